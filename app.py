@@ -0,0 +1,151 @@
+"""
+Prediction service.
+
+    POST /predict         JSON body: a list of records or {column: [values]}; JSON response
+    POST /predict/batch   Arrow IPC (application/vnd.apache.arrow.stream or .file) or Parquet body;
+                          Arrow IPC response when the Accept header asks for it, JSON otherwise
+    POST /predict/customers   JSON body {"customer_ids": [...]}: scores existing customers from the feature lookup
+                              store built during ingestion; unknown ids are listed under "missing", ids that are
+                              not integers are answered 422, and 503 means no store was published yet
+    GET  /customers/{id}/prediction
+    GET  /metrics         admission control metrics (queue depth, shed requests, queue wait histogram), Prometheus format
+
+A body that cannot be decoded (malformed JSON, a JSON scalar, a corrupt Arrow or Parquet file) is answered 400.
+
+Scoring requests are admitted by src.utils.admission_utils.AdmissionController: one scoring thread per CPU, a bounded
+queue, and a deadline per request (X-Request-Deadline-Ms header, SERVING_DEADLINE_MS by default). A request is
+answered 429 when the queue is full and 503 when it cannot be scored within its deadline, with a Retry-After header.
+
+Columns are the model inputs in src.pipeline.prediction_pipeline.MODEL_INPUT_COLUMN_KINDS; a model trained with
+feature selection needs (and reads) only its selected features.
+"""
+import json
+import math
+import time
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+from src.constants import APP_HOST, APP_PORT, SERVING_DEADLINE_HEADER
+from src.exception import RowValidationError
+from src.entity.config_entity import AdmissionControlConfig
+from src.pipeline.prediction_pipeline import VehicleDataClassifier
+from src.utils.admission_utils import ServiceOverloaded, admission_controller_from_config
+from src.utils.arrow_utils import (ARROW_STREAM_MEDIA_TYPE, ARROW_FILE_MEDIA_TYPE, MalformedBody,
+                                   UnsupportedMediaType, read_frame, predictions_to_arrow_ipc)
+
+app = FastAPI(title='Vehicle insurance cross-sell prediction')
+classifier = VehicleDataClassifier()
+admission = admission_controller_from_config(AdmissionControlConfig())
+
+def _wants_arrow(request: Request) -> bool:
+    accept = request.headers.get('accept', '')
+    return ARROW_STREAM_MEDIA_TYPE in accept or ARROW_FILE_MEDIA_TYPE in accept
+
+async def _score(request: Request, func, *args, rows: int):
+    # the model is CPU bound: off the event loop, on the bounded scoring threads of admission control
+    return await admission.run(func, *args, rows=rows, arrival=request.state.arrival,
+                               deadline=admission.deadline(request.headers.get(SERVING_DEADLINE_HEADER)))
+
+def _admit(request: Request) -> None:
+    # refuse before reading the body when the queue is already full
+    request.state.arrival = time.monotonic()
+    admission.check_queue()
+
+_JSON_TYPE_NAMES = {dict: 'object', list: 'array'}
+
+async def _json_body(request: Request, expected: tuple = (dict, list)):
+    try:
+        payload = json.loads(await request.body())
+    except ValueError as e: # JSONDecodeError and undecodable bytes
+        raise MalformedBody(f'Request body is not valid JSON: {e}') from e
+    if not isinstance(payload, expected):
+        raise MalformedBody(f'Expected a JSON {" or ".join(_JSON_TYPE_NAMES[kind] for kind in expected)}, '
+                            f'got {type(payload).__name__}')
+    return payload
+
+def _json_frame(payload):
+    import pandas as pd
+    if isinstance(payload, list) and not all(isinstance(record, dict) for record in payload):
+        raise MalformedBody('Expected a JSON array of records (objects)')
+    try:
+        return pd.DataFrame(payload)
+    except ValueError as e: # e.g. {column: scalar} or columns of different lengths
+        raise MalformedBody(f'Request body is not a table of records or columns: {e}') from e
+
+async def _predict(request: Request, df):
+    return await _score(request, classifier.predict, df, rows=len(df))
+
+@app.exception_handler(RowValidationError)
+async def row_validation_error_handler(request: Request, exc: RowValidationError) -> JSONResponse:
+    return JSONResponse(status_code=422, content=exc.report.to_dict())
+
+@app.exception_handler(UnsupportedMediaType)
+async def unsupported_media_type_handler(request: Request, exc: UnsupportedMediaType) -> JSONResponse:
+    return JSONResponse(status_code=415, content={'detail': str(exc)})
+
+@app.exception_handler(MalformedBody)
+async def malformed_body_handler(request: Request, exc: MalformedBody) -> JSONResponse:
+    return JSONResponse(status_code=400, content={'detail': str(exc)})
+
+@app.exception_handler(ServiceOverloaded)
+async def service_overloaded_handler(request: Request, exc: ServiceOverloaded) -> JSONResponse:
+    return JSONResponse(status_code=exc.status_code, content={'detail': str(exc), 'reason': exc.reason},
+                        headers={'Retry-After': str(max(math.ceil(exc.retry_after), 1))})
+
+@app.get('/health')
+async def health() -> dict:
+    return {'status': 'ok'}
+
+@app.get('/metrics')
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(admission.exposition(), media_type='text/plain; version=0.0.4')
+
+@app.post('/predict')
+async def predict(request: Request) -> dict:
+    _admit(request)
+    df = _json_frame(await _json_body(request))
+    df = df[[column for column in classifier.input_columns if column in df.columns]]
+    predictions = await _predict(request, df)
+    return {'predictions': predictions.tolist()}
+
+@app.post('/predict/batch')
+async def predict_batch(request: Request) -> Response:
+    _admit(request)
+    df = read_frame(await request.body(), request.headers.get('content-type'), columns=classifier.input_columns)
+    predictions = await _predict(request, df)
+    if _wants_arrow(request):
+        return Response(content=predictions_to_arrow_ipc(predictions), media_type=ARROW_STREAM_MEDIA_TYPE)
+    return JSONResponse({'predictions': predictions.tolist()})
+
+async def _predict_customers(request: Request, customer_ids):
+    try:
+        return await _score(request, classifier.predict_customers, customer_ids, rows=len(customer_ids))
+    except RowValidationError:
+        raise
+    except Exception as e:
+        if isinstance(e.__cause__, FileNotFoundError): # the lookup found no published store
+            raise HTTPException(status_code=503, detail='Feature lookup store not available') from e
+        raise
+
+@app.post('/predict/customers')
+async def predict_customers(request: Request) -> dict:
+    _admit(request)
+    customer_ids = (await _json_body(request, expected=(dict,))).get('customer_ids', [])
+    if not isinstance(customer_ids, list):
+        raise HTTPException(status_code=422, detail='customer_ids must be an array of integer customer ids')
+    predictions, found = await _predict_customers(request, customer_ids)
+    found_ids = [customer_id for customer_id, is_found in zip(customer_ids, found) if is_found]
+    return {'customer_ids': found_ids, 'predictions': predictions.tolist(),
+            'missing': [customer_id for customer_id, is_found in zip(customer_ids, found) if not is_found]}
+
+@app.get('/customers/{customer_id}/prediction')
+async def predict_customer(request: Request, customer_id: int) -> dict:
+    _admit(request)
+    predictions, found = await _predict_customers(request, [customer_id])
+    if not found[0]:
+        raise HTTPException(status_code=404, detail=f'Customer {customer_id} not in the feature lookup store')
+    return {'customer_id': customer_id, 'prediction': predictions.tolist()[0]}
+
+if __name__ == '__main__':
+    uvicorn.run(app, host=APP_HOST, port=APP_PORT)
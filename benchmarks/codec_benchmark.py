@@ -0,0 +1,114 @@
+"""
+Size, write time and load time of the artifact codecs (src/utils/codec_utils.py).
+
+The transformed train array (resampled, as data transformation saves it) and a trained MyModel are built from
+synthetic data (benchmarks/synthetic_data.py), then written and read back with every codec through
+save_numpy_array_data / load_numpy_array_data and save_object / load_object. For arrays, the time to read a range of
+rows (BlockArrayReader.read_rows) is also reported. Timings are the best of --repeats.
+
+Usage:
+    python benchmarks/codec_benchmark.py --rows 200000
+    python benchmarks/codec_benchmark.py --rows 200000 --threads 1 --level 1 --output bench/codecs.json
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR) # config paths are relative to the project root
+
+import numpy as np
+
+from src.constants import TARGET_COLUMN
+from synthetic_data import generate_frame
+
+CODECS = ('none', 'lz4', 'zstd')
+
+def build_artifacts(rows: int, n_estimators: int):
+    """
+    Returns the transformed train array and a MyModel trained on it, like the pipeline saves them.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from src.components.data_transformation import DataTransformation
+    from src.entity.estimator import MyModel
+    from src.utils.dtype_utils import get_dtype_plan
+
+    transformation = DataTransformation(data_ingestion_artifact=None, data_transformation_config=None, data_validation_artifact=None)
+    df = get_dtype_plan().apply(generate_frame(rows))
+    features, target = df.drop(columns=[TARGET_COLUMN, 'id']), df[TARGET_COLUMN]
+    features = transformation.apply_custom_transformations(features)
+    preprocessor = transformation.get_data_transformer_object().fit(features)
+    array = transformation.transform_and_resample(preprocessor, features, target)
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=10, random_state=0, n_jobs=1)
+    model.fit(array[:, :-1], array[:, -1])
+    return array, MyModel(preprocessing_object=preprocessor, trained_model_object=model)
+
+def best_of(repeats: int, func) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--n-estimators', type=int, default=50)
+    parser.add_argument('--level', type=int, default=0, help="codec level, 0 for the codec's default")
+    parser.add_argument('--threads', type=int, default=0, help='(de)compression threads, 0 for one per CPU')
+    parser.add_argument('--slice-rows', type=int, default=10_000, help='rows read by the random access timing')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args()
+
+    os.environ['ARTIFACT_CODEC_LEVEL'] = str(args.level)
+    os.environ['ARTIFACT_CODEC_THREADS'] = str(args.threads)
+    from src.utils.codec_utils import BlockArrayReader
+    from src.utils.main_utils import save_numpy_array_data, load_numpy_array_data, save_object, load_object
+
+    array, model = build_artifacts(args.rows, args.n_estimators)
+    results = {'rows': len(array), 'array_bytes': array.nbytes, 'level': args.level,
+               'threads': args.threads or os.cpu_count(), 'arrays': {}, 'objects': {}}
+    start_row = len(array) // 2
+    with tempfile.TemporaryDirectory() as work_dir:
+        print(f'array {array.shape} {array.nbytes / 2**20:.1f} MiB')
+        print(f'{"codec":<6} {"MiB":>8} {"ratio":>6} {"write s":>8} {"load s":>8} {"slice s":>8}')
+        for codec in CODECS:
+            file_path = os.path.join(work_dir, f'array_{codec}.npy')
+            write_seconds = best_of(args.repeats, lambda: save_numpy_array_data(file_path, array, codec=codec))
+            load_seconds = best_of(args.repeats, lambda: load_numpy_array_data(file_path))
+            if codec == 'none':
+                read_slice = lambda: np.array(np.load(file_path, mmap_mode='r')[start_row:start_row + args.slice_rows])
+            else:
+                read_slice = lambda: BlockArrayReader(file_path).read_rows(start_row, start_row + args.slice_rows)
+            slice_seconds = best_of(args.repeats, read_slice)
+            size = os.path.getsize(file_path)
+            results['arrays'][codec] = {'file_bytes': size, 'ratio': round(array.nbytes / size, 2),
+                                        'write_seconds': round(write_seconds, 4), 'load_seconds': round(load_seconds, 4),
+                                        'slice_seconds': round(slice_seconds, 5)}
+            print(f'{codec:<6} {size / 2**20:>8.2f} {array.nbytes / size:>6.2f} {write_seconds:>8.3f} '
+                  f'{load_seconds:>8.3f} {slice_seconds:>8.4f}')
+
+        print(f'model ({args.n_estimators} trees)')
+        print(f'{"codec":<6} {"MiB":>8} {"write s":>8} {"load s":>8}')
+        for codec in CODECS:
+            os.environ['ARTIFACT_OBJECT_CODEC'] = codec
+            file_path = os.path.join(work_dir, f'model_{codec}.pkl')
+            write_seconds = best_of(args.repeats, lambda: save_object(file_path, model))
+            load_seconds = best_of(args.repeats, lambda: load_object(file_path))
+            size = os.path.getsize(file_path)
+            results['objects'][codec] = {'file_bytes': size, 'write_seconds': round(write_seconds, 4),
+                                         'load_seconds': round(load_seconds, 4)}
+            print(f'{codec:<6} {size / 2**20:>8.2f} {write_seconds:>8.3f} {load_seconds:>8.3f}')
+
+    if args.output:
+        with open(args.output, 'w') as file_obj:
+            json.dump(results, file_obj, indent=2)
+
+if __name__ == '__main__':
+    main()
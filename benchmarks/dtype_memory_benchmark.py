@@ -0,0 +1,61 @@
+"""
+Memory benchmark for the schema-driven dtype plan (src/utils/dtype_utils.py).
+
+Builds a frame shaped like the Project1 collection, writes it to csv and reports bytes/row for:
+  - default pandas inference (pd.read_csv)
+  - the compact plan (DtypePlan.read_csv)
+  - the transformed model input (gender mapping, dummy columns, integer casts) before and after
+
+Usage:
+    python benchmarks/dtype_memory_benchmark.py --rows 1000000
+"""
+import os
+import sys
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # schema path is relative to the project root
+
+from src.utils.dtype_utils import get_dtype_plan, bytes_per_row
+from synthetic_data import generate_frame
+
+def transform(df: pd.DataFrame, compact: bool) -> pd.DataFrame:
+    # mirrors DataTransformation's custom steps, with and without compact dtypes
+    df = df.drop(columns=['id', 'Response'])
+    df['Gender'] = df['Gender'].map({'Female': 0, 'Male': 1}).astype(np.uint8 if compact else int)
+    df = pd.get_dummies(df, drop_first=True, dtype=np.uint8 if compact else bool)
+    for col in df.columns:
+        df[col] = pd.to_numeric(df[col].astype(np.int64), downcast='integer') if compact else df[col].astype(int)
+    return df
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    plan = get_dtype_plan()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'data.csv')
+        generate_frame(args.rows).to_csv(path, index=False)
+        default_df = pd.read_csv(path)
+        compact_df = plan.read_csv(path)
+
+    results = [
+        ('read: default inference', bytes_per_row(default_df)),
+        ('read: dtype plan', bytes_per_row(compact_df)),
+        ('transformed: default', bytes_per_row(transform(default_df, compact=False))),
+        ('transformed: dtype plan', bytes_per_row(transform(compact_df, compact=True))),
+    ]
+    print(f'{args.rows} rows')
+    print(f"{'frame':<26} {'bytes/row':>10}")
+    for name, value in results:
+        print(f'{name:<26} {value:>10.1f}')
+    print(f'read reduction: {results[0][1] / results[1][1]:.1f}x, transformed reduction: {results[2][1] / results[3][1]:.1f}x')
+    print('\ncompact dtypes:')
+    print(compact_df.dtypes.to_string())
+
+if __name__ == '__main__':
+    main()
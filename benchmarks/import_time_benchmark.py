@@ -0,0 +1,82 @@
+"""
+Import-time benchmark with a regression budget for the prediction entry point.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter (several times, keeping the best run),
+reports the total and the slowest imported modules, and fails if:
+  - the cumulative import time of the entry point exceeds the budget, or
+  - any module in FORBIDDEN_MODULES was imported (they must be deferred until first use), or
+  - importing the entry point created this process's log file.
+
+Usage:
+    python benchmarks/import_time_benchmark.py
+    python benchmarks/import_time_benchmark.py --module src.pipeline.prediction_pipeline --budget-ms 150
+"""
+import os
+import sys
+import argparse
+import subprocess
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINT = 'src.pipeline.prediction_pipeline'
+IMPORT_BUDGET_MS = 150.0 # cumulative import time allowed for the entry point, on a warm filesystem cache
+FORBIDDEN_MODULES = ('pandas', 'sklearn', 'imblearn', 'pymongo', 'boto3', 'dill')
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    Parses `-X importtime` output into {module: (self_us, cumulative_us)}.
+    """
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+def run_once(module: str, log_root: str) -> tuple:
+    code = (f'import os, sys, {module}; import src.logger as l; '
+            f'print(os.path.exists(l.log_file_path)); print(",".join(sorted(sys.modules)))')
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT_DIR, os.getenv('PYTHONPATH')])))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=log_root, env=env, capture_output=True, text=True, check=True)
+    log_created, modules = result.stdout.strip().split('\n', 1)
+    return parse_importtime(result.stderr), set(modules.split(',')), log_created == 'True'
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default=ENTRY_POINT)
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    failures = []
+    best_timings, best_total_us, loaded, log_created = None, None, set(), False
+    with tempfile.TemporaryDirectory() as log_root:
+        for _ in range(args.repeat):
+            timings, loaded, log_created = run_once(args.module, log_root)
+            total_us = timings.get(args.module, (0, 0))[1]
+            if best_total_us is None or total_us < best_total_us:
+                best_timings, best_total_us = timings, total_us
+
+    top = sorted(best_timings.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    print(f'{args.module}: {best_total_us / 1000:.1f} ms cumulative (budget {args.budget_ms:.0f} ms, best of {args.repeat})')
+    print(f"{'self (ms)':>10} {'cumul (ms)':>11}  module")
+    for name, (self_us, cumulative_us) in top:
+        print(f'{self_us / 1000:>10.1f} {cumulative_us / 1000:>11.1f}  {name}')
+
+    if best_total_us / 1000 > args.budget_ms:
+        failures.append(f'import time {best_total_us / 1000:.1f} ms exceeds budget {args.budget_ms:.0f} ms')
+    eager = sorted(m for m in FORBIDDEN_MODULES if m in loaded)
+    if eager:
+        failures.append(f'heavy modules imported eagerly: {eager}')
+    if log_created:
+        failures.append('importing the entry point created a log file')
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
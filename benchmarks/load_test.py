@@ -0,0 +1,175 @@
+"""
+Latency of the prediction service under overload, with and without admission control (src/utils/admission_utils.py).
+
+A small model is trained on synthetic data (benchmarks/synthetic_data.py) and served by uvicorn in a subprocess. The
+capacity of the server is measured with sequential requests, then an open-loop Poisson load of --overload times that
+capacity is offered for --duration seconds (arrivals do not wait for responses, as with independent clients), once
+with SERVING_ADMISSION_CONTROL on and once off. For each run the number of requests served and shed, the latency
+percentiles of the served ones and the goodput (requests served within their deadline per second, until the last
+response) are reported, with the server's /metrics after the run. Client and server share the machine, so on few
+cores the absolute numbers are pessimistic; the comparison between the two runs is what matters.
+
+Usage:
+    python benchmarks/load_test.py --rows-per-request 200 --overload 2 --duration 20
+    python benchmarks/load_test.py --deadline-ms 500 --output bench/load.json
+"""
+import os
+import sys
+import time
+import json
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import logging
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR) # config paths are relative to the project root
+
+import numpy as np
+
+from src.constants import PREDICTION_MODEL_FILE_PATH_ENV_KEY, SERVING_DEADLINE_HEADER
+from serving_benchmark import train_model
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(port: int, env: dict) -> subprocess.Popen:
+    import httpx
+
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'app:app', '--host', '127.0.0.1', '--port', str(port),
+                               '--log-level', 'warning', '--no-access-log'], env={**os.environ, **env}, cwd=ROOT_DIR)
+    for _ in range(300):
+        try:
+            if httpx.get(f'http://127.0.0.1:{port}/health').status_code == 200:
+                return server
+        except httpx.TransportError:
+            pass
+        if server.poll() is not None:
+            raise RuntimeError(f'Server exited with code {server.returncode}')
+        time.sleep(0.1)
+    stop_server(server)
+    raise RuntimeError('Server did not start')
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.terminate()
+    try:
+        server.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+async def post(client, url: str, body: bytes, deadline_ms: int, results: list) -> None:
+    start = time.perf_counter()
+    try:
+        response = await client.post(url, content=body, headers={'content-type': 'application/json',
+                                                                 SERVING_DEADLINE_HEADER: str(deadline_ms)})
+        status = response.status_code
+    except Exception:
+        status = 0 # connection error or client timeout
+    results.append((status, time.perf_counter() - start))
+
+async def calibrate(url: str, body: bytes, seconds: float) -> float:
+    """
+    Mean latency of sequential requests, after a warm-up one (the server loads the model on first use).
+    """
+    import httpx
+
+    async with httpx.AsyncClient(timeout=60) as client:
+        (await client.post(url, content=body, headers={'content-type': 'application/json'})).raise_for_status()
+        latencies, stop = [], time.perf_counter() + seconds
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            (await client.post(url, content=body, headers={'content-type': 'application/json'})).raise_for_status()
+            latencies.append(time.perf_counter() - start)
+    return float(np.mean(latencies))
+
+async def offer_load(url: str, body: bytes, rate: float, duration: float, deadline_ms: int, seed: int) -> list:
+    """
+    Sends requests at Poisson arrivals of `rate` per second for `duration` seconds, without waiting for responses.
+    """
+    import httpx
+
+    rng, results, tasks = random.Random(seed), [], []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        start = time.perf_counter()
+        next_arrival = start
+        while next_arrival - start < duration:
+            await asyncio.sleep(max(next_arrival - time.perf_counter(), 0))
+            tasks.append(asyncio.create_task(post(client, url, body, deadline_ms, results)))
+            next_arrival += rng.expovariate(rate)
+        await asyncio.gather(*tasks)
+    return results, time.perf_counter() - start
+
+def summarize(results: list, elapsed: float, deadline_ms: int) -> dict:
+    served = np.array([latency for status, latency in results if status == 200])
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    summary = {'sent': len(results), 'statuses': statuses, 'served': len(served),
+               'shed': statuses.get('429', 0) + statuses.get('503', 0),
+               'elapsed_seconds': round(elapsed, 1),
+               'goodput_per_second': round(float((served <= deadline_ms / 1000).sum()) / elapsed, 2)}
+    for q in (50, 95, 99):
+        summary[f'p{q}_ms'] = round(float(np.percentile(served, q)) * 1000, 1) if len(served) else None
+    summary['max_ms'] = round(float(served.max()) * 1000, 1) if len(served) else None
+    return summary
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--train-rows', type=int, default=20_000)
+    parser.add_argument('--n-estimators', type=int, default=20)
+    parser.add_argument('--rows-per-request', type=int, default=200)
+    parser.add_argument('--overload', type=float, default=2.0, help='offered load as a multiple of the measured capacity')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds of offered load per run')
+    parser.add_argument('--calibration', type=float, default=5.0, help='seconds of sequential requests to measure capacity')
+    parser.add_argument('--deadline-ms', type=int, default=1_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args()
+    for name in ('httpx', 'httpcore'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        model_file_path = os.path.join(work_dir, 'model.pkl')
+        features = train_model(args.train_rows, args.n_estimators, model_file_path)
+        body = features.sample(args.rows_per_request, random_state=args.seed).to_json(orient='records').encode()
+
+        results = {'rows_per_request': args.rows_per_request, 'overload': args.overload, 'duration': args.duration,
+                   'deadline_ms': args.deadline_ms, 'runs': {}}
+        for admission_control in (True, False):
+            name = 'admission_control' if admission_control else 'no_admission_control'
+            port = free_port()
+            server = start_server(port, {PREDICTION_MODEL_FILE_PATH_ENV_KEY: model_file_path,
+                                         'SERVING_ADMISSION_CONTROL': str(admission_control).lower(),
+                                         'SERVING_DEADLINE_MS': str(args.deadline_ms), 'LOG_LEVEL': 'WARNING'})
+            try:
+                url = f'http://127.0.0.1:{port}/predict'
+                service_seconds = asyncio.run(calibrate(url, body, args.calibration))
+                rate = args.overload / service_seconds
+                print(f'{name}: {service_seconds * 1000:.1f} ms per request sequentially, offering {rate:.1f} req/s '
+                      f'for {args.duration:.0f}s')
+                run = summarize(*asyncio.run(offer_load(url, body, rate, args.duration, args.deadline_ms, args.seed)),
+                                args.deadline_ms)
+                run.update(service_ms=round(service_seconds * 1000, 1), offered_per_second=round(rate, 1))
+                import httpx
+                run['metrics'] = httpx.get(f'http://127.0.0.1:{port}/metrics').text
+            finally:
+                stop_server(server)
+            results['runs'][name] = run
+            print(f'  sent {run["sent"]} served {run["served"]} shed {run["shed"]} {run["statuses"]}')
+            print(f'  p50 {run["p50_ms"]} ms  p95 {run["p95_ms"]} ms  p99 {run["p99_ms"]} ms  max {run["max_ms"]} ms  '
+                  f'goodput {run["goodput_per_second"]} req/s')
+
+    if args.output:
+        with open(args.output, 'w') as file_obj:
+            json.dump(results, file_obj, indent=2)
+
+if __name__ == '__main__':
+    main()
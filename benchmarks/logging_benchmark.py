@@ -0,0 +1,60 @@
+"""
+Micro-benchmark for the per-record cost of `logging.info` on the caller's thread.
+
+Compares the default synchronous handlers against queue mode (QueueHandler/QueueListener),
+in both text and json format. Only the time spent in the calling thread is measured;
+in queue mode the listener is stopped (flushed) afterwards and that drain time is reported separately.
+
+Usage:
+    python benchmarks/logging_benchmark.py --records 50000
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.logger as app_logger
+
+def run_case(records: int, use_queue: bool, fmt: str) -> dict:
+    # console output is sent to devnull so the terminal does not dominate the measurement
+    with open(os.devnull, 'w') as devnull:
+        stderr, sys.stderr = sys.stderr, devnull
+        try:
+            app_logger.configure_logger(level=logging.INFO, fmt=fmt, use_queue=use_queue)
+            start = time.perf_counter()
+            for i in range(records):
+                logging.info('Processed chunk %d with %d rows', i, 10_000)
+            caller_seconds = time.perf_counter() - start
+
+            drain_start = time.perf_counter()
+            app_logger.stop_queue_listener()
+            drain_seconds = time.perf_counter() - drain_start
+        finally:
+            sys.stderr = stderr
+
+    return {
+        'mode': 'queue' if use_queue else 'sync',
+        'format': fmt,
+        'records': records,
+        'caller_us_per_record': caller_seconds / records * 1e6,
+        'drain_seconds': drain_seconds,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=50_000)
+    args = parser.parse_args()
+
+    results = [run_case(args.records, use_queue, fmt) for fmt in ('text', 'json') for use_queue in (False, True)]
+    # restore the configuration the rest of the process expects
+    app_logger.configure_logger()
+
+    print(f"{'mode':<6} {'format':<6} {'us/record (caller)':>20} {'drain (s)':>10}")
+    for r in results:
+        print(f"{r['mode']:<6} {r['format']:<6} {r['caller_us_per_record']:>20.2f} {r['drain_seconds']:>10.3f}")
+
+if __name__ == '__main__':
+    main()
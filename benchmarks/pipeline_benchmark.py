@@ -0,0 +1,238 @@
+"""
+End-to-end benchmark harness for TrainPipeline on synthetic data (benchmarks/synthetic_data.py).
+
+Every stage of the training pipeline is run in order and profiled for wall time, CPU time and peak RSS (sampled
+by a background thread). Results are written to a JSON file that can be compared between commits.
+
+Data sources:
+  --source mongomock       generate rows into an in-process mongomock collection (default, no server needed)
+  --source mongod          generate rows into a local mongod given by --mongo-url (use --skip-load to reuse them)
+  --source feature-store   write rows straight to a csv and start ingestion from it (no MongoDB at all)
+
+Usage:
+    python benchmarks/pipeline_benchmark.py --rows 100000 --output bench/base.json
+    python benchmarks/pipeline_benchmark.py --rows 100000 --max-workers 4 --output bench/dag.json
+    python benchmarks/pipeline_benchmark.py --rows 100000 --memory-budget-mb 400 --output bench/budget.json
+    python benchmarks/pipeline_benchmark.py --rows 100000 --output bench/new.json --compare bench/base.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timezone
+from functools import partial
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INVOCATION_DIR = os.getcwd()
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR) # config paths are relative to the project root
+
+import pandas as pd
+
+from src.constants import DATABASE_NAME, DATA_INGESTION_COLLECTION_NAME
+from src.entity.config_entity import TrainingPipelineConfig, set_training_pipeline_config
+from src.utils.memory_utils import current_rss_bytes
+from synthetic_data import DEFAULT_CHUNK_SIZE, load_into_collection, write_feature_store
+
+class StageProfiler:
+    """
+    Measures wall time, CPU time and peak RSS of the enclosed block; RSS is sampled every `interval` seconds.
+    """
+    def __init__(self, name: str, interval: float = 0.005):
+        self.name = name
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, current_rss_bytes())
+
+    def __enter__(self) -> 'StageProfiler':
+        self.start_rss = self.peak_rss = current_rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self._cpu, self._wall = time.process_time(), time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.wall_seconds = time.perf_counter() - self._wall
+        self.cpu_seconds = time.process_time() - self._cpu
+        self._stop.set()
+        self._thread.join()
+        self.end_rss = current_rss_bytes()
+        self.peak_rss = max(self.peak_rss, self.end_rss)
+
+    def result(self) -> dict:
+        return {
+            'stage': self.name,
+            'wall_seconds': round(self.wall_seconds, 4),
+            'cpu_seconds': round(self.cpu_seconds, 4),
+            'start_rss_mb': round(self.start_rss / 2**20, 1),
+            'peak_rss_mb': round(self.peak_rss / 2**20, 1),
+            'peak_rss_delta_mb': round((self.peak_rss - self.start_rss) / 2**20, 1),
+        }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def prepare_source(args, work_dir: str) -> dict:
+    """
+    Loads the synthetic rows into the requested source and wires the pipeline to it.
+    """
+    from src.configuration.mongo_db_connection import MongoDBClient
+    if args.source == 'mongomock':
+        import mongomock
+        client = mongomock.MongoClient()
+        MongoDBClient.register_client(client)
+    elif args.source == 'mongod':
+        os.environ['MONGODB_URL'] = args.mongo_url
+        client = MongoDBClient.get_client()
+    else:
+        path = os.path.join(work_dir, 'synthetic_feature_store.csv')
+        with StageProfiler('generate') as profiler:
+            rows = write_feature_store(path, args.rows, args.chunk_size, args.seed, include_id=True)
+        return {'feature_store_csv': path, 'rows': rows, 'generate': profiler.result()}
+
+    collection = client[DATABASE_NAME][DATA_INGESTION_COLLECTION_NAME]
+    with StageProfiler('generate') as profiler:
+        if args.skip_load:
+            rows = collection.estimated_document_count()
+        else:
+            rows = load_into_collection(collection, args.rows, args.chunk_size, args.seed)
+    return {'rows': rows, 'generate': profiler.result()}
+
+def ingest_from_feature_store(data_ingestion_config, feature_store_csv: str):
+    """
+    Ingestion stage for --source feature-store (module level so that it pickles for --max-workers with process pools).
+    """
+    from src.components.data_ingestion import DataIngestion
+    from src.entity.artifact_entity import DataIngestionArtifact
+    data_ingestion = DataIngestion(data_ingestion_config=data_ingestion_config)
+    config = data_ingestion.data_ingestion_config
+    # documents exported from MongoDB carry an '_id'; add one so the csv matches what validation expects
+    chunks = (chunk.assign(_id=chunk['id'].astype(str))
+              for chunk in pd.read_csv(feature_store_csv, chunksize=config.chunk_size))
+    n_train, n_test = data_ingestion.split_chunks_as_train_test(chunks, feature_store_file_path=config.feature_store_file_path)
+    return DataIngestionArtifact(trained_file_path=config.train_file_path, test_file_path=config.test_file_path,
+                                 train_rows=n_train, test_rows=n_test)
+
+def run_benchmark(args) -> dict:
+    from src.pipeline.training_pipeline import TrainPipeline
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = prepare_source(args, work_dir)
+        set_training_pipeline_config(TrainingPipelineConfig(artifact_dir=os.path.join(work_dir, 'artifact')))
+        # stores that outlive a run live outside the artifact dir; keep them out of the project too
+        os.environ['FEATURE_LOOKUP_DIR'] = os.path.join(work_dir, 'feature_lookup')
+        os.environ['DATA_INGESTION_DEDUP_INDEX_DIR'] = os.path.join(work_dir, 'dedup_index')
+        pipeline = TrainPipeline()
+        if args.n_estimators is not None:
+            pipeline.model_trainer_config._n_estimators = args.n_estimators
+
+        stages, artifacts = [], {}
+        ingest = (partial(ingest_from_feature_store, pipeline.data_ingestion_config, source['feature_store_csv'])
+                  if args.source == 'feature-store' else pipeline.start_data_ingestion)
+        plan = [
+            ('data_ingestion', lambda: ingest()),
+            ('data_validation', lambda: pipeline.start_data_validation(data_ingestion_artifact=artifacts['data_ingestion'])),
+            ('data_transformation', lambda: pipeline.start_data_transformation(data_ingestion_artifact=artifacts['data_ingestion'],
+                                                                               data_validion_artifact=artifacts['data_validation'])),
+            ('model_trainer', lambda: pipeline.start_model_trainer(data_transformation_artifact=artifacts['data_transformation'],
+                                                                   data_watermark=artifacts['data_ingestion'].max_customer_id,
+                                                                   data_ingestion_artifact=artifacts['data_ingestion'])),
+        ]
+        if args.max_workers is not None:
+            # run every stage through the DAG executor instead, as TrainPipeline.run_pipeline does
+            pipeline.training_pipeline_config.max_workers = args.max_workers
+            pipeline.start_data_ingestion = ingest
+            plan = [('pipeline_dag', pipeline.run_pipeline)]
+        total_start = time.perf_counter()
+        for name, run_stage in plan:
+            with StageProfiler(name) as profiler:
+                artifacts[name] = run_stage()
+            result = profiler.result()
+            result['rows_per_second'] = round(source['rows'] / profiler.wall_seconds, 1) if profiler.wall_seconds else None
+            if name == 'pipeline_dag':
+                report = artifacts[name]
+                result['critical_path'] = report.critical_path
+                result['critical_path_seconds'] = round(report.critical_path_seconds, 4)
+                result['nodes'] = {timing.name: {'start_seconds': round(timing.start_seconds, 4),
+                                                 'duration_seconds': round(timing.duration_seconds, 4)}
+                                   for timing in report.timings.values()}
+            stages.append(result)
+            print(f"{name:<20} {result['wall_seconds']:>9.2f}s  peak RSS {result['peak_rss_mb']:>8.1f} MB")
+
+    return {
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'source': args.source,
+        'rows': source['rows'],
+        'seed': args.seed,
+        'n_estimators': args.n_estimators,
+        'max_workers': args.max_workers,
+        'generate': source['generate'],
+        'stages': stages,
+        'total_wall_seconds': round(time.perf_counter() - total_start, 4),
+        'peak_rss_mb': max(stage['peak_rss_mb'] for stage in stages),
+    }
+
+def compare(current: dict, baseline: dict) -> None:
+    """
+    Prints per-stage wall time and peak RSS deltas against a baseline result file.
+    """
+    base_stages = {stage['stage']: stage for stage in baseline['stages']}
+    print(f"\ncompared with {baseline.get('commit')} ({baseline.get('rows')} rows)")
+    print(f"{'stage':<20} {'wall (s)':>10} {'delta':>8} {'peak RSS (MB)':>14} {'delta':>8}")
+    for stage in current['stages']:
+        base = base_stages.get(stage['stage'])
+        if base is None:
+            print(f"{stage['stage']:<20} {stage['wall_seconds']:>10.2f} {'new':>8} {stage['peak_rss_mb']:>14.1f} {'new':>8}")
+            continue
+        wall_delta = (stage['wall_seconds'] / base['wall_seconds'] - 1) * 100 if base['wall_seconds'] else 0.0
+        rss_delta = (stage['peak_rss_mb'] / base['peak_rss_mb'] - 1) * 100 if base['peak_rss_mb'] else 0.0
+        print(f"{stage['stage']:<20} {stage['wall_seconds']:>10.2f} {wall_delta:>+7.1f}% {stage['peak_rss_mb']:>14.1f} {rss_delta:>+7.1f}%")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--source', choices=['mongomock', 'mongod', 'feature-store'], default='mongomock')
+    parser.add_argument('--mongo-url', default='mongodb://localhost:27017')
+    parser.add_argument('--skip-load', action='store_true', help='reuse the rows already in the mongod collection')
+    parser.add_argument('--n-estimators', type=int, default=None, help='override MODEL_TRAINER_N_ESTIMATORS for quicker runs')
+    parser.add_argument('--max-workers', type=int, default=None,
+                        help='run the stages as a DAG on this many workers (default: one stage after another)')
+    parser.add_argument('--memory-budget-mb', type=int, default=None,
+                        help='memory budget of the stages (MEMORY_BUDGET_BYTES); default: a fraction of the RAM')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='baseline result file to compare against')
+    args = parser.parse_args()
+    if args.memory_budget_mb is not None:
+        os.environ['MEMORY_BUDGET_BYTES'] = str(args.memory_budget_mb * 2**20)
+    args.output = os.path.join(INVOCATION_DIR, args.output)
+    args.compare = os.path.join(INVOCATION_DIR, args.compare) if args.compare else None
+
+    result = run_benchmark(args)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as file_obj:
+        json.dump(result, file_obj, indent=2)
+    print(f"total {result['total_wall_seconds']:.2f}s, results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file_obj:
+            compare(result, json.load(file_obj))
+
+if __name__ == '__main__':
+    main()
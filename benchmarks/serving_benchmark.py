@@ -0,0 +1,109 @@
+"""
+Throughput of the prediction app for JSON, Arrow IPC and Parquet request bodies.
+
+A small model is trained on synthetic data (benchmarks/synthetic_data.py) and served in-process through the FastAPI
+app; every request scores the same batch. Bodies are serialized once up front, so the timings cover what the
+server does: parse the body, build the dataframe, validate, predict and encode the response.
+
+Usage:
+    python benchmarks/serving_benchmark.py --rows 100000
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR) # config paths are relative to the project root
+
+import io
+import logging
+
+from src.constants import TARGET_COLUMN, PREDICTION_MODEL_FILE_PATH_ENV_KEY
+from synthetic_data import generate_frame
+
+def train_model(rows: int, n_estimators: int, model_file_path: str):
+    """
+    Trains a MyModel on synthetic rows and returns the model input frame to score.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from src.components.data_transformation import DataTransformation
+    from src.entity.estimator import MyModel
+    from src.utils.main_utils import save_object
+    from src.utils.dtype_utils import get_dtype_plan
+
+    transformation = DataTransformation(data_ingestion_artifact=None, data_transformation_config=None, data_validation_artifact=None)
+    df = get_dtype_plan().apply(generate_frame(rows))
+    features, target = df.drop(columns=[TARGET_COLUMN, 'id']), df[TARGET_COLUMN] # ingestion drops the customer id
+    features = transformation._renanme_columns(transformation._create_dummy_columns(
+        transformation._drop_id_column(transformation._map_gender_column(features))))
+    preprocessor = transformation.get_data_transformer_object().fit(features)
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=10, random_state=0, n_jobs=1)
+    model.fit(preprocessor.transform(features), target)
+    save_object(model_file_path, MyModel(preprocessing_object=preprocessor, trained_model_object=model))
+    return features
+
+def time_requests(client, repeats: int, **request) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = client.post(**request)
+        elapsed = time.perf_counter() - start
+        response.raise_for_status()
+        best = min(best, elapsed)
+    return best
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--n-estimators', type=int, default=10)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        model_file_path = os.path.join(work_dir, 'model.pkl')
+        features = train_model(args.rows, args.n_estimators, model_file_path)
+        os.environ[PREDICTION_MODEL_FILE_PATH_ENV_KEY] = model_file_path
+
+        from fastapi.testclient import TestClient
+        from app import app, classifier
+        from src.utils.arrow_utils import ARROW_STREAM_MEDIA_TYPE, PARQUET_MEDIA_TYPES, frame_to_arrow_ipc
+
+        parquet_body = io.BytesIO()
+        features.to_parquet(parquet_body, index=False)
+        bodies = {
+            'json': dict(url='/predict', content=features.to_json(orient='records').encode(),
+                         headers={'content-type': 'application/json'}),
+            'arrow_ipc': dict(url='/predict/batch', content=frame_to_arrow_ipc(features),
+                              headers={'content-type': ARROW_STREAM_MEDIA_TYPE, 'accept': ARROW_STREAM_MEDIA_TYPE}),
+            'parquet': dict(url='/predict/batch', content=parquet_body.getvalue(),
+                            headers={'content-type': PARQUET_MEDIA_TYPES[0], 'accept': ARROW_STREAM_MEDIA_TYPE}),
+        }
+
+        logging.getLogger('httpx').setLevel(logging.WARNING)
+        model_seconds = float('inf')
+        for _ in range(args.repeats): # the model alone on the ready dataframe: the floor for any format
+            start = time.perf_counter()
+            classifier.model.predict(features)
+            model_seconds = min(model_seconds, time.perf_counter() - start)
+
+        results = {'rows': args.rows, 'n_estimators': args.n_estimators, 'model_only_seconds': round(model_seconds, 4), 'formats': {}}
+        print(f'{"format":<10} {"body MB":>8} {"seconds":>9} {"rows/s":>12} {"model share":>12}')
+        with TestClient(app) as client:
+            for name, request in bodies.items():
+                seconds = time_requests(client, args.repeats, **request)
+                results['formats'][name] = {'body_bytes': len(request['content']), 'seconds': round(seconds, 4),
+                                            'rows_per_second': round(args.rows / seconds, 1)}
+                print(f'{name:<10} {len(request["content"]) / 2**20:>8.1f} {seconds:>9.3f} {args.rows / seconds:>12.0f} '
+                      f'{model_seconds / seconds:>11.0%}')
+
+    if args.output:
+        with open(args.output, 'w') as file_obj:
+            json.dump(results, file_obj, indent=2)
+
+if __name__ == '__main__':
+    main()
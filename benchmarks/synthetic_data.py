@@ -0,0 +1,169 @@
+"""
+Synthetic data generator for the Project1 collection, following config/schema.yaml.
+
+Column distributions follow the public vehicle insurance cross-sell data the project is built on: category
+frequencies for Gender, Vehicle_Age and Vehicle_Damage, the dominant Region_Code and Policy_Sales_Channel values,
+the 2630 premium floor, and a Response that depends on Previously_Insured, Vehicle_Damage, Vehicle_Age and Age with
+the intercept calibrated to the requested positive rate (~12% by default).
+
+Rows are generated in chunks with a per-chunk seed, so any row count (10k to 50M) streams in constant memory and
+the same (seed, rows, chunk_size) always produces the same data.
+
+Usage:
+    python benchmarks/synthetic_data.py --rows 1000000 --feature-store artifact/synthetic/data.csv
+    python benchmarks/synthetic_data.py --rows 1000000 --mongo-url mongodb://localhost:27017
+"""
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Iterator
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.constants import SCHEMA_FILE_PATH, DATABASE_NAME, COLLECTION_NAME, TARGET_COLUMN
+from src.utils.main_utils import read_yaml_file
+
+DEFAULT_CHUNK_SIZE = 250_000
+DEFAULT_POSITIVE_RATE = 0.12
+
+GENDER_P = {'Male': 0.541, 'Female': 0.459}
+VEHICLE_AGE_P = {'1-2 Year': 0.526, '< 1 Year': 0.432, '> 2 Year': 0.042}
+VEHICLE_DAMAGE_P = {'Yes': 0.505, 'No': 0.495}
+REGION_CODE_TOP = {28: 0.279, 8: 0.089, 46: 0.052, 41: 0.048, 15: 0.035, 30: 0.032, 29: 0.029}
+POLICY_CHANNEL_TOP = {152: 0.354, 26: 0.209, 124: 0.194, 160: 0.057, 156: 0.028, 122: 0.026, 157: 0.017}
+PREMIUM_FLOOR, PREMIUM_FLOOR_P = 2630.0, 0.17
+
+def _choice(rng: np.random.Generator, probabilities: dict, size: int) -> np.ndarray:
+    return rng.choice(np.array(list(probabilities)), size=size, p=np.array(list(probabilities.values())))
+
+def _top_or_uniform(rng: np.random.Generator, top: dict, low: int, high: int, size: int) -> np.ndarray:
+    """
+    Draws the listed frequent values with their probabilities and everything else uniformly from [low, high].
+    """
+    values = rng.integers(low, high + 1, size)
+    draw = rng.random(size)
+    edges = np.cumsum(list(top.values()))
+    picked = np.searchsorted(edges, draw, side='right')
+    frequent = picked < len(top)
+    values[frequent] = np.array(list(top))[picked[frequent]]
+    return values
+
+def _response_logits(df: pd.DataFrame) -> np.ndarray:
+    age = df['Age'].to_numpy()
+    logits = (
+        -6.0 * df['Previously_Insured'].to_numpy()
+        + 2.2 * (df['Vehicle_Damage'].to_numpy() == 'Yes')
+        + 0.6 * (df['Vehicle_Age'].to_numpy() == '> 2 Year')
+        - 0.5 * (df['Vehicle_Age'].to_numpy() == '< 1 Year')
+        + 0.9 * ((age >= 30) & (age <= 55))
+        + 0.3 * (df['Policy_Sales_Channel'].to_numpy() == 26)
+        - 0.4 * (df['Policy_Sales_Channel'].to_numpy() == 152)
+    )
+    return logits
+
+def calibrate_intercept(positive_rate: float, seed: int = 0, sample_rows: int = 200_000) -> float:
+    """
+    Finds the intercept that gives the requested expected positive rate, by bisection on a calibration sample.
+    """
+    logits = _response_logits(_features(np.random.default_rng([seed, 2**31]), 0, sample_rows))
+    low, high = -20.0, 20.0
+    for _ in range(60):
+        mid = (low + high) / 2
+        rate = (1 / (1 + np.exp(-(logits + mid)))).mean()
+        low, high = (mid, high) if rate < positive_rate else (low, mid)
+    return (low + high) / 2
+
+def _features(rng: np.random.Generator, first_id: int, rows: int) -> pd.DataFrame:
+    # Age: young drivers plus a broad middle-aged bulk, like the source data's bimodal shape
+    young = rng.random(rows) < 0.45
+    age = np.where(young, rng.integers(20, 30, rows), np.clip(rng.normal(46, 12, rows), 20, 85)).astype(int)
+    premium = np.where(rng.random(rows) < PREMIUM_FLOOR_P, PREMIUM_FLOOR,
+                       np.round(np.clip(rng.lognormal(np.log(33000), 0.35, rows), PREMIUM_FLOOR, 540165)))
+    return pd.DataFrame({
+        'id': np.arange(first_id + 1, first_id + rows + 1),
+        'Gender': _choice(rng, GENDER_P, rows),
+        'Age': age,
+        'Driving_License': (rng.random(rows) < 0.998).astype(int),
+        'Region_Code': _top_or_uniform(rng, REGION_CODE_TOP, 0, 52, rows).astype(float),
+        'Previously_Insured': (rng.random(rows) < 0.458).astype(int),
+        'Vehicle_Age': _choice(rng, VEHICLE_AGE_P, rows),
+        'Vehicle_Damage': _choice(rng, VEHICLE_DAMAGE_P, rows),
+        'Annual_Premium': premium,
+        'Policy_Sales_Channel': _top_or_uniform(rng, POLICY_CHANNEL_TOP, 1, 163, rows).astype(float),
+        'Vintage': rng.integers(10, 300, rows),
+    })
+
+def generate_chunks(rows: int, chunk_size: int = DEFAULT_CHUNK_SIZE, seed: int = 42,
+                    positive_rate: float = DEFAULT_POSITIVE_RATE) -> Iterator[pd.DataFrame]:
+    """
+    Yields dataframes of at most chunk_size rows with the schema.yaml columns (id included, no _id), deterministic for a given seed.
+    """
+    schema_columns = [name for column in read_yaml_file(SCHEMA_FILE_PATH)['columns'] for name in column]
+    intercept = calibrate_intercept(positive_rate, seed)
+    for chunk_index, start in enumerate(range(0, rows, chunk_size)):
+        rng = np.random.default_rng([seed, chunk_index])
+        df = _features(rng, start, min(chunk_size, rows - start))
+        probability = 1 / (1 + np.exp(-(_response_logits(df) + intercept)))
+        df[TARGET_COLUMN] = (rng.random(len(df)) < probability).astype(int)
+        yield df[schema_columns]
+
+def generate_frame(rows: int, seed: int = 42, positive_rate: float = DEFAULT_POSITIVE_RATE) -> pd.DataFrame:
+    """
+    Returns all rows in one dataframe (for small row counts).
+    """
+    return pd.concat(generate_chunks(rows, seed=seed, positive_rate=positive_rate), ignore_index=True)
+
+def write_feature_store(file_path: str, rows: int, chunk_size: int = DEFAULT_CHUNK_SIZE, seed: int = 42,
+                        positive_rate: float = DEFAULT_POSITIVE_RATE, include_id: bool = False) -> int:
+    """
+    Writes rows straight to a feature-store csv in the format DataIngestion produces (no customer id unless include_id,
+    which is needed to split the csv by customer). Returns the row count.
+    """
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    written = 0
+    with open(file_path, 'w', newline='') as file_obj:
+        for df in generate_chunks(rows, chunk_size, seed, positive_rate):
+            (df if include_id else df.drop(columns=['id'])).to_csv(file_obj, index=False, header=written == 0)
+            written += len(df)
+    return written
+
+def load_into_collection(collection, rows: int, chunk_size: int = DEFAULT_CHUNK_SIZE, seed: int = 42,
+                         positive_rate: float = DEFAULT_POSITIVE_RATE, drop: bool = True) -> int:
+    """
+    Inserts rows into a pymongo (local mongod) or mongomock collection. Returns the row count.
+    """
+    if drop:
+        collection.drop()
+    written = 0
+    for df in generate_chunks(rows, chunk_size, seed, positive_rate):
+        collection.insert_many(df.to_dict('records'), ordered=False)
+        written += len(df)
+    return written
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--positive-rate', type=float, default=DEFAULT_POSITIVE_RATE)
+    parser.add_argument('--feature-store', help='csv path to write')
+    parser.add_argument('--mongo-url', help='e.g. mongodb://localhost:27017 for a local mongod')
+    parser.add_argument('--database', default=DATABASE_NAME)
+    parser.add_argument('--collection', default=COLLECTION_NAME)
+    args = parser.parse_args()
+
+    if not args.feature_store and not args.mongo_url:
+        parser.error('pass --feature-store and/or --mongo-url')
+    if args.feature_store:
+        n = write_feature_store(args.feature_store, args.rows, args.chunk_size, args.seed, args.positive_rate)
+        print(f'Wrote {n} rows to {args.feature_store}')
+    if args.mongo_url:
+        import pymongo
+        collection = pymongo.MongoClient(args.mongo_url)[args.database][args.collection]
+        n = load_into_collection(collection, args.rows, args.chunk_size, args.seed, args.positive_rate)
+        print(f'Inserted {n} rows into {args.database}.{args.collection}')
+
+if __name__ == '__main__':
+    main()
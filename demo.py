@@ -27,5 +27,7 @@
 
 from src.pipeline.training_pipeline import TrainPipeline
 
-pipeline = TrainPipeline()
-pipeline.run_pipeline()
\ No newline at end of file
+# the guard matters: cross-validation workers are spawned, and a spawned process re-imports the main module
+if __name__ == '__main__':
+    pipeline = TrainPipeline()
+    pipeline.run_pipeline()
\ No newline at end of file
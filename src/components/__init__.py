@@ -0,0 +1,19 @@
+import importlib
+
+# Components are resolved lazily (PEP 562): `from src.components import DataIngestion` imports only that
+# component's module, so importing the package never pulls in sklearn/imblearn/pandas for unrelated stages.
+_LAZY_IMPORTS = {
+    'DataIngestion': 'src.components.data_ingestion',
+    'DataValidation': 'src.components.data_validation',
+    'DataTransformation': 'src.components.data_transformation',
+    'ModelTrainer': 'src.components.model_trainer',
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -1,26 +1,36 @@
 import os
 import sys
+import numpy as np
+import pandas as pd
+from typing import Iterable, Optional, Tuple
 
 from pandas import DataFrame
-from sklearn.model_selection import train_test_split
 
 from src.logger import logging
 from src.exception import MyException
-from src.data_access.project1_data import Poject1Data
+from src.constants import TARGET_COLUMN, CUSTOMER_ID_COLUMN
+from src.data_access.project1_data import Poject1Data, hashed_sample_query
 from src.entity.config_entity import DataIngestionConfig
 from src.entity.artifact_entity import DataIngestionArtifact
+from src.utils.dtype_utils import get_dtype_plan
+from src.utils.dedup_utils import RowDeduplicator
+from src.utils.memory_utils import AdaptiveChunkSizer, get_memory_budget
+from src.data_access.feature_lookup import FeatureLookupStore, FeatureSegmentWriter
 
 class DataIngestion:
-    def __init__(self, data_ingestion_config: DataIngestionConfig = DataIngestionConfig()):
+    def __init__(self, data_ingestion_config: Optional[DataIngestionConfig] = None):
         """
         Args:
             data_ingestion_config (DataIngestionConfig, optional): Configuration for data ingestion. Defaults to DataIngestionConfig().
         """
         try:
-            self.data_ingestion_config = data_ingestion_config
+            self.data_ingestion_config = data_ingestion_config if data_ingestion_config is not None else DataIngestionConfig()
+            self._dtype_plan = get_dtype_plan()
+            self.max_customer_id: Optional[int] = None
+            self._transformation = None
         except Exception as e:
             raise MyException(e, sys)
-        
+
     def export_data_into_feature_store(self) -> DataFrame:
         """
         Method to export data from MongoDB to a csv file in feature store
@@ -35,44 +45,271 @@ class DataIngestion:
             os.makedirs(dir_path, exist_ok=True)
             df.to_csv(feature_store_file_path, index=False, header=True) # header=True to include the column names in the csv file
             return df
-        
+
         except Exception as e:
             raise MyException(e, sys)
-        
+
+    @staticmethod
+    def _stable_split_keys(df: DataFrame, key_column: str) -> pd.Series:
+        """
+        Returns the split key of every row as a canonical string, so the same customer hashes identically whatever dtype
+        a chunk was inferred with (e.g. 42, 42.0 and '42' all become '42'). Falls back to MongoDB's '_id' if the key column is missing.
+        """
+        if key_column not in df.columns:
+            if '_id' not in df.columns:
+                raise Exception(f'Split key column {key_column} (or _id) not found in data')
+            key_column = '_id'
+        keys = df[key_column]
+        numeric = pd.to_numeric(keys, errors='coerce')
+        if numeric.notna().all() and (numeric % 1 == 0).all():
+            return numeric.astype('int64').astype(str)
+        return keys.astype(str)
+
+    @staticmethod
+    def _split_hashes(keys: pd.Series) -> np.ndarray:
+        return pd.util.hash_pandas_object(keys, index=False).to_numpy(dtype=np.uint64)
+
+    @staticmethod
+    def assign_test_rows(keys: pd.Series, test_ratio: float) -> np.ndarray:
+        """
+        Assigns rows to the test split with a deterministic hash of their key: a row is in test if its 64-bit hash
+        falls in the lowest `test_ratio` fraction of the hash range. The threshold is the same for every target class
+        and every run, so a customer lands in the same split across chunks, full runs and incremental runs whatever
+        else is in the collection. The hash is independent of the target, so each class is split at `test_ratio` in
+        expectation (the realized ratios are logged); an exact per-class ratio would need a threshold that moves as
+        the collection grows, and so customers that change split.
+
+        Returns:
+            np.ndarray: Boolean mask, True for test rows.
+        """
+        ratio = min(max(test_ratio, 0.0), 1.0)
+        if ratio >= 1.0:
+            return np.ones(len(keys), dtype=bool)
+        return DataIngestion._split_hashes(keys) < np.uint64(int(ratio * 2**64))
+
+    def _split_chunk(self, df: DataFrame) -> Tuple[DataFrame, DataFrame]:
+        """
+        Splits one chunk into train and test rows and drops the customer id (as the full export does) before writing.
+        """
+        keys = self._stable_split_keys(df, self.data_ingestion_config.split_key_column)
+        is_test = self.assign_test_rows(keys, self.data_ingestion_config.train_test_split_ratio)
+        if CUSTOMER_ID_COLUMN in df.columns:
+            df = df.drop(columns=[CUSTOMER_ID_COLUMN])
+        return df[~is_test], df[is_test]
+
+    def _log_split_balance(self, train_counts: pd.Series, test_counts: pd.Series) -> None:
+        for label in sorted(set(train_counts.index) | set(test_counts.index)):
+            n_train, n_test = int(train_counts.get(label, 0)), int(test_counts.get(label, 0))
+            ratio = n_test / (n_train + n_test) if (n_train + n_test) else 0.0
+            logging.info(f'{TARGET_COLUMN}={label}: {n_train} train rows, {n_test} test rows (test ratio {ratio:.4f})')
+
+    def _update_max_customer_id(self, df: DataFrame) -> None:
+        if CUSTOMER_ID_COLUMN not in df.columns or df.empty:
+            return
+        chunk_max = pd.to_numeric(df[CUSTOMER_ID_COLUMN], errors='coerce').max()
+        if pd.notna(chunk_max):
+            self.max_customer_id = int(chunk_max) if self.max_customer_id is None else max(self.max_customer_id, int(chunk_max))
+
+    def _append_lookup_features(self, writer: FeatureSegmentWriter, df: DataFrame) -> None:
+        """
+        Appends the model input features of a chunk, keyed by customer id, to a feature lookup segment.
+        """
+        if self._transformation is None:
+            from src.components.data_transformation import DataTransformation
+            self._transformation = DataTransformation(data_ingestion_artifact=None, data_transformation_config=None,
+                                                      data_validation_artifact=None)
+        customer_ids = pd.to_numeric(df[CUSTOMER_ID_COLUMN], errors='coerce')
+        df = df[customer_ids.notna().to_numpy()]
+        features = self._transformation.apply_custom_transformations(df.drop(columns=[TARGET_COLUMN, CUSTOMER_ID_COLUMN], errors='ignore'))
+        features = features.reindex(columns=writer.columns, fill_value=0)
+        writer.append(customer_ids.dropna().to_numpy(dtype=np.int64), features.to_numpy(dtype=np.float32))
+
+    def split_chunks_as_train_test(self, chunks: Iterable[DataFrame], feature_store_file_path: Optional[str] = None,
+                                   feature_lookup_writer: Optional[FeatureSegmentWriter] = None,
+                                   deduplicator: Optional[RowDeduplicator] = None) -> Tuple[int, int]:
+        """
+        Method to split a stream of chunks into train and test sets by hashed key, writing each file exactly once.
+        Only one chunk is held in memory at a time. If feature_store_file_path is given the chunks (without the customer id) are also written there.
+        If feature_lookup_writer is given the model input features of every customer are appended to it; a chunk that
+        cannot be transformed aborts the writer (logged) instead of the ingestion, validation reports the bad rows later.
+        If deduplicator is given, duplicate rows are dropped before anything is written (the lookup store still gets
+        every customer).
+        The largest customer id seen is kept in self.max_customer_id.
+
+        Returns:
+            Tuple[int, int]: Number of train rows and test rows written.
+        """
+        try:
+            train_file_path = self.data_ingestion_config.train_file_path
+            test_file_path = self.data_ingestion_config.test_file_path
+            os.makedirs(os.path.dirname(train_file_path), exist_ok=True)
+            os.makedirs(os.path.dirname(test_file_path), exist_ok=True)
+            feature_store_file = None
+            if feature_store_file_path is not None:
+                os.makedirs(os.path.dirname(feature_store_file_path), exist_ok=True)
+                feature_store_file = open(feature_store_file_path, 'w', newline='')
+
+            n_train, n_test, columns = 0, 0, None
+            train_counts, test_counts = pd.Series(dtype='int64'), pd.Series(dtype='int64')
+            try:
+                with open(train_file_path, 'w', newline='') as train_file, open(test_file_path, 'w', newline='') as test_file:
+                    for chunk in chunks:
+                        chunk = self._dtype_plan.apply(chunk)
+                        if columns is None:
+                            columns = list(chunk.columns)
+                        else:
+                            chunk = chunk.reindex(columns=columns) # keep every chunk aligned with the header written first
+                        if feature_lookup_writer is not None and CUSTOMER_ID_COLUMN in chunk.columns:
+                            try:
+                                self._append_lookup_features(feature_lookup_writer, chunk)
+                            except Exception as e:
+                                logging.warning(f'Feature lookup store not refreshed, a chunk could not be transformed: {e}')
+                                feature_lookup_writer.abort()
+                                feature_lookup_writer = None
+
+                        self._update_max_customer_id(chunk)
+                        if deduplicator is not None:
+                            chunk = deduplicator.deduplicate(chunk)
+                        if feature_store_file is not None:
+                            chunk.drop(columns=[CUSTOMER_ID_COLUMN], errors='ignore').to_csv(
+                                feature_store_file, index=False, header=feature_store_file.tell() == 0)
+
+                        train_set, test_set = self._split_chunk(chunk)
+                        train_set.to_csv(train_file, index=False, header=train_file.tell() == 0)
+                        test_set.to_csv(test_file, index=False, header=test_file.tell() == 0)
+                        n_train += len(train_set)
+                        n_test += len(test_set)
+                        if TARGET_COLUMN in chunk.columns:
+                            train_counts = train_counts.add(train_set[TARGET_COLUMN].value_counts(), fill_value=0)
+                            test_counts = test_counts.add(test_set[TARGET_COLUMN].value_counts(), fill_value=0)
+            except Exception:
+                if feature_lookup_writer is not None:
+                    feature_lookup_writer.abort()
+                raise
+            finally:
+                if feature_store_file is not None:
+                    feature_store_file.close()
+
+            self._log_split_balance(train_counts, test_counts)
+            logging.info(f'Train and test data is saved at {train_file_path} ({n_train} rows) and {test_file_path} ({n_test} rows)')
+            return n_train, n_test
+
+        except Exception as e:
+            raise MyException(e, sys)
+
     def split_data_as_train_test(self, df: DataFrame) -> None:
         """
-        Method to split data into train and test sets and test based on split ratio. 
-        Create a Folder in S3 bucket to store train and test data
+        Method to split data into train and test sets and test based on split ratio.
+        Rows are assigned by a deterministic hash of the customer id (see assign_test_rows), and each file is written once.
         """
         try:
-            train_set, test_set = train_test_split(df, test_size=self.data_ingestion_config.train_test_split_ratio)
             logging.info('Splitting data into train and test sets')
+            self.split_chunks_as_train_test([df])
 
-            os.makedirs(os.path.dirname(self.data_ingestion_config.train_file_path), exist_ok=True)
+        except Exception as e:
+            raise MyException(e, sys)
 
-            logging.info(f'Exporting train data to file: {self.data_ingestion_config.train_file_path}')
-            train_set.to_csv(self.data_ingestion_config.train_file_path, index=False, header=True)
+    def _deduplicator(self) -> Optional[RowDeduplicator]:
+        """
+        Builds the row deduplicator of this run. An incremental run starts from the index saved by the run that
+        ingested up to its min_customer_id, so rows duplicating already ingested ones are dropped too.
+        """
+        if not self.data_ingestion_config.deduplicate:
+            return None
+        from src.utils.schema_utils import get_compiled_schema
+        feature_columns = [column for column in get_compiled_schema().feature_columns if column != CUSTOMER_ID_COLUMN]
+        deduplicator = RowDeduplicator(feature_columns, TARGET_COLUMN,
+                                       drop_conflicts=self.data_ingestion_config.drop_conflicting_duplicates,
+                                       max_keys=self.data_ingestion_config.dedup_max_keys)
+        if self.data_ingestion_config.min_customer_id is not None:
+            deduplicator.load(self.data_ingestion_config.dedup_index_dir, watermark=self.data_ingestion_config.min_customer_id)
+        return deduplicator
 
-            logging.info(f'Exporting test data to file: {self.data_ingestion_config.test_file_path}')
-            train_set.to_csv(self.data_ingestion_config.train_file_path, index=False, header=True)
-            test_set.to_csv(self.data_ingestion_config.test_file_path, index=False, header=True)
-            logging.info(f'Train and test data is saved at {self.data_ingestion_config.train_file_path} and {self.data_ingestion_config.test_file_path}')
+    def _feature_lookup_writer(self) -> Optional[FeatureSegmentWriter]:
+        if not self.data_ingestion_config.build_feature_lookup:
+            return None
+        from src.pipeline.prediction_pipeline import MODEL_INPUT_COLUMN_KINDS
+        store = FeatureLookupStore(self.data_ingestion_config.feature_lookup_dir, self.data_ingestion_config.feature_lookup_max_segments)
+        return store.writer(columns=list(MODEL_INPUT_COLUMN_KINDS))
 
+    def _publish_feature_lookup(self, writer: FeatureSegmentWriter) -> None:
+        """
+        Publishes the feature lookup segment written during ingestion: a full ingestion replaces the store, an incremental
+        one (min_customer_id set) adds a delta segment. The store only serves lookups, so a failure is logged, not raised.
+        """
+        if writer.aborted:
+            return
+        if writer.rows == 0:
+            writer.abort()
+            return
+        try:
+            store = FeatureLookupStore(self.data_ingestion_config.feature_lookup_dir, self.data_ingestion_config.feature_lookup_max_segments)
+            segment = writer.finish()
+            store.publish(segment, columns=writer.columns, replace=self.data_ingestion_config.min_customer_id is None)
         except Exception as e:
-            raise MyException(e, sys)
-        
+            logging.warning(f'Feature lookup store {self.data_ingestion_config.feature_lookup_dir} not refreshed: {e}')
+
+    def export_query(self, max_customer_id: Optional[int] = None) -> Optional[dict]:
+        """
+        MongoDB filter of the documents ingested: newer than min_customer_id (incremental retraining) and in the sample
+        of sample_rates (sample runs); None for the whole collection. With max_customer_id, only the documents up to it,
+        so later stages can query the documents an ingestion exported (see DataIngestionArtifact.max_customer_id).
+        """
+        conditions = []
+        if self.data_ingestion_config.min_customer_id is not None:
+            conditions.append({CUSTOMER_ID_COLUMN: {'$gt': self.data_ingestion_config.min_customer_id}})
+        if max_customer_id is not None:
+            conditions.append({CUSTOMER_ID_COLUMN: {'$lte': max_customer_id}})
+        if self.data_ingestion_config.sample_rates:
+            conditions.append(hashed_sample_query(self.data_ingestion_config.sample_rates, stratify_column=TARGET_COLUMN))
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {'$and': conditions}
+
     def initiate_data_ingestion(self) -> DataIngestionArtifact:
         """
         Method to initiate data ingestion components of training pipeline.
+        Data is streamed from MongoDB in chunks into the feature store and the train/test files in a single pass.
         Train set and test set are returned as artifacts of data ingestion component
         """
         try:
-            df = self.export_data_into_feature_store()
-            logging.info('Fetched data from MongoDB')
-            self.split_data_as_train_test(df)
+            logging.info('Exporting data from MongoDB in chunks sized to the memory budget, starting at {} rows'.format(self.data_ingestion_config.chunk_size))
+            project1_data = Poject1Data()
+            query = self.export_query()
+            if self.data_ingestion_config.min_customer_id is not None:
+                logging.info(f'Exporting only documents with {CUSTOMER_ID_COLUMN} > {self.data_ingestion_config.min_customer_id}')
+            if self.data_ingestion_config.sample_rates:
+                logging.info(f'Exporting a sample of the documents: {self.data_ingestion_config.sample_rates} of each {TARGET_COLUMN}')
+            chunk_sizer = AdaptiveChunkSizer(get_memory_budget(), initial_rows=self.data_ingestion_config.chunk_size,
+                                             max_rows=self.data_ingestion_config.max_chunk_size,
+                                             overhead=self.data_ingestion_config.chunk_overhead)
+            chunks = project1_data.export_collection_in_chunks(collection_name=self.data_ingestion_config.collection_name,
+                                                               chunk_size=self.data_ingestion_config.chunk_size,
+                                                               drop_id=False, # the id is the split key; it is dropped after splitting
+                                                               query=query, chunk_sizer=chunk_sizer)
+            feature_lookup_writer = self._feature_lookup_writer()
+            deduplicator = self._deduplicator()
+            n_train, n_test = self.split_chunks_as_train_test(chunks, feature_store_file_path=self.data_ingestion_config.feature_store_file_path,
+                                                              feature_lookup_writer=feature_lookup_writer,
+                                                              deduplicator=deduplicator)
+            if feature_lookup_writer is not None:
+                self._publish_feature_lookup(feature_lookup_writer)
+            if n_train + n_test == 0:
+                since = '' if self.data_ingestion_config.min_customer_id is None else f' with {CUSTOMER_ID_COLUMN} > {self.data_ingestion_config.min_customer_id}'
+                raise Exception(f'No documents{since} in collection {self.data_ingestion_config.collection_name}; nothing to train on')
             logging.info('Performed train test split on fetched dataset')
-            data_ingestion_artifact = DataIngestionArtifact(trained_file_path=self.data_ingestion_config.train_file_path, test_file_path=self.data_ingestion_config.test_file_path)
+            if deduplicator is not None:
+                logging.info(f'Dropped {deduplicator.duplicate_rows} duplicate and {deduplicator.conflicting_rows} conflicting rows')
+                if self.max_customer_id is not None:
+                    deduplicator.save(self.data_ingestion_config.dedup_index_dir, watermark=self.max_customer_id)
+            data_ingestion_artifact = DataIngestionArtifact(trained_file_path=self.data_ingestion_config.train_file_path,
+                                                            test_file_path=self.data_ingestion_config.test_file_path,
+                                                            train_rows=n_train,
+                                                            test_rows=n_test,
+                                                            max_customer_id=self.max_customer_id,
+                                                            duplicate_rows_dropped=deduplicator.duplicate_rows if deduplicator else 0,
+                                                            conflicting_rows_dropped=deduplicator.conflicting_rows if deduplicator else 0)
             logging.info(f'Data ingestion artifact: {data_ingestion_artifact}')
             return data_ingestion_artifact
         except Exception as e:
-            raise MyException(e, sys)
\ No newline at end of file
+            raise MyException(e, sys)
@@ -0,0 +1,89 @@
+import sys
+from typing import Optional
+
+from src.logger import logging
+from src.exception import MyException
+from src.constants import TARGET_COLUMN
+from src.data_access.project1_data import Poject1Data
+from src.entity.config_entity import DataProfilingConfig
+from src.entity.artifact_entity import DataProfileArtifact
+from src.utils.main_utils import write_yaml_file
+from src.utils.profile_utils import DataProfile, profile_drift
+from src.utils.schema_utils import get_compiled_schema
+
+class DataProfiling:
+    def __init__(self, data_profiling_config: DataProfilingConfig, collection_name: str, query: Optional[dict] = None,
+                 reference_profile: Optional[DataProfile] = None):
+        """
+        Args:
+            data_profiling_config (DataProfilingConfig): Configuration for data profiling.
+            collection_name (str): Collection holding the documents to profile.
+            query (dict, optional): MongoDB filter of the documents to profile (the ones ingested). Defaults to all documents.
+            reference_profile (DataProfile, optional): Profile of the production model's training data; the documents
+                are bucketed with its edges and their drift from it is measured. Defaults to no drift check.
+        """
+        try:
+            self.data_profiling_config = data_profiling_config
+            self.collection_name = collection_name
+            self.query = query
+            self.reference_profile = reference_profile
+            self.schema = get_compiled_schema()
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def profile_documents(self) -> DataProfile:
+        """
+        Method to profile the documents on the MongoDB server (in pandas if the server cannot run the aggregation).
+        """
+        try:
+            profile = Poject1Data().profile_collection(
+                collection_name=self.collection_name,
+                numeric_columns=self.schema.numerical_columns,
+                categorical_columns=self.schema.categorical_columns,
+                target_column=TARGET_COLUMN,
+                query=self.query,
+                buckets=self.data_profiling_config.buckets,
+                reference=self.reference_profile)
+            logging.info(f'Profiled {profile.n_rows} documents of {self.collection_name} ({profile.source}), '
+                         f'{TARGET_COLUMN} rate {profile.target_rate}')
+            return profile
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def initiate_data_profiling(self) -> DataProfileArtifact:
+        """
+        Method to profile the ingested documents, measure their drift from the reference profile and write the profile.
+
+        Returns:
+            DataProfileArtifact: The profile and the population stability index of every column.
+        """
+        try:
+            logging.info('Entered initiate_data_profiling method of DataProfiling class')
+            profile = self.profile_documents()
+            drift = profile_drift(self.reference_profile, profile) if self.reference_profile is not None else {}
+            drifted_columns = sorted(column for column, psi in drift.items() if psi > self.data_profiling_config.drift_threshold)
+            if drifted_columns:
+                logging.warning(f'Columns drifted from the production model\'s training data (PSI > '
+                                f'{self.data_profiling_config.drift_threshold}): '
+                                f'{ {column: round(drift[column], 3) for column in drifted_columns} }')
+            elif self.reference_profile is None:
+                logging.info('No reference profile; drift is not measured')
+
+            data_profile_artifact = DataProfileArtifact(
+                profile_file_path=self.data_profiling_config.profile_file_path,
+                profile=profile.to_dict(),
+                source=profile.source,
+                n_rows=profile.n_rows,
+                target_rate=profile.target_rate,
+                drift=drift,
+                drifted_columns=drifted_columns,
+            )
+            write_yaml_file(self.data_profiling_config.profile_file_path,
+                            {'profile': profile.to_dict(), 'drift': drift, 'drifted_columns': drifted_columns}, replace=True)
+            logging.info(f'Data profile written to {self.data_profiling_config.profile_file_path}')
+            return data_profile_artifact
+
+        except Exception as e:
+            raise MyException(e, sys) from e
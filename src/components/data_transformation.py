@@ -1,17 +1,21 @@
+import os
 import sys 
 import numpy as np
 import pandas as pd
-from imblearn.combine import SMOTEENN
-from sklearn.pipeline import Pipeline
-from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import StandardScaler, MinMaxScaler
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 from src.logger import logging
 from src.exception import MyException
 from src.entity.config_entity import DataTransformationConfig
 from src.entity.artifact_entity import DataTransformationArtifact, DataIngestionArtifact, DataValidationArtifact
-from src.constants import TARGET_COLUMN, SCHEMA_FILE_PATH, CURRENT_YEAR
-from src.utils.main_utils import save_object, save_numpy_array_data, read_yaml_file
+from src.constants import TARGET_COLUMN, CURRENT_YEAR, DATA_TRANSFORMATION_MEMORY_OVERHEAD, MIN_SAMPLES_SPLIT_RANDOM_STATE
+from src.utils.main_utils import save_object, save_numpy_array_data
+from src.utils.dtype_utils import get_dtype_plan
+from src.utils.schema_utils import get_compiled_schema
+from src.utils.memory_utils import get_memory_budget
+
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
 
 class DataTransformation:
     def __init__(self, data_ingestion_artifact: DataIngestionArtifact,
@@ -21,7 +25,7 @@ class DataTransformation:
             self.data_ingestion_artifact = data_ingestion_artifact
             self.data_transformation_config = data_transformation_config
             self.data_validation_artifact = data_validation_artifact
-            self._schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+            self._schema = get_compiled_schema()
 
         except Exception as e:
             raise MyException(e, sys)
@@ -29,34 +33,128 @@ class DataTransformation:
     @staticmethod
     def read_data(file_path: str) -> pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return get_dtype_plan().read_csv(file_path)
         except Exception as e:
             raise MyException(e, sys)
         
-    def get_data_transformer_object(self) -> Pipeline:
+    def train_row_limit(self, train_file_path: str, test_file_path: str) -> Optional[int]:
+        """
+        Reserves the memory budget for both splits at once, before either is read (the train and test branches run
+        concurrently, so checking the headroom in each would let both claim it). The test split is always read whole;
+        the train split gets what is left.
+
+        Returns:
+            Optional[int]: Rows of the train split that fit, None if the whole file does.
+        """
+        try:
+            budget = get_memory_budget()
+            plan = get_dtype_plan()
+            headroom = budget.headroom()
+            n_train, train_row_bytes = plan.estimate_frame_size(train_file_path)
+            n_test, test_row_bytes = plan.estimate_frame_size(test_file_path)
+            test_bytes = n_test * test_row_bytes * DATA_TRANSFORMATION_MEMORY_OVERHEAD
+            train_row_bytes *= DATA_TRANSFORMATION_MEMORY_OVERHEAD
+            if n_train * train_row_bytes + test_bytes <= headroom:
+                return None
+            max_rows = max(int((headroom - test_bytes) / train_row_bytes) if train_row_bytes > 0 else n_train,
+                           budget.min_chunk_rows)
+            logging.warning(f'Train ({n_train} rows) and test ({n_test} rows) data do not fit the memory budget for '
+                            f'transformation together; the train data is downsampled to about {max_rows} rows')
+            return max_rows
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    @staticmethod
+    def read_data_in_chunks(file_path: str) -> pd.DataFrame:
+        """
+        Reads every row of a data file, parsing it in chunks sized to the memory budget (no whole-file parser buffers).
+        """
+        try:
+            plan = get_dtype_plan()
+            _, row_bytes = plan.estimate_frame_size(file_path)
+            chunk_rows = get_memory_budget().rows_for(row_bytes * 2, share=0.1)
+            chunks = list(plan.iter_csv(file_path, chunksize=chunk_rows))
+            return chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def read_data_within_budget(self, file_path: str, max_rows: Optional[int] = None) -> pd.DataFrame:
+        """
+        Reads the train file whole if it has at most `max_rows` rows (see train_row_limit; None for no limit).
+        Otherwise the file is streamed and the most frequent target class is randomly downsampled (every row of the
+        other classes is kept) to `max_rows`: SMOTEENN needs all its rows in memory, so this is the fallback to
+        failing later. Only the train split is downsampled; the test split keeps every row.
+        """
+        if max_rows is None:
+            return self.read_data(file_path)
+        plan = get_dtype_plan()
+        _, row_bytes = plan.estimate_frame_size(file_path)
+        chunk_rows = get_memory_budget().rows_for(row_bytes * 2, share=0.1)
+        counts = pd.Series(dtype='int64')
+        for chunk in pd.read_csv(file_path, usecols=[TARGET_COLUMN], chunksize=chunk_rows):
+            counts = counts.add(chunk[TARGET_COLUMN].value_counts(), fill_value=0)
+        if counts.sum() <= max_rows:
+            return self.read_data(file_path)
+        majority = counts.idxmax()
+        n_other = int(counts.sum() - counts[majority])
+        majority_rate = min(max(max_rows - n_other, 0) / counts[majority], 1.0)
+        other_rate = 1.0 if n_other <= max_rows else max_rows / counts.sum()
+        if n_other > max_rows:
+            majority_rate = other_rate
+        logging.warning(f'{file_path} ({int(counts.sum())} rows) does not fit the memory budget for transformation; keeping '
+                        f'{majority_rate:.1%} of {TARGET_COLUMN}={majority} rows and {other_rate:.1%} of the others')
+
+        rng = np.random.default_rng(MIN_SAMPLES_SPLIT_RANDOM_STATE)
+        kept = []
+        for chunk in plan.iter_csv(file_path, chunksize=chunk_rows):
+            rate = np.where(chunk[TARGET_COLUMN].to_numpy() == majority, majority_rate, other_rate)
+            kept.append(chunk[rng.random(len(chunk)) < rate])
+        return pd.concat(kept, ignore_index=True)
+
+    def get_data_transformer_object(self, columns: Optional[List[str]] = None) -> 'Pipeline':
         """
         Creates and returns a data transformer object for the pipeline including gender mapping, dummy encoding and scaling and type conversion
+        columns: the selected features of a pruned model; only these are scaled or passed through (in the order the
+        full preprocessor outputs them) and any other column of the input is dropped
         """
         logging.info('Entered get_data_transformer_object method of DataTransformation class')
         try:
+            # sklearn is imported on first use so that importing this module stays cheap
+            from sklearn.pipeline import Pipeline
+            from sklearn.compose import ColumnTransformer
+            from sklearn.preprocessing import StandardScaler, MinMaxScaler
+
             # initialize the transformers
             numeric_transformer = StandardScaler()
             min_max_scaler = MinMaxScaler()
             logging.info('Transformers initialized: StandardScaler, MinMaxScaler')
 
             # load schema config from yaml
-            num_features = self._schema_config['num_features']
-            mm_columns = self._schema_config['mm_columns']
+            num_features = self._schema.num_features
+            mm_columns = self._schema.mm_columns
             logging.info('Columns initialized: num_features, mm_columns')
 
             # create the preprocessor pipeline with the transformers
-            preprocessor = ColumnTransformer(
-                transformers=[
-                    ('StandardScaler', numeric_transformer, num_features),
-                    ('MinMaxScaler', min_max_scaler, mm_columns) 
-                ],
-                remainder = 'passthrough' # leaves the categorical columns as it is
-            )
+            if columns is None:
+                preprocessor = ColumnTransformer(
+                    transformers=[
+                        ('StandardScaler', numeric_transformer, num_features),
+                        ('MinMaxScaler', min_max_scaler, mm_columns) 
+                    ],
+                    remainder = 'passthrough' # leaves the categorical columns as it is
+                )
+            else:
+                scaled = set(num_features) | set(mm_columns)
+                preprocessor = ColumnTransformer(
+                    transformers=[
+                        ('StandardScaler', numeric_transformer, [column for column in num_features if column in columns]),
+                        ('MinMaxScaler', min_max_scaler, [column for column in mm_columns if column in columns]),
+                        ('Passthrough', 'passthrough', [column for column in columns if column not in scaled])
+                    ],
+                    remainder = 'drop' # the dropped features are never copied or scaled
+                )
 
             # wrapping the preprocessor into a pipeline
             final_pipeline = Pipeline(steps=[('Preprocessor', preprocessor)])
@@ -71,7 +169,7 @@ class DataTransformation:
         Maps the gender column to numeric values- 1 for Male and 0 for Female
         """
         logging.info('Entered _map_gender_column method of DataTransformation class')
-        df['Gender'] = df['Gender'].map({'Female': 0, 'Male': 1}).astype(int)
+        df['Gender'] = df['Gender'].map(self._schema.category_codes['Gender']).astype(np.uint8)
         return df
 
     def _create_dummy_columns(self, df):
@@ -79,7 +177,7 @@ class DataTransformation:
         Creates dummy columns for the categorical columns
         """
         logging.info('Entered _create_dummy_columns method of DataTransformation class')
-        df = pd.get_dummies(df, drop_first=True) # drop first column to avoid multicollinearity(one of the dummy columns is a linear combination of the other dummy columns)
+        df = pd.get_dummies(df, drop_first=True, dtype=np.uint8) # drop first column to avoid multicollinearity(one of the dummy columns is a linear combination of the other dummy columns)
         return df 
 
     def _renanme_columns(self, df):
@@ -92,7 +190,7 @@ class DataTransformation:
             'Vehicle_Age_> 2 Year': 'Vehicle_Age_gt_2_Year',
         })
         for col in df.columns:
-            df[col] = df[col].astype(int) # ensure integer type for dummy columns
+            df[col] = pd.to_numeric(df[col].astype(np.int64), downcast='integer') # ensure integer type for dummy columns, in the smallest type that holds the values
         return df
     
     def _drop_id_column(self, df):
@@ -100,79 +198,207 @@ class DataTransformation:
         Drops the id column if present
         """
         logging.info('Entered _drop_id_column method of DataTransformation class')
-        drop_col = self._schema_config['drop_columns']
+        drop_col = self._schema.drop_columns
         if drop_col in df.columns:
             df = df.drop(drop_col, axis=1)
         return df
     
-    def initiate_data_transformation(self) -> DataTransformationArtifact:
+    def check_validation_status(self) -> None:
         """
-        Initiates the data transformation process for the pipeline and returns a DataTransformationArtifact object.
+        Raises when data validation failed, so nothing is transformed from invalid data.
         """
         try:
-            logging.info('Data Transformation started...')
             if not self.data_validation_artifact.validation_status:
                 raise Exception(self.data_validation_artifact.message)
-            
-            # load data
-            train_df = self.read_data(file_path=self.data_ingestion_artifact.trained_file_path)
-            test_df = self.read_data(file_path=self.data_ingestion_artifact.test_file_path)
-            logging.info('Train and test data loaded')
-
-            input_features_train_df = train_df.drop(columns=[TARGET_COLUMN], axis=1)
-            target_feature_train_df = train_df[TARGET_COLUMN]
-            
-            input_features_test_df = test_df.drop(columns=[TARGET_COLUMN], axis=1)
-            target_feature_test_df = test_df[TARGET_COLUMN]
-            
-            logging.info('Input and target features loaded for Train and test data')
-
-            # apply custom transformations to the data in specific order
-            input_features_train_df = self._map_gender_column(input_features_train_df)
-            input_features_train_df = self._drop_id_column(input_features_train_df)
-            input_features_train_df = self._create_dummy_columns(input_features_train_df)
-            input_features_train_df = self._renanme_columns(input_features_train_df)
-
-            input_features_test_df = self._map_gender_column(input_features_test_df)
-            input_features_test_df = self._drop_id_column(input_features_test_df)
-            input_features_test_df = self._create_dummy_columns(input_features_test_df)
-            input_features_test_df = self._renanme_columns(input_features_test_df)
-
-            logging.info('Custom transformations applied to the data')
-
-            logging.info('Statrting data transformation')
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def apply_custom_transformations(self, input_features_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Applies the custom transformations to input features in their specific order, giving the model input columns.
+        Also used by ingestion to fill the feature lookup store, so served features match the training ones.
+        """
+        input_features_df = self._map_gender_column(input_features_df)
+        input_features_df = self._drop_id_column(input_features_df)
+        input_features_df = self._create_dummy_columns(input_features_df)
+        return self._renanme_columns(input_features_df)
+
+    def prepare_features(self, file_path: str, split: str = 'train', max_rows: Optional[int] = None) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        Reads a data file and applies the custom transformations in their specific order.
+
+        Args:
+            file_path (str): Path of the train or test csv.
+            split (str): 'train' or 'test'; only the train split is downsampled to fit the memory budget.
+            max_rows (int, optional): Rows of the train split that fit, from train_row_limit.
+
+        Returns:
+            Tuple[pd.DataFrame, pd.Series]: Input features and target feature.
+        """
+        try:
+            if split == 'train':
+                df = self.read_data_within_budget(file_path=file_path, max_rows=max_rows)
+            else:
+                df = self.read_data_in_chunks(file_path=file_path)
+            input_features_df = self.apply_custom_transformations(df.drop(columns=[TARGET_COLUMN]))
+            target_feature_df = df[TARGET_COLUMN]
+            logging.info(f'Custom transformations applied to {file_path}')
+            return input_features_df, target_feature_df
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def fit_preprocessor(self, input_features_train_df: pd.DataFrame, base_preprocessor: Optional['Pipeline'] = None) -> 'Pipeline':
+        """
+        Fits the preprocessor on the train input features (learns the scaling parameters).
+        With base_preprocessor (incremental retraining) the production preprocessor is reused unchanged, so new
+        trees see features scaled exactly like the ones the existing trees were trained on.
+        """
+        try:
+            if base_preprocessor is not None:
+                logging.info('Reusing the preprocessor of the production model')
+                return base_preprocessor
             preprocessor = self.get_data_transformer_object()
-            logging.info('Preprocessor initialized')
+            preprocessor.fit(input_features_train_df)
+            logging.info('Preprocessor fitted on train data')
+            return preprocessor
 
-            input_feature_train_arr = preprocessor.fit_transform(input_features_train_df) # fit_transform is a method that returns a numpy array of transformed data and also fits the transformer to the data(learn the parameters)
-            input_feature_test_arr = preprocessor.transform(input_features_test_df) # transform returns a numpy array of transformed data
-            logging.info('Data transformation completed')
+        except Exception as e:
+            raise MyException(e, sys) from e
 
-            logging.info('Applying SMOTEENN for handling imbalanced dataset...')
+    def hold_out_validation(self, input_features_df: pd.DataFrame, target_feature_df: pd.Series,
+                            validation_split_ratio: float) -> Tuple[Tuple[pd.DataFrame, pd.Series], Optional[Tuple[pd.DataFrame, pd.Series]]]:
+        """
+        Holds out validation_split_ratio of the train rows, stratified by target, before they are resampled: the model
+        trainer tunes feature selection and compression on them, and SMOTEENN's synthetic rows, built from the
+        neighbours of the rows it resamples, must not end up among them.
+
+        Returns:
+            Tuple: The (input features, target) to fit on, and the validation (input features, target) or None if no
+            rows are held out.
+        """
+        try:
+            if validation_split_ratio <= 0:
+                return (input_features_df, target_feature_df), None
+            from sklearn.model_selection import train_test_split
+            fit_rows, validation_rows = train_test_split(np.arange(len(target_feature_df)), test_size=validation_split_ratio,
+                                                         stratify=target_feature_df, random_state=MIN_SAMPLES_SPLIT_RANDOM_STATE)
+            fit_rows, validation_rows = np.sort(fit_rows), np.sort(validation_rows)
+            logging.info(f'Holding out {len(validation_rows)} of {len(target_feature_df)} train rows for validation')
+            return ((input_features_df.iloc[fit_rows], target_feature_df.iloc[fit_rows]),
+                    (input_features_df.iloc[validation_rows], target_feature_df.iloc[validation_rows]))
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def _features_and_target(self, input_feature_arr: np.ndarray, target_feature: np.ndarray) -> np.ndarray:
+        # features and target side by side without np.c_'s intermediate copies; on disk if it does not fit
+        array = get_memory_budget().allocate((input_feature_arr.shape[0], input_feature_arr.shape[1] + 1),
+                                             dtype=np.result_type(input_feature_arr.dtype, np.float64), prefix='transformed',
+                                             spill_dir=self._spill_dir())
+        array[:, :-1] = input_feature_arr
+        array[:, -1] = np.asarray(target_feature)
+        return array
+
+    def transform(self, preprocessor: 'Pipeline', input_features_df: pd.DataFrame, target_feature_df: pd.Series) -> np.ndarray:
+        """
+        Transforms input features with the fitted preprocessor, without resampling, and returns the features and
+        target concatenated into one array (target last).
+        """
+        try:
+            return self._features_and_target(preprocessor.transform(input_features_df), target_feature_df)
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def transform_and_resample(self, preprocessor: 'Pipeline', input_features_df: pd.DataFrame,
+                               target_feature_df: pd.Series) -> np.ndarray:
+        """
+        Transforms input features with the fitted preprocessor, applies SMOTEENN for the imbalanced target and
+        returns the features and target concatenated into one array (target last).
+        """
+        try:
+            import sklearn
+            from imblearn.combine import SMOTEENN
+            budget = get_memory_budget()
+            input_feature_arr = preprocessor.transform(input_features_df)
             smt = SMOTEENN(sampling_strategy="minority")
-            input_feature_train_final, target_feature_train_final = smt.fit_resample(
-                input_feature_train_arr, target_feature_train_df
-            )
-            input_feature_test_final, target_feature_test_final = smt.fit_resample(
-                input_feature_test_arr, target_feature_test_df
-            )
-            logging.info("SMOTEENN applied to train-test df.")
-
-            train_arr = np.c_[input_feature_train_final, np.array(target_feature_train_final)]
-            test_arr = np.c_[input_feature_test_final, np.array(target_feature_test_final)]
-            logging.info('feature-target concatenation done for train-test split')
+            # nearest neighbour searches compute distances in blocks sized to the budget
+            with sklearn.config_context(working_memory=budget.working_memory_mb()):
+                input_feature_final, target_feature_final = smt.fit_resample(input_feature_arr, target_feature_df)
+            del input_feature_arr
+            logging.info('SMOTEENN applied')
+            return self._features_and_target(input_feature_final, target_feature_final)
+
+        except Exception as e:
+            raise MyException(e, sys) from e
 
+    def _spill_dir(self) -> Optional[str]:
+        # next to the transformed files, so saving a spilled array is a rename
+        if self.data_transformation_config is None or self.data_transformation_config.transformed_train_file_path is None:
+            return None
+        return os.path.dirname(self.data_transformation_config.transformed_train_file_path)
+
+    def save_preprocessor(self, preprocessor: 'Pipeline') -> str:
+        try:
             save_object(self.data_transformation_config.transformed_object_file_path, preprocessor)
-            save_numpy_array_data(self.data_transformation_config.transformed_train_file_path, array=train_arr)
-            save_numpy_array_data(self.data_transformation_config.transformed_test_file_path, array=test_arr)
+            return self.data_transformation_config.transformed_object_file_path
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def save_array(self, file_path: str, array: np.ndarray) -> str:
+        try:
+            save_numpy_array_data(file_path, array=array)
+            return file_path
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def build_artifact(self, validation_file_path: Optional[str] = None) -> DataTransformationArtifact:
+        return DataTransformationArtifact(
+            transformed_object_file_path=self.data_transformation_config.transformed_object_file_path,
+            transformed_train_file_path=self.data_transformation_config.transformed_train_file_path,
+            transformed_test_file_path=self.data_transformation_config.transformed_test_file_path,
+            transformed_validation_file_path=validation_file_path
+        )
+
+    def initiate_data_transformation(self, base_preprocessor: Optional['Pipeline'] = None,
+                                     validation_split_ratio: float = 0.0) -> DataTransformationArtifact:
+        """
+        Initiates the data transformation process for the pipeline and returns a DataTransformationArtifact object.
+        The steps are separate methods so that TrainPipeline can run the train and test branches concurrently.
+        base_preprocessor: fitted preprocessor of the production model, used instead of fitting a new one
+        validation_split_ratio: share of the train rows held out before resampling and saved untouched (see hold_out_validation)
+        """
+        try:
+            logging.info('Data Transformation started...')
+            self.check_validation_status()
+
+            max_train_rows = self.train_row_limit(self.data_ingestion_artifact.trained_file_path,
+                                                  self.data_ingestion_artifact.test_file_path)
+            input_features_train_df, target_feature_train_df = self.prepare_features(
+                self.data_ingestion_artifact.trained_file_path, split='train', max_rows=max_train_rows)
+            input_features_test_df, target_feature_test_df = self.prepare_features(
+                self.data_ingestion_artifact.test_file_path, split='test')
+
+            train_features, validation_features = self.hold_out_validation(input_features_train_df, target_feature_train_df,
+                                                                           validation_split_ratio)
+            preprocessor = self.fit_preprocessor(train_features[0], base_preprocessor=base_preprocessor)
+            train_arr = self.transform_and_resample(preprocessor, *train_features)
+            test_arr = self.transform_and_resample(preprocessor, input_features_test_df, target_feature_test_df)
+
+            self.save_preprocessor(preprocessor)
+            self.save_array(self.data_transformation_config.transformed_train_file_path, train_arr)
+            self.save_array(self.data_transformation_config.transformed_test_file_path, test_arr)
+            validation_file_path = None
+            if validation_features is not None:
+                validation_file_path = self.save_array(self.data_transformation_config.transformed_validation_file_path,
+                                                       self.transform(preprocessor, *validation_features))
             logging.info('Saved transformation objest and transformed object')
             logging.info('Data transformation completed successfully...')
-
-            return DataTransformationArtifact(
-                transformed_object_file_path=self.data_transformation_config.transformed_object_file_path,
-                transformed_train_file_path=self.data_transformation_config.transformed_train_file_path,
-                transformed_test_file_path=self.data_transformation_config.transformed_test_file_path
-            )
+            return self.build_artifact(validation_file_path)
         
         except Exception as e:
-            raise MyException(e, sys) from e
\ No newline at end of file
+            raise MyException(e, sys) from e
@@ -2,13 +2,17 @@ import os
 import sys
 import json
 import pandas as pd
+from typing import Optional
 
 from src.logger import logging
 from src.exception import MyException
-from src.constants import SCHEMA_FILE_PATH
-from src.utils.main_utils import read_yaml_file
+from src.utils.validation_utils import RowValidationReport
+from src.utils.dtype_utils import get_dtype_plan
+from src.utils.schema_utils import get_compiled_schema
+from src.utils.memory_utils import get_memory_budget
+from src.constants import DATA_VALIDATION_MEMORY_OVERHEAD
 from src.entity.config_entity import DataValidationConfig
-from src.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
+from src.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, DataProfileArtifact
 
 class DataValidation:
     def __init__(self, data_ingestion_artifact: DataIngestionArtifact, data_validation_config: DataValidationConfig):
@@ -20,7 +24,8 @@ class DataValidation:
         try:
             self.data_ingeston_artifact = data_ingestion_artifact
             self.data_validation_config = data_validation_config
-            self.schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+            self.schema = get_compiled_schema()
+            self.schema_config = self.schema.config
 
         except Exception as e:  
             raise MyException(e, sys) from e
@@ -36,7 +41,7 @@ class DataValidation:
             bool: True if the number of columns is valid, False otherwise.
         """
         try:
-            status = len(df.columns) == len(self.schema_config['columns'])
+            status = len(df.columns) == len(self.schema.columns)
             logging.info(f"Is number of columns valid?: {status}")
             return status
         
@@ -54,11 +59,11 @@ class DataValidation:
             bool: True if all required columns are present, False otherwise.
         """
         try:
-            missing_numeric_cols = [col for col in self.schema_config['numerical_columns'] if col not in df.columns]
+            missing_numeric_cols = [col for col in self.schema.numerical_columns if col not in df.columns]
             if len(missing_numeric_cols) > 0:
                 logging.info(f'Missing numeric columns: {missing_numeric_cols}')
                 return False
-            missing_categorical_cols = [col for col in self.schema_config['categorical_columns'] if col not in df.columns]
+            missing_categorical_cols = [col for col in self.schema.categorical_columns if col not in df.columns]
             if len(missing_categorical_cols) > 0:
                 logging.info(f'Missing categorical columns: {missing_categorical_cols}')
                 return False
@@ -67,51 +72,95 @@ class DataValidation:
         except Exception as e:
             raise MyException(e, sys) from e
         
+    def validate_rows(self, df: pd.DataFrame) -> RowValidationReport:
+        """
+        Method to validate the values of every row against the schema column types in one vectorized pass.
+
+        Args:
+            df (pd.DataFrame): The dataframe to validate.
+
+        Returns:
+            RowValidationReport: Counts and row indices of null, non-numeric and non-integer values per column.
+        """
+        try:
+            report = self.schema.row_validator.validate(df)
+            logging.info(f'Row validation: {report.summary()}')
+            return report
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
     @staticmethod
     def read_data(file_path: str) -> pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return get_dtype_plan().read_csv(file_path)
         
         except Exception as e:
             raise MyException(e, sys)
         
-    def initiate_data_validation(self) -> DataValidationArtifact:
+    def validate_file(self, file_path: str, label: str) -> dict:
         """
-        Method to initiate the data validation process.
+        Method to run every check on one data file. Files are independent, so train and test can be validated concurrently.
+
+        Args:
+            file_path (str): Path of the csv file to validate.
+            label (str): Name of the split used in messages ('train' or 'test').
 
         Returns:
-            DataValidationArtifact: Artifact containing the status of the data validation.
+            dict: Error messages of the column checks ('' when passing) and the row validation report.
         """
         try:
-            validation_err_msg = ''
-            logging.info('Entered initiate_data_validation method of DataValidation class')
-            train_df = DataValidation.read_data(file_path=self.data_ingeston_artifact.trained_file_path)
-            test_df = DataValidation.read_data(file_path=self.data_ingeston_artifact.test_file_path)
-
-            status = self.validate_number_of_columns(df=train_df)
-            if not status:
-                validation_err_msg += 'Number of columns in train data is invalid.\n'
+            budget = get_memory_budget()
+            plan = get_dtype_plan()
+            n_rows, row_bytes = plan.estimate_frame_size(file_path)
+            if budget.fits(n_rows * row_bytes * DATA_VALIDATION_MEMORY_OVERHEAD):
+                df = DataValidation.read_data(file_path=file_path)
+                chunks = None
             else:
-                logging.info(f'All columns in train data are valid. Number of columns: {train_df.shape[1]}, status: {status}')
-
-            status = self.validate_number_of_columns(df=test_df)
+                # out of core: the column checks run on the first chunk, rows are validated chunk by chunk
+                rows_per_chunk = budget.rows_for(row_bytes * DATA_VALIDATION_MEMORY_OVERHEAD)
+                logging.info(f'{label} data does not fit the memory budget; validating in chunks of about {rows_per_chunk} rows')
+                chunks = plan.iter_csv(file_path, chunksize=rows_per_chunk)
+                df = next(chunks)
+            result = {'label': label, 'column_count_error': '', 'column_exist_error': ''}
+
+            status = self.validate_number_of_columns(df=df)
             if not status:
-                validation_err_msg += 'Number of columns in test data is invalid.\n'
+                result['column_count_error'] = f'Number of columns in {label} data is invalid.\n'
             else:
-                logging.info(f'All columns in test data are valid. Number of columns: {test_df.shape[1]}, status: {status}')
+                logging.info(f'All columns in {label} data are valid. Number of columns: {df.shape[1]}, status: {status}')
 
-            status = self.is_column_exist(df=train_df)
+            status = self.is_column_exist(df=df)
             if not status:
-                validation_err_msg += 'Columns are not valid in train data.\n'
+                result['column_exist_error'] = f'Columns are not valid in {label} data.\n'
             else:
-                logging.info(f'All columns in train data are valid. Number of columns: {train_df.shape[1]}, status: {status}')
+                logging.info(f'All columns in {label} data are valid. Number of columns: {df.shape[1]}, status: {status}')
 
-            status = self.is_column_exist(df=test_df)
-            if not status:
-                validation_err_msg += 'Columns are not valid in test data.\n'
+            # row-level problems are reported, not raised, so a few bad records do not stop the pipeline
+            if chunks is None:
+                result['row_validation'] = self.validate_rows(df=df).to_dict()
             else:
-                logging.info(f'All columns in test data are valid. Number of columns: {test_df.shape[1]}, status: {status}')
+                reports = [self.schema.row_validator.validate(df)]
+                del df
+                reports.extend(self.schema.row_validator.validate(chunk) for chunk in chunks)
+                report = RowValidationReport.concat(reports)
+                logging.info(f'Row validation: {report.summary()}')
+                result['row_validation'] = report.to_dict()
+            return result
+
+        except Exception as e:
+            raise MyException(e, sys) from e
 
+    def build_validation_artifact(self, train_result: dict, test_result: dict,
+                                  data_profile_artifact: Optional[DataProfileArtifact] = None) -> DataValidationArtifact:
+        """
+        Method to combine the per-file results, write the validation report and return the artifact.
+        data_profile_artifact: collection-level statistics and drift of the ingested documents, added to the report
+        """
+        try:
+            results = [train_result, test_result]
+            validation_err_msg = ''.join(result['column_count_error'] for result in results)
+            validation_err_msg += ''.join(result['column_exist_error'] for result in results)
             validation_status = len(validation_err_msg) == 0
 
             data_validation_artifact = DataValidationArtifact(
@@ -124,15 +173,54 @@ class DataValidation:
 
             validation_report = {
                 'validation_status': validation_status,
-                'message': validation_err_msg.strip()
+                'message': validation_err_msg.strip(),
+                'row_validation': {result['label']: result['row_validation'] for result in results}
             }
+            if data_profile_artifact is not None:
+                validation_report['profile'] = self.profile_summary(data_profile_artifact)
 
             with open(self.data_validation_config.validation_report_file_path, 'w') as report_file:
                 json.dump(validation_report, report_file, indent=4)
 
-            logging.info('Exited initiate_data_validation method of DataValidation class successfully')
             logging.info(f'Data validation artifact: {data_validation_artifact}')
             return data_validation_artifact
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    @staticmethod
+    def profile_summary(data_profile_artifact: DataProfileArtifact) -> dict:
+        """
+        Method to summarise a data profile for the validation report: null and invalid values per column, the target
+        rate and the drifted columns.
+        """
+        profile = data_profile_artifact.profile
+        return {
+            'n_rows': data_profile_artifact.n_rows,
+            'source': data_profile_artifact.source,
+            'target_rate': data_profile_artifact.target_rate,
+            'null_counts': {column: values['null_count'] for kind in ('numeric', 'categorical')
+                            for column, values in profile[kind].items() if values['null_count']},
+            'invalid_counts': {column: values['invalid_count'] for column, values in profile['numeric'].items()
+                               if values['invalid_count']},
+            'drift': {column: round(psi, 4) for column, psi in data_profile_artifact.drift.items()},
+            'drifted_columns': data_profile_artifact.drifted_columns,
+        }
+
+    def initiate_data_validation(self) -> DataValidationArtifact:
+        """
+        Method to initiate the data validation process.
+
+        Returns:
+            DataValidationArtifact: Artifact containing the status of the data validation.
+        """
+        try:
+            logging.info('Entered initiate_data_validation method of DataValidation class')
+            train_result = self.validate_file(file_path=self.data_ingeston_artifact.trained_file_path, label='train')
+            test_result = self.validate_file(file_path=self.data_ingeston_artifact.test_file_path, label='test')
+            data_validation_artifact = self.build_validation_artifact(train_result=train_result, test_result=test_result)
+            logging.info('Exited initiate_data_validation method of DataValidation class successfully')
+            return data_validation_artifact
         
         except Exception as e:
-            raise MyException(e, sys) from e
\ No newline at end of file
+            raise MyException(e, sys) from e
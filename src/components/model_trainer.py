@@ -1,15 +1,21 @@
+import os
 import sys
+import time
 import numpy as np
-from typing import Tuple
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 from src.logger import logging
 from src.exception import MyException
 from src.entity.estimator import MyModel
 from src.entity.config_entity import ModelTrainerConfig
-from src.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact, ClassificationMetricArtifact
+from src.entity.artifact_entity import (DataTransformationArtifact, ModelTrainerArtifact, ClassificationMetricArtifact,
+                                        ModelCompressionArtifact, CrossValidationArtifact, FeatureSelectionArtifact)
 from src.utils.main_utils import load_numpy_array_data, load_object, save_object
+from src.utils.codec_utils import array_file_nbytes
+from src.utils.memory_utils import get_memory_budget
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 class ModelTrainer:
     def __init__(self, data_transformation_artifact: DataTransformationArtifact, 
@@ -21,12 +27,23 @@ class ModelTrainer:
         self.data_transformation_artifact = data_transformation_artifact
         self.model_trainer_config = model_trainer_config
 
+    def _model_params(self) -> dict:
+        return dict(
+            n_estimators=self.model_trainer_config._n_estimators,
+            min_samples_split=self.model_trainer_config._min_samples_split,
+            min_samples_leaf=self.model_trainer_config._min_samples_leaf,
+            max_depth=self.model_trainer_config._max_depth,
+            criterion=self.model_trainer_config._criterion,
+            random_state=self.model_trainer_config._random_state
+        )
+
     def get_model_object_and_report(self, train: np.array, test: np.array) -> Tuple[object, object]:
         """
         This method trains a RandomForestClassifier with specified parameters,
         Returns the model object and classification report
         """
         try:
+            from sklearn.ensemble import RandomForestClassifier
             logging.info('Training RandomForestClassifier with specified parameters')
             
             # Splitting train and test data into features and target variables
@@ -34,71 +51,415 @@ class ModelTrainer:
             logging.info('Splitting train and test data into features and target variables is done successfully')
 
             # Initialize and fit RandomForestClassifier with specified parameters
-            model = RandomForestClassifier(
-                n_estimators=self.model_trainer_config._n_estimators,
-                min_samples_split=self.model_trainer_config._min_samples_split,
-                min_samples_leaf=self.model_trainer_config._min_samples_leaf,
-                max_depth=self.model_trainer_config._max_depth,
-                criterion=self.model_trainer_config._criterion,
-                random_state=self.model_trainer_config._random_state
-            )
+            model = RandomForestClassifier(**self._model_params())
 
             # Fit the model on the training data
             model.fit(X_train, y_train)
             logging.info('Fitting RandomForestClassifier with specified parameters is done successfully')
 
-            # Make predictions on the test data and calculate metrics
-            y_pred = model.predict(X_test)
-            accuracy = accuracy_score(y_test, y_pred)
-            f1 = f1_score(y_test, y_pred)
-            precision = precision_score(y_test, y_pred)
-            recall = recall_score(y_test, y_pred)
+            return model, self._classification_metrics(model, X_test, y_test)
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def cross_validate(self, features: np.ndarray, target: np.ndarray) -> CrossValidationArtifact:
+        """
+        This method runs stratified k-fold cross-validation of the model parameters with the folds evaluated in
+        parallel worker processes. Features are the transformed but not resampled train rows; they are written once to
+        a memory-mapped file that every worker maps instead of receiving a pickled copy
+        Returns per-fold metrics with their mean and variance and the total wall time
+        """
+        try:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            from src.utils.cross_validation_utils import write_shared_array, stratified_fold_indices, evaluate_fold
+            start = time.perf_counter()
+            n_splits = self.model_trainer_config.cv_folds
+            n_workers = min(n_splits, self.model_trainer_config.cv_workers or os.cpu_count() or 1)
+            os.makedirs(self.model_trainer_config.cv_dir, exist_ok=True)
+            features_path = write_shared_array(os.path.join(self.model_trainer_config.cv_dir, 'features.npy'), features, np.float32)
+            target_path = write_shared_array(os.path.join(self.model_trainer_config.cv_dir, 'target.npy'), np.asarray(target))
+            logging.info(f'Cross-validating on {len(target)} rows: {n_splits} folds on {n_workers} worker processes')
+            try:
+                folds = stratified_fold_indices(np.asarray(target), n_splits, self.model_trainer_config._random_state)
+                # spawn, not fork: this runs on a pipeline worker thread, and forking while other threads hold locks
+                # (logging, imports) can deadlock the children
+                with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                    results = list(pool.map(evaluate_fold, [features_path] * n_splits, [target_path] * n_splits, folds,
+                                            [self._model_params()] * n_splits, [self.model_trainer_config.cv_resample] * n_splits))
+            finally:
+                os.remove(features_path)
+                os.remove(target_path)
+
+            cross_validation_artifact = CrossValidationArtifact(
+                fold_metrics=[ClassificationMetricArtifact(f1_score=f1, precision_score=precision, recall_score=recall)
+                              for f1, precision, recall, _ in results],
+                fold_fit_seconds=[fit_seconds for *_, fit_seconds in results],
+                wall_seconds=time.perf_counter() - start,
+                n_workers=n_workers,
+            )
+            logging.info(f'Cross-validation: {cross_validation_artifact.summary()}')
+            return cross_validation_artifact
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    @staticmethod
+    def _classification_metrics(model: object, X_test: np.ndarray, y_test: np.ndarray) -> ClassificationMetricArtifact:
+        """
+        Makes predictions on the test data and returns the classification report / metrics report
+        """
+        from sklearn.metrics import f1_score, precision_score, recall_score
+        y_pred = model.predict(X_test)
+        return ClassificationMetricArtifact(f1_score=f1_score(y_test, y_pred),
+                                            precision_score=precision_score(y_test, y_pred),
+                                            recall_score=recall_score(y_test, y_pred))
+
+    def load_base_model(self) -> Optional[MyModel]:
+        """
+        Loads the production model to warm-start from; returns None if there is none yet (the first run trains from scratch)
+        """
+        try:
+            base_model_file_path = self.model_trainer_config.base_model_file_path
+            if not os.path.exists(base_model_file_path):
+                logging.info(f'No production model at {base_model_file_path}; training a new model from scratch')
+                return None
+            logging.info(f'Loading production model from {base_model_file_path} for incremental training')
+            return load_object(file_path=base_model_file_path)
 
-            # Create a classification report / metrics report
-            metric_artifiact = ClassificationMetricArtifact(f1_score=f1, precision_score=precision, recall_score=recall)
-            return model, metric_artifiact
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def get_incremental_model_and_report(self, base_model: MyModel, train: np.array, test: np.array
+                                         ) -> Tuple[object, ClassificationMetricArtifact, Optional[List[int]]]:
+        """
+        This method continues training the production model on new data only:
+        a forest retires the trees older than the configured window and grows new trees (warm_start),
+        a gradient boosting model fits additional boosting rounds
+        Returns the model object, classification report and the generation of every tree (None for boosting)
+        """
+        try:
+            from sklearn.ensemble import (RandomForestClassifier, ExtraTreesClassifier,
+                                          GradientBoostingClassifier, HistGradientBoostingClassifier)
+            X_train, y_train, X_test, y_test = train[:, :-1], train[:, -1], test[:, :-1], test[:, -1]
+            model = base_model.trained_model_object
+            n_new = self.model_trainer_config._incremental_n_estimators
+            tree_generations = None
+
+            if isinstance(model, (RandomForestClassifier, ExtraTreesClassifier)):
+                # models trained before generations were tracked count as generation 0
+                tree_generations = list(base_model.tree_generations or [0] * len(model.estimators_))
+                generation = max(tree_generations, default=0) + 1
+                window = self.model_trainer_config._tree_window
+                if window > 0:
+                    keep = [i for i, tree_generation in enumerate(tree_generations) if tree_generation > generation - window]
+                    logging.info(f'Retiring {len(tree_generations) - len(keep)} trees older than {window} generations')
+                    model.estimators_ = [model.estimators_[i] for i in keep]
+                    tree_generations = [tree_generations[i] for i in keep]
+                model.set_params(warm_start=True, n_estimators=len(model.estimators_) + n_new)
+                model.fit(X_train, y_train)
+                tree_generations += [generation] * n_new
+                logging.info(f'Added {n_new} trees of generation {generation}; the forest has {len(model.estimators_)} trees')
+            elif isinstance(model, GradientBoostingClassifier):
+                model.set_params(warm_start=True, n_estimators=model.n_estimators + n_new)
+                model.fit(X_train, y_train)
+                logging.info(f'Added {n_new} boosting rounds; the model has {model.n_estimators_} rounds')
+            elif isinstance(model, HistGradientBoostingClassifier):
+                model.set_params(warm_start=True, max_iter=model.max_iter + n_new)
+                model.fit(X_train, y_train)
+                logging.info(f'Added {n_new} boosting rounds; the model has {model.n_iter_} rounds')
+            else:
+                raise Exception(f'Incremental training is not supported for {type(model).__name__}')
+
+            return model, self._classification_metrics(model, X_test, y_test), tree_generations
 
         except Exception as e:
             raise MyException(e, sys) from e
         
-    def initiate_model_trainer(self) -> ModelTrainerArtifact:
+    def validation_split(self, train: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        This method holds out validation_split_ratio of the train rows, stratified by target, to tune the model
+        (feature selection, compression) without looking at the test rows, which are kept for the reported metrics.
+        Only for train rows that were not resampled: the pipeline holds the validation rows out before SMOTEENN
+        (DataTransformation.hold_out_validation)
+        Returns the rows to fit on and the validation rows
+        """
+        try:
+            from sklearn.model_selection import train_test_split
+            fit_rows, validation_rows = train_test_split(np.arange(len(train)), test_size=self.model_trainer_config.validation_split_ratio,
+                                                         stratify=train[:, -1], random_state=self.model_trainer_config._random_state)
+            logging.info(f'Holding out {len(validation_rows)} of {len(train)} train rows for validation')
+            return train[np.sort(fit_rows)], train[np.sort(validation_rows)]
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def compress_model(self, model: object, train: np.array, validation: np.array, test: np.array,
+                       tree_generations: Optional[List[int]] = None
+                       ) -> Tuple[object, Optional[List[int]], Optional[ModelCompressionArtifact]]:
+        """
+        This method searches for the smallest subset of the forest's trees whose validation f1 stays within
+        compression_f1_tolerance of the full forest: trees are ranked by greedy forward selection on a sample of
+        the training rows and added until the validation f1 target is reached (and compression_min_estimators are kept).
+        The test rows play no part in the choice; they only report the f1 of both forests
+        Returns the compressed model, the generations of its trees and the compression report (None if not a forest)
+        """
+        try:
+            import dill
+            from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
+            from src.utils.forest_compression import (tree_probabilities, greedy_tree_order, subset_forest,
+                                                      predict_latency_seconds, sample_rows, binary_f1)
+            if not isinstance(model, (RandomForestClassifier, ExtraTreesClassifier)) or len(model.classes_) != 2:
+                logging.info(f'Compression is only implemented for binary forests, skipping {type(model).__name__}')
+                return model, tree_generations, None
+
+            X_train, y_train, X_test, y_test = train[:, :-1], train[:, -1], test[:, :-1], test[:, -1]
+            X_validation, y_validation = validation[:, :-1], validation[:, -1]
+            rows = sample_rows(len(X_train), self.model_trainer_config.compression_sample_rows, self.model_trainer_config._random_state)
+            validation_probabilities = tree_probabilities(model, X_validation)
+            target_f1 = (float(binary_f1(validation_probabilities.mean(axis=0) > 0.5, y_validation))
+                         - self.model_trainer_config.compression_f1_tolerance)
+
+            order, validation_f1 = greedy_tree_order(tree_probabilities(model, X_train[rows]), y_train[rows],
+                                                     validation_probabilities, y_validation, target_f1,
+                                                     min_trees=self.model_trainer_config.compression_min_estimators)
+            compressed = subset_forest(model, order)
+            test_probabilities = tree_probabilities(model, X_test)
+            if tree_generations is not None:
+                tree_generations = [tree_generations[i] for i in order]
+
+            compression_artifact = ModelCompressionArtifact(
+                original_n_estimators=len(model.estimators_),
+                compressed_n_estimators=len(compressed.estimators_),
+                original_size_bytes=len(dill.dumps(model)),
+                compressed_size_bytes=len(dill.dumps(compressed)),
+                original_latency_seconds=predict_latency_seconds(model, X_test),
+                compressed_latency_seconds=predict_latency_seconds(compressed, X_test),
+                original_f1_score=float(binary_f1(test_probabilities.mean(axis=0) > 0.5, y_test)),
+                compressed_f1_score=float(binary_f1(test_probabilities[order].mean(axis=0) > 0.5, y_test)),
+            )
+            logging.info(f'Forest compressed from {compression_artifact.original_n_estimators} to '
+                         f'{compression_artifact.compressed_n_estimators} trees: validation f1 {validation_f1[-1]:.4f} '
+                         f'(target {target_f1:.4f}), test f1 delta {compression_artifact.f1_delta:+.4f}, '
+                         f'{compression_artifact.original_size_bytes} -> {compression_artifact.compressed_size_bytes} bytes, '
+                         f'latency {compression_artifact.original_latency_seconds:.4f}s -> {compression_artifact.compressed_latency_seconds:.4f}s')
+            return compressed, tree_generations, compression_artifact
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def select_features(self, model: object, train: np.array, validation: np.array, preprocessor_obj: object,
+                        train_features_df: 'pd.DataFrame'
+                        ) -> Tuple[object, object, Optional[List[int]], FeatureSelectionArtifact]:
+        """
+        This method ranks the model inputs by importance (feature_selection_method) on the validation rows, drops the
+        ones below feature_selection_threshold of the total importance and retrains on the rest. The retrained model is
+        kept if its validation f1 is within feature_selection_f1_tolerance of the full model, with a preprocessor fitted
+        on the selected columns of train_features_df only, so serving never materializes or scales the dropped ones.
+        The test rows play no part in the choice
+        Returns the model, its preprocessor, the positions of the selected columns in the transformed arrays
+        (None if every feature was kept) and the feature selection report
+        """
+        try:
+            from src.components.data_transformation import DataTransformation
+            from src.utils.forest_compression import sample_rows
+            from src.utils.feature_selection import (preprocessor_output_columns, feature_importances,
+                                                     importance_shares, selected_feature_mask)
+            config = self.model_trainer_config
+            columns = preprocessor_output_columns(preprocessor_obj)
+            X_validation, y_validation = validation[:, :-1], validation[:, -1]
+            rows = sample_rows(len(X_validation), config.feature_selection_sample_rows, config._random_state)
+            start = time.perf_counter()
+            shares = importance_shares(feature_importances(model, X_validation[rows], y_validation[rows], method=config.feature_selection_method,
+                                                           n_repeats=config.feature_selection_n_repeats,
+                                                           n_jobs=config.feature_selection_n_jobs, random_state=config._random_state))
+            logging.info(f'{config.feature_selection_method} importances computed in {time.perf_counter() - start:.1f}s: '
+                         + ', '.join(f'{column}={share:.3f}' for column, share in zip(columns, shares)))
+            keep = selected_feature_mask(shares, config.feature_selection_threshold)
+            selected = [column for column, kept in zip(columns, keep) if kept]
+            validation_f1 = self._classification_metrics(model, X_validation, y_validation).f1_score
+            report = dict(method=config.feature_selection_method,
+                          importances={column: float(share) for column, share in zip(columns, shares)},
+                          selected_features=selected, dropped_features=[column for column in columns if column not in selected],
+                          original_f1_score=validation_f1, selected_f1_score=validation_f1, applied=False)
+            if len(selected) == len(columns):
+                logging.info(f'Every feature reaches the importance threshold {config.feature_selection_threshold}; keeping all')
+                return model, preprocessor_obj, None, FeatureSelectionArtifact(**report)
+
+            selected_preprocessor = DataTransformation(None, None, None).get_data_transformer_object(columns=selected)
+            selected_preprocessor.fit(train_features_df[selected])
+            # the scalers work column by column, so the selected preprocessor outputs exactly these columns of the arrays
+            positions = [columns.index(column) for column in preprocessor_output_columns(selected_preprocessor)]
+            selected_model, selected_metric = self.get_model_object_and_report(train=train[:, positions + [-1]],
+                                                                               test=validation[:, positions + [-1]])
+            report.update(selected_f1_score=selected_metric.f1_score)
+            if selected_metric.f1_score < validation_f1 - config.feature_selection_f1_tolerance:
+                feature_selection_artifact = FeatureSelectionArtifact(**report)
+                logging.info(f'Dropping {feature_selection_artifact.dropped_features} changes validation f1 by '
+                             f'{feature_selection_artifact.f1_delta:+.4f}, beyond the tolerance; keeping every feature')
+                return model, preprocessor_obj, None, feature_selection_artifact
+
+            report.update(selected_features=preprocessor_output_columns(selected_preprocessor), applied=True)
+            feature_selection_artifact = FeatureSelectionArtifact(**report)
+            logging.info(f'Dropped features {feature_selection_artifact.dropped_features}; retrained on '
+                         f'{len(positions)} features, validation f1 delta {feature_selection_artifact.f1_delta:+.4f}')
+            return selected_model, selected_preprocessor, positions, feature_selection_artifact
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    @staticmethod
+    def _load_array(file_path: str) -> np.ndarray:
+        mmap_mode = None if get_memory_budget().fits(array_file_nbytes(file_path), share=0.5) else 'r'
+        if mmap_mode is not None:
+            logging.info(f'{file_path} does not fit the memory budget; memory-mapping it')
+        return load_numpy_array_data(file_path=file_path, mmap_mode=mmap_mode)
+
+    def training_data_profile(self, base_model: Optional[MyModel], data_profile: Optional[dict]) -> Optional[dict]:
+        """
+        Profile of all the data a model is trained on: the profile of the ingested documents, merged with the base
+        model's profile in incremental mode (the new documents were profiled with its bucket edges)
+        """
+        if not (self.model_trainer_config.incremental and base_model is not None and base_model.data_profile):
+            return data_profile
+        if data_profile is None:
+            return base_model.data_profile
+        from src.utils.profile_utils import DataProfile
+        try:
+            return DataProfile.from_dict(base_model.data_profile).merge(DataProfile.from_dict(data_profile)).to_dict()
+        except ValueError as e:
+            logging.warning(f'Keeping the profile of the new documents only: {e}')
+            return data_profile
+
+    def initiate_model_trainer(self, train_arr: Optional[np.ndarray] = None, test_arr: Optional[np.ndarray] = None,
+                               preprocessor_obj: Optional[object] = None, base_model: Optional[MyModel] = None,
+                               data_watermark: Optional[int] = None,
+                               train_features_df: Optional['pd.DataFrame'] = None,
+                               data_profile: Optional[dict] = None,
+                               validation_arr: Optional[np.ndarray] = None) -> ModelTrainerArtifact:
         """
         This method trains a RandomForestClassifier with specified parameters,
-        Returns the model object and classification report
+        or in incremental mode continues training the production model on the new data,
+        Returns the model trainer artifact with the classification report
+
+        train_arr, test_arr, preprocessor_obj: in-memory outputs of data transformation; each one not given is
+        loaded from the files of data_transformation_artifact
+        base_model: production model for incremental mode, loaded from base_model_file_path if not given
+        data_watermark: largest customer id in the training data, saved with the model
+        train_features_df: untransformed train input features, needed to fit the preprocessor of a pruned model
+        data_profile: profile of the ingested documents (DataProfileArtifact.profile), saved with the model
+        validation_arr: transformed train rows held out before resampling, which feature selection and compression
+        are tuned on; loaded from the data transformation artifact if not given, and carved out of train_arr (which
+        must then not be resampled) if it has none
         """
         try:
+            from sklearn.metrics import accuracy_score
             logging.info('Initiating model trainer')
             print(f'Starting model training with parameters: {self.model_trainer_config}')
 
-            # Load transformed train and test data
-            train_arr = load_numpy_array_data(file_path=self.data_transformation_artifact.transformed_train_file_path)
-            test_arr = load_numpy_array_data(file_path=self.data_transformation_artifact.transformed_test_file_path)
+            # Load transformed train and test data, memory-mapped when they do not fit the memory budget
+            if train_arr is None:
+                train_arr = self._load_array(self.data_transformation_artifact.transformed_train_file_path)
+            if test_arr is None:
+                test_arr = self._load_array(self.data_transformation_artifact.transformed_test_file_path)
             logging.info('Loading transformed train and test data is done successfully')
 
+            if self.model_trainer_config.incremental and base_model is None:
+                base_model = self.load_base_model()
+            # the choices made after training (features, tree subset) are tuned on rows held out of the train data, never on test
+            incremental = self.model_trainer_config.incremental and base_model is not None
+            select_features = self.model_trainer_config.feature_selection and not incremental and train_features_df is not None
+            needs_validation = self.model_trainer_config.compression or select_features
+            if (needs_validation and validation_arr is None and self.data_transformation_artifact is not None
+                    and self.data_transformation_artifact.transformed_validation_file_path is not None):
+                validation_arr = self._load_array(self.data_transformation_artifact.transformed_validation_file_path)
+            tree_generations = None
+            selected_features, full_preprocessor_obj = None, None
+            if self.model_trainer_config.incremental and base_model is not None:
+                selected_features, full_preprocessor_obj = base_model.selected_features, base_model.full_preprocessing_object
+                if selected_features is not None:
+                    # the new data was transformed with every column (see MyModel.full_preprocessing_object)
+                    from src.utils.feature_selection import preprocessor_output_columns
+                    columns = preprocessor_output_columns(full_preprocessor_obj)
+                    positions = [columns.index(column) for column in selected_features] + [-1]
+                    train_arr, test_arr = train_arr[:, positions], test_arr[:, positions]
+                    if validation_arr is not None:
+                        validation_arr = validation_arr[:, positions]
+
+            if not needs_validation:
+                validation_arr = None
+            elif validation_arr is None:
+                logging.warning('No validation rows were held out before resampling; holding out train rows instead')
+                train_arr, validation_arr = self.validation_split(train_arr)
+
             # Get model object and classification report
-            trained_model, metric_artifact = self.get_model_object_and_report(train=train_arr, test=test_arr)
+            if incremental:
+                trained_model, metric_artifact, tree_generations = self.get_incremental_model_and_report(
+                    base_model=base_model, train=train_arr, test=test_arr)
+                # the new trees were trained on features scaled by the production preprocessor
+                preprocessor_obj = base_model.preprocessing_object
+                if data_watermark is None:
+                    data_watermark = base_model.data_watermark
+                elif base_model.data_watermark is not None:
+                    data_watermark = max(data_watermark, base_model.data_watermark)
+            else:
+                trained_model, metric_artifact = self.get_model_object_and_report(train=train_arr, test=test_arr)
             logging.info('Getting model object and classification report is done successfully')
 
             # load preprocessor object
-            preprocessor_obj = load_object(file_path=self.data_transformation_artifact.transformed_object_file_path)
+            if preprocessor_obj is None:
+                preprocessor_obj = load_object(file_path=self.data_transformation_artifact.transformed_object_file_path)
             logging.info('Loading preprocessor object is done successfully')
 
+            feature_selection_artifact = None
+            if self.model_trainer_config.feature_selection:
+                if incremental:
+                    # new trees must see the inputs of the existing ones; the features are selected on full retrains
+                    logging.info('Skipping feature selection for an incremental retrain')
+                elif train_features_df is None:
+                    logging.warning('Feature selection needs the untransformed train features; keeping every feature')
+                else:
+                    full_preprocessor = preprocessor_obj
+                    trained_model, preprocessor_obj, positions, feature_selection_artifact = self.select_features(
+                        model=trained_model, train=train_arr, validation=validation_arr, preprocessor_obj=preprocessor_obj,
+                        train_features_df=train_features_df)
+                    if positions is not None:
+                        train_arr, test_arr = train_arr[:, positions + [-1]], test_arr[:, positions + [-1]]
+                        if validation_arr is not None:
+                            validation_arr = validation_arr[:, positions + [-1]]
+                        selected_features = feature_selection_artifact.selected_features
+                        full_preprocessor_obj = full_preprocessor
+                        metric_artifact = self._classification_metrics(trained_model, test_arr[:, :-1], test_arr[:, -1])
+
+            compression_artifact = None
+            if self.model_trainer_config.compression:
+                trained_model, tree_generations, compression_artifact = self.compress_model(
+                    model=trained_model, train=train_arr, validation=validation_arr, test=test_arr,
+                    tree_generations=tree_generations)
+                if compression_artifact is not None:
+                    metric_artifact = self._classification_metrics(trained_model, test_arr[:, :-1], test_arr[:, -1])
+
             # check if model's accuracy meets the expected threshold
             if accuracy_score(train_arr[:, -1], trained_model.predict(train_arr[:, :-1])) < self.model_trainer_config.expected_accuracy:
                 logging.info('Model accuracy is less than expected accuracy')
                 raise Exception(f'Model accuracy is less than expected accuracy: {self.model_trainer_config.expected_accuracy}')
             
             # save model object that includes preprocessor object and trained model object
-            my_model = MyModel(preprocessing_object=preprocessor_obj, trained_model_object=trained_model)
+            my_model = MyModel(preprocessing_object=preprocessor_obj, trained_model_object=trained_model,
+                               tree_generations=tree_generations, data_watermark=data_watermark,
+                               selected_features=selected_features, full_preprocessing_object=full_preprocessor_obj,
+                               data_profile=self.training_data_profile(base_model, data_profile))
             save_object(self.model_trainer_config.trained_model_file_path, my_model)
 
             # create and return model trainer artifact
             model_trainer_artifact = ModelTrainerArtifact(
                 trained_model_file_path=self.model_trainer_config.trained_model_file_path,
                 metric_artifact=metric_artifact,
+                compression_artifact=compression_artifact,
+                feature_selection_artifact=feature_selection_artifact,
             )
             logging.info(f'Model trainer artifact: {model_trainer_artifact}')
-            return metric_artifact
+            return model_trainer_artifact
         
         except Exception as e:
             raise MyException(e, sys)
\ No newline at end of file
@@ -0,0 +1,107 @@
+import os
+import sys
+import asyncio
+import threading
+from typing import Dict, Optional, Tuple
+
+from src.logger import logging
+from src.exception import MyException
+from src.constants import DATABASE_NAME, MONGODB_URL_KEY
+from src.entity.config_entity import MongoDBConfig
+
+class AsyncMongoDBClient:
+    """
+    This class is used to connect to MongoDB from asyncio code (e.g. a FastAPI app) without blocking the event loop.
+
+    Attributes:
+    client: AsyncMongoClient - The client shared by every AsyncMongoDBClient of the current process and event loop
+    database: AsyncDatabase - The specific database instance that AsyncMongoDBClient is connected to
+
+    Uses pymongo's native asyncio API (pymongo.AsyncMongoClient). An async client is bound to the event loop it is
+    first used on, so one client is kept per (process id, event loop); pool settings come from MongoDBConfig as for MongoDBClient.
+    """
+
+    _clients: Dict[Tuple[int, int], object] = {} # (pid, id(loop)) -> AsyncMongoClient
+    _lock = threading.Lock()
+
+    def __init__(self, database_name: str = DATABASE_NAME, mongo_config: Optional[MongoDBConfig] = None, client: object = None) -> None:
+        """
+        Args:
+        database_name (str): The name of the database to connect to. Defaults to 'Project1'.
+        mongo_config (MongoDBConfig, optional): Pool, timeout, read preference and compression settings.
+        client (object, optional): An already built async client (or in-memory stand-in) to use instead of connecting.
+
+        Raises:
+        MyException: If the MONGODB_URL_KEY environment variable is not set or the client cannot be created.
+        """
+        try:
+            self.client = client if client is not None else AsyncMongoDBClient.get_client(mongo_config)
+            self.database = self.client[database_name]
+            self.database_name = database_name
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+    @classmethod
+    def get_client(cls, mongo_config: Optional[MongoDBConfig] = None):
+        """
+        Returns the AsyncMongoClient of the current process and running event loop, creating it on first use.
+        """
+        try:
+            loop_id = id(asyncio.get_running_loop())
+        except RuntimeError:
+            loop_id = 0 # created outside a loop; pymongo binds it to the loop it is first awaited on
+        key = (os.getpid(), loop_id)
+        client = cls._clients.get(key)
+        if client is not None:
+            return client
+
+        with cls._lock:
+            client = cls._clients.get(key)
+            if client is None:
+                mongo_db_url = os.getenv(MONGODB_URL_KEY)
+                if mongo_db_url is None:
+                    raise Exception(f'{MONGODB_URL_KEY} is not set as an environment variable.')
+
+                import certifi
+                from pymongo import AsyncMongoClient
+
+                mongo_config = mongo_config if mongo_config is not None else MongoDBConfig()
+                kwargs = mongo_config.client_kwargs()
+                if mongo_db_url.startswith('mongodb+srv://') or 'tls=true' in mongo_db_url.lower() or 'ssl=true' in mongo_db_url.lower():
+                    kwargs['tlsCAFile'] = certifi.where()
+                client = AsyncMongoClient(mongo_db_url, **kwargs)
+                cls._clients[key] = client
+                logging.info(f'Created async MongoDB client for process {key[0]}')
+        return client
+
+    async def ping(self) -> float:
+        """
+        Sends a ping to the server and returns the round trip time in milliseconds.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await self.client.admin.command('ping')
+            return (loop.time() - start) * 1000
+        except Exception as e:
+            raise MyException(e, sys)
+
+    @classmethod
+    async def close(cls) -> None:
+        """
+        Closes the clients of the current process bound to the running event loop (e.g. on app shutdown).
+        """
+        key = (os.getpid(), id(asyncio.get_running_loop()))
+        with cls._lock:
+            client = cls._clients.pop(key, None)
+        if client is not None:
+            await client.close()
+
+    @classmethod
+    def _after_fork_in_child(cls) -> None:
+        cls._lock = threading.Lock()
+        cls._clients = {}
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=AsyncMongoDBClient._after_fork_in_child)
@@ -1,14 +1,14 @@
 import os
 import sys
-import certifi # for ssl certificate verification: https://pypi.org/project/certifi/ - for more info
-import pymongo # for mongodb connection
+import time
+import threading
+from typing import Dict, Optional
 
 from src.logger import logging
 from src.exception import MyException
 from src.constants import DATABASE_NAME, MONGODB_URL_KEY
+from src.entity.config_entity import MongoDBConfig
 
-# Load the certificate authority file to avoid timeout errors when connecting to MongoDB
-ca =certifi.where()
 logging.getLogger("pymongo").setLevel(logging.WARNING)
 
 class MongoDBClient:
@@ -16,22 +16,31 @@ class MongoDBClient:
     This class is used to connect to MongoDB
 
     Attributes:
-    client: MongoClient - A shared MongoClient instance for the class
+    client: MongoClient - The MongoClient shared by every MongoDBClient of the current process
     database: Database - The specific database instance that MongoDBClient is connected to
 
     Methods:
     __init__(database_name: str) -> None: Initializes a new instance of MongoDBClient using the specified database name
-    
+    get_client(mongo_config: MongoDBConfig) -> MongoClient: Returns the pooled client of the current process
+    pool_metrics() -> dict: Connection pool utilization counters of the current process
+    ping() -> float: Round trip time of a ping to the server in milliseconds
+
+    One pymongo.MongoClient (and so one connection pool) is kept per process id: MongoClient is not fork-safe,
+    so a child created by a process pool or a gunicorn worker fork builds its own client on first use.
+    Construction is guarded by a lock so concurrent threads never create two clients.
     """
 
-    client = None # A shared MongoClient instance across all instances of MongoDBClient
+    _clients: Dict[int, object] = {} # pid -> MongoClient
+    _metrics: Dict[int, object] = {} # pid -> PoolMetricsListener
+    _lock = threading.Lock()
 
-    def __init__(self, database_name: str = DATABASE_NAME) -> None:
+    def __init__(self, database_name: str = DATABASE_NAME, mongo_config: Optional[MongoDBConfig] = None) -> None:
         """
         Initializes a connection to MongoDB using the MONGODB_URL_KEY environment variable. If no existing connection is available, it creates a new client and connects to MongoDB.
         
         Args:
         database_name (str): The name of the database to connect to. Defaults to 'Project1'.
+        mongo_config (MongoDBConfig, optional): Pool, timeout, read preference and compression settings. Defaults to MongoDBConfig().
         
         Returns:
         None
@@ -41,20 +50,115 @@ class MongoDBClient:
         
         """
         try:
-            # Check if a MongoDB client connection is already established, otherwise create a new one
-            if MongoDBClient.client is None:
-                mongo_db_url = os.getenv(MONGODB_URL_KEY) # Get the MongoDB connection URL from the environment variable
-                if mongo_db_url is None:
-                    raise Exception(f'{MONGODB_URL_KEY} is not set as an environment variable.') # If the environment variable is not set, raise an exception
-                
-                # Connect to MongoDB using the MONGODB_URL_KEY environment variable
-                MongoDBClient.client = pymongo.MongoClient(mongo_db_url, tlsCAFile=ca) # tlsCAFile is for ssl certificate verification: https://pypi.org/project/certifi/ - for more info
-
-            # Get the database instance
-            self.client = MongoDBClient.client
+            # Get the process-wide client (created on first use) and the database instance
+            self.client = MongoDBClient.get_client(mongo_config)
             self.database = self.client[database_name]
             self.database_name = database_name
             logging.info(f'Connected to MongoDB database: {database_name}')
         
         except Exception as e:
-            raise MyException(e, sys)
\ No newline at end of file
+            raise MyException(e, sys)
+
+    @classmethod
+    def get_client(cls, mongo_config: Optional[MongoDBConfig] = None):
+        """
+        Returns the MongoClient of the current process, creating it on first use.
+        The config only applies when the client is created; later callers share the existing pool.
+        """
+        pid = os.getpid()
+        client = cls._clients.get(pid)
+        if client is not None:
+            return client
+
+        with cls._lock:
+            # double-checked: another thread may have created it while we waited for the lock
+            client = cls._clients.get(pid)
+            if client is None:
+                client = cls._create_client(mongo_config if mongo_config is not None else MongoDBConfig(), pid)
+                cls._clients[pid] = client
+        return client
+
+    @classmethod
+    def _create_client(cls, mongo_config: MongoDBConfig, pid: int):
+        mongo_db_url = os.getenv(MONGODB_URL_KEY) # Get the MongoDB connection URL from the environment variable
+        if mongo_db_url is None:
+            raise Exception(f'{MONGODB_URL_KEY} is not set as an environment variable.') # If the environment variable is not set, raise an exception
+
+        # pymongo and certifi are only needed once a connection is made, so they are imported here
+        import certifi # for ssl certificate verification: https://pypi.org/project/certifi/ - for more info
+        import pymongo # for mongodb connection
+        from src.configuration.mongo_pool_metrics import PoolMetricsListener
+
+        # Load the certificate authority file to avoid timeout errors when connecting to MongoDB
+        ca = certifi.where()
+        listener = PoolMetricsListener(max_pool_size=mongo_config.max_pool_size)
+
+        kwargs = mongo_config.client_kwargs()
+        if mongo_db_url.startswith('mongodb+srv://') or 'tls=true' in mongo_db_url.lower() or 'ssl=true' in mongo_db_url.lower():
+            kwargs['tlsCAFile'] = ca # tlsCAFile is for ssl certificate verification: https://pypi.org/project/certifi/ - for more info
+
+        # Connect to MongoDB using the MONGODB_URL_KEY environment variable
+        client = pymongo.MongoClient(mongo_db_url, event_listeners=[listener], **kwargs)
+        cls._metrics[pid] = listener
+        logging.info(f'Created MongoDB client for process {pid} (maxPoolSize={mongo_config.max_pool_size}, '
+                     f'readPreference={mongo_config.read_preference}, compressors={mongo_config.compressors})')
+        return client
+
+    @classmethod
+    def register_client(cls, client) -> None:
+        """
+        Uses an already built client (e.g. a local mongod client or a mongomock stand-in for benchmarks) for the current process.
+        """
+        with cls._lock:
+            cls._clients[os.getpid()] = client
+
+    @classmethod
+    def pool_metrics(cls) -> dict:
+        """
+        Returns connection pool counters (open/checked-out connections, utilization, checkout failures) of the current process.
+        """
+        listener = cls._metrics.get(os.getpid())
+        return listener.snapshot() if listener is not None else {}
+
+    def ping(self) -> float:
+        """
+        Sends a ping to the server and returns the round trip time in milliseconds. Raises MyException if the server is unreachable.
+        """
+        try:
+            start = time.perf_counter()
+            self.client.admin.command('ping')
+            return (time.perf_counter() - start) * 1000
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def is_healthy(self) -> bool:
+        """
+        Returns True if the server answers a ping within the server selection timeout.
+        """
+        try:
+            self.ping()
+            return True
+        except MyException as e:
+            e.log(level=logging.WARNING)
+            return False
+
+    @classmethod
+    def close(cls) -> None:
+        """
+        Closes the client of the current process (e.g. on worker shutdown).
+        """
+        with cls._lock:
+            client = cls._clients.pop(os.getpid(), None)
+            cls._metrics.pop(os.getpid(), None)
+        if client is not None:
+            client.close()
+
+    @classmethod
+    def _after_fork_in_child(cls) -> None:
+        # the parent's clients (and a lock possibly held by another parent thread) must not be used in the child
+        cls._lock = threading.Lock()
+        cls._clients = {}
+        cls._metrics = {}
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=MongoDBClient._after_fork_in_child)
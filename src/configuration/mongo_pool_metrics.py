@@ -0,0 +1,73 @@
+import threading
+from pymongo import monitoring
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Collects connection-pool counters from pymongo's CMAP events for one MongoClient.
+    Registered per client so the numbers describe this process's pool only.
+    """
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.total_checkouts = 0
+        self.checkout_failures = 0
+        self.pools_cleared = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'max_pool_size': self.max_pool_size,
+                'open_connections': self.open_connections,
+                'checked_out': self.checked_out,
+                'peak_checked_out': self.peak_checked_out,
+                'utilization': self.checked_out / self.max_pool_size if self.max_pool_size else 0.0,
+                'peak_utilization': self.peak_checked_out / self.max_pool_size if self.max_pool_size else 0.0,
+                'total_checkouts': self.total_checkouts,
+                'checkout_failures': self.checkout_failures,
+                'pools_cleared': self.pools_cleared,
+            }
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections = max(0, self.open_connections - 1)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checked_out += 1
+            self.total_checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    # remaining CMAP events carry no counters we report
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
@@ -6,12 +6,59 @@ DATABASE_NAME = 'Project1'
 COLLECTION_NAME = 'Project1_Data'
 MONGODB_URL_KEY = 'MONGODB_URL'
 
+# MongoDB connection pool settings; each can be overridden by an environment variable of the same name
+MONGODB_MAX_POOL_SIZE: int = 50 # max connections per process
+MONGODB_MIN_POOL_SIZE: int = 0 # connections kept open while idle
+MONGODB_MAX_IDLE_TIME_MS: int = 60_000 # idle connections are closed after this time
+MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 10_000 # max wait for a free connection when the pool is exhausted
+MONGODB_CONNECT_TIMEOUT_MS: int = 10_000
+MONGODB_SOCKET_TIMEOUT_MS: int = 300_000 # large exports stream for a long time, keep this generous
+MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 15_000
+MONGODB_READ_PREFERENCE: str = 'primaryPreferred' # primary, primaryPreferred, secondary, secondaryPreferred, nearest
+MONGODB_COMPRESSORS: str = 'zlib' # comma separated, e.g. 'zstd,snappy,zlib' (zstd/snappy need extra packages)
+
 PIPELINE_NAME: str = '' 
 ARTIFACT_DIR: str = 'artifact'
+PIPELINE_MAX_WORKERS: int = 4 # worker budget of the stage DAG; 1 runs the stages one after another
+PIPELINE_EXECUTOR_TYPE: str = 'thread' # 'thread' or 'process'
+
+# Artifact retention: runs under ARTIFACT_DIR beyond any of these limits are deleted (pinned and production runs never are)
+ARTIFACT_RETENTION_KEEP_LAST: int = 10 # newest runs kept regardless of age
+ARTIFACT_RETENTION_MAX_AGE_DAYS: float = 30.0
+ARTIFACT_RETENTION_MAX_TOTAL_BYTES: int = 20 * 1024**3 # disk quota of ARTIFACT_DIR, oldest runs are deleted first
+ARTIFACT_RETENTION_DEDUPLICATE: bool = True # hard-link identical files across runs
+ARTIFACT_RETENTION_ON_RUN: bool = True # apply retention at the end of every training run
+ARTIFACT_PIN_FILE_NAME: str = 'PINNED' # marker file of a pinned run directory
+ARTIFACT_IN_PROGRESS_FILE_NAME: str = 'IN_PROGRESS' # marker file of a run directory a training process is writing
+ARTIFACT_INDEX_FILE_NAME: str = 'runs_index.json'
+LOG_RETENTION_KEEP_LAST: int = 50 # log files (including rotated backups) kept in the log directory
+LOG_RETENTION_MAX_AGE_DAYS: float = 30.0
+
+# Memory budget respected by every data-touching stage (chunk sizes, in-memory vs on-disk paths)
+MEMORY_BUDGET_BYTES: int = 0 # 0: MEMORY_BUDGET_FRACTION of the RAM (or cgroup limit)
+MEMORY_BUDGET_FRACTION: float = 0.75
+MEMORY_BUDGET_MIN_CHUNK_ROWS: int = 1_000 # chunks never shrink below this, so stages always make progress
+MEMORY_BUDGET_SPILL_DIR: str = '' # where arrays that do not fit are memory-mapped; '' for the system temp dir
+
+# Artifact compression: transformed arrays and pickled objects (preprocessor, model). Files are recognised by their
+# first bytes when loaded, so changing a codec never breaks loading artifacts written with another one
+ARTIFACT_ARRAY_CODEC: str = 'zstd' # 'zstd', 'lz4' or 'none' (plain .npy, memory-mappable as it is)
+ARTIFACT_OBJECT_CODEC: str = 'zstd'
+ARTIFACT_CODEC_LEVEL: int = 0 # 0 for the codec's default (zstd 3, lz4 fast mode)
+ARTIFACT_CODEC_THREADS: int = 0 # (de)compression threads, 0 for one per CPU
+ARTIFACT_ARRAY_BLOCK_BYTES: int = 4 * 1024**2 # arrays are compressed in independent blocks of rows of about this size
+
+# Sample runs: every stage on a server-side sample of the collection, to extrapolate the time and memory of a full run
+SAMPLE_RUN_ROWS: int = 20_000 # documents of the larger sample
+SAMPLE_RUN_SMALL_FRACTION: float = 0.25 # the smaller sample (a subset of the larger) is this share of it; the two fit how each stage scales
+SAMPLE_RUN_MIN_CLASS_ROWS: int = 200 # floor per target class, so a rare class is still sampled enough to resample and score
+SAMPLE_RUN_DIR_NAME: str = 'sample_run' # under the artifact dir of the run
+SAMPLE_RUN_REPORT_FILE_NAME: str = 'sample_run_report.yaml'
 
 MODEL_FILE_NAME = 'model.pkl'
 
 TARGET_COLUMN = 'Response' 
+CUSTOMER_ID_COLUMN = 'id' # customer key in the Project1_Data documents
 CURRENT_YEAR = date.today().year
 PREPROCESSING_OBJECT_FILE_NAME = 'preprocessing.pkl'
 
@@ -31,15 +78,40 @@ DATA_INGETSION_DIR_NAME: str = 'data_ingestion'
 DATA_INGESTION_FEATURE_STORE_DIR: str = 'feature_store' 
 DATA_INGESTION_INGESTED_DIR: str = 'ingested'
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO: float = 0.25
+DATA_INGESTION_CHUNK_SIZE: int = 50_000 # documents in the first chunk streamed from MongoDB, later ones fit the memory budget
+DATA_INGESTION_MAX_CHUNK_SIZE: int = 500_000
+DATA_INGESTION_CHUNK_OVERHEAD: float = 6.0 # working set per chunk row (raw documents, dataframe, dtype copy) over the dataframe size
+DATA_INGESTION_SPLIT_KEY_COLUMN: str = CUSTOMER_ID_COLUMN # stable key hashed to assign a row to train or test
+DATA_INGESTION_DEDUPLICATE: bool = True # drop rows whose feature values and target repeat an earlier row
+DATA_INGESTION_DROP_CONFLICTING_DUPLICATES: bool = False # also drop rows repeating earlier feature values with another target
+DATA_INGESTION_DEDUP_INDEX_DIR: str = 'dedup_index' # row hashes kept between runs for incremental ingestion
+DATA_INGESTION_DEDUP_MAX_KEYS: int = 50_000_000 # per hash set, 8 bytes each
+
+# Feature lookup store: model input features keyed by customer id, built during ingestion and memory-mapped for serving
+FEATURE_LOOKUP_DIR: str = 'feature_lookup' # outside ARTIFACT_DIR: it outlives training runs
+FEATURE_LOOKUP_BUILD: bool = True
+FEATURE_LOOKUP_MAX_SEGMENTS: int = 8 # incremental delta segments are merged beyond this
+FEATURE_LOOKUP_REFRESH_SECONDS: float = 1.0 # how often serving checks for a newly published store version
+
+# Data profiling: statistics of the ingested documents aggregated on the MongoDB server, and their drift from the
+# profile saved with the production model
+DATA_PROFILING_ENABLED: bool = True
+DATA_PROFILING_DIR_NAME: str = 'data_profiling'
+DATA_PROFILING_FILE_NAME: str = 'profile.yaml'
+DATA_PROFILING_BUCKETS: int = 10 # equal-frequency histogram buckets per numeric column ($bucketAuto)
+DATA_PROFILING_DRIFT_THRESHOLD: float = 0.2 # population stability index above which a column is reported as drifted
 
 # Data Validation related constants with DATA_VALIDATION VAR NAME
 DATA_VALIDATION_DIR_NAME: str = 'data_validation'
 DATA_VALIDATION_REPORT_FILE_NAME: str = 'report.yaml'
+DATA_VALIDATION_MEMORY_OVERHEAD: float = 4.0 # working set of row validation over the size of the data read
 
 # Data Transformation related constants with DATA_TRANSFORMATION VAR NAME
 DATA_TRANSFORMATION_DIR_NAME: str = 'data_transformation'
 DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR: str = 'transformed'
 DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR: str = 'transformed_object'
+DATA_TRANSFORMATION_VALIDATION_FILE_NAME: str = 'validation.npy' # train rows held out before resampling, for the model trainer to tune on
+DATA_TRANSFORMATION_MEMORY_OVERHEAD: float = 50.0 # working set of transform + SMOTEENN (float64 copies, ~2x rows) over the compact size of the data read
 
 # Model Trainer related constants with MODEL_TRAINER VAR NAME
 MODEL_TRAINER_DIR_NAME: str = 'model_trainer'
@@ -48,6 +120,25 @@ MODEL_TRAINER_TRAINED_MODEL_NAME: str = 'model.pkl'
 MODEL_TRAINER_EXPECTED_SCORE: float = 0.6
 MODEL_TRAINER_MODEL_CONFIG_FILE_PATH: str = os.path.join('config', 'model.yaml')
 MODEL_TRAINER_N_ESTIMATORS = 200
+MODEL_TRAINER_INCREMENTAL: bool = False # warm-start from the production model and train only on documents newer than it
+MODEL_TRAINER_INCREMENTAL_N_ESTIMATORS: int = 50 # trees (or boosting rounds) added by each incremental retrain
+MODEL_TRAINER_TREE_WINDOW: int = 4 # forest trees from the last N retrains are kept, older ones are retired; 0 keeps all
+MODEL_TRAINER_COMPRESSION: bool = False # after training, keep the smallest subset of trees within the f1 tolerance
+MODEL_TRAINER_COMPRESSION_F1_TOLERANCE: float = 0.005 # allowed drop in validation f1 of the compressed forest
+MODEL_TRAINER_COMPRESSION_SAMPLE_ROWS: int = 20_000 # training rows used to rank the trees
+MODEL_TRAINER_COMPRESSION_MIN_ESTIMATORS: int = 10 # floor so a lucky handful of trees is not kept on a small validation set
+MODEL_TRAINER_VALIDATION_SPLIT_RATIO: float = 0.2 # share of the train rows held out from fitting to tune feature selection and compression; test rows only report
+MODEL_TRAINER_FEATURE_SELECTION: bool = False # after training, drop low-importance features and retrain on the rest
+MODEL_TRAINER_FEATURE_SELECTION_METHOD: str = 'permutation' # 'permutation' (validation f1 drop when shuffled) or 'impurity' (forest feature_importances_)
+MODEL_TRAINER_FEATURE_SELECTION_THRESHOLD: float = 0.01 # features below this share of the total importance are dropped
+MODEL_TRAINER_FEATURE_SELECTION_F1_TOLERANCE: float = 0.005 # allowed drop in validation f1 of the retrained model, else all features are kept
+MODEL_TRAINER_FEATURE_SELECTION_N_REPEATS: int = 5 # shuffles per feature for permutation importance
+MODEL_TRAINER_FEATURE_SELECTION_SAMPLE_ROWS: int = 20_000 # validation rows used for permutation importance
+MODEL_TRAINER_FEATURE_SELECTION_N_JOBS: int = 0 # worker processes scoring features in parallel; 0 uses the cpu count
+MODEL_TRAINER_CV_FOLDS: int = 0 # k-fold cross-validation of the model parameters on the train data; 0 disables it
+MODEL_TRAINER_CV_WORKERS: int = 0 # worker processes evaluating folds; 0 uses min(folds, cpu count)
+MODEL_TRAINER_CV_RESAMPLE: bool = True # apply SMOTEENN to each training fold, as training does (validation folds are never resampled)
+MODEL_TRAINER_CV_DIR: str = 'cross_validation'
 MODEL_TRAINER_MIN_SAMPLES_SPLIT: int = 7 # minimum number of samples required to be at a node/split before it is split
 MODEL_TRAINER_MIN_SAMPLES_LEAF: int = 6 # minimum number of samples required to be at a leaf node 
 MIN_SAMPLES_SPLIT_MAX_DEPTH: int = 10 # maximum depth of the tree
@@ -60,4 +151,18 @@ MODEL_BUCKET_NAME = 'my-model-project1mlops'
 MODEL_PUSHER_S3_KEY  = 'model-registry'
 
 APP_HOST = '0.0.0.0'
-APP_PORT = 5000
\ No newline at end of file
+APP_PORT = 5000
+
+# Admission control of the prediction service: scoring runs on a bounded number of threads behind a bounded queue,
+# and requests that cannot be scored within their deadline are rejected up front instead of queueing
+SERVING_ADMISSION_CONTROL: bool = True
+SERVING_MAX_CONCURRENCY: int = 0 # requests scored at once, 0 for one per CPU available to the process
+SERVING_MAX_QUEUE: int = 0 # requests waiting for a scoring thread beyond which new ones get 429, 0 for 4 per scoring thread
+SERVING_DEADLINE_MS: int = 1_000 # latency budget of a request without an X-Request-Deadline-Ms header
+SERVING_MAX_DEADLINE_MS: int = 30_000 # longest deadline a client can ask for
+SERVING_DEADLINE_HEADER: str = 'x-request-deadline-ms'
+
+# Prediction pipeline related constants with PREDICTION VAR NAME
+PREDICTION_MODEL_DIR: str = 'saved_models'
+PREDICTION_MODEL_FILE_PATH_ENV_KEY = 'MODEL_FILE_PATH' # overrides the local model path used for serving
+PREDICTION_MEMORY_OVERHEAD: float = 8.0 # working set of scoring (transformed float64 copy, per-tree probabilities) over the input size
@@ -0,0 +1,323 @@
+"""
+Feature lookup store: model input feature vectors keyed by customer id, memory-mapped for serving.
+
+Layout of a store directory:
+    CURRENT                         name of the live manifest, swapped atomically with os.replace
+    manifest-<version>.json         {"version", "columns", "segments": [oldest, ..., newest]}
+    segment-<id>/ids.npy            sorted unique int64 customer ids
+    segment-<id>/features.npy       float32 matrix, one row per id, columns in manifest order
+
+Segments and manifests are never modified once published. A refresh writes a new segment and a new manifest and only
+then swaps CURRENT, so readers keep serving from the manifest they opened and never wait for (or see part of) a refresh.
+A full ingestion publishes a single segment; an incremental one appends a delta segment whose rows shadow the same ids
+in older segments. Once there are more than `max_segments` they are merged into one.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import threading
+import numpy as np
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
+
+from src.logger import logging
+from src.exception import MyException
+from src.constants import FEATURE_LOOKUP_MAX_SEGMENTS, FEATURE_LOOKUP_REFRESH_SECONDS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+CURRENT_FILE_NAME = 'CURRENT'
+IDS_FILE_NAME = 'ids.npy'
+FEATURES_FILE_NAME = 'features.npy'
+FEATURE_DTYPE = np.float32
+_COPY_BLOCK_ROWS = 1 << 20
+
+def _write_atomic(file_path: str, text: str) -> None:
+    tmp_path = f'{file_path}.tmp-{os.getpid()}-{threading.get_ident()}'
+    with open(tmp_path, 'w') as file_obj:
+        file_obj.write(text)
+        file_obj.flush()
+        os.fsync(file_obj.fileno())
+    os.replace(tmp_path, file_path)
+
+class FeatureSegmentWriter:
+    """
+    Streams (customer id, feature vector) rows into a new segment. Rows are appended to raw files chunk by chunk and
+    sorted by id on finish(), holding only the ids in memory; when an id is appended more than once the last row wins.
+    """
+
+    def __init__(self, store_dir: str, columns: List[str]):
+        try:
+            self.store_dir = store_dir
+            self.columns = list(columns)
+            self.name = f'segment-{time.time_ns():020d}'
+            self.tmp_dir = os.path.join(store_dir, f'.tmp-{self.name}')
+            os.makedirs(self.tmp_dir)
+            self._ids_file = open(os.path.join(self.tmp_dir, 'ids.bin'), 'wb')
+            self._features_file = open(os.path.join(self.tmp_dir, 'features.bin'), 'wb')
+            self.rows = 0
+            self.aborted = False
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def append(self, customer_ids: np.ndarray, features: np.ndarray) -> None:
+        customer_ids = np.ascontiguousarray(customer_ids, dtype=np.int64)
+        features = np.ascontiguousarray(features, dtype=FEATURE_DTYPE)
+        if features.shape != (len(customer_ids), len(self.columns)):
+            raise ValueError(f'Expected features of shape ({len(customer_ids)}, {len(self.columns)}), got {features.shape}')
+        customer_ids.tofile(self._ids_file)
+        features.tofile(self._features_file)
+        self.rows += len(customer_ids)
+
+    def finish(self) -> str:
+        """
+        Sorts the appended rows by customer id into the segment files and moves the segment into the store.
+
+        Returns:
+            str: Name of the segment, to pass to FeatureLookupStore.publish.
+        """
+        try:
+            self._ids_file.close()
+            self._features_file.close()
+            ids = np.fromfile(os.path.join(self.tmp_dir, 'ids.bin'), dtype=np.int64)
+            order = np.argsort(ids, kind='stable')
+            sorted_ids = ids[order]
+            is_last = np.ones(len(sorted_ids), dtype=bool) # keep the last row appended for every id
+            is_last[:-1] = sorted_ids[1:] != sorted_ids[:-1]
+            order, sorted_ids = order[is_last], sorted_ids[is_last]
+            del ids
+
+            np.save(os.path.join(self.tmp_dir, IDS_FILE_NAME), sorted_ids)
+            features = np.lib.format.open_memmap(os.path.join(self.tmp_dir, FEATURES_FILE_NAME), mode='w+',
+                                                 dtype=FEATURE_DTYPE, shape=(len(order), len(self.columns)))
+            if self.rows:
+                raw = np.memmap(os.path.join(self.tmp_dir, 'features.bin'), dtype=FEATURE_DTYPE, mode='r',
+                                shape=(self.rows, len(self.columns)))
+                for start in range(0, len(order), _COPY_BLOCK_ROWS):
+                    features[start:start + _COPY_BLOCK_ROWS] = raw[order[start:start + _COPY_BLOCK_ROWS]]
+                del raw
+            features.flush()
+            del features
+            os.remove(os.path.join(self.tmp_dir, 'ids.bin'))
+            os.remove(os.path.join(self.tmp_dir, 'features.bin'))
+            os.rename(self.tmp_dir, os.path.join(self.store_dir, self.name))
+            logging.info(f'Feature lookup segment {self.name}: {len(sorted_ids)} customers from {self.rows} rows')
+            return self.name
+
+        except Exception as e:
+            self.abort()
+            raise MyException(e, sys) from e
+
+    def abort(self) -> None:
+        self.aborted = True
+        for file_obj in (self._ids_file, self._features_file):
+            file_obj.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+class FeatureLookupStore:
+    """
+    Writer side of a feature lookup store: creates segments and publishes manifests. Expects a single writer at a time
+    (the training pipeline); any number of FeatureLookupReader instances may read concurrently.
+    """
+
+    def __init__(self, store_dir: str, max_segments: int = FEATURE_LOOKUP_MAX_SEGMENTS):
+        self.store_dir = store_dir
+        self.max_segments = max(int(max_segments), 1)
+
+    def current_manifest(self) -> Optional[dict]:
+        return read_current_manifest(self.store_dir)
+
+    def writer(self, columns: List[str]) -> FeatureSegmentWriter:
+        os.makedirs(self.store_dir, exist_ok=True)
+        return FeatureSegmentWriter(self.store_dir, columns)
+
+    def publish(self, segment: str, columns: List[str], replace: bool) -> dict:
+        """
+        Makes a finished segment visible to readers.
+
+        Args:
+            segment (str): Name returned by FeatureSegmentWriter.finish.
+            columns (List[str]): Feature columns of the segment.
+            replace (bool): True for a full snapshot that replaces every older segment, False for an incremental delta
+                stacked on the current manifest (its rows shadow older rows of the same customers).
+
+        Returns:
+            dict: The published manifest.
+        """
+        try:
+            current = self.current_manifest()
+            columns = list(columns)
+            if replace or current is None:
+                segments = [segment]
+            elif current['columns'] != columns:
+                raise ValueError(f'Delta segment columns {columns} differ from the store columns {current["columns"]}; '
+                                 'a full refresh is needed')
+            else:
+                segments = current['segments'] + [segment]
+            if len(segments) > self.max_segments:
+                segments = [self.merge_segments(segments, columns)]
+
+            version = (current['version'] if current is not None else 0) + 1
+            manifest = {'version': version, 'columns': columns, 'segments': segments, 'published_at': time.time()}
+            manifest_name = f'manifest-{version:06d}.json'
+            _write_atomic(os.path.join(self.store_dir, manifest_name), json.dumps(manifest, indent=2))
+            _write_atomic(os.path.join(self.store_dir, CURRENT_FILE_NAME), manifest_name)
+            logging.info(f'Published feature lookup manifest {manifest_name} with segments {segments}')
+            self.collect_garbage(keep=[manifest, current])
+            return manifest
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def merge_segments(self, segments: List[str], columns: List[str]) -> str:
+        """
+        Merges segments (oldest first) into a new one where the newest row of every customer wins.
+        """
+        writer = self.writer(columns)
+        for segment in segments:
+            ids, features = open_segment(self.store_dir, segment)
+            for start in range(0, len(ids), _COPY_BLOCK_ROWS):
+                writer.append(ids[start:start + _COPY_BLOCK_ROWS], features[start:start + _COPY_BLOCK_ROWS])
+        logging.info(f'Merging {len(segments)} feature lookup segments')
+        return writer.finish()
+
+    def collect_garbage(self, keep: Iterable[Optional[dict]]) -> None:
+        """
+        Deletes manifests and segments not referenced by the manifests in `keep` (the live one and its predecessor, so
+        a reader that has just read the old CURRENT can still open it). A reader that already mapped a deleted segment
+        keeps reading it: the files stay alive until they are unmapped.
+        """
+        keep = [manifest for manifest in keep if manifest is not None]
+        keep_manifests = {f'manifest-{manifest["version"]:06d}.json' for manifest in keep}
+        keep_segments = {segment for manifest in keep for segment in manifest['segments']}
+        for name in os.listdir(self.store_dir):
+            path = os.path.join(self.store_dir, name)
+            if name.startswith('manifest-') and name.endswith('.json') and name not in keep_manifests:
+                os.remove(path)
+            elif name.startswith('segment-') and name not in keep_segments:
+                shutil.rmtree(path, ignore_errors=True)
+
+def read_current_manifest(store_dir: str) -> Optional[dict]:
+    """
+    Returns the live manifest of a store, None if nothing was published yet.
+    """
+    for _ in range(3): # CURRENT may move on (and its old manifest be collected) between the two reads
+        try:
+            with open(os.path.join(store_dir, CURRENT_FILE_NAME)) as file_obj:
+                manifest_name = file_obj.read().strip()
+            with open(os.path.join(store_dir, manifest_name)) as file_obj:
+                return json.load(file_obj)
+        except FileNotFoundError:
+            if not os.path.exists(os.path.join(store_dir, CURRENT_FILE_NAME)):
+                return None
+    raise RuntimeError(f'Could not read the current manifest of feature lookup store {store_dir}')
+
+def open_segment(store_dir: str, segment: str) -> Tuple[np.ndarray, np.ndarray]:
+    segment_dir = os.path.join(store_dir, segment)
+    return (np.load(os.path.join(segment_dir, IDS_FILE_NAME), mmap_mode='r'),
+            np.load(os.path.join(segment_dir, FEATURES_FILE_NAME), mmap_mode='r'))
+
+class FeatureLookupReader:
+    """
+    Reader side of a feature lookup store. Segments are memory-mapped, a lookup is a binary search per segment (newest
+    first), so fetching a customer costs microseconds and only touches the pages it reads. The reader checks for a newly
+    published manifest at most every `refresh_seconds`; lookups never take a lock.
+    """
+
+    def __init__(self, store_dir: str, refresh_seconds: float = FEATURE_LOOKUP_REFRESH_SECONDS):
+        self.store_dir = store_dir
+        self.refresh_seconds = refresh_seconds
+        self._state: Tuple[Optional[dict], List[Tuple[np.ndarray, np.ndarray]]] = (None, [])
+        self._checked_at = float('-inf')
+
+    @property
+    def manifest(self) -> Optional[dict]:
+        self.refresh()
+        return self._state[0]
+
+    @property
+    def columns(self) -> List[str]:
+        manifest = self.manifest
+        return manifest['columns'] if manifest is not None else []
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Switches to the live manifest if a new one was published. Returns True if the reader switched.
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_seconds:
+            return False
+        self._checked_at = now
+        current = self._state[0]
+        try:
+            manifest = read_current_manifest(self.store_dir)
+            if manifest is None or (current is not None and manifest['version'] == current['version']):
+                return False
+            segments = [open_segment(self.store_dir, segment) for segment in manifest['segments']]
+            self._state = (manifest, segments) # one assignment: concurrent lookups see the old or the new state
+            logging.info(f'Feature lookup reader switched to version {manifest["version"]} of {self.store_dir}')
+            return True
+
+        except Exception as e:
+            if current is None:
+                raise MyException(e, sys) from e
+            logging.warning(f'Could not refresh feature lookup store {self.store_dir}, serving version '
+                            f'{current["version"]}: {e}')
+            return False
+
+    def lookup(self, customer_ids: Iterable[int], columns: Optional[List[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Fetches the feature vectors of customers, restricted to `columns` (in that order) if given.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Features (NaN rows for unknown customers) and a boolean mask of found customers.
+        """
+        self.refresh()
+        manifest, segments = self._state
+        if manifest is None:
+            raise FileNotFoundError(f'No feature lookup store published at {self.store_dir}')
+        customer_ids = np.asarray(customer_ids, dtype=np.int64).reshape(-1)
+        column_positions = None if columns is None else [manifest['columns'].index(column) for column in columns]
+        features = np.full((len(customer_ids), len(manifest['columns']) if columns is None else len(columns)), np.nan,
+                           dtype=FEATURE_DTYPE)
+        found = np.zeros(len(customer_ids), dtype=bool)
+        for ids, segment_features in reversed(segments): # newest segment first: its rows shadow older ones
+            pending = np.flatnonzero(~found)
+            if not len(pending):
+                break
+            if not len(ids):
+                continue
+            positions = np.searchsorted(ids, customer_ids[pending])
+            in_range = positions < len(ids)
+            hit = in_range.copy()
+            hit[in_range] = ids[positions[in_range]] == customer_ids[pending[in_range]]
+            if column_positions is None:
+                features[pending[hit]] = segment_features[positions[hit]]
+            else:
+                features[pending[hit]] = segment_features[np.ix_(positions[hit], column_positions)]
+            found[pending[hit]] = True
+        return features, found
+
+    def lookup_frame(self, customer_ids: Iterable[int], column_kinds: Optional[dict] = None,
+                     columns: Optional[List[str]] = None) -> Tuple['pd.DataFrame', np.ndarray]:
+        """
+        Fetches customers as a model input dataframe of the customers that were found.
+
+        Args:
+            customer_ids (Iterable[int]): Customer ids.
+            column_kinds (dict, optional): {column: 'int' | 'float'}; 'int' columns are cast back to int64.
+            columns (List[str], optional): Columns to fetch, all the stored ones if not given.
+
+        Returns:
+            Tuple[pd.DataFrame, np.ndarray]: Features of the found customers and the mask of found customers.
+        """
+        import pandas as pd
+        features, found = self.lookup(customer_ids, columns=columns)
+        df = pd.DataFrame(features[found], columns=self._state[0]['columns'] if columns is None else columns)
+        for column, kind in (column_kinds or {}).items():
+            if kind == 'int' and column in df.columns:
+                df[column] = df[column].astype(np.int64)
+        return df, found
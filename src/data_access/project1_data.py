@@ -1,11 +1,126 @@
 import sys
+import asyncio
+import itertools
 import numpy as np
 import pandas as pd
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional
 
+from src.logger import logging
 from src.exception import MyException
-from src.constants import DATABASE_NAME
+from src.constants import DATABASE_NAME, CUSTOMER_ID_COLUMN
 from src.configuration.mongo_db_connection import MongoDBClient
+from src.utils.profile_utils import (DataProfile, NumericColumnProfile, CategoricalColumnProfile, NULL_VALUES,
+                                     auto_bucket_edges_of_chunks, bucket_boundaries, category_key, profile_chunks)
+
+if TYPE_CHECKING:
+    from src.utils.memory_utils import AdaptiveChunkSizer
+
+def documents_to_df(documents: List[dict], drop_id: bool = True) -> pd.DataFrame:
+    """
+    Converts raw MongoDB documents to a dataframe: removes the 'id' column (unless drop_id is False) and replaces 'na' values with NaN.
+    Shared by the sync and async access paths so both return identical frames.
+    """
+    df = pd.DataFrame(documents)
+    if drop_id and CUSTOMER_ID_COLUMN in df.columns.to_list():
+        df = df.drop(columns=[CUSTOMER_ID_COLUMN])
+    df.replace({'na': np.nan}, inplace=True)
+    return df
+
+# Knuth's multiplicative hash: consecutive customer ids are spread evenly over [0, 2**32)
+_SAMPLE_HASH_MULTIPLIER = 2654435761
+_SAMPLE_HASH_RANGE = 2**32
+
+# server errors meaning the profile pipeline is not supported (an unknown stage, expression or accumulator on an old
+# MongoDB), the only failures profile_collection falls back to exporting the collection for
+_UNSUPPORTED_PIPELINE_ERROR_CODES = frozenset({40324, 168, 15952})
+
+def hashed_sample_query(rates: Dict[Any, float], stratify_column: str, key_column: str = CUSTOMER_ID_COLUMN) -> dict:
+    """
+    MongoDB filter keeping the share `rates[value]` of the documents of every value of `stratify_column`, evaluated
+    on the server. Documents are kept by a hash of their integer key, not at random ($sample), so a sample is the same
+    on every run and a smaller rate selects a subset of a larger one.
+    """
+    key_hash = {'$mod': [{'$multiply': [f'${key_column}', _SAMPLE_HASH_MULTIPLIER]}, _SAMPLE_HASH_RANGE]}
+    return {'$or': [{stratify_column: value, '$expr': {'$lt': [key_hash, int(min(max(rate, 0.0), 1.0) * _SAMPLE_HASH_RANGE)]}}
+                    for value, rate in rates.items()]}
+
+def profile_pipeline(numeric_columns: List[str], categorical_columns: List[str], target_column: Optional[str] = None,
+                     buckets: int = 10, reference: Optional[DataProfile] = None) -> List[dict]:
+    """
+    Aggregation pipeline computing a DataProfile on the server in one pass over the documents, returning one small
+    document: a $group of counts, sums, minimums and maximums of every column, and in a $facet the histogram of every
+    numeric column ($bucketAuto, or $bucket over the edges of the reference profile) and the category frequencies.
+    """
+    statistics = {'_id': None, 'n_rows': {'$sum': 1}}
+    facets = {}
+    reference_edges = reference.bucket_edges() if reference is not None else {}
+    for i, column in enumerate(numeric_columns):
+        field_path = f'${column}'
+        is_number = {'$isNumber': field_path}
+        statistics.update({
+            f'count_{i}': {'$sum': {'$cond': [is_number, 1, 0]}},
+            f'null_{i}': {'$sum': {'$cond': [{'$in': [{'$ifNull': [field_path, None]}, list(NULL_VALUES)]}, 1, 0]}},
+            f'sum_{i}': {'$sum': {'$cond': [is_number, field_path, 0]}},
+            f'sum_squares_{i}': {'$sum': {'$cond': [is_number, {'$multiply': [field_path, field_path]}, 0]}},
+            f'min_{i}': {'$min': {'$cond': [is_number, field_path, None]}},
+            f'max_{i}': {'$max': {'$cond': [is_number, field_path, None]}},
+        })
+        numbers = {'$match': {column: {'$type': 'number'}}}
+        if column in reference_edges:
+            facets[f'buckets_{i}'] = [numbers, {'$bucket': {'groupBy': field_path, 'default': 'out_of_range',
+                                                            'boundaries': bucket_boundaries(reference_edges[column])}}]
+        else:
+            facets[f'buckets_{i}'] = [numbers, {'$bucketAuto': {'groupBy': field_path, 'buckets': buckets}}]
+    frequency_columns = list(dict.fromkeys(categorical_columns + ([target_column] if target_column else [])))
+    for i, column in enumerate(frequency_columns):
+        statistics[f'category_null_{i}'] = {'$sum': {'$cond': [{'$in': [{'$ifNull': [f'${column}', None]}, list(NULL_VALUES)]}, 1, 0]}}
+        facets[f'frequencies_{i}'] = [{'$match': {column: {'$nin': list(NULL_VALUES)}}},
+                                      {'$group': {'_id': f'${column}', 'count': {'$sum': 1}}}]
+    facets['statistics'] = [{'$group': statistics}]
+    return [{'$facet': facets}]
+
+def profile_from_aggregation(result: dict, numeric_columns: List[str], categorical_columns: List[str],
+                             target_column: Optional[str] = None, reference: Optional[DataProfile] = None) -> DataProfile:
+    """
+    DataProfile from the document returned by profile_pipeline (with the same arguments).
+    """
+    statistics = result['statistics'][0] if result['statistics'] else {'n_rows': 0}
+    reference_edges = reference.bucket_edges() if reference is not None else {}
+    numeric = {}
+    for i, column in enumerate(numeric_columns):
+        count = int(statistics.get(f'count_{i}', 0))
+        null_count = int(statistics.get(f'null_{i}', 0))
+        profile = NumericColumnProfile(count=count, null_count=null_count,
+                                       invalid_count=int(statistics['n_rows']) - count - null_count,
+                                       sum=float(statistics.get(f'sum_{i}', 0)), sum_squares=float(statistics.get(f'sum_squares_{i}', 0)),
+                                       min=None if statistics.get(f'min_{i}') is None else float(statistics[f'min_{i}']),
+                                       max=None if statistics.get(f'max_{i}') is None else float(statistics[f'max_{i}']))
+        buckets = result.get(f'buckets_{i}', [])
+        if column in reference_edges:
+            boundaries = bucket_boundaries(reference_edges[column])
+            counts = [0] * (len(boundaries) - 1)
+            for bucket in buckets:
+                # a bucket is labelled with its lower boundary; +inf falls outside every bucket, above the edges
+                position = len(counts) - 1 if bucket['_id'] == 'out_of_range' else boundaries.index(float(bucket['_id']))
+                counts[position] += int(bucket['count'])
+            profile.bucket_edges = list(reference_edges[column])
+            profile.below_count, profile.above_count, profile.bucket_counts = counts[0], counts[-1], counts[1:-1]
+        elif buckets:
+            buckets = sorted(buckets, key=lambda bucket: bucket['_id']['min'])
+            profile.bucket_edges = [float(bucket['_id']['min']) for bucket in buckets] + [float(buckets[-1]['_id']['max'])]
+            profile.bucket_counts = [int(bucket['count']) for bucket in buckets]
+        numeric[column] = profile
+    categorical = {}
+    frequency_columns = list(dict.fromkeys(categorical_columns + ([target_column] if target_column else [])))
+    for i, column in enumerate(frequency_columns):
+        frequencies = {}
+        for group in result.get(f'frequencies_{i}', []):
+            key = category_key(group['_id'])
+            frequencies[key] = frequencies.get(key, 0) + int(group['count'])
+        categorical[column] = CategoricalColumnProfile(null_count=int(statistics.get(f'category_null_{i}', 0)),
+                                                       frequencies=dict(sorted(frequencies.items())))
+    return DataProfile(n_rows=int(statistics['n_rows']), numeric=numeric, categorical=categorical,
+                       target_column=target_column, source='server')
 
 class Poject1Data:
     """
@@ -37,16 +152,209 @@ class Poject1Data:
             if database_name is None:
                 collection = self.mongo_client.database[collection_name]
             else:
-                collection = self.mongo_client[database_name][collection_name]
+                collection = self.mongo_client.client[database_name][collection_name]
             
             # convert collection to pandas dataframe and preprocess(remove 'id' and 'na' values)
             print(f'Exporting collection: {collection_name}')
-            df = pd.DataFrame(list(collection.find()))
+            df = documents_to_df(list(collection.find()))
             print(f'Exported collection: {collection_name} with {df.shape[0]} rows and {df.shape[1]} columns and length: {len(df)}')
-            if 'id' in df.columns.to_list():
-                df = df.drop(columns=['id'], axis=1)
-            df.replace({'na': np.nan}, inplace=True)
             return df
         
         except Exception as e:
-            raise MyException(e, sys)
\ No newline at end of file
+            raise MyException(e, sys)
+
+    def export_collection_in_chunks(self, collection_name: str, chunk_size: int, database_name: Optional[str] = None,
+                                    drop_id: bool = True, query: Optional[dict] = None,
+                                    chunk_sizer: Optional['AdaptiveChunkSizer'] = None,
+                                    projection: Optional[dict] = None) -> Iterator[pd.DataFrame]:
+        """
+        Export the collection as a stream of dataframes of at most `chunk_size` rows, so the full collection is never held in memory.
+
+        Args:
+            collection_name (str): The name of the collection to export.
+            chunk_size (int): Maximum number of documents per chunk (also used as the cursor batch size).
+            database_name (str, optional): The name of the database to connect to. Defaults to None.
+            drop_id (bool): Remove the 'id' column as export_collection_as_df does. Defaults to True.
+            query (dict, optional): MongoDB filter selecting the documents to export. Defaults to all documents.
+            chunk_sizer (AdaptiveChunkSizer, optional): Re-sizes every next chunk to the memory budget; chunk_size is
+                then only the size of the first chunk.
+            projection (dict, optional): MongoDB projection of the fields to export. Defaults to every field.
+
+        Yields:
+            pd.DataFrame: Chunks preprocessed like export_collection_as_df.
+        """
+        try:
+            if database_name is None:
+                collection = self.mongo_client.database[collection_name]
+            else:
+                collection = self.mongo_client.client[database_name][collection_name]
+
+            cursor = collection.find(query or {}, projection, batch_size=chunk_size)
+            rows = chunk_size
+            while True:
+                documents = list(itertools.islice(cursor, rows))
+                if not documents:
+                    break
+                df = documents_to_df(documents, drop_id=drop_id)
+                del documents
+                if chunk_sizer is not None:
+                    rows = chunk_sizer.observe(df)
+                yield df
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def count_by_value(self, collection_name: str, column: str, query: Optional[dict] = None,
+                       database_name: Optional[str] = None) -> Dict[Any, int]:
+        """
+        Number of documents per value of a column, counted on the server with one $group.
+
+        Returns:
+            Dict[Any, int]: {value: number of documents}.
+        """
+        try:
+            if database_name is None:
+                collection = self.mongo_client.database[collection_name]
+            else:
+                collection = self.mongo_client.client[database_name][collection_name]
+            pipeline = ([{'$match': query}] if query else []) + [{'$group': {'_id': f'${column}', 'count': {'$sum': 1}}}]
+            return {group['_id']: int(group['count']) for group in collection.aggregate(pipeline)}
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def profile_collection(self, collection_name: str, numeric_columns: List[str], categorical_columns: List[str],
+                           target_column: Optional[str] = None, query: Optional[dict] = None, buckets: int = 10,
+                           reference: Optional[DataProfile] = None, database_name: Optional[str] = None,
+                           fallback_chunk_size: int = 50_000) -> DataProfile:
+        """
+        Profiles the documents matching `query` with one aggregation on the server (see profile_pipeline): only the
+        profile crosses the network. If the server does not support the pipeline (an old MongoDB, or a stand-in like
+        mongomock without $bucketAuto), the documents are exported and profiled in pandas chunk by chunk instead, with
+        the same counts and histograms: the $bucketAuto edges of the numeric columns the reference does not give are
+        computed on a first pass exporting only those columns. Other server errors (authorization, time or memory
+        limits) are raised rather than answered with a full export.
+
+        Args:
+            numeric_columns, categorical_columns (List[str]): Columns to profile; the target also gets category frequencies.
+            reference (DataProfile, optional): Profile whose bucket edges the numeric columns are bucketed with, so the
+                two compare (see profile_drift). Defaults to equal-frequency buckets.
+
+        Returns:
+            DataProfile: The profile, with source 'server' or 'pandas'.
+        """
+        try:
+            from pymongo.errors import OperationFailure
+            if database_name is None:
+                collection = self.mongo_client.database[collection_name]
+            else:
+                collection = self.mongo_client.client[database_name][collection_name]
+            pipeline = ([{'$match': query}] if query else []) + profile_pipeline(numeric_columns, categorical_columns,
+                                                                                 target_column, buckets, reference)
+            try:
+                result = next(collection.aggregate(pipeline, allowDiskUse=True))
+            except (NotImplementedError, OperationFailure) as e:
+                if isinstance(e, OperationFailure) and e.code not in _UNSUPPORTED_PIPELINE_ERROR_CODES:
+                    raise
+                logging.warning(f'Profiling {collection_name} on the server failed ({e}); exporting it to profile in pandas')
+                def chunks(columns: List[str]) -> Iterator[pd.DataFrame]:
+                    for chunk in self.export_collection_in_chunks(collection_name, chunk_size=fallback_chunk_size,
+                                                                  database_name=database_name, query=query,
+                                                                  projection={column: 1 for column in columns}):
+                        yield chunk.reindex(columns=columns)
+                bucket_edges = reference.bucket_edges() if reference is not None else {}
+                unbucketed = [column for column in numeric_columns if column not in bucket_edges]
+                if unbucketed:
+                    bucket_edges = {**bucket_edges, **auto_bucket_edges_of_chunks(chunks(unbucketed), unbucketed, buckets)}
+                columns = list(dict.fromkeys(numeric_columns + categorical_columns + ([target_column] if target_column else [])))
+                return profile_chunks(chunks(columns), numeric_columns, categorical_columns, target_column, bucket_edges)
+            return profile_from_aggregation(result, numeric_columns, categorical_columns, target_column, reference)
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+class AsyncPoject1Data:
+    """
+    Async counterpart of Poject1Data for asyncio code (serving, concurrent ingestion): same export semantics plus point lookups by customer id.
+
+    Only `collection.find(filter, projection)` returning a cursor with an awaitable `to_list()` and an awaitable
+    `collection.create_index(key)` are used, so a local mongod, a pymongo AsyncMongoClient or an in-memory stand-in
+    exposing those methods can be passed as `client`, or its collections through `collection_factory`.
+    """
+
+    def __init__(self, client: object = None, database_name: str = DATABASE_NAME,
+                 collection_factory: Optional[Callable[[str, str], Any]] = None) -> None:
+        """
+        Args:
+            client (object, optional): Async client or in-memory stand-in. Defaults to the process' AsyncMongoDBClient.
+            database_name (str): The name of the database to connect to. Defaults to 'Project1'.
+            collection_factory (callable, optional): Returns the async collection of (database name, collection name),
+                e.g. an async wrapper of a mongomock collection; no client is created when it is given.
+        """
+        try:
+            self.database_name = database_name
+            self.collection_factory = collection_factory
+            self.mongo_client = None
+            if collection_factory is None:
+                from src.configuration.async_mongo_db_connection import AsyncMongoDBClient
+                self.mongo_client = AsyncMongoDBClient(database_name=database_name, client=client)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def _collection(self, collection_name: str, database_name: Optional[str] = None):
+        if self.collection_factory is not None:
+            return self.collection_factory(database_name or self.database_name, collection_name)
+        if database_name is None:
+            return self.mongo_client.database[collection_name]
+        return self.mongo_client.client[database_name][collection_name]
+
+    async def export_collection_as_df(self, collection_name: str, database_name: Optional[str] = None) -> pd.DataFrame:
+        """
+        Export the entire collection as a pandas dataframe without blocking the event loop.
+
+        Returns:
+            pd.DataFrame: Same frame as Poject1Data.export_collection_as_df ('id' removed, 'na' replaced with NaN).
+        """
+        try:
+            documents = await self._collection(collection_name, database_name).find().to_list(None)
+            # building the frame is CPU work; keep it off the event loop for large collections
+            return await asyncio.to_thread(documents_to_df, documents)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    async def get_customers_by_id(self, collection_name: str, customer_ids: Iterable, database_name: Optional[str] = None) -> pd.DataFrame:
+        """
+        Fetches the documents of the given customer ids in one round trip.
+
+        Returns:
+            pd.DataFrame: One row per customer found (the 'id' column is kept to correlate rows; '_id' is not returned).
+        """
+        try:
+            customer_ids = list(customer_ids)
+            documents = await self._collection(collection_name, database_name).find(
+                {CUSTOMER_ID_COLUMN: {'$in': customer_ids}}, {'_id': 0}).to_list(None)
+            return documents_to_df(documents, drop_id=False)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    async def get_customer_by_id(self, collection_name: str, customer_id, database_name: Optional[str] = None) -> Optional[dict]:
+        """
+        Fetches a single customer document, or None if the id is unknown.
+        """
+        try:
+            documents = await self._collection(collection_name, database_name).find(
+                {CUSTOMER_ID_COLUMN: customer_id}, {'_id': 0}).to_list(1)
+            if not documents:
+                return None
+            return {key: (np.nan if value == 'na' else value) for key, value in documents[0].items()}
+        except Exception as e:
+            raise MyException(e, sys)
+
+    async def ensure_customer_id_index(self, collection_name: str, database_name: Optional[str] = None) -> None:
+        """
+        Creates the index on the customer id used by the point lookups (no-op if it exists).
+        """
+        try:
+            await self._collection(collection_name, database_name).create_index(CUSTOMER_ID_COLUMN)
+        except Exception as e:
+            raise MyException(e, sys)
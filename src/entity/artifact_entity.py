@@ -1,9 +1,26 @@
 from dataclasses import dataclass # dataclass is used to create a class with predefined attributes and methods 
+import statistics
+from typing import Dict, List, Optional
 
 @dataclass
 class DataIngestionArtifact:
     trained_file_path: str
     test_file_path: str
+    train_rows: int = 0
+    test_rows: int = 0
+    max_customer_id: Optional[int] = None # largest customer id ingested, the watermark of the next incremental run
+    duplicate_rows_dropped: int = 0
+    conflicting_rows_dropped: int = 0
+
+@dataclass
+class DataProfileArtifact:
+    profile_file_path: str
+    profile: dict # DataProfile.to_dict() of the ingested documents
+    source: str # 'server' if aggregated by MongoDB, 'pandas' if the server could not run the pipeline
+    n_rows: int
+    target_rate: Optional[float]
+    drift: Dict[str, float] # population stability index per column against the production model's profile (empty without one)
+    drifted_columns: List[str]
 
 @dataclass
 class DataValidationArtifact:
@@ -16,6 +33,7 @@ class DataTransformationArtifact:
     transformed_object_file_path: str
     transformed_train_file_path: str
     transformed_test_file_path: str
+    transformed_validation_file_path: Optional[str] = None # train rows held out before resampling, None if none were
 
 @dataclass
 class ClassificationMetricArtifact:
@@ -23,7 +41,99 @@ class ClassificationMetricArtifact:
     precision_score: float
     recall_score: float
 
+@dataclass
+class ModelCompressionArtifact:
+    original_n_estimators: int
+    compressed_n_estimators: int
+    original_size_bytes: int
+    compressed_size_bytes: int
+    original_latency_seconds: float # predict() on the test rows
+    compressed_latency_seconds: float
+    original_f1_score: float
+    compressed_f1_score: float
+
+    @property
+    def f1_delta(self) -> float:
+        return self.compressed_f1_score - self.original_f1_score
+
+@dataclass
+class FeatureSelectionArtifact:
+    method: str
+    importances: Dict[str, float] # share of the total importance of every model input column
+    selected_features: List[str]
+    dropped_features: List[str]
+    original_f1_score: float # validation f1 of the model trained on every feature
+    selected_f1_score: float # validation f1 of the model retrained on selected_features
+    applied: bool # False if no feature was dropped or the retrained model fell outside the f1 tolerance (every feature kept)
+
+    @property
+    def f1_delta(self) -> float:
+        return self.selected_f1_score - self.original_f1_score
+
+@dataclass
+class CrossValidationArtifact:
+    fold_metrics: List[ClassificationMetricArtifact]
+    fold_fit_seconds: List[float]
+    wall_seconds: float
+    n_workers: int
+
+    def _values(self, metric: str) -> List[float]:
+        return [getattr(fold, metric) for fold in self.fold_metrics]
+
+    def mean(self, metric: str = 'f1_score') -> float:
+        return statistics.fmean(self._values(metric))
+
+    def variance(self, metric: str = 'f1_score') -> float:
+        values = self._values(metric)
+        return statistics.variance(values) if len(values) > 1 else 0.0
+
+    def summary(self) -> str:
+        return ', '.join(f'{metric} {self.mean(metric):.4f} +/- {self.variance(metric) ** 0.5:.4f}'
+                         for metric in ('f1_score', 'precision_score', 'recall_score')) + \
+               f' over {len(self.fold_metrics)} folds in {self.wall_seconds:.2f}s on {self.n_workers} workers'
+
 @dataclass
 class ModelTrainerArtifact:
     trained_model_file_path: str
-    metric_artifact: ClassificationMetricArtifact
\ No newline at end of file
+    metric_artifact: ClassificationMetricArtifact
+    compression_artifact: Optional[ModelCompressionArtifact] = None
+    feature_selection_artifact: Optional[FeatureSelectionArtifact] = None
+    cross_validation_artifact: Optional[CrossValidationArtifact] = None
+
+@dataclass
+class StageCostEstimate:
+    name: str # DAG node
+    sample_seconds: List[float] # measured on each sample, smallest first
+    fixed_seconds: float # seconds = fixed_seconds + seconds_per_row * rows through the samples
+    seconds_per_row: float
+    estimated_seconds: float # on the full collection
+
+@dataclass
+class SampleRunArtifact:
+    full_rows: int # documents in the collection
+    sample_rows: List[int] # documents ingested by each sample run, smallest first
+    sample_rates: Dict[str, float] # share of each target value's documents in the larger sample
+    stages: List[StageCostEstimate]
+    sample_wall_seconds: List[float]
+    estimated_wall_seconds: float # critical path of the estimated stage times, or their sum over the workers if longer
+    estimated_critical_path: List[str]
+    sample_peak_rss_bytes: List[int]
+    estimated_peak_rss_bytes: int
+    memory_budget_bytes: int
+    metric_artifact: ClassificationMetricArtifact # of the model trained on the larger sample
+    report_file_path: str
+
+    @property
+    def fits_memory_budget(self) -> bool:
+        return self.estimated_peak_rss_bytes <= self.memory_budget_bytes
+
+    def summary(self) -> str:
+        lines = [f'Sample runs of {self.sample_rows} of {self.full_rows} documents took {self.sample_wall_seconds} s; '
+                 f'sample f1 {self.metric_artifact.f1_score:.4f}',
+                 f'Full run estimate: {self.estimated_wall_seconds:.0f}s wall, peak RSS {self.estimated_peak_rss_bytes / 2**20:.0f} MiB '
+                 f'({"within" if self.fits_memory_budget else "over"} the {self.memory_budget_bytes / 2**20:.0f} MiB budget)']
+        for stage in sorted(self.stages, key=lambda stage: -stage.estimated_seconds):
+            marker = '*' if stage.name in self.estimated_critical_path else ' '
+            lines.append(f' {marker} {stage.name:<28} {" -> ".join(f"{seconds:.2f}s" for seconds in stage.sample_seconds):<22} '
+                         f'{stage.fixed_seconds:>7.2f}s + {stage.seconds_per_row * 1e6:>8.2f}us/row -> {stage.estimated_seconds:>9.1f}s')
+        return '\n'.join(lines)
@@ -1,43 +1,230 @@
 import os
 from src.constants import *
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Optional
 
-TIMESTAMP: str = datetime.now().strftime('%m_%d_%Y_%H_%M_%S')
+_timestamp: Optional[str] = None
+_training_pipeline_config = None
+
+def get_timestamp() -> str:
+    """
+    Returns the run timestamp, fixed the first time it is requested (not at import) and shared by every config of the run.
+    """
+    global _timestamp
+    if _timestamp is None:
+        _timestamp = datetime.now().strftime('%m_%d_%Y_%H_%M_%S')
+    return _timestamp
+
+def _env_or_default(key: str, default):
+    """
+    Returns a dataclass default factory reading the environment variable `key`, cast to the type of `default`.
+    """
+    def factory():
+        value = os.getenv(key)
+        if value is None or value == '':
+            return default
+        if isinstance(default, bool):
+            return value.strip().lower() in ('1', 'true', 'yes', 'on')
+        return type(default)(value)
+    return field(default_factory=factory)
 
 @dataclass
 class TrainingPipelineConfig:
-    pipeline_name = PIPELINE_NAME
-    artifact_dir = os.path.join(ARTIFACT_DIR, TIMESTAMP)
-    timestamp: str = TIMESTAMP
+    pipeline_name: str = PIPELINE_NAME
+    timestamp: str = field(default_factory=get_timestamp)
+    artifact_dir: Optional[str] = None
+    max_workers: int = _env_or_default('PIPELINE_MAX_WORKERS', PIPELINE_MAX_WORKERS)
+    executor_type: str = _env_or_default('PIPELINE_EXECUTOR_TYPE', PIPELINE_EXECUTOR_TYPE)
+
+    def __post_init__(self):
+        if self.artifact_dir is None:
+            self.artifact_dir = os.path.join(ARTIFACT_DIR, self.timestamp)
+
+def get_training_pipeline_config() -> TrainingPipelineConfig:
+    """
+    Returns the process-wide TrainingPipelineConfig, created on first use.
+    """
+    global _training_pipeline_config
+    if _training_pipeline_config is None:
+        _training_pipeline_config = TrainingPipelineConfig()
+    return _training_pipeline_config
+
+def set_training_pipeline_config(training_pipeline_config: TrainingPipelineConfig) -> None:
+    """
+    Sets the process-wide TrainingPipelineConfig, e.g. to run the pipeline against another artifact directory.
+    Only configs built afterwards use it.
+    """
+    global _training_pipeline_config
+    _training_pipeline_config = training_pipeline_config
+
+def __getattr__(name: str):
+    # `TIMESTAMP` and `training_pipeline_config` used to be computed at import; keep them importable but resolve on first access
+    if name == 'TIMESTAMP':
+        return get_timestamp()
+    if name == 'training_pipeline_config':
+        return get_training_pipeline_config()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+@dataclass
+class ArtifactRetentionConfig:
+    artifact_dir: str = ARTIFACT_DIR
+    log_dir: Optional[str] = None # defaults to the logger's directory
+    keep_last: int = _env_or_default('ARTIFACT_RETENTION_KEEP_LAST', ARTIFACT_RETENTION_KEEP_LAST)
+    max_age_days: float = _env_or_default('ARTIFACT_RETENTION_MAX_AGE_DAYS', ARTIFACT_RETENTION_MAX_AGE_DAYS)
+    max_total_bytes: int = _env_or_default('ARTIFACT_RETENTION_MAX_TOTAL_BYTES', ARTIFACT_RETENTION_MAX_TOTAL_BYTES)
+    deduplicate: bool = _env_or_default('ARTIFACT_RETENTION_DEDUPLICATE', ARTIFACT_RETENTION_DEDUPLICATE)
+    on_run: bool = _env_or_default('ARTIFACT_RETENTION_ON_RUN', ARTIFACT_RETENTION_ON_RUN)
+    log_keep_last: int = LOG_RETENTION_KEEP_LAST
+    log_max_age_days: float = LOG_RETENTION_MAX_AGE_DAYS
+    production_model_file_path: Optional[str] = None # runs holding an identical model are production runs
+
+    def __post_init__(self):
+        if self.production_model_file_path is None:
+            self.production_model_file_path = os.getenv(PREDICTION_MODEL_FILE_PATH_ENV_KEY, os.path.join(PREDICTION_MODEL_DIR, MODEL_FILE_NAME))
+
+@dataclass
+class MemoryBudgetConfig:
+    budget_bytes: int = _env_or_default('MEMORY_BUDGET_BYTES', MEMORY_BUDGET_BYTES)
+    fraction: float = _env_or_default('MEMORY_BUDGET_FRACTION', MEMORY_BUDGET_FRACTION)
+    min_chunk_rows: int = _env_or_default('MEMORY_BUDGET_MIN_CHUNK_ROWS', MEMORY_BUDGET_MIN_CHUNK_ROWS)
+    spill_dir: str = _env_or_default('MEMORY_BUDGET_SPILL_DIR', MEMORY_BUDGET_SPILL_DIR)
+
+@dataclass
+class ArtifactCodecConfig:
+    array_codec: str = _env_or_default('ARTIFACT_ARRAY_CODEC', ARTIFACT_ARRAY_CODEC)
+    object_codec: str = _env_or_default('ARTIFACT_OBJECT_CODEC', ARTIFACT_OBJECT_CODEC)
+    level: int = _env_or_default('ARTIFACT_CODEC_LEVEL', ARTIFACT_CODEC_LEVEL)
+    threads: int = _env_or_default('ARTIFACT_CODEC_THREADS', ARTIFACT_CODEC_THREADS)
+    block_bytes: int = ARTIFACT_ARRAY_BLOCK_BYTES
+
+@dataclass
+class SampleRunConfig:
+    sample_rows: int = _env_or_default('SAMPLE_RUN_ROWS', SAMPLE_RUN_ROWS)
+    small_fraction: float = _env_or_default('SAMPLE_RUN_SMALL_FRACTION', SAMPLE_RUN_SMALL_FRACTION)
+    min_class_rows: int = SAMPLE_RUN_MIN_CLASS_ROWS
+    sample_run_dir: Optional[str] = None
+    report_file_path: Optional[str] = None
 
-training_pipeline_config = TrainingPipelineConfig = TrainingPipelineConfig()
+    def __post_init__(self):
+        if self.sample_run_dir is None:
+            self.sample_run_dir = os.path.join(get_training_pipeline_config().artifact_dir, SAMPLE_RUN_DIR_NAME)
+        if self.report_file_path is None:
+            self.report_file_path = os.path.join(self.sample_run_dir, SAMPLE_RUN_REPORT_FILE_NAME)
+
+@dataclass
+class MongoDBConfig:
+    # environment variables named like the constants (e.g. MONGODB_MAX_POOL_SIZE) override the defaults
+    max_pool_size: int = _env_or_default('MONGODB_MAX_POOL_SIZE', MONGODB_MAX_POOL_SIZE)
+    min_pool_size: int = _env_or_default('MONGODB_MIN_POOL_SIZE', MONGODB_MIN_POOL_SIZE)
+    max_idle_time_ms: int = _env_or_default('MONGODB_MAX_IDLE_TIME_MS', MONGODB_MAX_IDLE_TIME_MS)
+    wait_queue_timeout_ms: int = _env_or_default('MONGODB_WAIT_QUEUE_TIMEOUT_MS', MONGODB_WAIT_QUEUE_TIMEOUT_MS)
+    connect_timeout_ms: int = _env_or_default('MONGODB_CONNECT_TIMEOUT_MS', MONGODB_CONNECT_TIMEOUT_MS)
+    socket_timeout_ms: int = _env_or_default('MONGODB_SOCKET_TIMEOUT_MS', MONGODB_SOCKET_TIMEOUT_MS)
+    server_selection_timeout_ms: int = _env_or_default('MONGODB_SERVER_SELECTION_TIMEOUT_MS', MONGODB_SERVER_SELECTION_TIMEOUT_MS)
+    read_preference: str = _env_or_default('MONGODB_READ_PREFERENCE', MONGODB_READ_PREFERENCE)
+    compressors: str = _env_or_default('MONGODB_COMPRESSORS', MONGODB_COMPRESSORS)
+
+    def client_kwargs(self) -> dict:
+        """
+        Returns the keyword arguments for pymongo.MongoClient.
+        """
+        kwargs = dict(
+            maxPoolSize=self.max_pool_size,
+            minPoolSize=self.min_pool_size,
+            maxIdleTimeMS=self.max_idle_time_ms,
+            waitQueueTimeoutMS=self.wait_queue_timeout_ms,
+            connectTimeoutMS=self.connect_timeout_ms,
+            socketTimeoutMS=self.socket_timeout_ms,
+            serverSelectionTimeoutMS=self.server_selection_timeout_ms,
+            readPreference=self.read_preference,
+        )
+        if self.compressors:
+            kwargs['compressors'] = self.compressors
+        return kwargs
 
 @dataclass
 class DataIngestionConfig:
-    data_ingestion_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_INGETSION_DIR_NAME)
-    feature_store_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_FEATURE_STORE_DIR, FILE_NAME)
-    train_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TRAIN_FILE_NAME)
-    test_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TEST_FILE_NAME)
+    data_ingestion_dir: Optional[str] = None
+    feature_store_file_path: Optional[str] = None
+    train_file_path: Optional[str] = None
+    test_file_path: Optional[str] = None
     train_test_split_ratio: float = DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO
     collection_name: str = DATA_INGESTION_COLLECTION_NAME
+    chunk_size: int = DATA_INGESTION_CHUNK_SIZE
+    max_chunk_size: int = DATA_INGESTION_MAX_CHUNK_SIZE
+    chunk_overhead: float = DATA_INGESTION_CHUNK_OVERHEAD
+    split_key_column: str = DATA_INGESTION_SPLIT_KEY_COLUMN
+    min_customer_id: Optional[int] = None # only documents with a larger customer id are ingested (incremental retraining)
+    sample_rates: Optional[dict] = None # {target value: share of its documents ingested} for sample runs; None ingests all
+    deduplicate: bool = _env_or_default('DATA_INGESTION_DEDUPLICATE', DATA_INGESTION_DEDUPLICATE)
+    drop_conflicting_duplicates: bool = _env_or_default('DATA_INGESTION_DROP_CONFLICTING_DUPLICATES', DATA_INGESTION_DROP_CONFLICTING_DUPLICATES)
+    dedup_index_dir: str = _env_or_default('DATA_INGESTION_DEDUP_INDEX_DIR', DATA_INGESTION_DEDUP_INDEX_DIR)
+    dedup_max_keys: int = DATA_INGESTION_DEDUP_MAX_KEYS
+    build_feature_lookup: bool = _env_or_default('FEATURE_LOOKUP_BUILD', FEATURE_LOOKUP_BUILD)
+    feature_lookup_dir: str = _env_or_default('FEATURE_LOOKUP_DIR', FEATURE_LOOKUP_DIR)
+    feature_lookup_max_segments: int = FEATURE_LOOKUP_MAX_SEGMENTS
+
+    def __post_init__(self):
+        if self.data_ingestion_dir is None:
+            self.data_ingestion_dir = os.path.join(get_training_pipeline_config().artifact_dir, DATA_INGETSION_DIR_NAME)
+        if self.feature_store_file_path is None:
+            self.feature_store_file_path = os.path.join(self.data_ingestion_dir, DATA_INGESTION_FEATURE_STORE_DIR, FILE_NAME)
+        if self.train_file_path is None:
+            self.train_file_path = os.path.join(self.data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TRAIN_FILE_NAME)
+        if self.test_file_path is None:
+            self.test_file_path = os.path.join(self.data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TEST_FILE_NAME)
+
+@dataclass
+class DataProfilingConfig:
+    enabled: bool = _env_or_default('DATA_PROFILING_ENABLED', DATA_PROFILING_ENABLED)
+    data_profiling_dir: Optional[str] = None
+    profile_file_path: Optional[str] = None
+    buckets: int = DATA_PROFILING_BUCKETS
+    drift_threshold: float = _env_or_default('DATA_PROFILING_DRIFT_THRESHOLD', DATA_PROFILING_DRIFT_THRESHOLD)
+
+    def __post_init__(self):
+        if self.data_profiling_dir is None:
+            self.data_profiling_dir = os.path.join(get_training_pipeline_config().artifact_dir, DATA_PROFILING_DIR_NAME)
+        if self.profile_file_path is None:
+            self.profile_file_path = os.path.join(self.data_profiling_dir, DATA_PROFILING_FILE_NAME)
 
 @dataclass
 class DataValidationConfig:
-    data_validation_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_VALIDATION_DIR_NAME)
-    validation_report_file_path: str = os.path.join(data_validation_dir, DATA_VALIDATION_REPORT_FILE_NAME)
+    data_validation_dir: Optional[str] = None
+    validation_report_file_path: Optional[str] = None
+
+    def __post_init__(self):
+        if self.data_validation_dir is None:
+            self.data_validation_dir = os.path.join(get_training_pipeline_config().artifact_dir, DATA_VALIDATION_DIR_NAME)
+        if self.validation_report_file_path is None:
+            self.validation_report_file_path = os.path.join(self.data_validation_dir, DATA_VALIDATION_REPORT_FILE_NAME)
 
 @dataclass
 class DataTransformationConfig:
-    data_transformation_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_TRANSFORMATION_DIR_NAME)
-    transformed_train_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, TRAIN_FILE_NAME.replace('csv', 'npy'))
-    transformed_test_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, TEST_FILE_NAME.replace('csv', 'npy'))
-    transformed_object_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR, PREPROCESSING_OBJECT_FILE_NAME)
+    data_transformation_dir: Optional[str] = None
+    transformed_train_file_path: Optional[str] = None
+    transformed_test_file_path: Optional[str] = None
+    transformed_validation_file_path: Optional[str] = None
+    transformed_object_file_path: Optional[str] = None
+
+    def __post_init__(self):
+        if self.data_transformation_dir is None:
+            self.data_transformation_dir = os.path.join(get_training_pipeline_config().artifact_dir, DATA_TRANSFORMATION_DIR_NAME)
+        transformed_data_dir = os.path.join(self.data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR)
+        if self.transformed_train_file_path is None:
+            self.transformed_train_file_path = os.path.join(transformed_data_dir, TRAIN_FILE_NAME.replace('csv', 'npy'))
+        if self.transformed_test_file_path is None:
+            self.transformed_test_file_path = os.path.join(transformed_data_dir, TEST_FILE_NAME.replace('csv', 'npy'))
+        if self.transformed_validation_file_path is None:
+            self.transformed_validation_file_path = os.path.join(transformed_data_dir, DATA_TRANSFORMATION_VALIDATION_FILE_NAME)
+        if self.transformed_object_file_path is None:
+            self.transformed_object_file_path = os.path.join(self.data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR, PREPROCESSING_OBJECT_FILE_NAME)
 
 @dataclass
 class ModelTrainerConfig:
-    model_trainer_dir: str = os.path.join(training_pipeline_config.artifact_dir, MODEL_TRAINER_DIR_NAME)
-    trained_model_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR, MODEL_FILE_NAME)
+    model_trainer_dir: Optional[str] = None
+    trained_model_file_path: Optional[str] = None
     model_config_file_path: str = MODEL_TRAINER_MODEL_CONFIG_FILE_PATH
     expected_accuracy: float = MODEL_TRAINER_EXPECTED_SCORE
     _n_estimators: int = MODEL_TRAINER_N_ESTIMATORS
@@ -46,4 +233,57 @@ class ModelTrainerConfig:
     _max_depth: int = MIN_SAMPLES_SPLIT_MAX_DEPTH
     _criterion: str = MIN_SAMPLES_SPLIT_CRITERION
     _random_state: int = MIN_SAMPLES_SPLIT_RANDOM_STATE
+    incremental: bool = _env_or_default('MODEL_TRAINER_INCREMENTAL', MODEL_TRAINER_INCREMENTAL)
+    base_model_file_path: Optional[str] = None # production model to warm-start from, defaults to the served model
+    _incremental_n_estimators: int = MODEL_TRAINER_INCREMENTAL_N_ESTIMATORS
+    _tree_window: int = MODEL_TRAINER_TREE_WINDOW
+    compression: bool = _env_or_default('MODEL_TRAINER_COMPRESSION', MODEL_TRAINER_COMPRESSION)
+    compression_f1_tolerance: float = _env_or_default('MODEL_TRAINER_COMPRESSION_F1_TOLERANCE', MODEL_TRAINER_COMPRESSION_F1_TOLERANCE)
+    compression_sample_rows: int = MODEL_TRAINER_COMPRESSION_SAMPLE_ROWS
+    compression_min_estimators: int = MODEL_TRAINER_COMPRESSION_MIN_ESTIMATORS
+    validation_split_ratio: float = MODEL_TRAINER_VALIDATION_SPLIT_RATIO
+    feature_selection: bool = _env_or_default('MODEL_TRAINER_FEATURE_SELECTION', MODEL_TRAINER_FEATURE_SELECTION)
+    feature_selection_method: str = _env_or_default('MODEL_TRAINER_FEATURE_SELECTION_METHOD', MODEL_TRAINER_FEATURE_SELECTION_METHOD)
+    feature_selection_threshold: float = _env_or_default('MODEL_TRAINER_FEATURE_SELECTION_THRESHOLD', MODEL_TRAINER_FEATURE_SELECTION_THRESHOLD)
+    feature_selection_f1_tolerance: float = MODEL_TRAINER_FEATURE_SELECTION_F1_TOLERANCE
+    feature_selection_n_repeats: int = MODEL_TRAINER_FEATURE_SELECTION_N_REPEATS
+    feature_selection_sample_rows: int = MODEL_TRAINER_FEATURE_SELECTION_SAMPLE_ROWS
+    feature_selection_n_jobs: int = _env_or_default('MODEL_TRAINER_FEATURE_SELECTION_N_JOBS', MODEL_TRAINER_FEATURE_SELECTION_N_JOBS)
+    cv_folds: int = _env_or_default('MODEL_TRAINER_CV_FOLDS', MODEL_TRAINER_CV_FOLDS)
+    cv_workers: int = _env_or_default('MODEL_TRAINER_CV_WORKERS', MODEL_TRAINER_CV_WORKERS)
+    cv_resample: bool = MODEL_TRAINER_CV_RESAMPLE
+    cv_dir: Optional[str] = None
+
+    def __post_init__(self):
+        if self.model_trainer_dir is None:
+            self.model_trainer_dir = os.path.join(get_training_pipeline_config().artifact_dir, MODEL_TRAINER_DIR_NAME)
+        if self.trained_model_file_path is None:
+            self.trained_model_file_path = os.path.join(self.model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR, MODEL_FILE_NAME)
+        if self.cv_dir is None:
+            self.cv_dir = os.path.join(self.model_trainer_dir, MODEL_TRAINER_CV_DIR)
+        if self.base_model_file_path is None:
+            self.base_model_file_path = os.getenv(PREDICTION_MODEL_FILE_PATH_ENV_KEY, os.path.join(PREDICTION_MODEL_DIR, MODEL_FILE_NAME))
+
+@dataclass
+class AdmissionControlConfig:
+    enabled: bool = _env_or_default('SERVING_ADMISSION_CONTROL', SERVING_ADMISSION_CONTROL)
+    max_concurrency: int = _env_or_default('SERVING_MAX_CONCURRENCY', SERVING_MAX_CONCURRENCY)
+    max_queue: int = _env_or_default('SERVING_MAX_QUEUE', SERVING_MAX_QUEUE)
+    deadline_ms: int = _env_or_default('SERVING_DEADLINE_MS', SERVING_DEADLINE_MS)
+    max_deadline_ms: int = _env_or_default('SERVING_MAX_DEADLINE_MS', SERVING_MAX_DEADLINE_MS)
+
+    def __post_init__(self):
+        if self.max_concurrency <= 0:
+            self.max_concurrency = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+        if self.max_queue <= 0:
+            self.max_queue = 4 * self.max_concurrency
+
+@dataclass
+class PredictionPipelineConfig:
+    model_file_path: Optional[str] = None
+    feature_lookup_dir: str = _env_or_default('FEATURE_LOOKUP_DIR', FEATURE_LOOKUP_DIR)
+    feature_lookup_refresh_seconds: float = FEATURE_LOOKUP_REFRESH_SECONDS
 
+    def __post_init__(self):
+        if self.model_file_path is None:
+            self.model_file_path = os.getenv(PREDICTION_MODEL_FILE_PATH_ENV_KEY, os.path.join(PREDICTION_MODEL_DIR, MODEL_FILE_NAME))
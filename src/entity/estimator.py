@@ -1,10 +1,13 @@
 import sys 
-import pandas as pd
-from sklearn.pipeline import Pipeline
+from typing import TYPE_CHECKING, List, Optional
 
 from src.logger import logging
 from src.exception import MyException
 
+if TYPE_CHECKING:
+    import pandas as pd
+    from sklearn.pipeline import Pipeline
+
 class TargetValueMapping:
     def __init__(self):
         self.yes: int = 0
@@ -22,15 +25,41 @@ class TargetValueMapping:
         return dict(zip(mapping_response.values(), mapping_response.keys()))
     
 class MyModel:
-    def __init__(self, preprocessing_object: Pipeline, trained_model_object: object):
+    def __init__(self, preprocessing_object: 'Pipeline', trained_model_object: object,
+                 tree_generations: Optional[List[int]] = None, data_watermark: Optional[int] = None,
+                 selected_features: Optional[List[str]] = None, full_preprocessing_object: Optional['Pipeline'] = None,
+                 data_profile: Optional[dict] = None):
         """
         preprocessing_object: input preprocessing object
         trained_model_object: input object of trained model
+        tree_generations: retrain generation of every tree of a forest model (0 for the initial full training)
+        data_watermark: largest customer id the model was trained on; incremental retrains ingest only newer documents
+        selected_features: model input columns kept by feature selection (None: all of them); the preprocessing object
+        reads only these columns and ignores any other column of the input
+        full_preprocessing_object: preprocessing object of every model input column, kept with selected_features:
+        incremental retrains resample the new data in the full feature space, as the model's training data was, and
+        keep the selected columns (SMOTEENN's neighbourhoods degenerate on a handful of discrete columns)
+        data_profile: DataProfile.to_dict() of the documents the model was trained on, the reference later documents
+        are checked for drift against
         """
         self.preprocessing_object = preprocessing_object
         self.trained_model_object = trained_model_object
+        self.tree_generations = tree_generations
+        self.data_watermark = data_watermark
+        self.selected_features = selected_features
+        self.full_preprocessing_object = full_preprocessing_object
+        self.data_profile = data_profile
+
+    def __setstate__(self, state: dict) -> None:
+        # models pickled before tree_generations/data_watermark/feature selection/data profiles existed
+        state.setdefault('tree_generations', None)
+        state.setdefault('data_watermark', None)
+        state.setdefault('selected_features', None)
+        state.setdefault('full_preprocessing_object', None)
+        state.setdefault('data_profile', None)
+        self.__dict__.update(state)
 
-    def predict(self, df: pd.DataFrame) -> pd.DataFrame:
+    def predict(self, df: 'pd.DataFrame') -> 'pd.DataFrame':
         """
         Function accepts a dataframe as input (with all custom transformations already applied) 
         applies scaling using preprocessing object and then performs prediction 
@@ -15,24 +15,29 @@ def error_message_detail(error: Exception, error_detail: sys) -> str:
 
     # Extracting the traceback information (exception type, error message, and traceback details)
     _, _, exc_tb = error_detail.exc_info()
+    return _format_error_message(error, exc_tb)
+
+def _format_error_message(error: object, exc_tb) -> str:
+    if exc_tb is None:
+        return f'Error message: {str(error)}'
 
     # Get the filename where the exception occured
     file_name = exc_tb.tb_frame.f_code.co_filename
 
     # Create a formatted error message with file name, line number, and error message
     line_number = exc_tb.tb_lineno
-    error_message = f'Error occured in python script name {file_name} at line number {line_number}: Error message: {str(error)}'
-
-    # Log the error for better tracking
-    logging.info(error_message)
-
-    return error_message
+    return f'Error occured in python script name {file_name} at line number {line_number}: Error message: {str(error)}'
 
 class MyException(Exception):
     """
     Custom exception class for handling errors in the US visa application.
+
+    Construction is cheap: only the traceback reference is captured, the message is formatted the first time it is read.
+    Wrapping a MyException in another MyException (as every component does at each stack level) reuses the original
+    error and location instead of nesting messages, and nothing is logged here; call `log()` once at the boundary
+    (pipeline run, request handler) instead.
     """
-    def __init__(self, error_message: str, error_detail: sys):
+    def __init__(self, error_message: str, error_detail: sys = sys):
         """
         Initializes a new instance of the MyException class with a detailed error message and traceback.
 
@@ -43,11 +48,51 @@ class MyException(Exception):
         Returns:
             None
         """
+        if isinstance(error_message, MyException):
+            # re-wrapped while propagating: keep the innermost error and location, share the logged state
+            self._error, self._exc_tb, self._formatted = error_message._error, error_message._exc_tb, error_message._formatted
+            self._inner = error_message
+        else:
+            self._error, self._formatted, self._inner = error_message, None, None
+            # only the traceback reference is kept; walking it happens in error_message
+            exc_tb = error_detail.exc_info()[2] if error_detail is not None else None
+            if exc_tb is None and isinstance(error_message, BaseException):
+                exc_tb = error_message.__traceback__
+            self._exc_tb = exc_tb
+
         # Call the parent class constructor with the error message
-        super().__init__(error_message)
+        super().__init__(self._error)
+
+    @property
+    def error_message(self) -> str:
+        """
+        Formatted error message with file name, line number, and error message (formatted lazily and cached).
+        """
+        if self._formatted is None:
+            self._formatted = _format_error_message(self._error, self._exc_tb)
+            if self._inner is not None:
+                self._inner._formatted = self._formatted
+        return self._formatted
+
+    def _root(self) -> 'MyException':
+        root = self
+        while root._inner is not None:
+            root = root._inner
+        return root
 
-        # Format the error message with file name, line number, and error message
-        self.error_message = error_message_detail(error_message, error_detail)
+    @property
+    def logged(self) -> bool:
+        return getattr(self._root(), '_logged', False)
+
+    def log(self, logger: logging.Logger = logging.getLogger(), level: int = logging.ERROR) -> None:
+        """
+        Logs the error once; later calls (for this exception or any exception wrapping it) are no-ops.
+        """
+        root = self._root()
+        if getattr(root, '_logged', False):
+            return
+        root._logged = True
+        logger.log(level, self.error_message)
 
     def __str__(self) -> str:
         """
@@ -55,4 +100,25 @@ class MyException(Exception):
         Returns:
             str: A formatted error message.
         """
-        return self.error_message
\ No newline at end of file
+        return self.error_message
+
+    def __reduce__(self):
+        # tracebacks cannot be pickled (e.g. when a worker process raises); ship the formatted message instead
+        return (_rebuild_exception, (self.error_message,))
+
+def _rebuild_exception(error_message: str) -> MyException:
+    exc = MyException(error_message, None)
+    exc._formatted = error_message
+    return exc
+
+class RowValidationError(MyException):
+    """
+    Raised once for a whole batch whose rows failed validation.
+    The attached report (src.utils.validation_utils.RowValidationReport) holds every failing row and reason.
+    """
+    def __init__(self, report, error_detail: sys = sys):
+        self.report = report
+        super().__init__(report.summary(), error_detail)
+
+    def __reduce__(self):
+        return (RowValidationError, (self.report,))
@@ -1,8 +1,12 @@
 import os
+import sys
+import json
+import queue
+import atexit
 import logging
 from datetime import datetime
 from from_root import from_root
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 
 # Constants for logging configuration
 LOG_DIR = 'logs' # Directory to store log files
@@ -10,36 +14,142 @@ LOG_FILE = f'{datetime.now().strftime("%m_%d_%Y_%H_%M_%S")}.log' # Log file name
 MAX_LOG_SIZE = 5 * 1024 * 1024 # Maximum log file size in bytes (5 MB)
 BACKUP_COUNT = 3 # Number of backup log files to keep
 
-# Create log directory if it doesn't exist
+# Environment variables to tune logging without code changes
+LOG_LEVEL_ENV_KEY = 'LOG_LEVEL' # root/console level, e.g. DEBUG, INFO, WARNING
+LOG_FILE_LEVEL_ENV_KEY = 'LOG_FILE_LEVEL' # file handler level, defaults to INFO
+LOG_FORMAT_ENV_KEY = 'LOG_FORMAT' # 'text' (default) or 'json'
+LOG_QUEUE_ENV_KEY = 'LOG_QUEUE' # '1'/'true' to do handler I/O on a background thread
+
+# Log directory and file are only created when the first record is written (see LazyRotatingFileHandler)
 log_dir_path = os.path.join(from_root(), LOG_DIR)
-os.makedirs(log_dir_path, exist_ok=True)
 log_file_path = os.path.join(log_dir_path, LOG_FILE)
 
-def configure_logger():
+# The running QueueListener when queue mode is enabled, None otherwise
+_queue_listener = None
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a log record as a single JSON object per line so logs can be shipped and queried without regex parsing.
+    Any extra attributes passed through `logging.info(..., extra={...})` are included as top-level keys.
+    """
+    _reserved = set(logging.LogRecord('', 0, '', 0, '', None, None).__dict__) | {'message', 'asctime'}
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'time': self.formatTime(record),
+            'name': record.name,
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        for key, value in record.__dict__.items():
+            if key not in self._reserved and not key.startswith('_'):
+                payload[key] = value
+        return json.dumps(payload, default=str)
+
+class LazyRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that creates the log directory and opens the file on the first emitted record,
+    so importing `src` (e.g. in a CLI or a serving worker that never logs to file) has no filesystem side effects.
+    """
+    def __init__(self, filename: str, **kwargs):
+        super().__init__(filename, delay=True, **kwargs)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+def _env_flag(key: str) -> bool:
+    return os.getenv(key, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+def _env_level(key: str, default: int) -> int:
+    """
+    Resolves a logging level from an environment variable, accepting names (INFO) or numbers (20).
+    """
+    value = os.getenv(key)
+    if not value:
+        return default
+    value = value.strip().upper()
+    if value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value)
+    return level if isinstance(level, int) else default
+
+def get_formatter(fmt: str = None) -> logging.Formatter:
+    """
+    Returns the formatter for the requested format ('text' or 'json'). Defaults to the LOG_FORMAT environment variable.
+    """
+    fmt = (fmt or os.getenv(LOG_FORMAT_ENV_KEY, 'text')).strip().lower()
+    if fmt == 'json':
+        return JsonFormatter()
+    return logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+def stop_queue_listener() -> None:
+    """
+    Stops the background listener (if any) after flushing every queued record to the handlers.
+    Registered with atexit so no records are lost on interpreter shutdown.
+    """
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+def configure_logger(level: int = None, fmt: str = None, use_queue: bool = None) -> None:
     """
     Configure logging with a rotating file handler(rotation means that the log file will be rotated when it reaches a certain size) and a console handler.
+
+    In queue mode the root logger only gets a QueueHandler, which puts records on an in-memory queue;
+    a QueueListener thread drains the queue and does the actual file and console I/O off the caller's thread.
+
+    Args:
+        level (int, optional): Root/console level. Defaults to LOG_LEVEL env var or DEBUG.
+        fmt (str, optional): 'text' or 'json'. Defaults to LOG_FORMAT env var or 'text'.
+        use_queue (bool, optional): Enable queue mode. Defaults to LOG_QUEUE env var.
     """
+    global _queue_listener
+    level = _env_level(LOG_LEVEL_ENV_KEY, logging.DEBUG) if level is None else level
+    use_queue = _env_flag(LOG_QUEUE_ENV_KEY) if use_queue is None else use_queue
 
     # Create a custom logger with the specified name
     logger = logging.getLogger()
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(level)
+
+    # Reconfiguring must not stack handlers or leave an old listener running
+    stop_queue_listener()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
 
     # Define formatter
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    formatter = get_formatter(fmt)
 
     # Define handlers for console and file logging with rotation
     # File handler
-    file_handler = RotatingFileHandler(log_file_path, maxBytes=MAX_LOG_SIZE, backupCount=BACKUP_COUNT)
+    file_handler = LazyRotatingFileHandler(log_file_path, maxBytes=MAX_LOG_SIZE, backupCount=BACKUP_COUNT)
     file_handler.setFormatter(formatter)
-    file_handler.setLevel(logging.INFO)
+    file_handler.setLevel(max(level, _env_level(LOG_FILE_LEVEL_ENV_KEY, logging.INFO)))
     # Console handler
-    console_handler = logging.StreamHandler()
+    console_handler = logging.StreamHandler(sys.stderr)
     console_handler.setFormatter(formatter)
-    console_handler.setLevel(logging.DEBUG)
+    console_handler.setLevel(level)
+
+    if use_queue:
+        # unbounded queue: the caller never blocks on a slow disk or terminal
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(QueueHandler(log_queue))
+        _queue_listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        _queue_listener.start()
+    else:
+        # Add handlers to the logger that means that the logger will use these handlers to log messages
+        logger.addHandler(file_handler)
+        logger.addHandler(console_handler)
 
-    # Add handlers to the logger that means that the logger will use these handlers to log messages
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+atexit.register(stop_queue_listener)
 
 # Call the configure_logger function to apply the configuration
-configure_logger()
\ No newline at end of file
+configure_logger()
@@ -0,0 +1,18 @@
+import importlib
+
+# Pipelines are resolved lazily (PEP 562) so a serving process importing the prediction pipeline
+# never imports the training stack.
+_LAZY_IMPORTS = {
+    'TrainPipeline': 'src.pipeline.training_pipeline',
+    'VehicleData': 'src.pipeline.prediction_pipeline',
+    'VehicleDataClassifier': 'src.pipeline.prediction_pipeline',
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
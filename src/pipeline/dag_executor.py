@@ -0,0 +1,175 @@
+import sys
+import time
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional
+
+from src.logger import logging
+from src.exception import MyException
+
+@dataclass
+class DagNode:
+    """
+    One unit of pipeline work.
+
+    name: unique node name; the node's return value is published under it
+    func: callable run with keyword arguments built from `inputs`
+    inputs: {keyword argument: name of the node whose output is passed}
+    output_type: expected type of the return value (e.g. an *Artifact dataclass), checked after the node runs
+    """
+    name: str
+    func: Callable
+    inputs: Dict[str, str] = field(default_factory=dict)
+    output_type: Optional[type] = None
+
+@dataclass
+class NodeTiming:
+    name: str
+    start_seconds: float # offset from the start of the run
+    duration_seconds: float
+    worker: str
+
+@dataclass
+class DagRunReport:
+    outputs: Dict[str, Any]
+    timings: Dict[str, NodeTiming]
+    critical_path: List[str]
+    critical_path_seconds: float
+    wall_seconds: float
+    max_workers: int
+
+    @property
+    def busy_seconds(self) -> float:
+        return sum(timing.duration_seconds for timing in self.timings.values())
+
+    def summary(self) -> str:
+        lines = [f'DAG run: {self.wall_seconds:.2f}s wall, {self.busy_seconds:.2f}s of node work on {self.max_workers} workers '
+                 f'(parallelism {self.busy_seconds / self.wall_seconds if self.wall_seconds else 0:.2f}x)']
+        for timing in sorted(self.timings.values(), key=lambda t: t.start_seconds):
+            marker = '*' if timing.name in self.critical_path else ' '
+            lines.append(f' {marker} {timing.name:<28} start {timing.start_seconds:>8.2f}s  took {timing.duration_seconds:>8.2f}s  [{timing.worker}]')
+        lines.append(f'Critical path ({self.critical_path_seconds:.2f}s): {" -> ".join(self.critical_path)}')
+        return '\n'.join(lines)
+
+def _timed_call(func: Callable, kwargs: dict):
+    # time.time so start/end are comparable across worker processes
+    start = time.time()
+    result = func(**kwargs)
+    return result, start, time.time(), threading.current_thread().name
+
+class DagExecutor:
+    """
+    Runs a DAG of DagNodes, submitting every node as soon as all of its inputs are available, on a thread or
+    process pool limited to `max_workers`. Independent nodes therefore run concurrently.
+    With executor_type='process' the node functions, their inputs and outputs must be picklable.
+    """
+    def __init__(self, nodes: List[DagNode], max_workers: int = 1, executor_type: str = 'thread'):
+        try:
+            self.nodes = {}
+            for node in nodes:
+                if node.name in self.nodes:
+                    raise Exception(f'Duplicate DAG node name: {node.name}')
+                self.nodes[node.name] = node
+            if executor_type not in ('thread', 'process'):
+                raise Exception(f'Unknown executor type: {executor_type}')
+            self.max_workers = max(1, int(max_workers))
+            self.executor_type = executor_type
+            self.order = self._topological_order()
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def _topological_order(self) -> List[str]:
+        for node in self.nodes.values():
+            missing = [dep for dep in node.inputs.values() if dep not in self.nodes]
+            if missing:
+                raise Exception(f'DAG node {node.name} depends on unknown nodes: {missing}')
+        order, state = [], {}
+        def visit(name: str, path: tuple) -> None:
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise Exception(f'DAG has a cycle: {" -> ".join(path + (name,))}')
+            state[name] = 'visiting'
+            for dep in self.nodes[name].inputs.values():
+                visit(dep, path + (name,))
+            state[name] = 'done'
+            order.append(name)
+        for name in self.nodes:
+            visit(name, ())
+        return order
+
+    def critical_path(self, durations: Dict[str, float]) -> tuple:
+        """
+        Longest chain of dependent nodes by duration (seconds per node, measured or estimated): the lower bound on
+        wall time whatever the worker count.
+        """
+        finish, previous = {}, {}
+        for name in self.order:
+            deps = set(self.nodes[name].inputs.values())
+            best = max(deps, key=lambda dep: finish[dep], default=None)
+            finish[name] = durations[name] + (finish[best] if best is not None else 0.0)
+            previous[name] = best
+        if not finish:
+            return [], 0.0
+        last = max(finish, key=finish.get)
+        path, node = [], last
+        while node is not None:
+            path.append(node)
+            node = previous[node]
+        return list(reversed(path)), finish[last]
+
+    def run(self) -> DagRunReport:
+        """
+        Runs every node and returns their outputs with per-node timings and the critical path.
+        The first failing node (raising, or returning something else than its output_type) cancels everything not
+        yet started and its error is raised.
+        """
+        try:
+            outputs, timings = {}, {}
+            remaining = {name: set(node.inputs.values()) for name, node in self.nodes.items()}
+            pool_class = ThreadPoolExecutor if self.executor_type == 'thread' else ProcessPoolExecutor
+            run_start = time.time()
+
+            with pool_class(max_workers=self.max_workers) as pool:
+                running = {}
+                def submit_ready() -> None:
+                    for name in [name for name, deps in remaining.items() if not deps]:
+                        node = self.nodes[name]
+                        kwargs = {arg: outputs[dep] for arg, dep in node.inputs.items()}
+                        running[pool.submit(_timed_call, node.func, kwargs)] = name
+                        del remaining[name]
+                        logging.info(f'DAG node started: {name}')
+
+                submit_ready()
+                while running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        try:
+                            result, start, end, worker = future.result()
+                            node = self.nodes[name]
+                            if node.output_type is not None and not isinstance(result, node.output_type):
+                                raise Exception(f'DAG node {name} returned {type(result).__name__}, expected {node.output_type.__name__}')
+                        except Exception:
+                            for pending in running:
+                                pending.cancel()
+                            raise
+                        outputs[name] = result
+                        timings[name] = NodeTiming(name=name, start_seconds=start - run_start, duration_seconds=end - start,
+                                                   worker=worker if self.executor_type == 'thread' else 'process')
+                        logging.info(f'DAG node finished: {name} in {end - start:.2f}s')
+                        for deps in remaining.values():
+                            deps.discard(name)
+                    submit_ready()
+
+            critical_path, critical_path_seconds = self.critical_path({name: timing.duration_seconds for name, timing in timings.items()})
+            report = DagRunReport(outputs=outputs, timings=timings, critical_path=critical_path,
+                                  critical_path_seconds=critical_path_seconds, wall_seconds=time.time() - run_start,
+                                  max_workers=self.max_workers)
+            logging.info(report.summary())
+            return report
+
+        except Exception as e:
+            raise MyException(e, sys) from e
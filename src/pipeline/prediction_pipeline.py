@@ -0,0 +1,226 @@
+import sys
+from typing import List, Optional, Tuple, TYPE_CHECKING
+
+from src.logger import logging
+from src.exception import MyException, RowValidationError
+from src.entity.config_entity import PredictionPipelineConfig
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    from src.entity.estimator import MyModel
+    from src.data_access.feature_lookup import FeatureLookupReader
+    from src.utils.validation_utils import CompiledValidator
+
+# This module is the serving entry point: heavy dependencies (pandas, sklearn via the unpickled model)
+# are imported on first use, not at import time. See benchmarks/import_time_benchmark.py for the budget.
+
+# Columns expected by MyModel.predict (custom transformations already applied) and their kinds
+MODEL_INPUT_COLUMN_KINDS = {
+    'Gender': 'int',
+    'Age': 'int',
+    'Driving_License': 'int',
+    'Region_Code': 'float',
+    'Previously_Insured': 'int',
+    'Annual_Premium': 'float',
+    'Policy_Sales_Channel': 'float',
+    'Vintage': 'int',
+    'Vehicle_Age_lt_1_Year': 'int',
+    'Vehicle_Age_gt_2_Year': 'int',
+    'Vehicle_Damage_Yes': 'int',
+}
+
+class VehicleData:
+    def __init__(self,
+                Gender,
+                Age,
+                Driving_License,
+                Region_Code,
+                Previously_Insured,
+                Annual_Premium,
+                Policy_Sales_Channel,
+                Vintage,
+                Vehicle_Age_lt_1_Year,
+                Vehicle_Age_gt_2_Year,
+                Vehicle_Damage_Yes
+                ):
+        """
+        Vehicle data input with all custom transformations (gender mapping, dummy columns) already applied
+        """
+        try:
+            self.Gender = Gender
+            self.Age = Age
+            self.Driving_License = Driving_License
+            self.Region_Code = Region_Code
+            self.Previously_Insured = Previously_Insured
+            self.Annual_Premium = Annual_Premium
+            self.Policy_Sales_Channel = Policy_Sales_Channel
+            self.Vintage = Vintage
+            self.Vehicle_Age_lt_1_Year = Vehicle_Age_lt_1_Year
+            self.Vehicle_Age_gt_2_Year = Vehicle_Age_gt_2_Year
+            self.Vehicle_Damage_Yes = Vehicle_Damage_Yes
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def get_vehicle_data_as_dict(self) -> dict:
+        """
+        This function returns a dictionary from VehicleData class input
+        """
+        logging.info('Entered get_vehicle_data_as_dict method of VehicleData class')
+        try:
+            input_data = {key: [value] for key, value in self.__dict__.items()}
+            logging.info('Created vehicle data dict')
+            return input_data
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def get_vehicle_input_data_frame(self) -> 'pd.DataFrame':
+        """
+        This function returns a DataFrame from VehicleData class input
+        """
+        try:
+            import pandas as pd
+            return pd.DataFrame(self.get_vehicle_data_as_dict())
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+class VehicleDataClassifier:
+    def __init__(self, prediction_pipeline_config: Optional[PredictionPipelineConfig] = None) -> None:
+        """
+        prediction_pipeline_config: configuration for prediction (path of the model to serve)
+        """
+        try:
+            self.prediction_pipeline_config = prediction_pipeline_config if prediction_pipeline_config is not None else PredictionPipelineConfig()
+            self._model: Optional['MyModel'] = None
+            self._feature_lookup: Optional['FeatureLookupReader'] = None
+            self._request_validator: Optional['CompiledValidator'] = None
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    @property
+    def model(self) -> 'MyModel':
+        """
+        The served MyModel, loaded from disk on first access and kept for the lifetime of the process
+        """
+        if self._model is None:
+            from src.utils.main_utils import load_object
+            logging.info(f'Loading model from {self.prediction_pipeline_config.model_file_path}')
+            self._model = load_object(file_path=self.prediction_pipeline_config.model_file_path)
+        return self._model
+
+    @property
+    def input_columns(self) -> List[str]:
+        """
+        Model input columns the served model reads: the selected features of a model trained with feature selection,
+        otherwise every column of MODEL_INPUT_COLUMN_KINDS
+        """
+        selected_features = self.model.selected_features
+        if selected_features is None:
+            return list(MODEL_INPUT_COLUMN_KINDS)
+        return [column for column in MODEL_INPUT_COLUMN_KINDS if column in selected_features]
+
+    @property
+    def request_validator(self) -> 'CompiledValidator':
+        """
+        Validator of the input columns of the served model; the shared one of the schema when it reads every column
+        """
+        if self._request_validator is None:
+            from src.utils.schema_utils import get_compiled_schema
+            from src.utils.validation_utils import CompiledValidator
+            schema = get_compiled_schema()
+            if self.model.selected_features is None:
+                self._request_validator = schema.request_validator
+            else:
+                self._request_validator = CompiledValidator({column: MODEL_INPUT_COLUMN_KINDS[column] for column in self.input_columns},
+                                                            allowed_values=schema.model_input_allowed_values(self.input_columns))
+        return self._request_validator
+
+    @property
+    def feature_lookup(self) -> 'FeatureLookupReader':
+        """
+        Reader of the feature lookup store built during ingestion, opened on first access
+        """
+        if self._feature_lookup is None:
+            from src.data_access.feature_lookup import FeatureLookupReader
+            self._feature_lookup = FeatureLookupReader(self.prediction_pipeline_config.feature_lookup_dir,
+                                                       refresh_seconds=self.prediction_pipeline_config.feature_lookup_refresh_seconds)
+        return self._feature_lookup
+
+    @staticmethod
+    def customer_id_array(customer_ids) -> 'np.ndarray':
+        """
+        Customer ids as int64, validated like an 'int' column: a RowValidationError reports the ids that are not integers.
+        """
+        import numpy as np
+        import pandas as pd
+        from src.constants import CUSTOMER_ID_COLUMN
+        from src.utils.validation_utils import validate_rows
+        ids = pd.DataFrame({CUSTOMER_ID_COLUMN: pd.Series(list(customer_ids), dtype=object)})
+        validate_rows(ids, {CUSTOMER_ID_COLUMN: 'int'}).raise_if_invalid()
+        return pd.to_numeric(ids[CUSTOMER_ID_COLUMN]).to_numpy(dtype=np.int64)
+
+    def predict_customers(self, customer_ids) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        Scores existing customers by id from the feature lookup store, without querying MongoDB.
+        The stored features went through the training transformations, so they are not validated again.
+        Ids are checked before the store is opened, so a bad request is reported as such even without a store.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Predictions of the found customers and the mask of found customers.
+        """
+        try:
+            customer_ids = self.customer_id_array(customer_ids)
+            features, found = self.feature_lookup.lookup_frame(customer_ids, column_kinds=MODEL_INPUT_COLUMN_KINDS,
+                                                               columns=self.input_columns)
+            if features.empty:
+                return features.index.to_numpy(), found
+            return self.model.predict(features), found
+
+        except RowValidationError as e:
+            e.log(level=logging.WARNING)
+            raise
+
+        except Exception as e:
+            exc = MyException(e, sys)
+            exc.log()
+            raise exc from e
+
+    def _predict_within_budget(self, dataframe: 'pd.DataFrame'):
+        """
+        Scores a batch in chunks that fit the memory budget (in one go when it fits).
+        """
+        from src.constants import PREDICTION_MEMORY_OVERHEAD
+        from src.utils.memory_utils import get_memory_budget, frame_bytes_per_row
+        if len(dataframe) <= get_memory_budget().min_chunk_rows:
+            return self.model.predict(dataframe)
+        rows = get_memory_budget().rows_for(frame_bytes_per_row(dataframe) * PREDICTION_MEMORY_OVERHEAD, max_rows=len(dataframe))
+        if rows >= len(dataframe):
+            return self.model.predict(dataframe)
+        import numpy as np
+        logging.info(f'Scoring {len(dataframe)} rows in chunks of {rows} to fit the memory budget')
+        return np.concatenate([self.model.predict(dataframe.iloc[start:start + rows]) for start in range(0, len(dataframe), rows)])
+
+    def predict(self, dataframe: 'pd.DataFrame'):
+        """
+        This is the method of VehicleDataClassifier
+        Returns: predictions for every row of the input dataframe
+
+        The whole batch is validated up front; if any row is bad a single RowValidationError with the
+        full report is raised. This is the serving boundary, so errors are logged here, once.
+        """
+        try:
+            logging.info('Entered predict method of VehicleDataClassifier class')
+            self.request_validator.validate(dataframe).raise_if_invalid()
+            return self._predict_within_budget(dataframe)
+
+        except RowValidationError as e:
+            e.log(level=logging.WARNING)
+            raise
+        except Exception as e:
+            exc = MyException(e, sys)
+            exc.log()
+            raise exc from e
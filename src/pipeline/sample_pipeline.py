@@ -0,0 +1,165 @@
+import gc
+import os
+import sys
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.logger import logging
+from src.exception import MyException
+from src.constants import TARGET_COLUMN
+from src.data_access.project1_data import Poject1Data
+from src.pipeline.dag_executor import DagExecutor, DagRunReport
+from src.pipeline.training_pipeline import TrainPipeline
+from src.entity.config_entity import (get_training_pipeline_config, set_training_pipeline_config,
+                                      TrainingPipelineConfig, DataIngestionConfig, SampleRunConfig)
+from src.entity.artifact_entity import SampleRunArtifact, StageCostEstimate
+from src.utils.main_utils import write_yaml_file
+from src.utils.memory_utils import PeakRssMonitor, get_memory_budget
+
+def fit_linear_cost(rows: Tuple[int, int], values: Tuple[float, float]) -> Tuple[float, float]:
+    """
+    Fixed and per-row cost of value = fixed + per_row * rows through two measurements, neither negative. A fixed cost
+    absorbs what does not grow with the sample (the server scanning the collection for it, process start-up, fitting
+    a handful of parameters); a single measurement, or a smaller value for more rows (noise), is taken as all per row.
+    """
+    if rows[1] > rows[0] and values[1] >= values[0]:
+        per_row = (values[1] - values[0]) / (rows[1] - rows[0])
+        return max(values[1] - per_row * rows[1], 0.0), per_row
+    return 0.0, values[1] / rows[1] if rows[1] else 0.0
+
+def warm_up_imports() -> None:
+    """
+    Imports the dependencies stages load on first use, so the first sample run does not pay for them.
+    """
+    import sklearn.compose, sklearn.ensemble, sklearn.metrics, sklearn.preprocessing # noqa: F401
+    import imblearn.combine # noqa: F401
+
+class SampleRunPipeline:
+    """
+    Runs the training pipeline on two nested, stratified samples of the collection, selected on the MongoDB server
+    (see hashed_sample_query), and extrapolates the time of every stage and the peak memory to the full collection.
+    Use it to size and schedule a full run after changing preprocessing or model configuration: the samples take
+    seconds, and as they are the same documents every time, two sample runs compare configurations, not samples.
+
+    Sample runs write only under their own artifact directory, including their feature lookup store and deduplication
+    index, and always train from scratch.
+    """
+    def __init__(self, sample_run_config: Optional[SampleRunConfig] = None):
+        try:
+            self.sample_run_config = sample_run_config if sample_run_config is not None else SampleRunConfig()
+            self.data_ingestion_config = DataIngestionConfig()
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def sample_rates(self, class_counts: Dict[Any, int]) -> Dict[Any, float]:
+        """
+        Share of the documents of every target value in the larger sample: sample_rows over the collection, raised for
+        values with fewer than min_class_rows documents in the sample.
+        """
+        total = sum(class_counts.values())
+        rate = min(self.sample_run_config.sample_rows / total, 1.0) if total else 1.0
+        return {value: min(max(rate, self.sample_run_config.min_class_rows / count), 1.0)
+                for value, count in class_counts.items() if count > 0}
+
+    def run_sample(self, name: str, sample_rates: Dict[Any, float]) -> Tuple[DagRunReport, int, PeakRssMonitor]:
+        """
+        Runs the pipeline on one sample under sample_run_dir/name.
+        Returns the run report, the number of documents ingested and the peak RSS of the run
+        """
+        previous_config = get_training_pipeline_config()
+        artifact_dir = os.path.join(self.sample_run_config.sample_run_dir, name)
+        set_training_pipeline_config(TrainingPipelineConfig(artifact_dir=artifact_dir, max_workers=previous_config.max_workers,
+                                                            executor_type=previous_config.executor_type))
+        try:
+            pipeline = TrainPipeline()
+            pipeline.data_ingestion_config.sample_rates = sample_rates
+            # built like in a full run, to be timed, but never where the service or the next run reads them
+            for directory in ('feature_lookup_dir', 'dedup_index_dir'):
+                setattr(pipeline.data_ingestion_config, directory,
+                        os.path.join(artifact_dir, os.path.basename(getattr(pipeline.data_ingestion_config, directory))))
+            pipeline.model_trainer_config.incremental = False
+            gc.collect()
+            with PeakRssMonitor() as monitor:
+                report = pipeline.run_pipeline()
+        finally:
+            set_training_pipeline_config(previous_config)
+        ingestion = report.outputs['data_ingestion']
+        rows = ingestion.train_rows + ingestion.test_rows + ingestion.duplicate_rows_dropped + ingestion.conflicting_rows_dropped
+        logging.info(f'Sample run {name}: {rows} documents in {report.wall_seconds:.2f}s, '
+                     f'peak RSS +{monitor.peak_delta / 2**20:.0f} MiB')
+        return report, rows, monitor
+
+    def estimate_stages(self, reports: List[DagRunReport], rows: List[int], full_rows: int) -> List[StageCostEstimate]:
+        stages = []
+        for name in reports[-1].timings:
+            seconds = [report.timings[name].duration_seconds for report in reports]
+            fixed_seconds, seconds_per_row = fit_linear_cost((rows[0], rows[-1]), (seconds[0], seconds[-1]))
+            stages.append(StageCostEstimate(name=name, sample_seconds=seconds, fixed_seconds=fixed_seconds,
+                                            seconds_per_row=seconds_per_row,
+                                            estimated_seconds=max(fixed_seconds + seconds_per_row * full_rows, seconds[-1])))
+        return stages
+
+    @staticmethod
+    def estimate_peak_rss(monitors: List[PeakRssMonitor], rows: List[int], full_rows: int) -> int:
+        """
+        Peak RSS of a full run: the process baseline plus the growth of the peak over it, fitted like stage times.
+        """
+        fixed_bytes, bytes_per_row = fit_linear_cost((rows[0], rows[-1]), (monitors[0].peak_delta, monitors[-1].peak_delta))
+        return int(monitors[-1].start_rss + max(fixed_bytes + bytes_per_row * full_rows, monitors[-1].peak_delta))
+
+    def run(self) -> SampleRunArtifact:
+        """
+        Counts the documents per target value on the server, runs the pipeline on the smaller then the larger sample
+        and returns (and saves to report_file_path) the estimated cost of a full run
+        """
+        try:
+            class_counts = Poject1Data().count_by_value(self.data_ingestion_config.collection_name, TARGET_COLUMN)
+            full_rows = sum(class_counts.values())
+            if full_rows == 0:
+                raise Exception(f'No documents in collection {self.data_ingestion_config.collection_name}')
+            rates = self.sample_rates(class_counts)
+            small_rates = {value: rate * self.sample_run_config.small_fraction for value, rate in rates.items()}
+            logging.info(f'Sample run of {self.data_ingestion_config.collection_name} ({full_rows} documents, '
+                         f'{TARGET_COLUMN} counts {class_counts}): sample rates {rates}')
+
+            warm_up_imports()
+            reports, rows, monitors = [], [], []
+            for name, sample_rates in (('small', small_rates), ('large', rates)):
+                report, n_rows, monitor = self.run_sample(name, sample_rates)
+                reports.append(report)
+                rows.append(n_rows)
+                monitors.append(monitor)
+
+            stages = self.estimate_stages(reports, rows, full_rows)
+            durations = {stage.name: stage.estimated_seconds for stage in stages}
+            max_workers = reports[-1].max_workers
+            critical_path, critical_path_seconds = DagExecutor(nodes=TrainPipeline().build_dag()).critical_path(durations)
+            sample_run_artifact = SampleRunArtifact(
+                full_rows=full_rows,
+                sample_rows=rows,
+                sample_rates={str(value): rate for value, rate in rates.items()},
+                stages=stages,
+                sample_wall_seconds=[round(report.wall_seconds, 2) for report in reports],
+                estimated_wall_seconds=max(critical_path_seconds, sum(durations.values()) / max_workers),
+                estimated_critical_path=critical_path,
+                sample_peak_rss_bytes=[monitor.peak_rss for monitor in monitors],
+                estimated_peak_rss_bytes=self.estimate_peak_rss(monitors, rows, full_rows),
+                memory_budget_bytes=get_memory_budget().limit_bytes,
+                metric_artifact=reports[-1].outputs['model_trainer'].metric_artifact,
+                report_file_path=self.sample_run_config.report_file_path,
+            )
+            write_yaml_file(self.sample_run_config.report_file_path, asdict(sample_run_artifact), replace=True)
+            logging.info(sample_run_artifact.summary())
+            if not sample_run_artifact.fits_memory_budget:
+                logging.warning('The full run is estimated over the memory budget: stages will take their chunked, '
+                                'downsampled or on-disk paths, which the time estimates do not account for')
+            return sample_run_artifact
+
+        except Exception as e:
+            # a failing sample run was already logged by TrainPipeline.run_pipeline
+            raise MyException(e, sys) from e
+
+if __name__ == '__main__':
+    artifact = SampleRunPipeline().run()
+    print(artifact.summary())
@@ -1,38 +1,113 @@
+import os
 import sys
+from functools import partial
+from dataclasses import replace
+from typing import List, Optional
+
 from src.logger import logging
 from src.exception import MyException
 
 from src.components.data_ingestion import DataIngestion
+from src.components.data_profiling import DataProfiling
 from src.components.data_validation import DataValidation
 from src.components.data_transformation import DataTransformation
 from src.components.model_trainer import ModelTrainer
+from src.pipeline.dag_executor import DagNode, DagExecutor, DagRunReport
+from src.entity.estimator import MyModel
+from src.utils.main_utils import load_object
+from src.utils.profile_utils import DataProfile
 # more imports here
 
-from src.entity.config_entity import (DataIngestionConfig,
+from src.entity.config_entity import (get_training_pipeline_config,
+    ArtifactRetentionConfig,
+    DataIngestionConfig,
+    DataProfilingConfig,
     DataValidationConfig,
     DataTransformationConfig,
     ModelTrainerConfig)
 # more imports here
 
 from src.entity.artifact_entity import (DataIngestionArtifact,
+    DataProfileArtifact,
     DataValidationArtifact,
     DataTransformationArtifact,
-    ModelTrainerArtifact)
+    ModelTrainerArtifact,
+    CrossValidationArtifact)
 # more imports here
 
 class TrainPipeline:
     def __init__(self):
+        self.training_pipeline_config = get_training_pipeline_config()
         self.data_ingestion_config = DataIngestionConfig()
+        self.data_profiling_config = DataProfilingConfig()
         self.data_validation_config = DataValidationConfig()
         self.data_transformation_config = DataTransformationConfig()
         self.model_trainer_config = ModelTrainerConfig()
+        self._base_model: Optional[MyModel] = None
+        self._base_model_loaded = False
         # more initializations here
 
+    def get_base_model(self) -> Optional[MyModel]:
+        """
+        this method returns the production model to warm-start from in incremental mode (loaded once), None otherwise
+        """
+        try:
+            if not self.model_trainer_config.incremental:
+                return None
+            if not self._base_model_loaded:
+                model_trainer = ModelTrainer(data_transformation_artifact=None, model_trainer_config=self.model_trainer_config)
+                self._base_model = model_trainer.load_base_model()
+                self._base_model_loaded = True
+            return self._base_model
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def _base_preprocessor(self) -> Optional[object]:
+        base_model = self.get_base_model()
+        if base_model is None:
+            return None
+        # a model trained with feature selection is retrained on all columns, of which it keeps the selected ones
+        return base_model.full_preprocessing_object or base_model.preprocessing_object
+
+    def validation_split_ratio(self) -> float:
+        """
+        this method returns the share of the train rows held out before resampling for the model trainer to tune
+        compression and feature selection (full retrains only) on; 0 when neither runs
+        """
+        if self.model_trainer_config.compression or (self.model_trainer_config.feature_selection and self.get_base_model() is None):
+            return self.model_trainer_config.validation_split_ratio
+        return 0.0
+
+    def _apply_data_watermark(self) -> None:
+        base_model = self.get_base_model()
+        if base_model is not None and base_model.data_watermark is not None and self.data_ingestion_config.min_customer_id is None:
+            # incremental retraining: only the documents added since the production model was trained
+            self.data_ingestion_config.min_customer_id = base_model.data_watermark
+
+    def reference_profile(self) -> Optional[DataProfile]:
+        """
+        this method returns the profile saved with the production model, which the ingested documents are checked for
+        drift against; None without a production model or for a model saved before profiles existed
+        """
+        try:
+            model = self.get_base_model()
+            if model is None and not self.model_trainer_config.incremental:
+                model_file_path = self.model_trainer_config.base_model_file_path
+                model = load_object(file_path=model_file_path) if os.path.exists(model_file_path) else None
+            if model is None or not model.data_profile:
+                return None
+            return DataProfile.from_dict(model.data_profile)
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
     def start_data_ingestion(self) -> DataIngestionArtifact:
         """
         this method returns data ingestion artifact after ingesting data
         """
         try:
+            self._apply_data_watermark()
             data_ingestion = DataIngestion(data_ingestion_config=self.data_ingestion_config)
             data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
             return data_ingestion_artifact
@@ -60,38 +135,252 @@ class TrainPipeline:
             data_transformation = DataTransformation(data_ingestion_artifact=data_ingestion_artifact,
                                                      data_transformation_config=self.data_transformation_config,
                                                      data_validation_artifact=data_validion_artifact)
-            data_transformation_artifact = data_transformation.initiate_data_transformation()
+            data_transformation_artifact = data_transformation.initiate_data_transformation(
+                base_preprocessor=self._base_preprocessor(), validation_split_ratio=self.validation_split_ratio())
             return data_transformation_artifact
         
         except Exception as e:
             raise MyException(e, sys)
         
-    def start_model_trainer(self, data_transformation_artifact: DataTransformationArtifact) -> ModelTrainerArtifact:
+    def start_model_trainer(self, data_transformation_artifact: DataTransformationArtifact,
+                            data_watermark: Optional[int] = None,
+                            data_ingestion_artifact: Optional[DataIngestionArtifact] = None) -> ModelTrainerArtifact:
         """
         This method initiates model training
+        data_watermark: max_customer_id of the data ingestion artifact, saved with the model for the next incremental run
+        data_ingestion_artifact: the ingested train file is read again for the untransformed features that feature
+        selection fits the preprocessor of a pruned model on
         """
         try:
+            train_features_df = None
+            # an incremental retrain keeps the features of the production model (get_base_model is None otherwise)
+            if (self.model_trainer_config.feature_selection and self.get_base_model() is None
+                    and data_ingestion_artifact is not None):
+                data_transformation = self._data_transformation(data_ingestion_artifact)
+                train_features = data_transformation.prepare_features(
+                    data_ingestion_artifact.trained_file_path, split='train',
+                    max_rows=data_transformation.train_row_limit(data_ingestion_artifact.trained_file_path,
+                                                                 data_ingestion_artifact.test_file_path))
+                # the rows the preprocessor was fitted on, without the validation rows
+                (train_features_df, _), _ = data_transformation.hold_out_validation(*train_features, self.validation_split_ratio())
             model_trainer = ModelTrainer(data_transformation_artifact=data_transformation_artifact,
                                          model_trainer_config=self.model_trainer_config)
-            model_trainer_artifact = model_trainer.initiate_model_trainer()
+            model_trainer_artifact = model_trainer.initiate_model_trainer(base_model=self.get_base_model(),
+                                                                          data_watermark=data_watermark,
+                                                                          train_features_df=train_features_df)
             return model_trainer_artifact
         
         except Exception as e:
             raise MyException(e, sys)
 
+    # DAG node functions: the train and test branches of validation and transformation are independent nodes,
+    # and model training starts from the in-memory arrays while the transformed files are still being written
+
+    def _split_file_path(self, data_ingestion_artifact: DataIngestionArtifact, split: str) -> str:
+        return data_ingestion_artifact.trained_file_path if split == 'train' else data_ingestion_artifact.test_file_path
+
+    def _data_transformation(self, data_ingestion_artifact: DataIngestionArtifact,
+                             data_validation_artifact: Optional[DataValidationArtifact] = None) -> DataTransformation:
+        return DataTransformation(data_ingestion_artifact=data_ingestion_artifact,
+                                  data_transformation_config=self.data_transformation_config,
+                                  data_validation_artifact=data_validation_artifact)
+
+    def validate_split(self, data_ingestion_artifact: DataIngestionArtifact, split: str) -> dict:
+        data_validation = DataValidation(data_ingestion_artifact=data_ingestion_artifact,
+                                         data_validation_config=self.data_validation_config)
+        return data_validation.validate_file(file_path=self._split_file_path(data_ingestion_artifact, split), label=split)
+
+    def profile_data(self, data_ingestion_artifact: DataIngestionArtifact) -> DataProfileArtifact:
+        # the documents ingested, profiled on the server: the same filter, up to the largest customer id exported
+        self._apply_data_watermark()
+        query = DataIngestion(self.data_ingestion_config).export_query(max_customer_id=data_ingestion_artifact.max_customer_id)
+        data_profiling = DataProfiling(data_profiling_config=self.data_profiling_config,
+                                       collection_name=self.data_ingestion_config.collection_name, query=query,
+                                       reference_profile=self.reference_profile())
+        return data_profiling.initiate_data_profiling()
+
+    def build_validation_artifact(self, data_ingestion_artifact: DataIngestionArtifact, train_result: dict,
+                                  test_result: dict, data_profile_artifact: Optional[DataProfileArtifact] = None
+                                  ) -> DataValidationArtifact:
+        data_validation = DataValidation(data_ingestion_artifact=data_ingestion_artifact,
+                                         data_validation_config=self.data_validation_config)
+        return data_validation.build_validation_artifact(train_result=train_result, test_result=test_result,
+                                                         data_profile_artifact=data_profile_artifact)
+
+    def train_row_limit(self, data_ingestion_artifact: DataIngestionArtifact,
+                        data_validation_artifact: DataValidationArtifact) -> Optional[int]:
+        # the budget of both prepare branches, reserved once before they run concurrently
+        return self._data_transformation(data_ingestion_artifact, data_validation_artifact).train_row_limit(
+            self._split_file_path(data_ingestion_artifact, 'train'), self._split_file_path(data_ingestion_artifact, 'test'))
+
+    def prepare_split(self, data_ingestion_artifact: DataIngestionArtifact,
+                      data_validation_artifact: DataValidationArtifact, split: str,
+                      max_train_rows: Optional[int] = None) -> tuple:
+        data_transformation = self._data_transformation(data_ingestion_artifact, data_validation_artifact)
+        data_transformation.check_validation_status()
+        return data_transformation.prepare_features(self._split_file_path(data_ingestion_artifact, split), split=split,
+                                                    max_rows=max_train_rows)
+
+    def hold_out_validation(self, data_ingestion_artifact: DataIngestionArtifact, train_features: tuple) -> tuple:
+        # (features to fit on, validation features or None); only the former are resampled
+        return self._data_transformation(data_ingestion_artifact).hold_out_validation(*train_features,
+                                                                                     self.validation_split_ratio())
+
+    def fit_preprocessor(self, data_ingestion_artifact: DataIngestionArtifact, split_features: tuple) -> object:
+        return self._data_transformation(data_ingestion_artifact).fit_preprocessor(split_features[0][0],
+                                                                                  base_preprocessor=self._base_preprocessor())
+
+    def transform_split(self, data_ingestion_artifact: DataIngestionArtifact, preprocessor: object, features: tuple):
+        return self._data_transformation(data_ingestion_artifact).transform_and_resample(preprocessor, *features)
+
+    def transform_train(self, data_ingestion_artifact: DataIngestionArtifact, preprocessor: object, split_features: tuple):
+        return self.transform_split(data_ingestion_artifact, preprocessor, split_features[0])
+
+    def transform_validation(self, data_ingestion_artifact: DataIngestionArtifact, preprocessor: object,
+                             split_features: tuple):
+        if split_features[1] is None:
+            return None
+        return self._data_transformation(data_ingestion_artifact).transform(preprocessor, *split_features[1])
+
+    def save_preprocessor(self, data_ingestion_artifact: DataIngestionArtifact, preprocessor: object) -> str:
+        return self._data_transformation(data_ingestion_artifact).save_preprocessor(preprocessor)
+
+    def save_split(self, data_ingestion_artifact: DataIngestionArtifact, array, split: str) -> Optional[str]:
+        if array is None: # no validation rows held out
+            return None
+        file_path = {'train': self.data_transformation_config.transformed_train_file_path,
+                     'test': self.data_transformation_config.transformed_test_file_path,
+                     'validation': self.data_transformation_config.transformed_validation_file_path}[split]
+        return self._data_transformation(data_ingestion_artifact).save_array(file_path, array)
+
+    def build_transformation_artifact(self, data_ingestion_artifact: DataIngestionArtifact,
+                                      preprocessor_file_path: str, train_file_path: str, test_file_path: str,
+                                      validation_file_path: Optional[str] = None) -> DataTransformationArtifact:
+        # the file paths are inputs only so that this node waits for every file to be written
+        return self._data_transformation(data_ingestion_artifact).build_artifact(validation_file_path)
+
+    def train_model(self, data_ingestion_artifact: DataIngestionArtifact, train_arr, test_arr,
+                    preprocessor: object, validation_arr=None, split_features: Optional[tuple] = None,
+                    data_profile_artifact: Optional[DataProfileArtifact] = None) -> ModelTrainerArtifact:
+        model_trainer = ModelTrainer(data_transformation_artifact=self._data_transformation(data_ingestion_artifact).build_artifact(),
+                                     model_trainer_config=self.model_trainer_config)
+        return model_trainer.initiate_model_trainer(train_arr=train_arr, test_arr=test_arr, preprocessor_obj=preprocessor,
+                                                    validation_arr=validation_arr,
+                                                    base_model=self.get_base_model(),
+                                                    data_watermark=data_ingestion_artifact.max_customer_id,
+                                                    train_features_df=split_features[0][0] if split_features is not None else None,
+                                                    data_profile=data_profile_artifact.profile if data_profile_artifact is not None else None)
+
+    def cross_validate(self, train_features: tuple, preprocessor: object) -> CrossValidationArtifact:
+        # folds are scored on transformed rows that were not resampled; SMOTEENN is applied inside each training fold
+        input_features_df, target_feature_df = train_features
+        model_trainer = ModelTrainer(data_transformation_artifact=None, model_trainer_config=self.model_trainer_config)
+        return model_trainer.cross_validate(features=preprocessor.transform(input_features_df),
+                                            target=target_feature_df.to_numpy())
+
+    def attach_cross_validation(self, model_trainer_artifact: ModelTrainerArtifact,
+                                cross_validation_artifact: CrossValidationArtifact) -> ModelTrainerArtifact:
+        return replace(model_trainer_artifact, cross_validation_artifact=cross_validation_artifact)
+
+    def build_dag(self) -> List[DagNode]:
+        """
+        This method returns the stages of the pipeline as DAG nodes; each node names the nodes whose outputs it takes
+        """
+        ingestion = {'data_ingestion_artifact': 'data_ingestion'}
+        model_inputs = {**ingestion, 'train_arr': 'transform_train', 'test_arr': 'transform_test', 'preprocessor': 'fit_preprocessor',
+                        'validation_arr': 'transform_validation'}
+        if self.model_trainer_config.feature_selection:
+            # the preprocessor of a pruned model is fitted on the selected untransformed columns
+            model_inputs['split_features'] = 'hold_out_validation'
+        validation_inputs = {**ingestion, 'train_result': 'validate_train', 'test_result': 'validate_test'}
+        profiling_nodes = []
+        if self.data_profiling_config.enabled:
+            # one aggregation on the server, alongside the validation of the ingested files
+            profiling_nodes = [DagNode('data_profiling', self.profile_data, ingestion, DataProfileArtifact)]
+            validation_inputs['data_profile_artifact'] = 'data_profiling'
+            model_inputs['data_profile_artifact'] = 'data_profiling'
+        if self.model_trainer_config.cv_folds > 0:
+            # cross-validation runs in its own worker processes alongside the training of the final model
+            model_nodes = [
+                DagNode('train_model', self.train_model, model_inputs, ModelTrainerArtifact),
+                DagNode('cross_validation', self.cross_validate,
+                        {'train_features': 'prepare_train', 'preprocessor': 'fit_preprocessor'}, CrossValidationArtifact),
+                DagNode('model_trainer', self.attach_cross_validation,
+                        {'model_trainer_artifact': 'train_model', 'cross_validation_artifact': 'cross_validation'},
+                        ModelTrainerArtifact),
+            ]
+        else:
+            model_nodes = [DagNode('model_trainer', self.train_model, model_inputs, ModelTrainerArtifact)]
+        return [
+            DagNode('data_ingestion', self.start_data_ingestion, output_type=DataIngestionArtifact),
+            DagNode('validate_train', partial(self.validate_split, split='train'), ingestion),
+            DagNode('validate_test', partial(self.validate_split, split='test'), ingestion),
+        ] + profiling_nodes + [
+            DagNode('data_validation', self.build_validation_artifact, validation_inputs, DataValidationArtifact),
+            DagNode('train_row_limit', self.train_row_limit, {**ingestion, 'data_validation_artifact': 'data_validation'}),
+            DagNode('prepare_train', partial(self.prepare_split, split='train'),
+                    {**ingestion, 'data_validation_artifact': 'data_validation', 'max_train_rows': 'train_row_limit'}, tuple),
+            DagNode('prepare_test', partial(self.prepare_split, split='test'),
+                    {**ingestion, 'data_validation_artifact': 'data_validation'}, tuple),
+            DagNode('hold_out_validation', self.hold_out_validation, {**ingestion, 'train_features': 'prepare_train'}, tuple),
+            DagNode('fit_preprocessor', self.fit_preprocessor, {**ingestion, 'split_features': 'hold_out_validation'}),
+            DagNode('transform_train', self.transform_train,
+                    {**ingestion, 'preprocessor': 'fit_preprocessor', 'split_features': 'hold_out_validation'}),
+            DagNode('transform_validation', self.transform_validation,
+                    {**ingestion, 'preprocessor': 'fit_preprocessor', 'split_features': 'hold_out_validation'}),
+            DagNode('transform_test', self.transform_split,
+                    {**ingestion, 'preprocessor': 'fit_preprocessor', 'features': 'prepare_test'}),
+            DagNode('save_preprocessor', self.save_preprocessor, {**ingestion, 'preprocessor': 'fit_preprocessor'}, str),
+            DagNode('save_train', partial(self.save_split, split='train'), {**ingestion, 'array': 'transform_train'}, str),
+            DagNode('save_validation', partial(self.save_split, split='validation'), {**ingestion, 'array': 'transform_validation'}),
+            DagNode('save_test', partial(self.save_split, split='test'), {**ingestion, 'array': 'transform_test'}, str),
+            DagNode('data_transformation', self.build_transformation_artifact,
+                    {**ingestion, 'preprocessor_file_path': 'save_preprocessor', 'train_file_path': 'save_train',
+                     'test_file_path': 'save_test', 'validation_file_path': 'save_validation'}, DataTransformationArtifact),
+        ] + model_nodes
+
+    def apply_artifact_retention(self) -> None:
+        """
+        This method deletes old runs and logs beyond the retention limits, keeping the run that just finished.
+        A failure here is logged and never fails the training run
+        """
+        try:
+            from src.utils.artifact_manager import ArtifactManager
+            retention_config = ArtifactRetentionConfig()
+            run_dir = os.path.abspath(self.training_pipeline_config.artifact_dir)
+            if not retention_config.on_run or os.path.dirname(run_dir) != os.path.abspath(retention_config.artifact_dir):
+                return
+            ArtifactManager(retention_config).apply_retention(protect=[run_dir])
+
+        except Exception as e:
+            logging.warning(f'Artifact retention failed: {e}')
+
     # more methods here
 
-    def run_pipeline(self) -> None:
+    def run_pipeline(self) -> DagRunReport:
         """
-        This method runs complete pipeline
+        This method runs complete pipeline, independent stages concurrently on
+        training_pipeline_config.max_workers workers, and returns the run report
         """
+        from src.utils.artifact_manager import mark_run_in_progress, clear_run_in_progress
+        run_dir = self.training_pipeline_config.artifact_dir
         try:
-            data_ingestion_artifact = self.start_data_ingestion()
-            data_validation_artifact = self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
-            data_transformation_artifact = self.start_data_transformation(data_ingestion_artifact=data_ingestion_artifact,
-                                                                          data_validion_artifact=data_validation_artifact)
-            model_trainer_artifiact = self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
-            # more code here
+            # retention in other processes leaves this run alone until it is finished
+            mark_run_in_progress(run_dir)
+            self.get_base_model() # loaded once up front so every node (and worker process) shares it
+            executor = DagExecutor(nodes=self.build_dag(),
+                                   max_workers=self.training_pipeline_config.max_workers,
+                                   executor_type=self.training_pipeline_config.executor_type)
+            report = executor.run()
+            model_trainer_artifiact = report.outputs['model_trainer']
+            logging.info(f'Model trainer artifact: {model_trainer_artifiact}')
+            self.apply_artifact_retention()
+            return report
 
         except Exception as e:
-            raise MyException(e, sys)
\ No newline at end of file
+            # top-level boundary of a training run: the only place the error is logged
+            exc = MyException(e, sys)
+            exc.log()
+            raise exc from e
+        finally:
+            clear_run_in_progress(run_dir)
@@ -0,0 +1,286 @@
+import math
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from src.entity.config_entity import AdmissionControlConfig
+
+# upper bounds (seconds) of the latency histogram buckets, as in Prometheus client defaults
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+SHED_REASONS = ('queue_full', 'deadline', 'expired')
+
+class ServiceOverloaded(Exception):
+    """
+    A request rejected by admission control. status_code is 429 when the queue is full (back off) and 503 when the
+    request cannot be scored within its deadline; retry_after is the estimated wait in seconds.
+    """
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        super().__init__(f'Request shed ({reason}), estimated wait {retry_after:.3f}s')
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+class Histogram:
+    """
+    Cumulative histogram of observations over fixed bucket upper bounds, in the Prometheus exposition format.
+    """
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Upper bound of the bucket holding the q-quantile (None without observations, inf past the last bucket).
+        """
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets + (math.inf,), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def exposition(self, name: str) -> List[str]:
+        lines, cumulative = [], 0
+        for bound, n in zip(self.buckets + (math.inf,), self.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{le="{"+Inf" if bound == math.inf else bound}"}} {cumulative}')
+        return lines + [f'{name}_sum {self.sum}', f'{name}_count {self.count}']
+
+class ServiceTimeEstimator:
+    """
+    Scoring time of a request from its number of rows, seconds = fixed + per_row * rows, fitted by exponentially
+    weighted least squares over the requests scored so far (the weight of an observation halves every `half_life`
+    observations, so the fit follows a change of model or load). Requests of one size only give seconds per row.
+    """
+    def __init__(self, initial_seconds: float = 0.01, half_life: int = 50):
+        self.initial_seconds = initial_seconds
+        self.decay = 0.5 ** (1 / half_life)
+        self._w = self._x = self._y = self._xx = self._xy = 0.0
+
+    def observe(self, rows: int, seconds: float) -> None:
+        self._w = self._w * self.decay + 1
+        self._x = self._x * self.decay + rows
+        self._y = self._y * self.decay + seconds
+        self._xx = self._xx * self.decay + rows * rows
+        self._xy = self._xy * self.decay + rows * seconds
+
+    def estimate(self, rows: int) -> float:
+        if not self._w:
+            return self.initial_seconds
+        mean_x, mean_y = self._x / self._w, self._y / self._w
+        variance = self._xx / self._w - mean_x ** 2
+        if variance <= 1e-9 * max(mean_x ** 2, 1.0):
+            return mean_y * rows / mean_x if mean_x > 0 else mean_y
+        per_row = max((self._xy / self._w - mean_x * mean_y) / variance, 0.0)
+        fixed = max(mean_y - per_row * mean_x, 0.0)
+        return fixed + per_row * rows
+
+class AdmissionController:
+    """
+    Admission control of CPU-bound work in an asyncio server: at most max_concurrency calls run at once, on a thread
+    pool of that size, and at most max_queue wait for a thread, first come first served. A request is rejected on
+    arrival, before it uses any CPU, with 429 when the queue is full and with 503 when the estimated wait plus its
+    own scoring time (ServiceTimeEstimator) exceed its deadline; a request whose deadline can no longer be met when it
+    reaches a thread (the estimate was optimistic) is dropped then. Latency of admitted requests therefore stays
+    near their deadline under any load, instead of growing with an unbounded queue.
+
+    Only the event loop thread touches the queue and counters; disabled, calls run on the framework's thread pool as
+    if there were no admission control, and are still measured.
+    """
+    def __init__(self, max_concurrency: int, max_queue: int, deadline_seconds: float = 1.0,
+                 max_deadline_seconds: float = 30.0, enabled: bool = True,
+                 estimator: Optional[ServiceTimeEstimator] = None):
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.max_queue = max(int(max_queue), 0)
+        self.deadline_seconds = deadline_seconds
+        self.max_deadline_seconds = max_deadline_seconds
+        self.enabled = enabled
+        self.estimator = estimator if estimator is not None else ServiceTimeEstimator()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._waiters: Deque[Tuple[asyncio.Future, float]] = deque()
+        self._queued_seconds = 0.0 # estimated scoring time of the waiting requests
+        self._running: Dict[int, Tuple[float, float]] = {} # id -> (start, estimated seconds)
+        self._next_id = 0
+        self.in_flight = 0
+        self.admitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.shed = {reason: 0 for reason in SHED_REASONS}
+        self.queue_wait = Histogram()
+        self.service_time = Histogram()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def deadline(self, header_value: Optional[str]) -> float:
+        """
+        Deadline in seconds of a request from its deadline header (milliseconds), clamped to the maximum; the
+        default deadline without a valid header.
+        """
+        try:
+            milliseconds = float(header_value) if header_value else None
+        except ValueError:
+            milliseconds = None
+        if milliseconds is None or milliseconds <= 0:
+            return self.deadline_seconds
+        return min(milliseconds / 1000, self.max_deadline_seconds)
+
+    def estimated_wait(self) -> float:
+        """
+        Seconds a request arriving now waits for a thread: the scoring left of the running requests and the scoring
+        of the queued ones, shared by the threads. 0 while a thread is free.
+        """
+        if self.in_flight < self.max_concurrency:
+            return 0.0
+        now = time.monotonic()
+        remaining = sum(max(estimate - (now - start), 0.0) for start, estimate in self._running.values())
+        return (remaining + self._queued_seconds) / self.max_concurrency
+
+    def check_queue(self) -> None:
+        """
+        Rejects a request with 429 if the queue is full, so a handler can refuse it before reading its body.
+        """
+        if self.enabled and self.in_flight >= self.max_concurrency and len(self._waiters) >= self.max_queue:
+            self.shed['queue_full'] += 1
+            raise ServiceOverloaded(429, 'queue_full', self.estimated_wait())
+
+    async def _acquire(self, estimate: float, deadline: float, arrival: float) -> None:
+        if self.in_flight < self.max_concurrency:
+            self.in_flight += 1
+            return
+        self.check_queue()
+        wait = self.estimated_wait()
+        if wait + estimate > deadline:
+            self.shed['deadline'] += 1
+            raise ServiceOverloaded(503, 'deadline', wait)
+        waiter = (asyncio.get_running_loop().create_future(), estimate)
+        self._waiters.append(waiter)
+        self._queued_seconds += estimate
+        try:
+            await waiter[0] # resolved by _release, which hands its thread slot over
+        except asyncio.CancelledError:
+            if waiter[0].done() and not waiter[0].cancelled():
+                self._release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        finally:
+            self._queued_seconds -= estimate
+        if time.monotonic() - arrival + estimate > deadline:
+            self._release()
+            self.shed['expired'] += 1
+            raise ServiceOverloaded(503, 'expired', self.estimated_wait())
+
+    def _release(self) -> None:
+        while self._waiters:
+            future, _ = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    async def run(self, func: Callable, *args: Any, rows: int = 1, deadline: Optional[float] = None,
+                  arrival: Optional[float] = None) -> Any:
+        """
+        Runs func(*args) on a scoring thread once admitted, and returns its result.
+
+        Args:
+            rows (int): Rows the call scores, to estimate its scoring time.
+            deadline (float, optional): Latency budget of the request in seconds. Defaults to deadline_seconds.
+            arrival (float, optional): time.monotonic() when the request arrived, so the time spent reading and
+                parsing it counts against the deadline. Defaults to now.
+
+        Raises:
+            ServiceOverloaded: The request was shed.
+        """
+        if not self.enabled:
+            from starlette.concurrency import run_in_threadpool
+            self.in_flight += 1
+            start = time.monotonic()
+            try:
+                return await run_in_threadpool(func, *args)
+            finally:
+                self.in_flight -= 1
+                self.service_time.observe(time.monotonic() - start)
+        arrival = arrival if arrival is not None else time.monotonic()
+        estimate = self.estimator.estimate(rows)
+        await self._acquire(estimate, deadline if deadline is not None else self.deadline_seconds, arrival)
+        start = time.monotonic()
+        self.admitted += 1
+        self.queue_wait.observe(start - arrival)
+        request_id, self._next_id = self._next_id, self._next_id + 1
+        self._running[request_id] = (start, estimate)
+        try:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='predict')
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+            seconds = time.monotonic() - start
+            self.estimator.observe(rows, seconds)
+            self.service_time.observe(seconds)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            del self._running[request_id]
+            self._release()
+
+    def snapshot(self) -> dict:
+        return {'enabled': self.enabled, 'max_concurrency': self.max_concurrency, 'max_queue': self.max_queue,
+                'in_flight': self.in_flight, 'queue_depth': self.queue_depth,
+                'estimated_wait_seconds': self.estimated_wait(), 'admitted': self.admitted,
+                'completed': self.completed, 'failed': self.failed, 'shed': dict(self.shed),
+                'queue_wait_p99_seconds': self.queue_wait.quantile(0.99),
+                'service_time_p99_seconds': self.service_time.quantile(0.99)}
+
+    def exposition(self, prefix: str = 'prediction') -> str:
+        """
+        Metrics in the Prometheus text exposition format.
+        """
+        lines = [
+            f'# HELP {prefix}_queue_depth Requests waiting for a scoring thread',
+            f'# TYPE {prefix}_queue_depth gauge', f'{prefix}_queue_depth {self.queue_depth}',
+            f'# HELP {prefix}_in_flight Requests being scored',
+            f'# TYPE {prefix}_in_flight gauge', f'{prefix}_in_flight {self.in_flight}',
+            f'# HELP {prefix}_estimated_wait_seconds Estimated queue wait of a request arriving now',
+            f'# TYPE {prefix}_estimated_wait_seconds gauge', f'{prefix}_estimated_wait_seconds {self.estimated_wait()}',
+            f'# HELP {prefix}_requests_admitted_total Requests admitted to a scoring thread',
+            f'# TYPE {prefix}_requests_admitted_total counter', f'{prefix}_requests_admitted_total {self.admitted}',
+            f'# HELP {prefix}_requests_failed_total Admitted requests whose scoring raised',
+            f'# TYPE {prefix}_requests_failed_total counter', f'{prefix}_requests_failed_total {self.failed}',
+            f'# HELP {prefix}_requests_shed_total Requests rejected by admission control',
+            f'# TYPE {prefix}_requests_shed_total counter',
+        ]
+        lines += [f'{prefix}_requests_shed_total{{reason="{reason}"}} {n}' for reason, n in self.shed.items()]
+        lines += [f'# HELP {prefix}_queue_wait_seconds Time from arrival to a scoring thread of admitted requests',
+                  f'# TYPE {prefix}_queue_wait_seconds histogram']
+        lines += self.queue_wait.exposition(f'{prefix}_queue_wait_seconds')
+        lines += [f'# HELP {prefix}_service_seconds Scoring time of a request',
+                  f'# TYPE {prefix}_service_seconds histogram']
+        lines += self.service_time.exposition(f'{prefix}_service_seconds')
+        return '\n'.join(lines) + '\n'
+
+def admission_controller_from_config(config: 'AdmissionControlConfig') -> AdmissionController:
+    return AdmissionController(max_concurrency=config.max_concurrency, max_queue=config.max_queue,
+                               deadline_seconds=config.deadline_ms / 1000, max_deadline_seconds=config.max_deadline_ms / 1000,
+                               enabled=config.enabled)
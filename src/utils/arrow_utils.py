@@ -0,0 +1,113 @@
+import sys
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from src.exception import MyException
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+
+ARROW_STREAM_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+ARROW_FILE_MEDIA_TYPE = 'application/vnd.apache.arrow.file'
+PARQUET_MEDIA_TYPES = ('application/vnd.apache.parquet', 'application/x-parquet', 'application/parquet')
+PREDICTION_COLUMN = 'prediction'
+
+class UnsupportedMediaType(Exception):
+    pass
+
+class MalformedBody(Exception):
+    """
+    A request body that cannot be decoded in its declared format (the client's error, answered 400).
+    """
+    pass
+
+def _media_type(content_type: Optional[str]) -> str:
+    return (content_type or '').split(';')[0].strip().lower()
+
+def is_columnar_media_type(content_type: Optional[str]) -> bool:
+    return _media_type(content_type) in (ARROW_STREAM_MEDIA_TYPE, ARROW_FILE_MEDIA_TYPE) + PARQUET_MEDIA_TYPES
+
+def read_table(body: bytes, content_type: str, columns: Optional[Iterable[str]] = None) -> 'pa.Table':
+    """
+    Reads an Arrow IPC (stream or file) or Parquet request body into an Arrow table. Arrow IPC buffers are used in place
+    (no copy of the body); for Parquet only the requested columns are decoded.
+
+    Args:
+        body (bytes): Request body.
+        content_type (str): Content-Type header of the request.
+        columns (Iterable[str], optional): Columns to keep; columns missing from the body are left for validation to report.
+
+    Returns:
+        pa.Table: The decoded table.
+
+    Raises:
+        UnsupportedMediaType: The content type is not Arrow IPC or Parquet.
+        MalformedBody: The body is not valid in its content type.
+    """
+    import pyarrow as pa
+    media_type = _media_type(content_type)
+    try:
+        if media_type == ARROW_STREAM_MEDIA_TYPE:
+            table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+        elif media_type == ARROW_FILE_MEDIA_TYPE:
+            table = pa.ipc.open_file(pa.BufferReader(body)).read_all()
+        elif media_type in PARQUET_MEDIA_TYPES:
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(pa.BufferReader(body))
+            present = set(parquet_file.schema_arrow.names)
+            table = parquet_file.read(columns=[column for column in columns if column in present] if columns is not None else None)
+        else:
+            raise UnsupportedMediaType(f'Unsupported content type {content_type!r}; expected {ARROW_STREAM_MEDIA_TYPE}, '
+                                       f'{ARROW_FILE_MEDIA_TYPE} or one of {PARQUET_MEDIA_TYPES}')
+    except (pa.ArrowException, OSError) as e: # ArrowInvalid, ArrowIOError, corrupt Parquet footers and pages
+        raise MalformedBody(f'Could not decode the {media_type} body: {e}') from e
+    if columns is not None:
+        table = table.select([column for column in columns if column in table.column_names])
+    return table
+
+def table_to_frame(table: 'pa.Table') -> 'pd.DataFrame':
+    """
+    Converts an Arrow table into a dataframe column by column: numeric columns without nulls become numpy views of the
+    Arrow buffers and the table releases each column as soon as it is converted, so no per-row Python objects are built.
+    """
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+def read_frame(body: bytes, content_type: str, columns: Optional[Iterable[str]] = None) -> 'pd.DataFrame':
+    """
+    Decodes an Arrow IPC or Parquet request body straight into a dataframe of the requested columns, in that order.
+    """
+    try:
+        return table_to_frame(read_table(body, content_type, columns=list(columns) if columns is not None else None))
+
+    except (UnsupportedMediaType, MalformedBody):
+        raise
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+def predictions_to_arrow_ipc(predictions: 'np.ndarray', column: str = PREDICTION_COLUMN) -> bytes:
+    """
+    Encodes predictions as an Arrow IPC stream with one column.
+    """
+    try:
+        import numpy as np
+        import pyarrow as pa
+        table = pa.table({column: pa.array(np.asarray(predictions))})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+def frame_to_arrow_ipc(df: 'pd.DataFrame') -> bytes:
+    """
+    Encodes a dataframe as an Arrow IPC stream (e.g. to build a request body).
+    """
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
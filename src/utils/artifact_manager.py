@@ -0,0 +1,418 @@
+"""
+Retention for training artifacts and log files.
+
+Every training run writes artifact/<timestamp>/ with csv copies, .npy arrays and pickles, and every process may
+start a new log file. ArtifactManager indexes the run directories and deletes runs that are beyond the configured
+count, age or total size, never touching pinned runs or runs holding the production model. Identical files across
+runs (the same preprocessor or model written twice, an unchanged feature store) are hard-linked to one copy.
+A training run marks its directory in progress while it writes it (mark_run_in_progress); retention neither deletes
+nor deduplicates a run in progress in another process, nor a run newer than the runs it was asked to keep.
+
+Usage:
+    python -m src.utils.artifact_manager list
+    python -m src.utils.artifact_manager pin 10_19_2026_12_00_00 --reason "baseline for the Q4 report"
+    python -m src.utils.artifact_manager gc --dry-run
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import hashlib
+import argparse
+from datetime import datetime
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.logger import logging
+from src.exception import MyException
+from src.constants import ARTIFACT_PIN_FILE_NAME, ARTIFACT_IN_PROGRESS_FILE_NAME, ARTIFACT_INDEX_FILE_NAME, MODEL_FILE_NAME
+from src.entity.config_entity import ArtifactRetentionConfig
+
+RUN_TIMESTAMP_FORMAT = '%m_%d_%Y_%H_%M_%S' # name of the run directories, see get_timestamp
+HASH_BLOCK_SIZE = 1024 * 1024
+
+@dataclass
+class RunInfo:
+    run_id: str
+    path: str
+    created_at: float # epoch seconds, from the directory name or its mtime
+    size_bytes: int # bytes of the distinct files in the run
+    n_files: int
+    pinned: bool = False
+    pin_reason: str = ''
+    production: bool = False
+    in_progress: bool = False
+
+    @property
+    def protected(self) -> bool:
+        return self.pinned or self.production or self.in_progress
+
+@dataclass
+class RetentionReport:
+    dry_run: bool
+    total_bytes_before: int
+    total_bytes_after: int
+    deleted_runs: List[str] = field(default_factory=list)
+    deleted_logs: List[str] = field(default_factory=list)
+    deduplicated_files: int = 0
+    deduplicated_bytes: int = 0
+
+    @property
+    def freed_bytes(self) -> int:
+        return self.total_bytes_before - self.total_bytes_after
+
+    def summary(self) -> str:
+        verb = 'would delete' if self.dry_run else 'deleted'
+        return (f'{verb} {len(self.deleted_runs)} runs and {len(self.deleted_logs)} log files, '
+                f'hard-linked {self.deduplicated_files} duplicate files ({self.deduplicated_bytes} bytes); '
+                f'artifacts {self.total_bytes_before} -> {self.total_bytes_after} bytes')
+
+def file_digest(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file_obj:
+        for block in iter(lambda: file_obj.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def mark_run_in_progress(run_dir: str) -> None:
+    """
+    Marks a run directory as being written by this process, creating it if needed.
+    """
+    os.makedirs(run_dir, exist_ok=True)
+    with open(os.path.join(run_dir, ARTIFACT_IN_PROGRESS_FILE_NAME), 'w') as file_obj:
+        json.dump({'pid': os.getpid(), 'host': socket.gethostname(), 'started_at': time.time()}, file_obj)
+
+def clear_run_in_progress(run_dir: str) -> None:
+    marker = os.path.join(run_dir, ARTIFACT_IN_PROGRESS_FILE_NAME)
+    if os.path.exists(marker):
+        os.remove(marker)
+
+def run_in_progress(run_dir: str) -> bool:
+    """
+    True if the run directory has an in-progress marker of a live process. A marker left by a process of this host
+    that is gone (a crashed run) is stale and ignored; one from another host is trusted.
+    """
+    marker = os.path.join(run_dir, ARTIFACT_IN_PROGRESS_FILE_NAME)
+    try:
+        with open(marker) as file_obj:
+            owner = json.load(file_obj)
+    except FileNotFoundError:
+        return False
+    except (OSError, ValueError):
+        return True # being written, or unreadable: assume a live run
+    if owner.get('host') != socket.gethostname():
+        return True
+    try:
+        os.kill(int(owner['pid']), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, KeyError, TypeError, ValueError):
+        return True
+    return True
+
+def _walk_files(root: str) -> Iterable[Tuple[str, os.stat_result]]:
+    for dir_path, _, file_names in os.walk(root):
+        for file_name in file_names:
+            path = os.path.join(dir_path, file_name)
+            try:
+                yield path, os.lstat(path)
+            except FileNotFoundError:
+                continue
+
+class ArtifactManager:
+    def __init__(self, config: Optional[ArtifactRetentionConfig] = None):
+        """
+        config: retention limits and directories, defaults to ArtifactRetentionConfig()
+        """
+        self.config = config if config is not None else ArtifactRetentionConfig()
+        if self.config.log_dir is None:
+            from src.logger import log_dir_path
+            self.config.log_dir = log_dir_path
+        self._run_inodes: Dict[str, Dict[Tuple[int, int], int]] = {} # run id -> {(device, inode): size}, filled by list_runs
+
+    def _run_created_at(self, path: str) -> float:
+        try:
+            return datetime.strptime(os.path.basename(path), RUN_TIMESTAMP_FORMAT).timestamp()
+        except ValueError:
+            return os.stat(path).st_mtime
+
+    def _production_digest(self) -> Optional[str]:
+        path = self.config.production_model_file_path
+        return file_digest(path) if path and os.path.isfile(path) else None
+
+    def run_dirs(self) -> List[str]:
+        root = self.config.artifact_dir
+        if not os.path.isdir(root):
+            return []
+        return [os.path.join(root, name) for name in sorted(os.listdir(root)) if os.path.isdir(os.path.join(root, name))]
+
+    def list_runs(self) -> List[RunInfo]:
+        """
+        Returns every run directory, newest first, with its size and pinned/production status.
+        """
+        try:
+            production_digest = self._production_digest()
+            production_size = os.path.getsize(self.config.production_model_file_path) if production_digest else None
+            runs = []
+            for path in self.run_dirs():
+                inodes, production = {}, False
+                for file_path, stat in _walk_files(path):
+                    inodes[(stat.st_dev, stat.st_ino)] = stat.st_size
+                    if (production_digest and not production and os.path.basename(file_path) == MODEL_FILE_NAME
+                            and stat.st_size == production_size):
+                        production = file_digest(file_path) == production_digest
+                pin_file = os.path.join(path, ARTIFACT_PIN_FILE_NAME)
+                pinned = os.path.isfile(pin_file)
+                pin_reason = ''
+                if pinned:
+                    with open(pin_file) as file_obj:
+                        pin_reason = file_obj.read().strip()
+                self._run_inodes[os.path.basename(path)] = inodes
+                runs.append(RunInfo(run_id=os.path.basename(path), path=path, created_at=self._run_created_at(path),
+                                    size_bytes=sum(inodes.values()), n_files=len(inodes), pinned=pinned,
+                                    pin_reason=pin_reason, production=production, in_progress=run_in_progress(path)))
+            return sorted(runs, key=lambda run: run.created_at, reverse=True)
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def _run_path(self, run_id: str) -> str:
+        path = os.path.join(self.config.artifact_dir, run_id)
+        if not os.path.isdir(path):
+            raise Exception(f'No run {run_id} in {self.config.artifact_dir}')
+        return path
+
+    def pin(self, run_id: str, reason: str = '') -> None:
+        """
+        Pins a run so retention never deletes it.
+        """
+        try:
+            with open(os.path.join(self._run_path(run_id), ARTIFACT_PIN_FILE_NAME), 'w') as file_obj:
+                file_obj.write(reason)
+            logging.info(f'Pinned run {run_id}')
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def unpin(self, run_id: str) -> None:
+        try:
+            pin_file = os.path.join(self._run_path(run_id), ARTIFACT_PIN_FILE_NAME)
+            if os.path.exists(pin_file):
+                os.remove(pin_file)
+            logging.info(f'Unpinned run {run_id}')
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def disk_usage(self) -> int:
+        """
+        Bytes used under the artifact directory, counting hard-linked files once.
+        """
+        inodes = {(stat.st_dev, stat.st_ino): stat.st_size for _, stat in _walk_files(self.config.artifact_dir)}
+        return sum(inodes.values())
+
+    def deduplicate(self, run_paths: Iterable[str], dry_run: bool = False) -> Tuple[int, int]:
+        """
+        Replaces files with identical content by hard links to one copy. Only files of equal size are hashed.
+        Artifact files are written once and never modified in place, so sharing their inode is safe.
+
+        Returns:
+            Tuple[int, int]: Number of files linked and bytes saved.
+        """
+        try:
+            by_size: Dict[int, List[Tuple[str, os.stat_result]]] = {}
+            for run_path in run_paths:
+                for file_path, stat in _walk_files(run_path):
+                    if stat.st_size > 0 and os.path.basename(file_path) not in (ARTIFACT_PIN_FILE_NAME, ARTIFACT_IN_PROGRESS_FILE_NAME):
+                        by_size.setdefault(stat.st_size, []).append((file_path, stat))
+
+            n_linked, saved = 0, 0
+            for size, files in by_size.items():
+                if len({(stat.st_dev, stat.st_ino) for _, stat in files}) < 2:
+                    continue
+                keepers: Dict[Tuple[int, str], Tuple[str, os.stat_result]] = {}
+                for file_path, stat in files:
+                    key = (stat.st_dev, file_digest(file_path))
+                    keeper = keepers.setdefault(key, (file_path, stat))
+                    if keeper[1].st_ino == stat.st_ino:
+                        continue
+                    if not dry_run:
+                        temp_path = f'{file_path}.dedup-tmp'
+                        try:
+                            os.link(keeper[0], temp_path)
+                            os.replace(temp_path, file_path)
+                        except OSError as e:
+                            logging.warning(f'Could not hard-link {file_path} to {keeper[0]}: {e}')
+                            if os.path.exists(temp_path):
+                                os.remove(temp_path)
+                            continue
+                    n_linked += 1
+                    saved += size
+            return n_linked, saved
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    @staticmethod
+    def busy_runs(runs: List[RunInfo], protect: Iterable[str] = ()) -> List[RunInfo]:
+        """
+        Returns the runs retention must not touch at all (delete or deduplicate): runs in progress, except the
+        protected ones (the caller's own run, finished by the time it applies retention), and runs newer than the
+        newest protected run, which another process may have just started.
+        """
+        protect = {os.path.abspath(path) for path in protect}
+        protected_created_at = [run.created_at for run in runs if os.path.abspath(run.path) in protect]
+        newest_protected = max(protected_created_at, default=None)
+        return [run for run in runs if os.path.abspath(run.path) not in protect
+                and (run.in_progress or (newest_protected is not None and run.created_at > newest_protected))]
+
+    def select_expired_runs(self, runs: List[RunInfo], protect: Iterable[str] = ()) -> List[RunInfo]:
+        """
+        Returns the runs to delete, oldest first: unprotected runs beyond keep_last or older than max_age_days,
+        then the oldest remaining unprotected runs until the total size fits max_total_bytes. Busy runs (busy_runs)
+        are never deleted.
+        """
+        busy = {run.run_id for run in self.busy_runs(runs, protect)}
+        protect = {os.path.abspath(path) for path in protect}
+        now = time.time()
+        candidates = [run for run in runs if not run.protected and os.path.abspath(run.path) not in protect
+                      and run.run_id not in busy]
+        newest_ids = {run.run_id for run in runs[:max(self.config.keep_last, 0)]}
+
+        expired = [run for run in candidates
+                   if run.run_id not in newest_ids or now - run.created_at > self.config.max_age_days * 86400]
+
+        # a file hard-linked into several runs only frees space when its last run is deleted
+        references, sizes = {}, {}
+        for run in runs:
+            if run in expired:
+                continue
+            for inode, size in self._run_inodes.get(run.run_id, {}).items():
+                references[inode] = references.get(inode, 0) + 1
+                sizes[inode] = size
+        remaining_bytes = sum(sizes.values())
+        for run in reversed(candidates): # oldest first
+            if remaining_bytes <= self.config.max_total_bytes:
+                break
+            if run in expired:
+                continue
+            expired.append(run)
+            for inode, size in self._run_inodes.get(run.run_id, {}).items():
+                references[inode] -= 1
+                if references[inode] == 0:
+                    remaining_bytes -= size
+        return sorted(expired, key=lambda run: run.created_at)
+
+    def clean_logs(self, dry_run: bool = False) -> List[str]:
+        """
+        Deletes log files (rotated backups included) beyond log_keep_last or older than log_max_age_days,
+        except the file the current process logs to.
+        """
+        try:
+            log_dir = self.config.log_dir
+            if not log_dir or not os.path.isdir(log_dir):
+                return []
+            from src.logger import log_file_path
+            current = os.path.abspath(log_file_path)
+            logs = [os.path.join(log_dir, name) for name in os.listdir(log_dir) if '.log' in name]
+            logs = sorted((path for path in logs if os.path.isfile(path) and os.path.abspath(path) != current),
+                          key=os.path.getmtime, reverse=True)
+            now = time.time()
+            deleted = [path for index, path in enumerate(logs)
+                       if index >= self.config.log_keep_last
+                       or now - os.path.getmtime(path) > self.config.log_max_age_days * 86400]
+            if not dry_run:
+                for path in deleted:
+                    os.remove(path)
+            return deleted
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def write_index(self, runs: List[RunInfo]) -> str:
+        """
+        Writes the run index (run id, creation time, size, pin and production status) next to the runs.
+        """
+        index_path = os.path.join(self.config.artifact_dir, ARTIFACT_INDEX_FILE_NAME)
+        with open(index_path, 'w') as file_obj:
+            json.dump({'updated_at': datetime.now().isoformat(), 'runs': [asdict(run) for run in runs]}, file_obj, indent=2)
+        return index_path
+
+    def apply_retention(self, protect: Iterable[str] = (), dry_run: bool = False) -> RetentionReport:
+        """
+        Deduplicates the runs, deletes expired runs and old log files and rewrites the run index.
+        Deduplication runs first so that the size limit is checked against the space the runs really use.
+        Runs in progress in another process and runs newer than the protected ones are left alone (busy_runs).
+
+        Args:
+            protect (Iterable[str]): Run directories that must be kept, e.g. the run that just finished.
+            dry_run (bool): Only report what would be done. Defaults to False.
+
+        Returns:
+            RetentionReport: Runs and logs deleted, duplicates linked and artifact bytes before and after.
+        """
+        try:
+            total_before = self.disk_usage()
+            report = RetentionReport(dry_run=dry_run, total_bytes_before=total_before, total_bytes_after=total_before)
+            if self.config.deduplicate:
+                runs = self.list_runs()
+                busy = {run.run_id for run in self.busy_runs(runs, protect)}
+                report.deduplicated_files, report.deduplicated_bytes = self.deduplicate(
+                    [run.path for run in runs if run.run_id not in busy], dry_run=dry_run)
+
+            runs = self.list_runs()
+            expired = self.select_expired_runs(runs, protect=protect)
+            report.deleted_runs = [run.run_id for run in expired]
+            for run in expired:
+                logging.info(f'{"Would delete" if dry_run else "Deleting"} run {run.run_id} ({run.size_bytes} bytes)')
+                if not dry_run:
+                    shutil.rmtree(run.path, ignore_errors=True)
+            report.deleted_logs = self.clean_logs(dry_run=dry_run)
+
+            if dry_run:
+                # upper bound: duplicates are not linked in a dry run, so the kept runs still count every copy
+                kept_inodes = {}
+                for run in runs:
+                    if run not in expired:
+                        kept_inodes.update(self._run_inodes.get(run.run_id, {}))
+                report.total_bytes_after = sum(kept_inodes.values())
+            else:
+                report.total_bytes_after = self.disk_usage()
+                if os.path.isdir(self.config.artifact_dir):
+                    self.write_index(self.list_runs())
+            logging.info(f'Artifact retention: {report.summary()}')
+            return report
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='list runs, newest first')
+    pin = commands.add_parser('pin', help='keep a run forever')
+    pin.add_argument('run_id')
+    pin.add_argument('--reason', default='')
+    unpin = commands.add_parser('unpin')
+    unpin.add_argument('run_id')
+    gc = commands.add_parser('gc', help='apply the retention limits')
+    gc.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    manager = ArtifactManager()
+    if args.command == 'list':
+        for run in manager.list_runs():
+            flags = ' '.join(flag for flag, on in (('pinned', run.pinned), ('production', run.production),
+                                                   ('in-progress', run.in_progress)) if on)
+            print(f'{run.run_id:<22} {run.size_bytes / 2**20:>10.1f} MB {run.n_files:>6} files  {flags} {run.pin_reason}')
+    elif args.command == 'pin':
+        manager.pin(args.run_id, args.reason)
+    elif args.command == 'unpin':
+        manager.unpin(args.run_id)
+    else:
+        print(manager.apply_retention(dry_run=args.dry_run).summary())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+import io
+import os
+import json
+import struct
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+# first bytes of every file format the artifact loaders accept
+NPY_MAGIC = b'\x93NUMPY'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+LZ4_FRAME_MAGIC = b'\x04\x22\x4d\x18'
+BLOCK_ARRAY_MAGIC = b'P1BLKARR'
+# a block array ends with its footer: JSON metadata, its length and the magic again
+_FOOTER_TRAILER = struct.Struct('<Q8s')
+
+CODEC_NAMES = ('none', 'zstd', 'lz4')
+
+class Codec:
+    """
+    Compression codec of artifact files. compress/decompress work on independent blocks and are safe to call from
+    several threads at once; open_writer/open_reader wrap a file object in a compressed stream (for pickles).
+    'none' stores the bytes as they are.
+    """
+    name = 'none'
+    stream_magic = b''
+
+    def __init__(self, level: int = 0, threads: int = 1):
+        self.level = level
+        self.threads = max(threads, 1)
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(data)
+
+    def decompress(self, data: bytes, size: int) -> bytes:
+        return data
+
+    @contextmanager
+    def open_writer(self, file_obj: BinaryIO) -> Iterator[BinaryIO]:
+        yield file_obj
+
+    @contextmanager
+    def open_reader(self, file_obj: BinaryIO) -> Iterator[BinaryIO]:
+        yield file_obj
+
+class ZstdCodec(Codec):
+    """
+    Zstandard: close to gzip ratios at several times the speed. Level 0 is zstd's default (3); streams are compressed
+    on `threads` threads by the library itself.
+    """
+    name = 'zstd'
+    stream_magic = ZSTD_MAGIC
+
+    def __init__(self, level: int = 0, threads: int = 1):
+        super().__init__(level, threads)
+        import zstandard
+        self._zstd = zstandard
+        self._local = threading.local() # compression contexts are not thread-safe
+
+    def _context(self, kind: str):
+        context = getattr(self._local, kind, None)
+        if context is None:
+            context = (self._zstd.ZstdCompressor(level=self.level) if kind == 'compressor'
+                       else self._zstd.ZstdDecompressor())
+            setattr(self._local, kind, context)
+        return context
+
+    def compress(self, data: bytes) -> bytes:
+        return self._context('compressor').compress(data)
+
+    def decompress(self, data: bytes, size: int) -> bytes:
+        return self._context('decompressor').decompress(data, max_output_size=size)
+
+    @contextmanager
+    def open_writer(self, file_obj: BinaryIO) -> Iterator[BinaryIO]:
+        compressor = self._zstd.ZstdCompressor(level=self.level, threads=self.threads if self.threads > 1 else 0)
+        with compressor.stream_writer(file_obj, closefd=False) as writer:
+            yield writer
+
+    @contextmanager
+    def open_reader(self, file_obj: BinaryIO) -> Iterator[BinaryIO]:
+        with self._zstd.ZstdDecompressor().stream_reader(file_obj, closefd=False) as reader:
+            # pickle needs readline, which the raw zstd reader does not have
+            yield io.BufferedReader(reader, buffer_size=1024**2)
+
+class Lz4Codec(Codec):
+    """
+    LZ4: a lower ratio than zstd but the fastest decompression, for artifacts read more often than written. Level 0
+    is the fast mode; higher levels trade write time for size. Streams are single-threaded.
+    """
+    name = 'lz4'
+    stream_magic = LZ4_FRAME_MAGIC
+
+    def __init__(self, level: int = 0, threads: int = 1):
+        super().__init__(level, threads)
+        import lz4.block
+        import lz4.frame
+        self._block = lz4.block
+        self._frame = lz4.frame
+
+    def compress(self, data: bytes) -> bytes:
+        if self.level > 0:
+            return self._block.compress(data, mode='high_compression', compression=self.level, store_size=False)
+        return self._block.compress(data, store_size=False)
+
+    def decompress(self, data: bytes, size: int) -> bytes:
+        return self._block.decompress(data, uncompressed_size=size)
+
+    @contextmanager
+    def open_writer(self, file_obj: BinaryIO) -> Iterator[BinaryIO]:
+        with self._frame.LZ4FrameFile(file_obj, mode='wb', compression_level=self.level) as writer:
+            yield writer
+
+    @contextmanager
+    def open_reader(self, file_obj: BinaryIO) -> Iterator[BinaryIO]:
+        with self._frame.LZ4FrameFile(file_obj, mode='rb') as reader:
+            yield reader
+
+_CODEC_CLASSES = {codec.name: codec for codec in (Codec, ZstdCodec, Lz4Codec)}
+
+@lru_cache(maxsize=None)
+def get_codec(name: str, level: int = 0, threads: int = 0) -> Codec:
+    """
+    Returns the codec called `name` ('none', 'zstd' or 'lz4'), one instance per settings. threads=0 uses every CPU.
+    """
+    if name not in _CODEC_CLASSES:
+        raise ValueError(f'Unknown artifact codec {name!r}, expected one of {CODEC_NAMES}')
+    return _CODEC_CLASSES[name](level=level, threads=threads or os.cpu_count() or 1)
+
+def stream_codec_name(file_obj: BinaryIO) -> str:
+    """
+    Codec of a stream file (a pickle, compressed or not) from its first bytes; leaves the position unchanged.
+    """
+    head = file_obj.read(4)
+    file_obj.seek(-len(head), io.SEEK_CUR)
+    for codec in (ZstdCodec, Lz4Codec):
+        if head == codec.stream_magic:
+            return codec.name
+    return 'none'
+
+def is_block_array(file_path: str) -> bool:
+    with open(file_path, 'rb') as file_obj:
+        return file_obj.read(len(BLOCK_ARRAY_MAGIC)) == BLOCK_ARRAY_MAGIC
+
+def _bounded_map(pool: ThreadPoolExecutor, func: Callable, items: Iterable, window: int) -> Iterator:
+    """
+    pool.map that keeps at most `window` items in flight, so memory stays bounded by the window instead of the input.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def _rows_2d(array: np.ndarray) -> np.ndarray:
+    return array.reshape(len(array), int(np.prod(array.shape[1:]))) if array.ndim > 1 else array.reshape(-1, 1)
+
+def write_block_array(file_path: str, array: np.ndarray, codec: Codec, block_bytes: int = 4 * 1024**2) -> int:
+    """
+    Writes an array as blocks of rows compressed independently, on codec.threads threads, followed by a footer
+    locating them; returns the size of the file. Every block is stored column by column: a column of transformed
+    features compresses much better than rows interleaving them, and a block is the unit of parallelism and of
+    random access (BlockArrayReader.read_rows decompresses only the blocks it needs). A 0-d array is one row.
+    """
+    array = np.asarray(array) if not isinstance(array, np.ndarray) else array
+    shape = array.shape
+    rows = _rows_2d(array.reshape(1) if array.ndim == 0 else array)
+    row_bytes = max(rows.shape[1] * rows.dtype.itemsize, 1)
+    block_rows = max(block_bytes // row_bytes, 1)
+    starts = range(0, len(rows), block_rows)
+
+    def encode(start: int) -> bytes:
+        return codec.compress(np.ascontiguousarray(rows[start:start + block_rows].T).data)
+
+    blocks: List[Tuple[int, int]] = []
+    with open(file_path, 'wb') as file_obj:
+        file_obj.write(BLOCK_ARRAY_MAGIC)
+        offset = len(BLOCK_ARRAY_MAGIC)
+        with ThreadPoolExecutor(max_workers=codec.threads) as pool:
+            for data in _bounded_map(pool, encode, starts, window=2 * codec.threads):
+                file_obj.write(data)
+                blocks.append((offset, len(data)))
+                offset += len(data)
+        footer = json.dumps({'codec': codec.name, 'dtype': np.lib.format.dtype_to_descr(rows.dtype), 'shape': list(shape),
+                             'block_rows': block_rows, 'blocks': blocks}).encode()
+        file_obj.write(footer)
+        file_obj.write(_FOOTER_TRAILER.pack(len(footer), BLOCK_ARRAY_MAGIC))
+        return file_obj.tell()
+
+class BlockArrayReader:
+    """
+    Reads an array written by write_block_array: whole, decompressing blocks in parallel straight into the output
+    (which can be a memory-mapped array, for arrays that do not fit in memory), or a range of rows.
+    """
+    def __init__(self, file_path: str, threads: int = 0):
+        self.file_path = file_path
+        with open(file_path, 'rb') as file_obj:
+            file_obj.seek(-_FOOTER_TRAILER.size, io.SEEK_END)
+            footer_length, magic = _FOOTER_TRAILER.unpack(file_obj.read(_FOOTER_TRAILER.size))
+            if magic != BLOCK_ARRAY_MAGIC:
+                raise ValueError(f'{file_path} is not a block array (truncated or not written by write_block_array)')
+            file_obj.seek(-_FOOTER_TRAILER.size - footer_length, io.SEEK_END)
+            footer = json.loads(file_obj.read(footer_length))
+        self.dtype = np.lib.format.descr_to_dtype(footer['dtype'] if isinstance(footer['dtype'], str)
+                                                  else [tuple(field) for field in footer['dtype']])
+        self.shape: Tuple[int, ...] = tuple(footer['shape'])
+        self.block_rows: int = footer['block_rows']
+        self.blocks: List[Tuple[int, int]] = [tuple(block) for block in footer['blocks']]
+        self.codec = get_codec(footer['codec'], threads=threads)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Size of the array once read.
+        """
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    def _row_count(self) -> int:
+        return self.shape[0] if self.shape else 1
+
+    def _decode_into(self, rows: np.ndarray, first_block: int, last_block: int, row_offset: int) -> None:
+        """
+        Decompresses blocks first_block..last_block into `rows` (2-d), whose row 0 is array row row_offset.
+        """
+        columns = rows.shape[1]
+        total = self._row_count()
+
+        def read_blocks() -> Iterator[Tuple[int, bytes]]:
+            # compressed bytes are read in order on this thread; only decompression runs on the pool
+            with open(self.file_path, 'rb') as file_obj:
+                for index in range(first_block, last_block + 1):
+                    offset, length = self.blocks[index]
+                    file_obj.seek(offset)
+                    yield index, file_obj.read(length)
+
+        def decode(item: Tuple[int, bytes]) -> None:
+            index, data = item
+            start = index * self.block_rows
+            stop = min(start + self.block_rows, total)
+            block = np.frombuffer(self.codec.decompress(data, (stop - start) * columns * self.dtype.itemsize),
+                                  dtype=self.dtype).reshape(columns, stop - start)
+            low, high = max(start, row_offset), min(stop, row_offset + len(rows))
+            rows[low - row_offset:high - row_offset] = block[:, low - start:high - start].T
+
+        with ThreadPoolExecutor(max_workers=self.codec.threads) as pool:
+            for _ in _bounded_map(pool, decode, read_blocks(), window=2 * self.codec.threads):
+                pass
+
+    def read(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Returns the whole array, in `out` (of its shape and dtype) if given.
+        """
+        if out is None:
+            out = np.empty(self.shape, dtype=self.dtype)
+        elif out.shape != self.shape or out.dtype != self.dtype:
+            raise ValueError(f'out is {out.shape} {out.dtype}, the array {self.shape} {self.dtype}')
+        if self.blocks:
+            self._decode_into(_rows_2d(out.reshape(1) if out.ndim == 0 else out), 0, len(self.blocks) - 1, 0)
+        return out
+
+    def read_rows(self, start: int, stop: int) -> np.ndarray:
+        """
+        Returns rows start:stop (clipped like a slice), decompressing only the blocks holding them.
+        """
+        if not self.shape:
+            raise ValueError('A 0-d array has no rows')
+        start, stop, _ = slice(start, stop).indices(self.shape[0])
+        out = np.empty((max(stop - start, 0),) + self.shape[1:], dtype=self.dtype)
+        if len(out):
+            self._decode_into(_rows_2d(out), start // self.block_rows, (stop - 1) // self.block_rows, start)
+        return out
+
+def array_file_nbytes(file_path: str) -> int:
+    """
+    Memory an array file takes once loaded: the uncompressed size of a block array, the file size of an .npy.
+    """
+    return BlockArrayReader(file_path).nbytes if is_block_array(file_path) else os.path.getsize(file_path)
@@ -0,0 +1,50 @@
+import time
+import numpy as np
+from typing import List, Tuple
+
+def write_shared_array(file_path: str, array: np.ndarray, dtype=None) -> str:
+    """
+    Writes an array to an .npy file that worker processes open with np.load(mmap_mode='r'): every process maps the
+    same pages instead of receiving a pickled copy. Returns the file path.
+    """
+    shared = np.lib.format.open_memmap(file_path, mode='w+', dtype=dtype or array.dtype, shape=array.shape)
+    shared[:] = array
+    shared.flush()
+    del shared
+    return file_path
+
+def stratified_fold_indices(y: np.ndarray, n_splits: int, random_state: int) -> List[np.ndarray]:
+    """
+    Returns the validation row indices of each of n_splits stratified folds.
+    """
+    from sklearn.model_selection import StratifiedKFold
+    folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    return [validation_index for _, validation_index in folds.split(np.zeros(len(y)), y)]
+
+def evaluate_fold(features_path: str, target_path: str, validation_index: np.ndarray, model_params: dict,
+                  resample: bool) -> Tuple[float, float, float, float]:
+    """
+    Fits a RandomForestClassifier on every row outside validation_index (SMOTEENN-resampled like training when
+    `resample`) and scores it on the untouched validation rows. Runs in a worker process; the features are read from
+    the shared memory-mapped file, only the fold's training rows are materialised for fitting.
+
+    Returns:
+        Tuple[float, float, float, float]: f1, precision, recall and fit seconds.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import f1_score, precision_score, recall_score
+    X = np.load(features_path, mmap_mode='r')
+    y = np.load(target_path, mmap_mode='r')
+    is_train = np.ones(len(y), dtype=bool)
+    is_train[validation_index] = False
+    X_train, y_train = X[is_train], y[is_train]
+    start = time.perf_counter()
+    if resample:
+        from imblearn.combine import SMOTEENN
+        X_train, y_train = SMOTEENN(sampling_strategy='minority').fit_resample(X_train, y_train)
+    model = RandomForestClassifier(**model_params).fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    y_pred = model.predict(X[validation_index])
+    y_true = y[validation_index]
+    return (float(f1_score(y_true, y_pred)), float(precision_score(y_true, y_pred, zero_division=0)),
+            float(recall_score(y_true, y_pred)), fit_seconds)
@@ -0,0 +1,156 @@
+import os
+import glob
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+from src.logger import logging
+
+def row_hashes(df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """
+    Returns a 64-bit hash of every row over `columns`, computed column-wise. Numeric columns are hashed as float64, so a
+    value hashes the same whatever compact dtype its chunk was given (23 as uint8 and 23.0 as float32 collide on purpose);
+    categorical and string columns hash by value.
+    """
+    canonical = {}
+    for column in columns:
+        values = df[column]
+        if pd.api.types.is_numeric_dtype(values) and not isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype('float64')
+        canonical[column] = values
+    return pd.util.hash_pandas_object(pd.DataFrame(canonical, index=df.index), index=False).to_numpy(dtype=np.uint64)
+
+class HashSet:
+    """
+    Set of uint64 hashes in memory as a few sorted runs (8 bytes per key, no per-key Python objects). New keys form a
+    new run and runs are merged while the newer one is at least half the size of the older, so there are O(log n)
+    runs and membership is one binary search per run. Stops growing at `max_keys` (logged once), so memory is bounded;
+    initial keys (e.g. a loaded index) count against the same limit.
+    """
+    def __init__(self, keys: Optional[np.ndarray] = None, max_keys: Optional[int] = None):
+        self.max_keys = max_keys
+        self._runs: List[np.ndarray] = []
+        self._full_logged = False
+        if keys is not None and len(keys):
+            self.add(keys)
+
+    def __len__(self) -> int:
+        return sum(len(run) for run in self._runs)
+
+    def contains(self, keys: np.ndarray) -> np.ndarray:
+        keys = np.asarray(keys, dtype=np.uint64)
+        found = np.zeros(len(keys), dtype=bool)
+        for run in self._runs:
+            positions = np.searchsorted(run, keys)
+            in_range = positions < len(run)
+            found[in_range] |= run[positions[in_range]] == keys[in_range]
+        return found
+
+    def add(self, keys: np.ndarray) -> None:
+        keys = np.unique(np.asarray(keys, dtype=np.uint64))
+        keys = keys[~self.contains(keys)]
+        if self.max_keys is not None:
+            room = max(self.max_keys - len(self), 0)
+            if len(keys) > room:
+                if not self._full_logged:
+                    logging.warning(f'Deduplication hash set is full ({self.max_keys} keys); later rows are only '
+                                    'compared against the rows already indexed')
+                    self._full_logged = True
+                keys = keys[:room]
+        if not len(keys):
+            return
+        self._runs.append(keys)
+        while len(self._runs) > 1 and 2 * len(self._runs[-1]) >= len(self._runs[-2]):
+            newer = self._runs.pop()
+            self._runs[-1] = np.sort(np.concatenate([self._runs[-1], newer]), kind='stable') # runs are disjoint
+
+    def to_array(self) -> np.ndarray:
+        if not self._runs:
+            return np.empty(0, dtype=np.uint64)
+        return np.sort(np.concatenate(self._runs), kind='stable')
+
+class RowDeduplicator:
+    """
+    Drops rows seen before, chunk after chunk.
+
+    A row is an exact duplicate if an earlier kept row has the same feature values and the same target. With
+    `drop_conflicts` it is a conflicting duplicate if an earlier kept row has the same feature values but another
+    target; the first row seen is kept. Only hashes of kept rows are stored (see HashSet), and the index can be saved
+    and loaded so incremental runs also drop rows already ingested by the run they build on.
+    """
+    def __init__(self, feature_columns: List[str], target_column: str, drop_conflicts: bool = False,
+                 max_keys: Optional[int] = None):
+        self.feature_columns = list(feature_columns)
+        self.target_column = target_column
+        self.drop_conflicts = drop_conflicts
+        self.max_keys = max_keys
+        self.exact_keys = HashSet(max_keys=max_keys)
+        self.feature_keys = HashSet(max_keys=max_keys) if drop_conflicts else None
+        self.duplicate_rows = 0
+        self.conflicting_rows = 0
+
+    def deduplicate(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns the rows of a chunk that are neither duplicates of earlier rows (of this or previous chunks) nor, when
+        drop_conflicts, conflicting duplicates; counts what was dropped.
+        """
+        columns = [column for column in self.feature_columns if column in df.columns]
+        if df.empty or not columns:
+            return df
+        feature_hashes = row_hashes(df, columns)
+        exact_hashes = feature_hashes
+        if self.target_column in df.columns:
+            exact_hashes = feature_hashes ^ row_hashes(df, [self.target_column]) * np.uint64(0x9E3779B97F4A7C15)
+        is_duplicate = self.exact_keys.contains(exact_hashes) | pd.Series(exact_hashes).duplicated().to_numpy()
+        drop = is_duplicate
+        if self.feature_keys is not None:
+            is_conflict = ~is_duplicate & (self.feature_keys.contains(feature_hashes) |
+                                           pd.Series(feature_hashes).duplicated().to_numpy())
+            drop = is_duplicate | is_conflict
+            self.conflicting_rows += int(is_conflict.sum())
+            self.feature_keys.add(feature_hashes[~drop])
+        self.duplicate_rows += int(is_duplicate.sum())
+        self.exact_keys.add(exact_hashes[~drop])
+        return df[~drop] if drop.any() else df
+
+    @staticmethod
+    def index_file_path(index_dir: str, watermark: int) -> str:
+        return os.path.join(index_dir, f'row_hashes_{watermark}.npz')
+
+    def save(self, index_dir: str, watermark: int, keep_last: int = 3) -> str:
+        """
+        Saves the hashes as the index of the data up to customer id `watermark`; older index files beyond keep_last are removed.
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        file_path = self.index_file_path(index_dir, watermark)
+        tmp_path = f'{file_path}.tmp.npz'
+        arrays = {'exact_keys': self.exact_keys.to_array()}
+        if self.feature_keys is not None:
+            arrays['feature_keys'] = self.feature_keys.to_array()
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, file_path)
+        index_files = sorted(glob.glob(os.path.join(index_dir, 'row_hashes_*.npz')), key=os.path.getmtime)
+        for old_file in index_files[:-keep_last] if keep_last > 0 else []:
+            os.remove(old_file)
+        logging.info(f'Saved deduplication index of {len(self.exact_keys)} rows to {file_path}')
+        return file_path
+
+    def load(self, index_dir: str, watermark: int) -> bool:
+        """
+        Loads the index saved for customer id `watermark` (the data the incremental run builds on). Returns False,
+        leaving the deduplicator empty, if there is none: rows are then only deduplicated within this run. An index
+        larger than max_keys is truncated like a full HashSet: later rows are only compared against the keys kept.
+        """
+        file_path = self.index_file_path(index_dir, watermark)
+        if not os.path.exists(file_path):
+            logging.warning(f'No deduplication index for {watermark} in {index_dir}; deduplicating within this run only')
+            return False
+        with np.load(file_path) as arrays:
+            self.exact_keys = HashSet(arrays['exact_keys'], max_keys=self.max_keys)
+            if self.drop_conflicts:
+                if 'feature_keys' in arrays:
+                    self.feature_keys = HashSet(arrays['feature_keys'], max_keys=self.max_keys)
+                else:
+                    logging.warning(f'{file_path} was saved without conflict detection; conflicts are only detected within this run')
+        logging.info(f'Loaded deduplication index of {len(self.exact_keys)} rows from {file_path}')
+        return True
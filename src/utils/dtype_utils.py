@@ -0,0 +1,170 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.logger import logging
+from src.exception import MyException
+from src.constants import SCHEMA_FILE_PATH
+
+# schema.yaml column kinds -> default compact dtype when a column has no explicit entry under `dtypes`
+DEFAULT_KIND_DTYPES = {'int': 'int64', 'float': 'float32', 'category': 'category'}
+
+class DtypePlan:
+    """
+    Maps every schema column to the smallest safe in-memory dtype (uint8/int32/float32/Categorical), built from the
+    `dtypes` and `categories` sections of config/schema.yaml.
+
+    `apply` never loses information silently: integer columns holding NaN or values out of range are widened,
+    and category values missing from the vocabulary are appended as extra categories (with a warning).
+    """
+    def __init__(self, dtypes: Dict[str, str], categories: Optional[Dict[str, List[str]]] = None):
+        self.dtypes = dict(dtypes)
+        self.categories = {column: list(values) for column, values in (categories or {}).items()}
+
+    @classmethod
+    def from_schema(cls, schema_config: dict) -> 'DtypePlan':
+        explicit = schema_config.get('dtypes') or {}
+        dtypes = {}
+        for column in schema_config['columns']:
+            for name, kind in column.items():
+                dtypes[name] = explicit.get(name, DEFAULT_KIND_DTYPES.get(kind, 'object'))
+        return cls(dtypes=dtypes, categories=schema_config.get('categories'))
+
+    def category_dtype(self, column: str) -> pd.CategoricalDtype:
+        values = self.categories.get(column)
+        return pd.CategoricalDtype(categories=values) if values is not None else pd.CategoricalDtype()
+
+    @property
+    def read_dtypes(self) -> dict:
+        """
+        dtype argument for pd.read_csv. Integer columns are read as floats since they may hold NaN, and categories without a
+        fixed vocabulary (read_csv would turn unknown values into NaN); apply() narrows both afterwards.
+        """
+        read_dtypes = {}
+        for column, dtype in self.dtypes.items():
+            if dtype == 'category':
+                read_dtypes[column] = 'category'
+            elif np.issubdtype(np.dtype(dtype), np.integer):
+                # read_csv fails on NaN for integer dtypes; most integer columns are small enough to be exact in float32
+                read_dtypes[column] = 'float64' if np.dtype(dtype).itemsize >= 4 else 'float32'
+            else:
+                read_dtypes[column] = dtype
+        return read_dtypes
+
+    def _apply_integer(self, column: str, values: pd.Series, dtype: np.dtype) -> pd.Series:
+        if not pd.api.types.is_numeric_dtype(values):
+            return values # non-numeric values are left for validation to report
+        if values.isna().any():
+            return values.astype('float32' if dtype.itemsize <= 2 else 'float64')
+        info = np.iinfo(dtype)
+        if len(values) and (values.min() < info.min or values.max() > info.max or (values % 1 != 0).any()):
+            logging.warning(f'{column} does not fit {dtype}; downcasting to the smallest type that holds it')
+            if (values % 1 != 0).any():
+                return pd.to_numeric(values, downcast='float')
+            return pd.to_numeric(values, downcast='integer' if values.min() < 0 else 'unsigned')
+        return values.astype(dtype)
+
+    def _apply_category(self, column: str, values: pd.Series) -> pd.Series:
+        dtype = self.category_dtype(column)
+        if dtype.categories is not None:
+            unknown = pd.Index(values.dropna().unique()).difference(dtype.categories)
+            if len(unknown):
+                logging.warning(f'{column} has values outside the schema vocabulary: {list(unknown)[:10]}')
+                dtype = pd.CategoricalDtype(categories=list(dtype.categories) + sorted(map(str, unknown)))
+        return values.astype(dtype)
+
+    def apply(self, df: pd.DataFrame, copy: bool = False) -> pd.DataFrame:
+        """
+        Casts the planned columns of a dataframe to their compact dtypes; columns not in the plan are left unchanged.
+
+        Args:
+            df (pd.DataFrame): The dataframe to convert.
+            copy (bool): Work on a copy instead of replacing columns in place. Defaults to False.
+
+        Returns:
+            pd.DataFrame: The converted dataframe.
+        """
+        try:
+            if copy:
+                df = df.copy()
+            for column, planned in self.dtypes.items():
+                if column not in df.columns:
+                    continue
+                values = df[column]
+                if planned == 'category':
+                    df[column] = self._apply_category(column, values)
+                    continue
+                dtype = np.dtype(planned)
+                if values.dtype == dtype:
+                    continue
+                if np.issubdtype(dtype, np.integer):
+                    df[column] = self._apply_integer(column, values, dtype)
+                elif pd.api.types.is_numeric_dtype(values):
+                    df[column] = values.astype(dtype)
+            return df
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def read_csv(self, file_path: str, **kwargs) -> pd.DataFrame:
+        """
+        Reads a csv straight into the compact dtypes (no int64/object intermediate for the planned columns).
+        """
+        try:
+            header = pd.read_csv(file_path, nrows=0).columns
+            dtypes = {column: dtype for column, dtype in self.read_dtypes.items() if column in header}
+            try:
+                df = pd.read_csv(file_path, dtype=dtypes, **kwargs)
+            except ValueError as e:
+                # a value that does not parse as its planned type: read with inference and leave it for validation
+                logging.warning(f'Reading {file_path} with the dtype plan failed ({e}); falling back to inferred dtypes')
+                df = pd.read_csv(file_path, **kwargs)
+            return self.apply(df)
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def iter_csv(self, file_path: str, chunksize: int, **kwargs) -> Iterator[pd.DataFrame]:
+        """
+        Reads a csv in chunks of `chunksize` rows converted with apply(). Chunks are parsed with inferred dtypes (memory
+        is bounded by the chunk size), so a value that does not parse as its planned type is left for validation to report.
+        """
+        try:
+            for chunk in pd.read_csv(file_path, chunksize=chunksize, **kwargs):
+                yield self.apply(chunk)
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def estimate_frame_size(self, file_path: str, sample_rows: int = 2_000) -> Tuple[int, float]:
+        """
+        Estimates the number of rows of a csv and their in-memory bytes per row once read with this plan, from the
+        first `sample_rows` rows and the file size.
+        """
+        try:
+            with open(file_path, 'rb') as file_obj:
+                file_obj.readline() # header
+                sample = [line for _, line in zip(range(sample_rows), file_obj)]
+            if not sample:
+                return 0, 0.0
+            csv_bytes_per_row = sum(len(line) for line in sample) / len(sample)
+            frame = self.read_csv(file_path, nrows=len(sample))
+            return int(os.path.getsize(file_path) / csv_bytes_per_row), bytes_per_row(frame)
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+def get_dtype_plan(schema_file_path: str = SCHEMA_FILE_PATH) -> DtypePlan:
+    """
+    Returns the DtypePlan of a schema file, built once per process as part of its CompiledSchema.
+    """
+    from src.utils.schema_utils import get_compiled_schema
+    return get_compiled_schema(schema_file_path).dtype_plan
+
+def bytes_per_row(df: pd.DataFrame) -> float:
+    """
+    Returns the deep memory usage of a dataframe divided by its number of rows.
+    """
+    return float(df.memory_usage(deep=True).sum()) / max(len(df), 1)
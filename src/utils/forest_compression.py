@@ -0,0 +1,75 @@
+import copy
+import time
+import numpy as np
+from typing import List, Optional, Tuple
+
+def binary_f1(predicted: np.ndarray, y_true: np.ndarray) -> np.ndarray:
+    """
+    f1 of the positive class for one prediction vector (n,) or a stack of them (k, n), with boolean predictions.
+    """
+    y_true = y_true.astype(bool)
+    tp = predicted @ y_true.astype(np.float32)
+    denominator = predicted.sum(axis=-1) + y_true.sum()
+    return np.where(denominator > 0, 2 * tp / np.maximum(denominator, 1), 0.0)
+
+def tree_probabilities(forest: object, X: np.ndarray) -> np.ndarray:
+    """
+    Returns the positive class probability of every tree of a fitted binary forest as a (n_trees, n_rows) float32 array.
+    """
+    positive = int(np.flatnonzero(forest.classes_ == 1)[0]) if 1 in forest.classes_ else len(forest.classes_) - 1
+    X = np.asarray(X, dtype=np.float32) # the dtype trees predict on, converted once instead of once per tree
+    return np.stack([tree.predict_proba(X)[:, positive].astype(np.float32) for tree in forest.estimators_])
+
+def greedy_tree_order(selection_probabilities: np.ndarray, y_selection: np.ndarray,
+                      eval_probabilities: np.ndarray, y_eval: np.ndarray,
+                      target_f1: float, min_trees: int = 1) -> Tuple[List[int], List[float]]:
+    """
+    Greedy forward selection: repeatedly adds the tree that maximises f1 of the averaged ensemble on the selection rows,
+    and stops as soon as the ensemble of at least min_trees trees reaches target_f1 on the evaluation rows.
+
+    Returns:
+        Tuple[List[int], List[float]]: Selected tree indices in order, and the evaluation f1 after each addition.
+    """
+    n_trees = selection_probabilities.shape[0]
+    remaining = np.ones(n_trees, dtype=bool)
+    selection_sum = np.zeros(selection_probabilities.shape[1], dtype=np.float32)
+    eval_sum = np.zeros(eval_probabilities.shape[1], dtype=np.float32)
+    order, eval_f1 = [], []
+    for k in range(1, n_trees + 1):
+        candidates = np.flatnonzero(remaining)
+        # like RandomForestClassifier.predict: positive when the mean probability is above one half
+        predicted = (selection_sum[None, :] + selection_probabilities[candidates]) / k > 0.5
+        best = int(candidates[np.argmax(binary_f1(predicted, y_selection))])
+        remaining[best] = False
+        order.append(best)
+        selection_sum += selection_probabilities[best]
+        eval_sum += eval_probabilities[best]
+        eval_f1.append(float(binary_f1(eval_sum / k > 0.5, y_eval)))
+        if k >= min_trees and eval_f1[-1] >= target_f1:
+            break
+    return order, eval_f1
+
+def subset_forest(forest: object, tree_indices: List[int]) -> object:
+    """
+    Returns a copy of a fitted forest that keeps only the given trees (the trees themselves are shared, not copied).
+    """
+    compressed = copy.copy(forest)
+    compressed.estimators_ = [forest.estimators_[i] for i in tree_indices]
+    compressed.n_estimators = len(tree_indices)
+    return compressed
+
+def predict_latency_seconds(model: object, X: np.ndarray, repeats: int = 3) -> float:
+    """
+    Best of `repeats` wall times of model.predict(X).
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(X)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def sample_rows(n_rows: int, max_rows: Optional[int], random_state: int) -> np.ndarray:
+    if max_rows is None or n_rows <= max_rows:
+        return np.arange(n_rows)
+    return np.sort(np.random.default_rng(random_state).choice(n_rows, size=max_rows, replace=False))
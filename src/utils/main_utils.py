@@ -1,12 +1,21 @@
 import os
+import mmap
+import shutil
 import sys
 import yaml
 import dill
 import numpy as np
-from pandas import DataFrame
+from typing import TYPE_CHECKING, Optional
 from src.logger import logging
 from src.exception import MyException
 
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+def _artifact_codec_config():
+    from src.entity.config_entity import ArtifactCodecConfig
+    return ArtifactCodecConfig()
+
 def read_yaml_file(file_path: str) -> dict:
     """
     Reads a YAML file and returns the contents as a dictionary.
@@ -54,37 +63,76 @@ def load_object(file_path: str) -> object:
     """
     try:
         with open(file_path, 'rb') as file_obj:
-            obj = dill.load(file_obj)
-        return obj
+            from src.utils.codec_utils import get_codec, stream_codec_name
+            codec_name = stream_codec_name(file_obj)
+            if codec_name == 'none':
+                return dill.load(file_obj)
+            config = _artifact_codec_config()
+            with get_codec(codec_name, threads=config.threads).open_reader(file_obj) as reader:
+                return dill.load(reader)
     except Exception as e:
         raise MyException(e, sys)
-    
-def save_numpy_array_data(file_path: str, array: np.array):
+
+def save_numpy_array_data(file_path: str, array: np.array, codec: Optional[str] = None):
     """
     Saves a NumPy array to a file.
     
     Args:
         file_path (str): The path to the file where the array will be saved.
         array (np.array): The NumPy array to be saved.
+        codec (str, optional): 'zstd', 'lz4' or 'none' (a plain .npy). Defaults to ArtifactCodecConfig.array_codec.
     """
     try:
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        config = _artifact_codec_config()
+        codec = codec or config.array_codec
+        spilled = isinstance(array, np.memmap) and isinstance(array.base, mmap.mmap) and array.filename
+        if codec != 'none':
+            from src.utils.codec_utils import get_codec, write_block_array
+            write_block_array(file_path, array, get_codec(codec, level=config.level, threads=config.threads),
+                              block_bytes=config.block_bytes)
+            if spilled:
+                # the spill file of MemoryBudget.allocate is not needed once compressed
+                os.remove(array.filename)
+            return
+        if spilled:
+            # a whole .npy spilled to disk (src.utils.memory_utils.MemoryBudget.allocate): move it instead of copying
+            array.flush()
+            shutil.move(array.filename, file_path) # a rename when both are on the same file system
+            return
         with open(file_path, 'wb') as file_obj:
             np.save(file_obj, array)
     except Exception as e:
         raise MyException(e, sys)
     
-def load_numpy_array_data(file_path: str) -> np.array:
+def load_numpy_array_data(file_path: str, mmap_mode: Optional[str] = None) -> np.array:
     """
     Loads a NumPy array from a file.
     
     Args:
         file_path (str): The path to the file containing the NumPy array.
+        mmap_mode (str, optional): Memory-map the file instead of reading it (e.g. 'r'), see np.load. A compressed
+            array is decompressed into memory, or into a memory-mapped spill file if it does not fit the memory budget.
         
     Returns:
         np.array: The loaded NumPy array.
     """
     try:
+        from src.utils.codec_utils import BlockArrayReader, is_block_array
+        if is_block_array(file_path):
+            reader = BlockArrayReader(file_path, threads=_artifact_codec_config().threads)
+            if mmap_mode is None:
+                return reader.read()
+            from src.utils.memory_utils import get_memory_budget
+            out = get_memory_budget().allocate(reader.shape, dtype=reader.dtype, prefix='load',
+                                               spill_dir=os.path.dirname(file_path))
+            if isinstance(out, np.memmap):
+                os.remove(out.filename) # the mapping outlives the name, and the space is freed with the array
+            reader.read(out=out)
+            out.flags.writeable = mmap_mode != 'r'
+            return out
+        if mmap_mode is not None:
+            return np.load(file_path, mmap_mode=mmap_mode)
         with open(file_path, 'rb') as file_obj:
             return np.load(file_obj)
     except Exception as e:
@@ -94,13 +142,16 @@ def save_object(file_path: str, obj: object) -> None:
     logging.info('Entered the save_object method of MainUtils class')
     try:
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        config = _artifact_codec_config()
+        from src.utils.codec_utils import get_codec
         with open(file_path, 'wb') as file_obj:
-            dill.dump(obj, file_obj)
+            with get_codec(config.object_codec, level=config.level, threads=config.threads).open_writer(file_obj) as writer:
+                dill.dump(obj, writer)
         logging.info('Exited the save_object method of MainUtils class')
     except Exception as e:
         raise MyException(e, sys)
     
-def drop_columns(df: DataFrame, cols_to_drop: list) -> DataFrame:
+def drop_columns(df: 'DataFrame', cols_to_drop: list) -> 'DataFrame':
     """
     Drops specified columns from a DataFrame.
     
@@ -113,7 +164,7 @@ def drop_columns(df: DataFrame, cols_to_drop: list) -> DataFrame:
     """
     logging.info('Dropping columns')
     try:
-        df = df.drop(columns=cols_to_drop, axis=1)
+        df = df.drop(columns=cols_to_drop)
         logging.info('Exited drop_columns method of utils')
         return df
     except Exception as e:
@@ -0,0 +1,184 @@
+import os
+import sys
+import tempfile
+import threading
+import numpy as np
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from src.logger import logging
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from src.entity.config_entity import MemoryBudgetConfig
+
+def current_rss_bytes() -> int:
+    """
+    Resident set size of this process.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is a peak (KiB on Linux, bytes on macOS); the best available without /proc
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+def total_memory_bytes() -> int:
+    """
+    Memory available to this process: physical RAM, or the cgroup limit when the process runs in a smaller container.
+    """
+    total = None
+    try:
+        total = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (OSError, ValueError, AttributeError):
+        pass
+    for limit_file in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(limit_file) as file_obj:
+                value = file_obj.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and (total is None or int(value) < total):
+            total = int(value)
+        break
+    return total if total is not None else 8 * 1024**3
+
+def frame_bytes_per_row(df: 'pd.DataFrame') -> float:
+    """
+    Deep memory usage of a dataframe per row (0 for an empty one).
+    """
+    return float(df.memory_usage(deep=True).sum()) / len(df) if len(df) else 0.0
+
+class MemoryBudget:
+    """
+    Process-wide memory budget. Stages ask how many rows fit in what is left of it (the budget minus the current RSS)
+    instead of assuming the whole dataset fits, and switch to chunked or on-disk paths when it does not.
+    """
+    def __init__(self, limit_bytes: int, min_chunk_rows: int = 1_000, spill_dir: Optional[str] = None):
+        self.limit_bytes = int(limit_bytes)
+        self.min_chunk_rows = int(min_chunk_rows)
+        self.spill_dir = spill_dir
+
+    def headroom(self) -> int:
+        """
+        Bytes left in the budget right now (never negative).
+        """
+        return max(self.limit_bytes - current_rss_bytes(), 0)
+
+    def fits(self, nbytes: float, share: float = 1.0) -> bool:
+        """
+        True if `nbytes` more fit in `share` of the current headroom.
+        """
+        return nbytes <= self.headroom() * share
+
+    def rows_for(self, bytes_per_row: float, share: float = 0.5, max_rows: Optional[int] = None) -> int:
+        """
+        Number of rows of `bytes_per_row` (working set per row, overheads included) fitting in `share` of the headroom,
+        at least min_chunk_rows so progress is always made, at most max_rows.
+        """
+        rows = int(self.headroom() * share / bytes_per_row) if bytes_per_row > 0 else (max_rows or self.min_chunk_rows)
+        rows = max(rows, self.min_chunk_rows)
+        return min(rows, max_rows) if max_rows is not None else rows
+
+    def working_memory_mb(self, share: float = 0.25) -> int:
+        """
+        Value for sklearn's `working_memory` (MiB of temporary pairwise-distance blocks, 1024 by default) so nearest
+        neighbour searches (SMOTE, ENN) chunk their work to the budget.
+        """
+        return max(int(self.headroom() * share / 2**20), 16)
+
+    def allocate(self, shape: Tuple[int, ...], dtype='float64', share: float = 0.5, prefix: str = 'array',
+                 spill_dir: Optional[str] = None) -> np.ndarray:
+        """
+        Returns an uninitialised array, in memory if it fits in `share` of the headroom, otherwise a memory-mapped .npy
+        file in spill_dir (defaults to the budget's), which the OS pages out as needed. save_numpy_array_data moves a
+        spilled file into place; otherwise the caller deletes it (array.filename).
+        """
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if self.fits(nbytes, share=share):
+            return np.empty(shape, dtype=dtype)
+        spill_dir = spill_dir or self.spill_dir or tempfile.gettempdir()
+        os.makedirs(spill_dir, exist_ok=True)
+        fd, file_path = tempfile.mkstemp(prefix=f'.spill-{prefix}-', suffix='.npy', dir=spill_dir)
+        os.close(fd)
+        logging.info(f'{prefix}: {nbytes / 2**20:.0f} MiB does not fit the memory budget, spilling to {file_path}')
+        return np.lib.format.open_memmap(file_path, mode='w+', dtype=dtype, shape=shape)
+
+class AdaptiveChunkSizer:
+    """
+    Chunk size for a stream of dataframes: starts at `initial_rows` and after every chunk re-sizes to what fits in the
+    budget, using the observed bytes per row (smoothed) times `overhead`, the copies a stage makes of each chunk.
+    """
+    def __init__(self, budget: MemoryBudget, initial_rows: int, max_rows: Optional[int] = None, overhead: float = 4.0,
+                 share: float = 0.5):
+        self.budget = budget
+        self.rows = max(int(initial_rows), 1)
+        self.max_rows = max_rows
+        self.overhead = overhead
+        self.share = share
+        self.bytes_per_row: Optional[float] = None
+
+    def observe(self, df: 'pd.DataFrame') -> int:
+        """
+        Records a chunk and returns the size of the next one.
+        """
+        observed = frame_bytes_per_row(df)
+        if observed > 0:
+            self.bytes_per_row = observed if self.bytes_per_row is None else 0.7 * self.bytes_per_row + 0.3 * observed
+            rows = self.budget.rows_for(self.bytes_per_row * self.overhead, share=self.share, max_rows=self.max_rows)
+            if rows != self.rows:
+                logging.info(f'Chunk size {self.rows} -> {rows} rows ({self.bytes_per_row:.0f} bytes per row, '
+                             f'{self.budget.headroom() / 2**20:.0f} MiB headroom)')
+            self.rows = rows
+        return self.rows
+
+class PeakRssMonitor:
+    """
+    Context manager recording the peak RSS of the process while the enclosed block runs, sampled every `interval`
+    seconds on a daemon thread (ru_maxrss cannot be reset, so it only gives the peak since the process started).
+    """
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.start_rss = self.peak_rss = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, current_rss_bytes())
+
+    def __enter__(self) -> 'PeakRssMonitor':
+        self.start_rss = self.peak_rss = current_rss_bytes()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name='peak-rss-monitor', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, current_rss_bytes())
+
+    @property
+    def peak_delta(self) -> int:
+        """
+        Growth of the RSS over its value at the start of the block.
+        """
+        return max(self.peak_rss - self.start_rss, 0)
+
+def memory_budget_from_config(config: 'MemoryBudgetConfig') -> MemoryBudget:
+    limit = config.budget_bytes if config.budget_bytes > 0 else int(total_memory_bytes() * config.fraction)
+    return MemoryBudget(limit_bytes=limit, min_chunk_rows=config.min_chunk_rows, spill_dir=config.spill_dir)
+
+@lru_cache(maxsize=None)
+def get_memory_budget() -> MemoryBudget:
+    """
+    Returns the process memory budget, configured once from MemoryBudgetConfig (MEMORY_BUDGET_BYTES, or a fraction of
+    the RAM / cgroup limit).
+    """
+    from src.entity.config_entity import MemoryBudgetConfig
+    budget = memory_budget_from_config(MemoryBudgetConfig())
+    logging.info(f'Memory budget: {budget.limit_bytes / 2**20:.0f} MiB')
+    return budget
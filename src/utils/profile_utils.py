@@ -0,0 +1,278 @@
+import math
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# how a missing value is stored in the collection (documents_to_df turns both into NaN)
+NULL_VALUES = (None, 'na')
+
+def category_key(value: Any) -> str:
+    """
+    Key of a category value in a profile: integral numbers without a decimal part (1 and 1.0 are the same class
+    whether the value came from MongoDB or from a float pandas column), everything else as str.
+    """
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    if isinstance(value, np.generic):
+        value = value.item()
+    return str(value)
+
+@dataclass
+class NumericColumnProfile:
+    """
+    Statistics of a numeric column. Values are numbers, nulls (missing, null or 'na') or invalid (anything else).
+    bucket_edges holds n + 1 increasing edges of n buckets [edges[i], edges[i+1]), the last one closed; values outside
+    the edges (a profile computed with the edges of another) are counted in below_count and above_count.
+    """
+    count: int = 0
+    null_count: int = 0
+    invalid_count: int = 0
+    sum: float = 0.0
+    sum_squares: float = 0.0
+    min: Optional[float] = None
+    max: Optional[float] = None
+    bucket_edges: List[float] = field(default_factory=list)
+    bucket_counts: List[int] = field(default_factory=list)
+    below_count: int = 0
+    above_count: int = 0
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    @property
+    def std(self) -> Optional[float]:
+        """
+        Population standard deviation.
+        """
+        if not self.count:
+            return None
+        return math.sqrt(max(self.sum_squares / self.count - self.mean ** 2, 0.0))
+
+    def histogram(self) -> List[int]:
+        """
+        Bucket counts with the values below and above the edges as first and last bucket.
+        """
+        return [self.below_count] + list(self.bucket_counts) + [self.above_count]
+
+@dataclass
+class CategoricalColumnProfile:
+    null_count: int = 0
+    frequencies: Dict[str, int] = field(default_factory=dict) # category_key(value) -> number of rows
+
+@dataclass
+class DataProfile:
+    """
+    Profile of a set of documents: per-column statistics, null and invalid counts, numeric histograms, category
+    frequencies and the target rate. Computed on the MongoDB server (Poject1Data.profile_collection) or from a
+    dataframe (profile_frame) with the same result: counts, buckets and frequencies are identical, sums are correctly
+    rounded on both sides.
+    """
+    n_rows: int
+    numeric: Dict[str, NumericColumnProfile] = field(default_factory=dict)
+    categorical: Dict[str, CategoricalColumnProfile] = field(default_factory=dict)
+    target_column: Optional[str] = None
+    source: str = 'server' # 'server' or 'pandas'
+
+    @property
+    def target_rate(self) -> Optional[float]:
+        """
+        Share of the rows whose target is 1, among those with a target.
+        """
+        target = self.categorical.get(self.target_column) if self.target_column else None
+        if target is None or not sum(target.frequencies.values()):
+            return None
+        return target.frequencies.get('1', 0) / sum(target.frequencies.values())
+
+    def bucket_edges(self) -> Dict[str, List[float]]:
+        return {column: profile.bucket_edges for column, profile in self.numeric.items() if profile.bucket_edges}
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, profile: dict) -> 'DataProfile':
+        return cls(n_rows=profile['n_rows'],
+                   numeric={column: NumericColumnProfile(**values) for column, values in profile.get('numeric', {}).items()},
+                   categorical={column: CategoricalColumnProfile(**values) for column, values in profile.get('categorical', {}).items()},
+                   target_column=profile.get('target_column'), source=profile.get('source', 'server'))
+
+    def merge(self, other: 'DataProfile') -> 'DataProfile':
+        """
+        Profile of the documents of both profiles, which must share their bucket edges (other profiled with
+        reference=self). Columns profiled in only one of them are dropped.
+        """
+        numeric = {}
+        for column in self.numeric.keys() & other.numeric.keys():
+            a, b = self.numeric[column], other.numeric[column]
+            if a.bucket_edges != b.bucket_edges:
+                raise ValueError(f'Cannot merge profiles of {column} with different bucket edges')
+            numeric[column] = NumericColumnProfile(
+                count=a.count + b.count, null_count=a.null_count + b.null_count, invalid_count=a.invalid_count + b.invalid_count,
+                sum=math.fsum([a.sum, b.sum]), sum_squares=math.fsum([a.sum_squares, b.sum_squares]),
+                min=min((v for v in (a.min, b.min) if v is not None), default=None),
+                max=max((v for v in (a.max, b.max) if v is not None), default=None),
+                bucket_edges=list(a.bucket_edges), bucket_counts=[x + y for x, y in zip(a.bucket_counts, b.bucket_counts)],
+                below_count=a.below_count + b.below_count, above_count=a.above_count + b.above_count)
+        categorical = {}
+        for column in self.categorical.keys() & other.categorical.keys():
+            a, b = self.categorical[column], other.categorical[column]
+            frequencies = dict(a.frequencies)
+            for key, n in b.frequencies.items():
+                frequencies[key] = frequencies.get(key, 0) + n
+            categorical[column] = CategoricalColumnProfile(null_count=a.null_count + b.null_count, frequencies=frequencies)
+        return DataProfile(n_rows=self.n_rows + other.n_rows, numeric=numeric, categorical=categorical,
+                           target_column=self.target_column, source=self.source)
+
+def auto_bucket_edges(values: np.ndarray, buckets: int) -> Tuple[List[float], List[int]]:
+    """
+    Edges and counts of the buckets MongoDB's $bucketAuto (without granularity) builds over sorted values: buckets of
+    round(n / buckets) values, each extended to every value equal to its last one, the last bucket taking the rest.
+    Every edge is the first value of a bucket, the last one the largest value.
+    """
+    values = np.sort(values)
+    n = len(values)
+    if n == 0:
+        return [], []
+    size = max(math.floor(n / buckets + 0.5), 1) # std::round, half away from zero
+    starts, counts = [], []
+    start = 0
+    for bucket in range(buckets):
+        if start >= n:
+            break
+        end = n if bucket == buckets - 1 else int(np.searchsorted(values, values[min(start + size, n) - 1], side='right'))
+        starts.append(start)
+        counts.append(end - start)
+        start = end
+    return [float(values[i]) for i in starts] + [float(values[-1])], counts
+
+def bucket_boundaries(edges: Sequence[float]) -> List[float]:
+    """
+    $bucket boundaries counting values into the buckets of `edges`, plus one bucket below and one above them:
+    -inf, the edges with the last one moved just past it (so the last bucket is closed), +inf.
+    """
+    return [-math.inf] + [float(edge) for edge in edges[:-1]] + [math.nextafter(float(edges[-1]), math.inf), math.inf]
+
+def _numeric_values(series: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mask of the null values and mask of the numbers of a column, with the types MongoDB's $isNumber accepts.
+    """
+    null = series.isna().to_numpy()
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return null, ~null
+    is_number = series.map(lambda value: isinstance(value, (int, float, np.integer, np.floating))
+                           and not isinstance(value, (bool, np.bool_))).to_numpy(dtype=bool)
+    return null, is_number & ~null
+
+def profile_frame(df: pd.DataFrame, numeric_columns: List[str], categorical_columns: List[str],
+                  target_column: Optional[str] = None, buckets: int = 10, reference: Optional[DataProfile] = None) -> DataProfile:
+    """
+    Profile of a dataframe of documents (as documents_to_df returns them), identical to the one
+    Poject1Data.profile_collection computes on the server. With a reference profile, numeric columns are bucketed
+    with its edges (for drift); otherwise with the edges $bucketAuto would choose.
+    """
+    reference_edges = reference.bucket_edges() if reference is not None else {}
+    numeric = {}
+    for column in numeric_columns:
+        if column not in df.columns:
+            numeric[column] = NumericColumnProfile(null_count=len(df))
+            continue
+        null, is_number = _numeric_values(df[column])
+        values = df[column][is_number].to_numpy(dtype=np.float64)
+        profile = NumericColumnProfile(count=int(is_number.sum()), null_count=int(null.sum()),
+                                       invalid_count=int((~null & ~is_number).sum()),
+                                       sum=math.fsum(values), sum_squares=math.fsum(values * values),
+                                       min=float(values.min()) if len(values) else None,
+                                       max=float(values.max()) if len(values) else None)
+        if column in reference_edges:
+            boundaries = bucket_boundaries(reference_edges[column])
+            # like $bucket: [boundaries[i], boundaries[i + 1]), and +inf (outside every bucket) with the values above
+            positions = np.clip(np.searchsorted(boundaries, values, side='right') - 1, 0, len(boundaries) - 2)
+            counts = np.bincount(positions, minlength=len(boundaries) - 1)
+            profile.bucket_edges = list(reference_edges[column])
+            profile.below_count, profile.above_count = int(counts[0]), int(counts[-1])
+            profile.bucket_counts = [int(n) for n in counts[1:-1]]
+        else:
+            profile.bucket_edges, profile.bucket_counts = auto_bucket_edges(values, buckets)
+        numeric[column] = profile
+
+    categorical = {}
+    for column in dict.fromkeys(categorical_columns + ([target_column] if target_column else [])):
+        if column not in df.columns:
+            categorical[column] = CategoricalColumnProfile(null_count=len(df))
+            continue
+        series = df[column]
+        frequencies = {}
+        for value, n in series.dropna().value_counts(sort=False).items():
+            key = category_key(value)
+            frequencies[key] = frequencies.get(key, 0) + int(n)
+        categorical[column] = CategoricalColumnProfile(null_count=int(series.isna().sum()),
+                                                       frequencies=dict(sorted(frequencies.items())))
+    return DataProfile(n_rows=len(df), numeric=numeric, categorical=categorical, target_column=target_column, source='pandas')
+
+def auto_bucket_edges_of_chunks(chunks: Iterable[pd.DataFrame], numeric_columns: List[str], buckets: int = 10
+                                ) -> Dict[str, List[float]]:
+    """
+    The $bucketAuto edges (auto_bucket_edges) of numeric columns over a stream of chunks, which profile_chunks then
+    buckets every chunk with. Only the numbers of these columns are kept (8 bytes each), not the chunks.
+    """
+    values = {column: [] for column in numeric_columns}
+    for chunk in chunks:
+        for column in numeric_columns:
+            if column in chunk.columns:
+                _, is_number = _numeric_values(chunk[column])
+                values[column].append(chunk[column][is_number].to_numpy(dtype=np.float64))
+    return {column: auto_bucket_edges(np.concatenate(arrays) if arrays else np.empty(0), buckets)[0]
+            for column, arrays in values.items()}
+
+def profile_chunks(chunks: Iterable[pd.DataFrame], numeric_columns: List[str], categorical_columns: List[str],
+                   target_column: Optional[str] = None, bucket_edges: Optional[Dict[str, List[float]]] = None) -> DataProfile:
+    """
+    profile_frame of the concatenation of `chunks`, one chunk in memory at a time: the chunk profiles are merged
+    (DataProfile.merge), so every numeric column is bucketed with fixed edges, `bucket_edges` (a reference profile's,
+    or auto_bucket_edges_of_chunks). Counts, histograms and frequencies equal those of profile_frame; sums are merged
+    with fsum per chunk and may differ from it in the last bit.
+    """
+    reference = DataProfile(n_rows=0, numeric={column: NumericColumnProfile(bucket_edges=list(edges))
+                                               for column, edges in (bucket_edges or {}).items()})
+    profile = None
+    for chunk in chunks:
+        chunk_profile = profile_frame(chunk, numeric_columns, categorical_columns, target_column, reference=reference)
+        profile = chunk_profile if profile is None else profile.merge(chunk_profile)
+    if profile is None:
+        columns = list(dict.fromkeys(numeric_columns + categorical_columns + ([target_column] if target_column else [])))
+        return profile_frame(pd.DataFrame(columns=columns), numeric_columns, categorical_columns, target_column, reference=reference)
+    for column_profile in profile.categorical.values():
+        column_profile.frequencies = dict(sorted(column_profile.frequencies.items()))
+    return profile
+
+def population_stability_index(expected: Sequence[float], actual: Sequence[float], floor: float = 1e-4) -> float:
+    """
+    PSI between two histograms over the same buckets: sum((a - e) * ln(a / e)) over the bucket shares, each share
+    floored so empty buckets count without dividing by zero. Below 0.1 is stable, above 0.2 a significant shift.
+    """
+    expected, actual = np.asarray(expected, dtype=np.float64), np.asarray(actual, dtype=np.float64)
+    if expected.sum() == 0 or actual.sum() == 0:
+        return 0.0
+    e = np.clip(expected / expected.sum(), floor, None)
+    a = np.clip(actual / actual.sum(), floor, None)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+def profile_drift(reference: DataProfile, current: DataProfile) -> Dict[str, float]:
+    """
+    PSI of every column profiled in both: numeric columns over the reference buckets (current must have been profiled
+    with reference=reference), categorical columns over the union of their categories.
+    """
+    drift = {}
+    for column, expected in reference.numeric.items():
+        actual = current.numeric.get(column)
+        if actual is not None and expected.bucket_edges and actual.bucket_edges == expected.bucket_edges:
+            drift[column] = population_stability_index(expected.histogram(), actual.histogram())
+    for column, expected in reference.categorical.items():
+        actual = current.categorical.get(column)
+        if actual is not None:
+            keys = sorted(expected.frequencies.keys() | actual.frequencies.keys())
+            drift[column] = population_stability_index([expected.frequencies.get(key, 0) for key in keys],
+                                                       [actual.frequencies.get(key, 0) for key in keys])
+    return drift
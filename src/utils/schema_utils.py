@@ -0,0 +1,75 @@
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from src.constants import SCHEMA_FILE_PATH, TARGET_COLUMN
+from src.utils.main_utils import read_yaml_file
+from src.utils.dtype_utils import DtypePlan
+from src.utils.validation_utils import CompiledValidator
+
+class CompiledSchema:
+    """
+    config/schema.yaml compiled once into what training and serving look up on every call: column lists, column kinds,
+    the DtypePlan, category vocabularies with their codes and ready-built row validators that check the vocabularies.
+    Use get_compiled_schema() to share one instance per process; treat it as read-only.
+    """
+    def __init__(self, schema_config: dict, dtype_plan: Optional[DtypePlan] = None):
+        self.config = schema_config
+        self.column_kinds: Dict[str, str] = {name: kind for column in schema_config['columns'] for name, kind in column.items()}
+        self.columns: List[str] = list(self.column_kinds)
+        self.numerical_columns: List[str] = list(schema_config.get('numerical_columns') or [])
+        self.categorical_columns: List[str] = list(schema_config.get('categorical_columns') or [])
+        self.drop_columns: str = schema_config.get('drop_columns')
+        self.num_features: List[str] = list(schema_config.get('num_features') or [])
+        self.mm_columns: List[str] = list(schema_config.get('mm_columns') or [])
+        self.dtype_plan = dtype_plan if dtype_plan is not None else DtypePlan.from_schema(schema_config)
+        self.categories: Dict[str, List[str]] = {column: list(values) for column, values in (schema_config.get('categories') or {}).items()}
+        # value -> code in vocabulary order, the codes of the Categorical dtypes the DtypePlan produces
+        self.category_codes: Dict[str, Dict[str, int]] = {column: {value: code for code, value in enumerate(values)}
+                                                          for column, values in self.categories.items()}
+
+        expected = self.numerical_columns + self.categorical_columns
+        self.row_validator = CompiledValidator({column: self.column_kinds.get(column, 'category') for column in expected},
+                                               allowed_values={column: values for column, values in self.categories.items()
+                                                               if column in expected})
+        self._request_validator: Optional[CompiledValidator] = None
+
+    @property
+    def feature_columns(self) -> List[str]:
+        """
+        Input columns of a record: every schema column except the target.
+        """
+        return [column for column in self.columns if column != TARGET_COLUMN]
+
+    @property
+    def request_validator(self) -> CompiledValidator:
+        """
+        Validator of the model input columns (custom transformations applied) accepted by the prediction service.
+        """
+        if self._request_validator is None:
+            from src.pipeline.prediction_pipeline import MODEL_INPUT_COLUMN_KINDS
+            self._request_validator = CompiledValidator(MODEL_INPUT_COLUMN_KINDS,
+                                                        allowed_values=self.model_input_allowed_values(MODEL_INPUT_COLUMN_KINDS))
+        return self._request_validator
+
+    def model_input_allowed_values(self, columns: List[str]) -> Dict[str, List[int]]:
+        """
+        Values the vocabularies allow in model input columns: the codes of a mapped category column (Gender) and 0/1
+        in the dummy columns of the others.
+        """
+        allowed = {}
+        for column in columns:
+            if column in self.category_codes:
+                allowed[column] = sorted(self.category_codes[column].values())
+            elif any(column.startswith(f'{category}_') for category in self.categories):
+                allowed[column] = [0, 1]
+        return allowed
+
+@lru_cache(maxsize=None)
+def _compile_schema(schema_file_path: str) -> CompiledSchema:
+    return CompiledSchema(read_yaml_file(file_path=schema_file_path))
+
+def get_compiled_schema(schema_file_path: str = SCHEMA_FILE_PATH) -> CompiledSchema:
+    """
+    Returns the CompiledSchema of a schema file, built once per process (get_dtype_plan returns its DtypePlan).
+    """
+    return _compile_schema(schema_file_path) # one cache key whether or not the path was passed
@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional
+from dataclasses import dataclass, field
+
+from src.exception import RowValidationError
+
+NUMERIC_KINDS = ('int', 'float')
+
+@dataclass
+class RowValidationReport:
+    """
+    Structured result of validating a batch of rows: one entry per (row, column, error), built with column-wise
+    array operations instead of raising on the first bad row.
+    """
+    n_rows: int
+    invalid_mask: np.ndarray
+    errors: pd.DataFrame
+    missing_columns: List[str] = field(default_factory=list)
+
+    @property
+    def n_invalid(self) -> int:
+        return int(self.invalid_mask.sum())
+
+    @property
+    def is_valid(self) -> bool:
+        return self.n_invalid == 0 and not self.missing_columns
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """
+        Returns {column: {error: number of rows}}.
+        """
+        counts = {}
+        for (column, error), n in self.errors.groupby(['column', 'error'], sort=True).size().items():
+            counts.setdefault(column, {})[error] = int(n)
+        return counts
+
+    def to_dict(self) -> dict:
+        return {
+            'n_rows': self.n_rows,
+            'n_invalid_rows': self.n_invalid,
+            'missing_columns': list(self.missing_columns),
+            'errors': self.counts(),
+        }
+
+    def summary(self, max_examples: int = 5) -> str:
+        if self.is_valid:
+            return f'All {self.n_rows} rows are valid'
+        parts = [f'{self.n_invalid} of {self.n_rows} rows are invalid']
+        if self.missing_columns:
+            parts.append(f'missing columns: {self.missing_columns}')
+        for column, errors in self.counts().items():
+            for error, n in errors.items():
+                rows = self.errors.loc[(self.errors['column'] == column) & (self.errors['error'] == error), 'row'].head(max_examples).tolist()
+                parts.append(f'{column}: {error} in {n} rows (e.g. rows {rows})')
+        return '; '.join(parts)
+
+    @classmethod
+    def concat(cls, reports: List['RowValidationReport']) -> 'RowValidationReport':
+        """
+        Combines the reports of consecutive chunks of one batch; row numbers are made relative to the whole batch.
+        """
+        offsets = np.cumsum([0] + [report.n_rows for report in reports])
+        errors = [report.errors.assign(row=report.errors['row'] + offset) for report, offset in zip(reports, offsets)]
+        missing = sorted({column for report in reports for column in report.missing_columns})
+        return cls(n_rows=int(offsets[-1]),
+                   invalid_mask=np.concatenate([report.invalid_mask for report in reports]) if reports else np.zeros(0, dtype=bool),
+                   errors=pd.concat(errors, ignore_index=True) if errors else pd.DataFrame({'row': [], 'column': [], 'error': []}),
+                   missing_columns=missing)
+
+    def raise_if_invalid(self) -> None:
+        """
+        Raises a single RowValidationError carrying this report if any row failed.
+        """
+        if not self.is_valid:
+            raise RowValidationError(self)
+
+def validate_rows(df: pd.DataFrame, column_kinds: Dict[str, str],
+                  allowed_values: Optional[Dict[str, Iterable]] = None) -> RowValidationReport:
+    """
+    Validates every row of a dataframe against the expected column kinds in one vectorized pass per column.
+
+    Args:
+        df (pd.DataFrame): The batch to validate.
+        column_kinds (dict): Expected kind per column: 'int', 'float' or 'category' (as in schema.yaml).
+        allowed_values (dict, optional): Allowed values per column (e.g. category vocabularies).
+
+    Returns:
+        RowValidationReport: Every failing (row, column, error) plus a per-row invalid mask.
+    """
+    allowed_values = allowed_values or {}
+    n_rows = len(df)
+    invalid_mask = np.zeros(n_rows, dtype=bool)
+    missing_columns = [column for column in column_kinds if column not in df.columns]
+    if missing_columns:
+        invalid_mask[:] = True
+
+    rows, columns, errors = [], [], []
+    def collect(column: str, error: str, mask: np.ndarray) -> None:
+        idx = np.flatnonzero(mask)
+        if len(idx):
+            invalid_mask[idx] = True
+            rows.append(idx)
+            columns.append(np.full(len(idx), column, dtype=object))
+            errors.append(np.full(len(idx), error, dtype=object))
+
+    for column, kind in column_kinds.items():
+        if column in missing_columns:
+            continue
+        values = df[column]
+        is_null = values.isna().to_numpy()
+        collect(column, 'null', is_null)
+
+        if kind in NUMERIC_KINDS:
+            numeric = pd.to_numeric(values, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+            not_numeric = np.isnan(numeric) & ~is_null
+            collect(column, 'not_numeric', not_numeric)
+            if kind == 'int':
+                with np.errstate(invalid='ignore'):
+                    collect(column, 'not_integer', ~np.isnan(numeric) & (numeric != np.round(numeric)))
+        if column in allowed_values:
+            collect(column, 'unknown_value', ~values.isin(list(allowed_values[column])).to_numpy() & ~is_null)
+
+    errors_df = pd.DataFrame({
+        'row': np.concatenate(rows) if rows else np.empty(0, dtype=np.int64),
+        'column': np.concatenate(columns) if columns else np.empty(0, dtype=object),
+        'error': np.concatenate(errors) if errors else np.empty(0, dtype=object),
+    })
+    return RowValidationReport(n_rows=n_rows, invalid_mask=invalid_mask, errors=errors_df, missing_columns=missing_columns)
+
+class CompiledValidator:
+    """
+    validate_rows for a fixed set of columns, with the column groups worked out once. A clean batch (the common case
+    when serving) is accepted after a few array operations per column on the numpy values; only a batch that fails
+    them goes through validate_rows to build the per-row report.
+    """
+    def __init__(self, column_kinds: Dict[str, str], allowed_values: Optional[Dict[str, Iterable]] = None):
+        self.column_kinds = dict(column_kinds)
+        self.allowed_values = {column: pd.Index(list(values)) for column, values in (allowed_values or {}).items()}
+        self.columns = list(self.column_kinds)
+        self.numeric_columns = [column for column, kind in self.column_kinds.items() if kind in NUMERIC_KINDS]
+        self.int_columns = frozenset(column for column, kind in self.column_kinds.items() if kind == 'int')
+        self.other_columns = [column for column in self.columns if column not in self.numeric_columns]
+        self._empty_errors = pd.DataFrame({'row': np.empty(0, dtype=np.int64), 'column': np.empty(0, dtype=object),
+                                           'error': np.empty(0, dtype=object)})
+
+    def is_clean(self, df: pd.DataFrame) -> bool:
+        """
+        True if every row is valid. False means "not proven clean" (e.g. a numeric column with object dtype), not invalid.
+        """
+        if any(column not in df.columns for column in self.columns):
+            return False
+        if not self.other_columns:
+            # all numeric (e.g. model inputs): one conversion of the whole frame, cheaper than any per-column access
+            frame = df if len(df.columns) == len(self.columns) else df[self.columns]
+            try:
+                values = frame.to_numpy(dtype='float64')
+            except (TypeError, ValueError):
+                return False
+            if np.isnan(values).any():
+                return False
+            is_int = np.array([column in self.int_columns for column in frame.columns], dtype=bool)
+            return not (values[:, is_int] != np.round(values[:, is_int])).any() and self._allowed(df)
+        for column in self.numeric_columns:
+            values = df[column].to_numpy()
+            if values.dtype.kind not in 'biuf':
+                return False
+            if values.dtype.kind == 'f':
+                if np.isnan(values).any():
+                    return False
+                if column in self.int_columns and (values != np.round(values)).any():
+                    return False
+        for column in self.other_columns:
+            if df[column].isna().any():
+                return False
+        return self._allowed(df)
+
+    def _allowed(self, df: pd.DataFrame) -> bool:
+        return all(df[column].isin(allowed).all() for column, allowed in self.allowed_values.items())
+
+    def validate(self, df: pd.DataFrame) -> RowValidationReport:
+        if self.is_clean(df):
+            # the empty errors frame is shared by every clean report: reports are read, never modified
+            return RowValidationReport(n_rows=len(df), invalid_mask=np.zeros(len(df), dtype=bool), errors=self._empty_errors)
+        return validate_rows(df, self.column_kinds, self.allowed_values)
@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# keep stores, spills and logs of the tests out of the project tree; set before any src module reads its config
+_TEST_DIR = tempfile.mkdtemp(prefix='project1-tests-')
+os.environ.setdefault('FEATURE_LOOKUP_DIR', os.path.join(_TEST_DIR, 'feature_lookup'))
+os.environ.setdefault('DATA_INGESTION_DEDUP_INDEX_DIR', os.path.join(_TEST_DIR, 'dedup_index'))
+os.environ.setdefault('MEMORY_BUDGET_SPILL_DIR', os.path.join(_TEST_DIR, 'spill'))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks')) # synthetic_data
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    async def to_list(self, length=None):
+        documents = list(self._cursor)
+        return documents if length is None else documents[:length]
+
+class AsyncCollection:
+    """
+    Async facade of a mongomock collection with the methods AsyncPoject1Data uses.
+    """
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find(self, *args, **kwargs) -> AsyncCursor:
+        return AsyncCursor(self.collection.find(*args, **kwargs))
+
+    async def create_index(self, keys, **kwargs):
+        return self.collection.create_index(keys, **kwargs)
+
+@pytest.fixture
+def mongo_client():
+    mongomock = pytest.importorskip('mongomock')
+    return mongomock.MongoClient()
+
+@pytest.fixture
+def async_collection_factory(mongo_client):
+    return lambda database_name, collection_name: AsyncCollection(mongo_client[database_name][collection_name])
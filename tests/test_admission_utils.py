@@ -0,0 +1,120 @@
+import asyncio
+import math
+import threading
+
+import pytest
+
+from src.utils.admission_utils import AdmissionController, Histogram, ServiceOverloaded, ServiceTimeEstimator
+
+def _blocking_call(release: threading.Event):
+    def call():
+        release.wait(5)
+        return 'done'
+    return call
+
+async def _occupy(controller: AdmissionController, release: threading.Event, **kwargs) -> asyncio.Task:
+    # a call holding the only scoring thread until `release` is set
+    task = asyncio.create_task(controller.run(_blocking_call(release), **kwargs))
+    await asyncio.sleep(0.01)
+    return task
+
+def test_full_queue_is_shed_with_429():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=1, deadline_seconds=5)
+        release = threading.Event()
+        running = await _occupy(controller, release)
+        queued = await _occupy(controller, release)
+        assert (controller.in_flight, controller.queue_depth) == (1, 1)
+        with pytest.raises(ServiceOverloaded) as rejected:
+            await controller.run(lambda: 'never')
+        release.set()
+        return rejected.value, await asyncio.gather(running, queued), controller
+
+    rejected, results, controller = asyncio.run(scenario())
+    assert (rejected.status_code, rejected.reason) == (429, 'queue_full')
+    assert results == ['done', 'done']
+    assert controller.shed['queue_full'] == 1 and controller.admitted == controller.completed == 2
+    assert (controller.in_flight, controller.queue_depth) == (0, 0)
+
+def test_request_that_cannot_meet_its_deadline_is_shed_with_503_before_queueing():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=10,
+                                         estimator=ServiceTimeEstimator(initial_seconds=0.5))
+        release = threading.Event()
+        running = await _occupy(controller, release)
+        with pytest.raises(ServiceOverloaded) as rejected:
+            await controller.run(lambda: 'never', deadline=0.1)
+        depth = controller.queue_depth
+        release.set()
+        await running
+        return rejected.value, depth, controller
+
+    rejected, depth, controller = asyncio.run(scenario())
+    assert (rejected.status_code, rejected.reason) == (503, 'deadline')
+    assert 0 < rejected.retry_after <= 0.5 # the scoring left of the running call
+    assert depth == 0 and controller.shed['deadline'] == 1
+
+def test_request_whose_deadline_passes_in_the_queue_is_dropped():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=10,
+                                         estimator=ServiceTimeEstimator(initial_seconds=0.01))
+        release = threading.Event()
+        running = await _occupy(controller, release)
+        called = []
+        queued = asyncio.create_task(controller.run(lambda: called.append(True), deadline=0.1))
+        await asyncio.sleep(0.2) # longer than the deadline the estimate promised
+        release.set()
+        await running
+        with pytest.raises(ServiceOverloaded) as dropped:
+            await queued
+        return dropped.value, called, controller
+
+    dropped, called, controller = asyncio.run(scenario())
+    assert (dropped.status_code, dropped.reason) == (503, 'expired')
+    assert called == [] and controller.shed['expired'] == 1
+    assert controller.in_flight == 0 # the slot handed over to the dropped request is released
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=1, deadline_seconds=5)
+        release = threading.Event()
+        running = await _occupy(controller, release)
+        queued = await _occupy(controller, release)
+        queued.cancel()
+        await asyncio.sleep(0)
+        depth = controller.queue_depth
+        release.set()
+        await running
+        return depth, controller
+
+    depth, controller = asyncio.run(scenario())
+    assert depth == 0 and controller.in_flight == 0
+
+@pytest.mark.parametrize('header, expected', [(None, 1.0), ('250', 0.25), ('junk', 1.0), ('-5', 1.0), ('60000', 30.0)])
+def test_deadline_header_is_clamped(header, expected):
+    assert AdmissionController(1, 1, deadline_seconds=1.0, max_deadline_seconds=30.0).deadline(header) == expected
+
+def test_estimator_fits_fixed_and_per_row_time():
+    estimator = ServiceTimeEstimator(initial_seconds=0.05)
+    assert estimator.estimate(100) == 0.05
+    for rows in (10, 100, 1000) * 10:
+        estimator.observe(rows, 0.002 + 0.0001 * rows)
+    assert estimator.estimate(500) == pytest.approx(0.052)
+
+def test_histogram_exposition_is_cumulative():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+    assert histogram.exposition('wait') == ['wait_bucket{le="0.1"} 1', 'wait_bucket{le="1.0"} 3',
+                                            'wait_bucket{le="+Inf"} 4', 'wait_sum 4.25', 'wait_count 4']
+    assert histogram.quantile(0.5) == 1.0 and histogram.quantile(1.0) == math.inf
+
+def test_exposition_reports_shed_requests():
+    controller = AdmissionController(max_concurrency=1, max_queue=0)
+    controller.in_flight = 1 # the only thread is busy and nothing may wait
+    with pytest.raises(ServiceOverloaded):
+        controller.check_queue()
+    lines = controller.exposition().splitlines()
+    assert 'prediction_requests_shed_total{reason="queue_full"} 1' in lines
+    assert 'prediction_requests_shed_total{reason="deadline"} 0' in lines
+    assert 'prediction_in_flight 1' in lines and '# TYPE prediction_queue_wait_seconds histogram' in lines
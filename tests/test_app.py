@@ -0,0 +1,145 @@
+import os
+
+import pytest
+
+from src.constants import PREDICTION_MODEL_FILE_PATH_ENV_KEY, SERVING_DEADLINE_HEADER
+from serving_benchmark import train_model
+
+@pytest.fixture(scope='module')
+def service(tmp_path_factory):
+    from fastapi.testclient import TestClient
+    model_file_path = str(tmp_path_factory.mktemp('model') / 'model.pkl')
+    features = train_model(rows=2000, n_estimators=5, model_file_path=model_file_path)
+    os.environ[PREDICTION_MODEL_FILE_PATH_ENV_KEY] = model_file_path
+    import app
+    return TestClient(app.app), features
+
+def test_json_records_are_scored(service):
+    client, features = service
+    response = client.post('/predict', json=features.head(3).to_dict(orient='records'))
+    assert response.status_code == 200 and len(response.json()['predictions']) == 3
+
+@pytest.mark.parametrize('body', [b'{"Age": [1,', b'42', b'"text"', b'[1, 2]', b'{"Age": 30}', b'\xff\xfe'])
+def test_undecodable_json_is_a_bad_request(service, body):
+    client, _ = service
+    response = client.post('/predict', content=body, headers={'content-type': 'application/json'})
+    assert response.status_code == 400 and response.json()['detail']
+
+@pytest.mark.parametrize('content_type', ['application/vnd.apache.arrow.stream', 'application/vnd.apache.arrow.file',
+                                          'application/vnd.apache.parquet'])
+def test_corrupt_batch_bodies_are_bad_requests(service, content_type):
+    client, _ = service
+    response = client.post('/predict/batch', content=b'definitely not columnar data', headers={'content-type': content_type})
+    assert response.status_code == 400 and 'decode' in response.json()['detail']
+
+def test_arrow_batch_is_scored(service):
+    import pyarrow as pa
+    client, features = service
+    sink = pa.BufferOutputStream()
+    table = pa.Table.from_pandas(features.head(4), preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    response = client.post('/predict/batch', content=sink.getvalue().to_pybytes(),
+                           headers={'content-type': 'application/vnd.apache.arrow.stream'})
+    assert response.status_code == 200 and len(response.json()['predictions']) == 4
+
+def test_customer_request_must_be_an_object(service):
+    client, _ = service
+    response = client.post('/predict/customers', json=[1, 2])
+    assert response.status_code == 400
+
+@pytest.fixture
+def feature_store(service, tmp_path, monkeypatch):
+    """
+    Points the served classifier at a store holding customers 1, 2 and 3.
+    """
+    import numpy as np
+    import app
+    from src.data_access.feature_lookup import FeatureLookupReader, FeatureLookupStore
+    _, features = service
+    columns = list(app.classifier.input_columns)
+    store = FeatureLookupStore(str(tmp_path / 'store'))
+    writer = store.writer(columns)
+    writer.append(np.array([1, 2, 3]), features[columns].head(3).to_numpy(dtype=np.float32))
+    store.publish(writer.finish(), columns, replace=True)
+    monkeypatch.setattr(app.classifier, '_feature_lookup', FeatureLookupReader(store.store_dir))
+
+@pytest.fixture
+def no_feature_store(tmp_path, monkeypatch):
+    import app
+    from src.data_access.feature_lookup import FeatureLookupReader
+    monkeypatch.setattr(app.classifier, '_feature_lookup', FeatureLookupReader(str(tmp_path / 'nothing_published')))
+
+def test_customers_are_scored_from_the_store(service, feature_store):
+    client, _ = service
+    response = client.post('/predict/customers', json={'customer_ids': [3, 99, 1]})
+    assert response.status_code == 200
+    assert response.json()['customer_ids'] == [3, 1] and response.json()['missing'] == [99]
+    assert client.get('/customers/99/prediction').status_code == 404
+
+@pytest.mark.parametrize('customer_ids', [['a'], [1, 2.5], [None], 'a'])
+@pytest.mark.parametrize('store', ['feature_store', 'no_feature_store'])
+def test_non_integer_customer_ids_are_unprocessable(service, request, store, customer_ids):
+    request.getfixturevalue(store)
+    client, _ = service
+    response = client.post('/predict/customers', json={'customer_ids': customer_ids})
+    assert response.status_code == 422
+
+def test_missing_store_is_unavailable(service, no_feature_store):
+    client, _ = service
+    response = client.post('/predict/customers', json={'customer_ids': [1]})
+    assert response.status_code == 503
+    assert client.get('/customers/1/prediction').status_code == 503
+
+def test_values_outside_the_vocabularies_are_unprocessable(service):
+    client, features = service
+    records = features.head(2).to_dict(orient='records')
+    records[1]['Vehicle_Damage_Yes'] = 2
+    response = client.post('/predict', json=records)
+    assert response.status_code == 422
+    assert response.json()['errors'] == {'Vehicle_Damage_Yes': {'unknown_value': 1}}
+
+@pytest.fixture
+def busy_admission(service, monkeypatch):
+    """
+    Serves with admission control whose only scoring thread is taken, and a slow estimated scoring time.
+    """
+    import app
+    from src.utils.admission_utils import AdmissionController, ServiceTimeEstimator
+    admission = AdmissionController(max_concurrency=1, max_queue=1, deadline_seconds=1.0,
+                                    estimator=ServiceTimeEstimator(initial_seconds=2.0))
+    admission.in_flight = 1
+    monkeypatch.setattr(app, 'admission', admission)
+    return admission
+
+def test_requests_over_the_deadline_are_unavailable(service, busy_admission):
+    client, features = service
+    busy_admission.deadline_seconds = 60.0 # only the header's deadline is too short
+    response = client.post('/predict', json=features.head(1).to_dict(orient='records'),
+                           headers={SERVING_DEADLINE_HEADER: '500'})
+    assert response.status_code == 503 and response.json()['reason'] == 'deadline'
+    assert int(response.headers['retry-after']) >= 1
+
+def test_full_queue_is_too_many_requests(service, busy_admission):
+    client, features = service
+    busy_admission.max_queue = 0
+    response = client.post('/predict', json=features.head(1).to_dict(orient='records'))
+    assert response.status_code == 429 and response.json()['reason'] == 'queue_full'
+    assert int(response.headers['retry-after']) >= 1
+
+def test_metrics_expose_the_shed_requests(service, busy_admission):
+    client, features = service
+    busy_admission.max_queue = 0
+    client.post('/predict', json=features.head(1).to_dict(orient='records'))
+    response = client.get('/metrics')
+    assert response.status_code == 200 and response.headers['content-type'].startswith('text/plain')
+    assert 'prediction_requests_shed_total{reason="queue_full"} 1' in response.text.splitlines()
+
+def test_admitted_requests_are_measured(service, monkeypatch):
+    import app
+    from src.utils.admission_utils import AdmissionController
+    monkeypatch.setattr(app, 'admission', AdmissionController(max_concurrency=1, max_queue=1, deadline_seconds=30))
+    client, features = service
+    assert client.post('/predict', json=features.head(2).to_dict(orient='records')).status_code == 200
+    lines = client.get('/metrics').text.splitlines()
+    assert 'prediction_requests_admitted_total 1' in lines and 'prediction_service_seconds_count 1' in lines
@@ -0,0 +1,62 @@
+import os
+import json
+import subprocess
+
+import pytest
+
+from src.constants import ARTIFACT_IN_PROGRESS_FILE_NAME
+from src.entity.config_entity import ArtifactRetentionConfig
+from src.utils.artifact_manager import (ArtifactManager, clear_run_in_progress, mark_run_in_progress,
+                                        run_in_progress)
+
+RUNS = ['01_01_2026_00_00_00', '01_02_2026_00_00_00', '01_03_2026_00_00_00', '01_04_2026_00_00_00']
+
+@pytest.fixture
+def artifact_dir(tmp_path):
+    for run_id in RUNS:
+        os.makedirs(tmp_path / 'artifact' / run_id)
+        with open(tmp_path / 'artifact' / run_id / 'preprocessing.pkl', 'wb') as file_obj:
+            file_obj.write(b'same bytes in every run')
+    return str(tmp_path / 'artifact')
+
+def _manager(artifact_dir: str, tmp_path) -> ArtifactManager:
+    config = ArtifactRetentionConfig(artifact_dir=artifact_dir, log_dir=str(tmp_path / 'logs'), keep_last=1,
+                                     max_age_days=10_000, max_total_bytes=2**40,
+                                     production_model_file_path=str(tmp_path / 'no_model.pkl'))
+    return ArtifactManager(config)
+
+def _dead_pid() -> int:
+    process = subprocess.Popen(['true'])
+    process.wait()
+    return process.pid
+
+def test_markers_follow_the_owning_process(tmp_path):
+    run_dir = str(tmp_path / 'run')
+    mark_run_in_progress(run_dir)
+    assert run_in_progress(run_dir)
+    marker = os.path.join(run_dir, ARTIFACT_IN_PROGRESS_FILE_NAME)
+    with open(marker) as file_obj:
+        owner = json.load(file_obj)
+    with open(marker, 'w') as file_obj:
+        json.dump({**owner, 'pid': _dead_pid()}, file_obj)
+    assert not run_in_progress(run_dir) # stale marker of a crashed run
+    clear_run_in_progress(run_dir)
+    assert not os.path.exists(marker) and not run_in_progress(run_dir)
+
+def test_retention_skips_runs_in_progress_and_newer_runs(artifact_dir, tmp_path):
+    oldest, in_progress, current, newer = (os.path.join(artifact_dir, run_id) for run_id in RUNS)
+    mark_run_in_progress(in_progress)
+    report = _manager(artifact_dir, tmp_path).apply_retention(protect=[current])
+
+    # keep_last=1 would expire everything but the newest run; only the idle older run goes
+    assert report.deleted_runs == [RUNS[0]]
+    assert not os.path.exists(oldest)
+    assert all(os.path.exists(path) for path in (in_progress, current, newer))
+    # nothing is hard-linked into a run another process may still be writing
+    inodes = {path: os.stat(os.path.join(path, 'preprocessing.pkl')).st_ino for path in (in_progress, current, newer)}
+    assert len(set(inodes.values())) == 3
+
+def test_idle_runs_are_deduplicated_and_expired(artifact_dir, tmp_path):
+    report = _manager(artifact_dir, tmp_path).apply_retention(protect=[os.path.join(artifact_dir, RUNS[-1])])
+    assert report.deduplicated_files == len(RUNS) - 1
+    assert report.deleted_runs == RUNS[:-1]
@@ -0,0 +1,43 @@
+import asyncio
+
+import numpy as np
+
+from src.constants import DATABASE_NAME
+from src.data_access.project1_data import AsyncPoject1Data, documents_to_df
+
+DOCUMENTS = [
+    {'id': 1, 'Gender': 'Male', 'Age': 44, 'Vehicle_Age': '> 2 Years', 'Response': 1},
+    {'id': 2, 'Gender': 'Female', 'Age': 'na', 'Vehicle_Age': '1-2 Year', 'Response': 0},
+    {'id': 3, 'Gender': 'Male', 'Age': 27, 'Vehicle_Age': '< 1 Year', 'Response': 0},
+]
+
+def _data(mongo_client, async_collection_factory) -> AsyncPoject1Data:
+    mongo_client[DATABASE_NAME]['customers'].insert_many([dict(document) for document in DOCUMENTS])
+    return AsyncPoject1Data(collection_factory=async_collection_factory)
+
+def test_export_matches_sync_conversion(mongo_client, async_collection_factory):
+    data = _data(mongo_client, async_collection_factory)
+    df = asyncio.run(data.export_collection_as_df('customers'))
+    expected = documents_to_df(list(mongo_client[DATABASE_NAME]['customers'].find()))
+    assert 'id' not in df.columns
+    assert df.drop(columns=['_id']).equals(expected.drop(columns=['_id']))
+
+def test_point_lookups(mongo_client, async_collection_factory):
+    data = _data(mongo_client, async_collection_factory)
+    df = asyncio.run(data.get_customers_by_id('customers', [3, 1, 99]))
+    assert sorted(df['id']) == [1, 3]
+    assert '_id' not in df.columns
+
+    customer = asyncio.run(data.get_customer_by_id('customers', 2))
+    assert customer['Gender'] == 'Female' and np.isnan(customer['Age'])
+    assert asyncio.run(data.get_customer_by_id('customers', 99)) is None
+
+def test_ensure_customer_id_index(mongo_client, async_collection_factory):
+    data = _data(mongo_client, async_collection_factory)
+    asyncio.run(data.ensure_customer_id_index('customers'))
+    assert 'id_1' in mongo_client[DATABASE_NAME]['customers'].index_information()
+
+def test_other_database(mongo_client, async_collection_factory):
+    mongo_client['other']['customers'].insert_one({'id': 7, 'Response': 1})
+    data = AsyncPoject1Data(collection_factory=async_collection_factory)
+    assert asyncio.run(data.get_customer_by_id('customers', 7, database_name='other')) == {'id': 7, 'Response': 1}
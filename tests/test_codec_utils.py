@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.exception import MyException
+from src.utils.codec_utils import (CODEC_NAMES, BlockArrayReader, array_file_nbytes, get_codec, is_block_array,
+                                   stream_codec_name, write_block_array)
+from src.utils.main_utils import load_numpy_array_data, load_object, save_numpy_array_data, save_object
+
+def _array(rows: int = 1001, columns: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    array = np.round(rng.normal(size=(rows, columns)), 2)
+    array[:, -1] = rng.integers(0, 2, rows) # a target column, as in the transformed arrays
+    return array
+
+@pytest.mark.parametrize('codec', CODEC_NAMES)
+@pytest.mark.parametrize('shape', [(1001, 7), (1001,), (50, 3, 4), (0, 5), ()])
+def test_block_arrays_round_trip(tmp_path, codec, shape):
+    array = np.arange(int(np.prod(shape)), dtype=np.float32).reshape(shape) * 0.5
+    file_path = str(tmp_path / 'array.npy')
+    # small blocks: many of them, the last one partial, decoded on several threads
+    write_block_array(file_path, array, get_codec(codec, threads=3), block_bytes=512)
+    reader = BlockArrayReader(file_path, threads=3)
+    result = reader.read()
+    assert result.dtype == array.dtype and result.shape == array.shape
+    assert np.array_equal(result, array)
+    assert reader.nbytes == array_file_nbytes(file_path) == array.nbytes
+
+@pytest.mark.parametrize('codec', CODEC_NAMES)
+def test_read_rows_decodes_any_range(tmp_path, codec):
+    array = _array()
+    file_path = str(tmp_path / 'array.npy')
+    write_block_array(file_path, array, get_codec(codec, threads=2), block_bytes=1000) # 17 rows per block
+    reader = BlockArrayReader(file_path)
+    assert len(reader.blocks) > 50
+    for start, stop in [(0, 1), (16, 18), (17, 34), (100, 555), (990, 2000), (-5, None), (500, 500)]:
+        assert np.array_equal(reader.read_rows(start, stop), array[start:stop])
+
+@pytest.mark.parametrize('codec', CODEC_NAMES)
+def test_saved_arrays_load_whole_or_mapped(tmp_path, codec):
+    array = _array()
+    file_path = str(tmp_path / 'train.npy')
+    save_numpy_array_data(file_path, array, codec=codec)
+    assert is_block_array(file_path) == (codec != 'none')
+    assert np.array_equal(load_numpy_array_data(file_path), array)
+    mapped = load_numpy_array_data(file_path, mmap_mode='r')
+    assert np.array_equal(mapped, array) and not mapped.flags.writeable
+
+def test_plain_npy_files_still_load(tmp_path):
+    array = _array()
+    file_path = str(tmp_path / 'old_run.npy')
+    np.save(file_path, array)
+    assert np.array_equal(load_numpy_array_data(file_path), array)
+    assert array_file_nbytes(file_path) == os.path.getsize(file_path)
+
+def test_truncated_block_array_is_rejected(tmp_path):
+    file_path = str(tmp_path / 'array.npy')
+    write_block_array(file_path, _array(), get_codec('zstd'))
+    with open(file_path, 'r+b') as file_obj:
+        file_obj.truncate(os.path.getsize(file_path) - 3)
+    with pytest.raises(MyException, match='not a block array'):
+        load_numpy_array_data(file_path)
+
+@pytest.mark.parametrize('codec', CODEC_NAMES)
+def test_objects_round_trip_with_every_codec(tmp_path, monkeypatch, codec):
+    monkeypatch.setenv('ARTIFACT_OBJECT_CODEC', codec)
+    obj = {'weights': _array(200), 'name': 'model', 'params': [1, 2.5, None]}
+    file_path = str(tmp_path / 'model.pkl')
+    save_object(file_path, obj)
+    with open(file_path, 'rb') as file_obj:
+        assert stream_codec_name(file_obj) == codec
+    loaded = load_object(file_path)
+    assert loaded.keys() == obj.keys() and np.array_equal(loaded['weights'], obj['weights'])
+    assert loaded['params'] == obj['params']
@@ -0,0 +1,34 @@
+import os
+import runpy
+
+import numpy as np
+
+from src.components.model_trainer import ModelTrainer
+from src.entity.config_entity import ModelTrainerConfig
+from src.utils.cross_validation_utils import stratified_fold_indices
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_folds_partition_the_rows_and_keep_the_class_ratio():
+    y = np.array([0] * 80 + [1] * 20)
+    folds = stratified_fold_indices(y, 4, random_state=0)
+    assert sorted(np.concatenate(folds)) == list(range(100))
+    assert all(y[fold].sum() == 5 for fold in folds)
+
+def test_cross_validation_runs_in_spawned_workers(tmp_path):
+    from sklearn.datasets import make_classification
+    X, y = make_classification(n_samples=600, n_features=6, weights=[0.7], random_state=0)
+    config = ModelTrainerConfig(model_trainer_dir=str(tmp_path), _n_estimators=10, _max_depth=4,
+                                cv_folds=3, cv_workers=2, cv_resample=False)
+    artifact = ModelTrainer(None, config).cross_validate(X, y)
+    assert len(artifact.fold_metrics) == 3 and artifact.n_workers == 2
+    assert all(0 < fold.f1_score <= 1 for fold in artifact.fold_metrics)
+    assert os.listdir(config.cv_dir) == [] # the shared feature files are removed
+
+def test_demo_does_not_run_the_pipeline_when_reimported(monkeypatch):
+    import src.pipeline.training_pipeline as training_pipeline
+    def fail():
+        raise AssertionError('the pipeline started in a re-imported main module')
+    monkeypatch.setattr(training_pipeline, 'TrainPipeline', fail)
+    # a spawned worker imports the parent's main module under this name
+    runpy.run_path(os.path.join(ROOT_DIR, 'demo.py'), run_name='__mp_main__')
@@ -0,0 +1,45 @@
+import threading
+
+import pytest
+
+from src.exception import MyException
+from src.pipeline.dag_executor import DagExecutor, DagNode
+
+def test_outputs_flow_along_edges_and_independent_nodes_run_concurrently():
+    both_started = threading.Barrier(2, timeout=5)
+    def branch(value):
+        both_started.wait() # deadlocks (BrokenBarrierError) unless the two branches run at the same time
+        return value
+    nodes = [DagNode('source', lambda: 2),
+             DagNode('left', lambda x: branch(x + 1), inputs={'x': 'source'}),
+             DagNode('right', lambda x: branch(x * 10), inputs={'x': 'source'}),
+             DagNode('join', lambda a, b: a + b, inputs={'a': 'left', 'b': 'right'}, output_type=int)]
+    report = DagExecutor(nodes, max_workers=2).run()
+    assert report.outputs == {'source': 2, 'left': 3, 'right': 20, 'join': 23}
+    assert report.critical_path[0] == 'source' and report.critical_path[-1] == 'join'
+
+def test_cycles_and_unknown_inputs_are_rejected():
+    with pytest.raises(MyException, match='cycle'):
+        DagExecutor([DagNode('a', lambda x: x, inputs={'x': 'b'}), DagNode('b', lambda x: x, inputs={'x': 'a'})])
+    with pytest.raises(MyException, match='unknown'):
+        DagExecutor([DagNode('a', lambda x: x, inputs={'x': 'missing'})])
+
+def _run_with_first_node(first: DagNode):
+    # one worker: 'second' is queued behind the first node and must be cancelled when it fails
+    ran = []
+    nodes = [first, DagNode('second', lambda: ran.append('second'))]
+    return ran, DagExecutor(nodes, max_workers=1)
+
+def test_failing_node_cancels_queued_nodes():
+    def fail():
+        raise ValueError('boom')
+    ran, executor = _run_with_first_node(DagNode('first', fail))
+    with pytest.raises(MyException, match='boom'):
+        executor.run()
+    assert ran == []
+
+def test_wrong_output_type_cancels_queued_nodes():
+    ran, executor = _run_with_first_node(DagNode('first', lambda: 'not an int', output_type=int))
+    with pytest.raises(MyException, match='expected int'):
+        executor.run()
+    assert ran == []
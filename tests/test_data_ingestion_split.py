@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.constants import TARGET_COLUMN, CUSTOMER_ID_COLUMN
+from src.components.data_ingestion import DataIngestion
+from src.entity.config_entity import DataIngestionConfig
+from synthetic_data import generate_chunks, generate_frame
+
+TEST_RATIO = 0.25
+
+@pytest.fixture
+def ingestion(tmp_path) -> DataIngestion:
+    config = DataIngestionConfig(data_ingestion_dir=str(tmp_path), train_test_split_ratio=TEST_RATIO,
+                                 deduplicate=False, build_feature_lookup=False)
+    config.train_file_path = os.path.join(tmp_path, 'ingested', 'train.csv')
+    config.test_file_path = os.path.join(tmp_path, 'ingested', 'test.csv')
+    return DataIngestion(config)
+
+def _split_keys(df: pd.DataFrame) -> pd.Series:
+    return DataIngestion._stable_split_keys(df, CUSTOMER_ID_COLUMN)
+
+def _chunks(df: pd.DataFrame, n_chunks: int) -> list:
+    size = -(-len(df) // n_chunks)
+    return [df.iloc[start:start + size] for start in range(0, len(df), size)]
+
+def _rows(path: str) -> set:
+    return set(pd.read_csv(path).itertuples(index=False, name=None))
+
+def test_assignment_does_not_depend_on_the_key_dtype():
+    ids = np.arange(1, 3001)
+    masks = [DataIngestion.assign_test_rows(_split_keys(pd.DataFrame({CUSTOMER_ID_COLUMN: keys})), TEST_RATIO)
+             for keys in (ids, ids.astype('float64'), ids.astype(str))]
+    assert (masks[0] == masks[1]).all() and (masks[0] == masks[2]).all()
+
+def test_every_class_is_split_at_the_ratio_in_expectation():
+    df = generate_frame(40_000, seed=5)
+    is_test = DataIngestion.assign_test_rows(_split_keys(df), TEST_RATIO)
+    for label in df[TARGET_COLUMN].unique():
+        assert is_test[(df[TARGET_COLUMN] == label).to_numpy()].mean() == pytest.approx(TEST_RATIO, abs=0.02)
+
+@pytest.mark.parametrize('test_ratio, expected', [(0.0, 0.0), (1.0, 1.0)])
+def test_ratio_bounds(test_ratio, expected):
+    keys = pd.Series(np.arange(1000).astype(str))
+    assert DataIngestion.assign_test_rows(keys, test_ratio).mean() == expected
+
+def test_customers_keep_their_split_when_the_collection_grows(ingestion, mongo_client, monkeypatch):
+    from src.constants import DATABASE_NAME
+    from src.configuration.mongo_db_connection import MongoDBClient
+    monkeypatch.setattr(MongoDBClient, '_clients', {})
+    MongoDBClient.register_client(mongo_client)
+    config = ingestion.data_ingestion_config
+    collection = mongo_client[DATABASE_NAME][config.collection_name]
+    collection.insert_many(generate_frame(20_000, seed=3).to_dict(orient='records'))
+    ingestion.initiate_data_ingestion()
+    train, test = _rows(config.train_file_path), _rows(config.test_file_path)
+
+    # 2,000 new customers arrive and the next full run re-exports the whole collection
+    collection.insert_many(generate_frame(2_000, seed=4).assign(**{CUSTOMER_ID_COLUMN: np.arange(20_001, 22_001)})
+                           .to_dict(orient='records'))
+    ingestion.initiate_data_ingestion()
+    grown_train, grown_test = _rows(config.train_file_path), _rows(config.test_file_path)
+    assert train <= grown_train and test <= grown_test
+    assert len(grown_train - train) + len(grown_test - test) > 0
+
+def test_streamed_split_keeps_class_proportions(ingestion):
+    rows = 6000
+    n_train, n_test = ingestion.split_chunks_as_train_test(generate_chunks(rows, chunk_size=1000))
+    train = pd.read_csv(ingestion.data_ingestion_config.train_file_path)
+    test = pd.read_csv(ingestion.data_ingestion_config.test_file_path)
+    assert (n_train, n_test) == (len(train), len(test)) and n_train + n_test == rows
+    assert CUSTOMER_ID_COLUMN not in train.columns
+    counts = pd.concat([chunk for chunk in generate_chunks(rows, chunk_size=1000)])[TARGET_COLUMN].value_counts()
+    for label, n_rows in counts.items():
+        assert (test[TARGET_COLUMN] == label).sum() / n_rows == pytest.approx(TEST_RATIO, abs=0.05)
+
+def test_split_data_as_train_test_matches_the_streamed_split(ingestion):
+    config = ingestion.data_ingestion_config
+    df = generate_frame(4000, seed=3)
+    ingestion.split_data_as_train_test(df)
+    test = _rows(config.test_file_path)
+    ingestion.split_chunks_as_train_test(_chunks(df, 4))
+    assert _rows(config.test_file_path) == test
@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+
+import src.components.data_transformation as data_transformation_module
+from src.constants import TARGET_COLUMN, DATA_TRANSFORMATION_MEMORY_OVERHEAD
+from src.components.data_transformation import DataTransformation
+from src.utils.dtype_utils import get_dtype_plan
+from src.utils.memory_utils import MemoryBudget
+from synthetic_data import generate_frame
+
+class FixedBudget(MemoryBudget):
+    """
+    A budget whose headroom does not depend on the RSS of the test process.
+    """
+    def __init__(self, headroom_bytes: float):
+        super().__init__(limit_bytes=int(headroom_bytes), min_chunk_rows=100)
+        self.headroom_bytes = headroom_bytes
+
+    def headroom(self) -> int:
+        return int(self.headroom_bytes)
+
+@pytest.fixture
+def split_files(tmp_path):
+    paths = {}
+    for split, rows, seed in (('train', 4000, 0), ('test', 1000, 1)):
+        paths[split] = str(tmp_path / f'{split}.csv')
+        generate_frame(rows, seed=seed).drop(columns=['id']).to_csv(paths[split], index=False)
+    return paths
+
+def _split_bytes(file_path: str) -> float:
+    n_rows, row_bytes = get_dtype_plan().estimate_frame_size(file_path)
+    return n_rows * row_bytes * DATA_TRANSFORMATION_MEMORY_OVERHEAD
+
+def _transformation(monkeypatch, headroom_bytes: float) -> DataTransformation:
+    monkeypatch.setattr(data_transformation_module, 'get_memory_budget', lambda: FixedBudget(headroom_bytes))
+    return DataTransformation(data_ingestion_artifact=None, data_transformation_config=None, data_validation_artifact=None)
+
+def test_budget_is_shared_by_both_splits(monkeypatch, split_files):
+    train_bytes, test_bytes = _split_bytes(split_files['train']), _split_bytes(split_files['test'])
+    enough = _transformation(monkeypatch, train_bytes + test_bytes + 1)
+    assert enough.train_row_limit(split_files['train'], split_files['test']) is None
+
+    # each split fits the headroom alone, not together: the train split gets what the test split leaves
+    transformation = _transformation(monkeypatch, train_bytes)
+    max_rows = transformation.train_row_limit(split_files['train'], split_files['test'])
+    assert max_rows == pytest.approx(3000, rel=0.05)
+
+def test_only_the_train_majority_class_is_downsampled(monkeypatch, split_files):
+    transformation = _transformation(monkeypatch, 1)
+    train = pd.read_csv(split_files['train'])
+    features, target = transformation.prepare_features(split_files['train'], split='train', max_rows=2000)
+    assert len(features) == len(target) == pytest.approx(2000, rel=0.1)
+    minority = train[TARGET_COLUMN].value_counts().idxmin()
+    assert (target == minority).sum() == (train[TARGET_COLUMN] == minority).sum()
+
+def test_test_split_keeps_every_row_over_budget(monkeypatch, split_files):
+    transformation = _transformation(monkeypatch, 1) # nothing fits: the test split is still read whole, in chunks
+    test = pd.read_csv(split_files['test'])
+    features, target = transformation.prepare_features(split_files['test'], split='test', max_rows=10)
+    assert len(features) == len(test)
+    assert target.tolist() == test[TARGET_COLUMN].tolist()
+    assert list(features.columns) == list(transformation.prepare_features(split_files['train'])[0].columns)
+
+def _transformed(split_files, tmp_path, **kwargs):
+    from src.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
+    from src.entity.config_entity import DataTransformationConfig
+    transformation = DataTransformation(
+        data_ingestion_artifact=DataIngestionArtifact(split_files['train'], split_files['test']),
+        data_transformation_config=DataTransformationConfig(data_transformation_dir=str(tmp_path / 'transformation')),
+        data_validation_artifact=DataValidationArtifact(validation_status=True, message='', validation_report_file_path=''))
+    return transformation, transformation.initiate_data_transformation(**kwargs)
+
+def test_validation_rows_are_held_out_before_resampling(split_files, tmp_path):
+    from src.utils.main_utils import load_numpy_array_data, load_object
+    transformation, artifact = _transformed(split_files, tmp_path, validation_split_ratio=0.2)
+    train = load_numpy_array_data(artifact.transformed_train_file_path)
+    validation = load_numpy_array_data(artifact.transformed_validation_file_path)
+
+    features, target = transformation.prepare_features(split_files['train'])
+    original = transformation.transform(load_object(artifact.transformed_object_file_path), features, target)
+    original_rows = {row.tobytes() for row in original}
+    train_rows = {row.tobytes() for row in train}
+    assert len(validation) == pytest.approx(0.2 * len(original), abs=1)
+    # every validation row is an original row, none is synthetic or also trained on
+    assert all(row.tobytes() in original_rows for row in validation)
+    assert not any(row.tobytes() in train_rows for row in validation)
+    # the validation rows keep the class balance of the data; only the rows fitted on are resampled
+    assert validation[:, -1].mean() == pytest.approx(target.mean(), abs=0.01)
+    assert train[:, -1].mean() > 0.3 > target.mean()
+
+def test_nothing_is_held_out_by_default(split_files, tmp_path):
+    _, artifact = _transformed(split_files, tmp_path)
+    assert artifact.transformed_validation_file_path is None
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.dedup_utils import HashSet, RowDeduplicator, row_hashes
+
+COLUMNS = ['Age', 'Vehicle_Age']
+
+def _frame(ages, vehicle_ages, responses) -> pd.DataFrame:
+    return pd.DataFrame({'Age': ages, 'Vehicle_Age': vehicle_ages, 'Response': responses})
+
+def test_hash_set_membership_across_runs():
+    keys = HashSet()
+    for start in range(0, 1000, 100):
+        keys.add(np.arange(start, start + 100, dtype=np.uint64) * np.uint64(7919))
+    assert len(keys) == 1000 and len(keys._runs) <= 4
+    probe = np.arange(0, 2000, dtype=np.uint64) * np.uint64(7919)
+    assert keys.contains(probe).tolist() == [True] * 1000 + [False] * 1000
+
+def test_hash_set_stops_at_max_keys_including_initial_keys():
+    keys = HashSet(np.arange(100, dtype=np.uint64), max_keys=40)
+    assert len(keys) == 40
+    keys.add(np.arange(100, 200, dtype=np.uint64))
+    assert len(keys) == 40
+
+def test_hashes_do_not_depend_on_numeric_dtype():
+    narrow = _frame(np.array([23, 40], dtype=np.uint8), ['< 1 Year', '1-2 Year'], [0, 1])
+    wide = narrow.astype({'Age': 'float32'})
+    assert (row_hashes(narrow, COLUMNS) == row_hashes(wide, COLUMNS)).all()
+
+def test_duplicates_and_conflicts_are_dropped_across_chunks():
+    deduplicator = RowDeduplicator(COLUMNS, 'Response', drop_conflicts=True)
+    first = deduplicator.deduplicate(_frame([20, 20, 30], ['< 1 Year'] * 3, [0, 0, 1]))
+    second = deduplicator.deduplicate(_frame([30, 30, 40], ['< 1 Year'] * 3, [1, 0, 0]))
+    assert first['Age'].tolist() == [20, 30] and second['Age'].tolist() == [40]
+    assert (deduplicator.duplicate_rows, deduplicator.conflicting_rows) == (2, 1)
+
+def test_loaded_index_respects_max_keys(tmp_path):
+    full = RowDeduplicator(COLUMNS, 'Response', drop_conflicts=True)
+    full.deduplicate(_frame(np.arange(500), ['< 1 Year'] * 500, [0] * 500))
+    full.save(str(tmp_path), watermark=500)
+
+    bounded = RowDeduplicator(COLUMNS, 'Response', drop_conflicts=True, max_keys=100)
+    assert bounded.load(str(tmp_path), watermark=500)
+    assert len(bounded.exact_keys) == 100 and len(bounded.feature_keys) == 100
+    bounded.deduplicate(_frame(np.arange(500, 600), ['< 1 Year'] * 100, [0] * 100))
+    assert len(bounded.exact_keys) == 100 # new rows are compared, not indexed
+
+    unbounded = RowDeduplicator(COLUMNS, 'Response')
+    unbounded.load(str(tmp_path), watermark=500)
+    assert len(unbounded.deduplicate(_frame(np.arange(490, 510), ['< 1 Year'] * 20, [0] * 20))) == 10
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.dtype_utils import DtypePlan, get_dtype_plan
+from synthetic_data import generate_frame
+
+SCHEMA = {
+    'columns': [{'id': 'int'}, {'Age': 'int'}, {'Premium': 'float'}, {'Gender': 'category'}, {'Note': 'text'}],
+    'dtypes': {'Age': 'uint8'},
+    'categories': {'Gender': ['Female', 'Male']},
+}
+
+def test_plan_uses_explicit_dtypes_then_the_column_kind():
+    plan = DtypePlan.from_schema(SCHEMA)
+    assert plan.dtypes == {'id': 'int64', 'Age': 'uint8', 'Premium': 'float32', 'Gender': 'category', 'Note': 'object'}
+    assert list(plan.category_dtype('Gender').categories) == ['Female', 'Male']
+
+def test_integers_that_fit_are_narrowed():
+    df = DtypePlan.from_schema(SCHEMA).apply(pd.DataFrame({'Age': [20, 85], 'Premium': [1.5, 2.5]}))
+    assert (df['Age'].dtype, df['Premium'].dtype) == (np.dtype('uint8'), np.dtype('float32'))
+
+@pytest.mark.parametrize('values, expected_dtype', [([20, 300], 'uint16'), ([20, -1], 'int8'), ([20, -1000], 'int16'),
+                                                     ([20.0, 20.5], 'float32'), ([20.0, np.nan], 'float32')])
+def test_values_that_overflow_the_planned_integer_are_widened(values, expected_dtype):
+    df = DtypePlan.from_schema(SCHEMA).apply(pd.DataFrame({'Age': values}))
+    assert df['Age'].dtype == np.dtype(expected_dtype)
+    assert df['Age'].tolist() == pytest.approx(values, nan_ok=True) # no value was lost
+
+def test_non_numeric_integers_are_left_for_validation():
+    df = DtypePlan.from_schema(SCHEMA).apply(pd.DataFrame({'Age': ['20', 'unknown']}))
+    assert df['Age'].tolist() == ['20', 'unknown']
+
+def test_values_outside_the_vocabulary_stay_in_the_category(caplog):
+    df = DtypePlan.from_schema(SCHEMA).apply(pd.DataFrame({'Gender': ['Male', 'Other', None, 'Female']}))
+    assert isinstance(df['Gender'].dtype, pd.CategoricalDtype)
+    assert list(df['Gender'].cat.categories) == ['Female', 'Male', 'Other'] # the vocabulary order is kept
+    assert df['Gender'].isna().tolist() == [False, False, True, False] # only the missing value is NaN
+    assert 'outside the schema vocabulary' in caplog.text
+
+def test_csv_readers_and_apply_give_the_same_dtypes(tmp_path):
+    path = str(tmp_path / 'data.csv')
+    df = generate_frame(500, seed=1)
+    df.loc[3, 'Gender'] = 'Other'
+    df.loc[7, 'Age'] = np.nan
+    df.to_csv(path, index=False)
+    plan = get_dtype_plan()
+
+    read = plan.read_csv(path)
+    applied = plan.apply(pd.read_csv(path))
+    chunked = pd.concat(list(plan.iter_csv(path, chunksize=100)), ignore_index=True)
+    assert read.dtypes.to_dict() == applied.dtypes.to_dict()
+    pd.testing.assert_frame_equal(read, applied)
+    # a chunk without NaN or unknown values keeps narrower dtypes, the values are the same
+    pd.testing.assert_frame_equal(chunked, read, check_dtype=False, check_categorical=False)
+    assert read['Vintage'].dtype == np.dtype('uint16') and read['Age'].dtype == np.dtype('float32')
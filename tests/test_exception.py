@@ -0,0 +1,74 @@
+import sys
+import pickle
+import logging
+
+import pandas as pd
+import pytest
+
+import src.exception as exception_module
+from src.exception import MyException, RowValidationError
+from src.utils.validation_utils import validate_rows
+
+def _raise_wrapped() -> MyException:
+    try:
+        try:
+            raise ValueError('boom')
+        except Exception as e:
+            raise MyException(e, sys) from e
+    except MyException as e:
+        return e
+
+def test_message_is_formatted_once_when_first_read(monkeypatch):
+    calls = []
+    format_error_message = exception_module._format_error_message
+    monkeypatch.setattr(exception_module, '_format_error_message',
+                        lambda *args: calls.append(args) or format_error_message(*args))
+    exc = _raise_wrapped()
+    assert calls == []
+    assert str(exc) == exc.error_message
+    assert 'test_exception.py' in str(exc) and 'Error message: boom' in str(exc)
+    assert len(calls) == 1
+
+def test_rewrapping_keeps_the_innermost_error_and_location():
+    inner = _raise_wrapped()
+    try:
+        raise MyException(inner, sys) from inner
+    except MyException as outer:
+        assert outer._error is inner._error and outer._exc_tb is inner._exc_tb
+        assert str(outer) == str(inner)
+        assert str(outer).count('Error message') == 1 # not nested
+
+def test_error_is_logged_once_across_wrappers(caplog):
+    inner = _raise_wrapped()
+    outer = MyException(inner, sys)
+    with caplog.at_level(logging.ERROR):
+        outer.log()
+        inner.log()
+        outer.log()
+    assert len(caplog.records) == 1 and inner.logged and outer.logged
+
+def test_pickled_exception_keeps_its_message():
+    exc = _raise_wrapped()
+    assert exc._exc_tb is not None # a traceback, which cannot be pickled
+    restored = pickle.loads(pickle.dumps(exc))
+    assert type(restored) is MyException and str(restored) == str(exc)
+
+def _report():
+    df = pd.DataFrame({'Age': [30, 'x', None], 'Gender': ['Male', 'Female', 'Other']})
+    return validate_rows(df, {'Age': 'int', 'Gender': 'category'}, allowed_values={'Gender': ['Male', 'Female']})
+
+def test_row_validation_error_carries_its_report():
+    with pytest.raises(RowValidationError) as raised:
+        _report().raise_if_invalid()
+    assert raised.value.report.to_dict() == {'n_rows': 3, 'n_invalid_rows': 2, 'missing_columns': [],
+                                             'errors': {'Age': {'not_numeric': 1, 'null': 1},
+                                                        'Gender': {'unknown_value': 1}}}
+    assert '2 of 3 rows are invalid' in str(raised.value)
+
+def test_pickled_row_validation_error_keeps_its_report():
+    with pytest.raises(RowValidationError) as raised:
+        _report().raise_if_invalid()
+    restored = pickle.loads(pickle.dumps(raised.value))
+    assert type(restored) is RowValidationError
+    assert restored.report.to_dict() == raised.value.report.to_dict()
+    assert raised.value.report.summary() in str(restored)
@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.exception import MyException
+from src.data_access import feature_lookup
+from src.data_access.feature_lookup import FeatureLookupReader, FeatureLookupStore
+
+COLUMNS = ['Age', 'Annual_Premium']
+
+def _publish(store, ids, values, replace=False, columns=COLUMNS) -> dict:
+    """
+    Publishes a segment where every row of customer `id` holds `value` in all columns.
+    """
+    writer = store.writer(columns)
+    writer.append(np.asarray(ids), np.repeat(np.asarray(values, dtype=np.float32)[:, None], len(columns), axis=1))
+    return store.publish(writer.finish(), columns, replace=replace)
+
+def _values(reader, ids) -> list:
+    features, found = reader.lookup(ids)
+    return [float(row[0]) if hit else None for row, hit in zip(features, found)]
+
+def _segment_dirs(store) -> list:
+    return sorted(name for name in os.listdir(store.store_dir) if name.startswith('segment-'))
+
+def test_delta_segments_shadow_older_rows(tmp_path):
+    store = FeatureLookupStore(str(tmp_path))
+    _publish(store, [1, 2, 3], [10, 20, 30], replace=True)
+    _publish(store, [2, 4], [21, 41])
+    manifest = _publish(store, [3], [32])
+    assert len(manifest['segments']) == 3
+    assert _values(FeatureLookupReader(store.store_dir), [1, 2, 3, 4, 5]) == [10, 21, 32, 41, None]
+
+def test_full_refresh_replaces_every_segment(tmp_path):
+    store = FeatureLookupStore(str(tmp_path))
+    _publish(store, [1, 2], [10, 20], replace=True)
+    _publish(store, [2], [21])
+    manifest = _publish(store, [3], [30], replace=True)
+    assert len(manifest['segments']) == 1
+    assert _values(FeatureLookupReader(store.store_dir), [1, 2, 3]) == [None, None, 30]
+
+def test_segments_are_merged_beyond_max_segments_and_the_newest_row_wins(tmp_path):
+    store = FeatureLookupStore(str(tmp_path), max_segments=2)
+    _publish(store, [1, 2, 3], [10, 20, 30], replace=True)
+    _publish(store, [2, 3], [21, 31])
+    manifest = _publish(store, [3, 4], [32, 42])
+    assert len(manifest['segments']) == 1
+    assert _values(FeatureLookupReader(store.store_dir), [1, 2, 3, 4]) == [10, 21, 32, 42]
+    # the merged-away segments of the predecessor manifest are kept until the next publish
+    _publish(store, [5], [50])
+    assert _segment_dirs(store) == sorted(set(manifest['segments']) | set(store.current_manifest()['segments']))
+
+def test_reader_keeps_its_version_while_newer_ones_are_published_and_collected(tmp_path):
+    store = FeatureLookupStore(str(tmp_path))
+    first = _publish(store, [1, 2], [10, 20], replace=True)
+    reader = FeatureLookupReader(store.store_dir, refresh_seconds=float('inf'))
+    assert reader.refresh(force=True) and reader.manifest['version'] == first['version']
+
+    _publish(store, [1, 2], [11, 21], replace=True)
+    _publish(store, [1, 2], [12, 22], replace=True)
+    assert not set(first['segments']) & set(_segment_dirs(store)) # the first version is garbage collected
+    assert _values(reader, [1, 2]) == [10, 20] and reader.manifest['version'] == first['version']
+
+    assert reader.refresh(force=True)
+    assert _values(reader, [1, 2]) == [12, 22] and reader.manifest['version'] == first['version'] + 2
+
+def test_refresh_is_throttled_to_refresh_seconds(tmp_path, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(feature_lookup.time, 'monotonic', lambda: clock[0])
+    store = FeatureLookupStore(str(tmp_path))
+    _publish(store, [1], [10], replace=True)
+    reader = FeatureLookupReader(store.store_dir, refresh_seconds=5.0)
+    assert _values(reader, [1]) == [10]
+
+    _publish(store, [1], [11])
+    clock[0] += 4.0
+    assert not reader.refresh() and _values(reader, [1]) == [10]
+    clock[0] += 1.0
+    assert reader.refresh() and _values(reader, [1]) == [11]
+
+def test_delta_with_different_columns_is_rejected(tmp_path):
+    store = FeatureLookupStore(str(tmp_path))
+    published = _publish(store, [1], [10], replace=True)
+    with pytest.raises(MyException, match='a full refresh is needed'):
+        _publish(store, [2], [20], columns=COLUMNS[::-1])
+    assert store.current_manifest()['version'] == published['version']
+    assert _publish(store, [2], [20], replace=True, columns=COLUMNS[::-1])['columns'] == COLUMNS[::-1]
+
+def test_lookup_restricts_and_orders_columns(tmp_path):
+    store = FeatureLookupStore(str(tmp_path))
+    writer = store.writer(COLUMNS)
+    writer.append(np.array([7, 3]), np.array([[70, 700], [30, 300]], dtype=np.float32))
+    writer.append(np.array([7]), np.array([[71, 710]], dtype=np.float32)) # the last row appended for an id wins
+    store.publish(writer.finish(), COLUMNS, replace=True)
+    features, found = FeatureLookupReader(store.store_dir).lookup([3, 7, 8], columns=COLUMNS[::-1])
+    assert found.tolist() == [True, True, False]
+    assert features[:2].tolist() == [[300, 30], [710, 71]] and np.isnan(features[2]).all()
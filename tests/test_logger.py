@@ -0,0 +1,75 @@
+import os
+import json
+import logging
+from logging.handlers import QueueHandler
+
+import pytest
+
+import src.logger as logger_module
+from src.logger import JsonFormatter, LazyRotatingFileHandler, configure_logger, stop_queue_listener
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    """
+    Points the file handler at a temporary log file; the test configuration is restored afterwards.
+    """
+    path = tmp_path / 'logs' / 'run.log'
+    monkeypatch.setattr(logger_module, 'log_file_path', str(path))
+    yield path
+    monkeypatch.undo()
+    configure_logger()
+
+def _records(path) -> list:
+    with open(path) as file_obj:
+        return [json.loads(line) for line in file_obj]
+
+def test_level_and_format_come_from_the_environment(log_file, monkeypatch):
+    monkeypatch.setenv('LOG_LEVEL', 'ERROR')
+    monkeypatch.setenv('LOG_FORMAT', 'json')
+    configure_logger()
+    root = logging.getLogger()
+    assert root.level == logging.ERROR
+    assert all(isinstance(handler.formatter, JsonFormatter) for handler in root.handlers)
+    monkeypatch.setenv('LOG_LEVEL', '20')
+    configure_logger()
+    assert root.level == logging.INFO
+    monkeypatch.setenv('LOG_LEVEL', 'not-a-level')
+    configure_logger()
+    assert root.level == logging.DEBUG
+
+def test_reconfiguring_does_not_stack_handlers(log_file):
+    configure_logger(level=logging.INFO)
+    configure_logger(level=logging.INFO)
+    assert len(logging.getLogger().handlers) == 2
+
+def test_json_records_carry_extra_fields_and_exceptions(log_file):
+    configure_logger(level=logging.INFO, fmt='json', use_queue=False)
+    logging.info('scored %d rows', 3, extra={'request_id': 'abc'})
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        logging.exception('scoring failed')
+    first, second = _records(log_file)
+    assert (first['message'], first['level'], first['request_id']) == ('scored 3 rows', 'INFO', 'abc')
+    assert 'ValueError: boom' in second['exc_info']
+
+def test_log_file_is_created_on_the_first_record(log_file):
+    configure_logger(level=logging.DEBUG, fmt='json', use_queue=False)
+    file_handler = next(handler for handler in logging.getLogger().handlers
+                        if isinstance(handler, LazyRotatingFileHandler))
+    logging.debug('below the file level (INFO)')
+    assert not os.path.exists(log_file.parent)
+    logging.warning('first record of the file')
+    file_handler.flush()
+    assert [record['message'] for record in _records(log_file)] == ['first record of the file']
+
+def test_queue_mode_writes_on_the_listener_thread(log_file):
+    configure_logger(level=logging.DEBUG, fmt='json', use_queue=True)
+    handlers = logging.getLogger().handlers
+    assert len(handlers) == 1 and isinstance(handlers[0], QueueHandler)
+    logging.debug('dropped by the file handler level')
+    logging.info('queued record')
+    stop_queue_listener() # flushes the queue
+    records = _records(log_file)
+    assert [record['message'] for record in records] == ['queued record']
+    assert records[0]['thread'] == 'MainThread' # the caller's thread, not the listener's
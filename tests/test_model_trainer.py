@@ -0,0 +1,259 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.constants import TARGET_COLUMN
+from src.components.data_transformation import DataTransformation
+from src.components.model_trainer import ModelTrainer
+from src.entity.artifact_entity import DataIngestionArtifact
+from src.entity.config_entity import ModelTrainerConfig
+from src.utils.dtype_utils import get_dtype_plan
+from synthetic_data import generate_frame
+
+def _arrays(n_rows: int = 3000, n_features: int = 8, seed: int = 0):
+    from sklearn.datasets import make_classification
+    X, y = make_classification(n_samples=n_rows, n_features=n_features, n_informative=4, weights=[0.7],
+                               flip_y=0.05, random_state=seed)
+    data = np.column_stack([X, y]).astype(np.float64)
+    return data[: n_rows * 3 // 4], data[n_rows * 3 // 4:]
+
+@pytest.fixture
+def config(tmp_path) -> ModelTrainerConfig:
+    return ModelTrainerConfig(model_trainer_dir=str(tmp_path), _n_estimators=30, _max_depth=6,
+                              compression_min_estimators=3, compression_sample_rows=1000, expected_accuracy=0.0)
+
+def test_compression_is_off_by_default(monkeypatch, tmp_path):
+    monkeypatch.delenv('MODEL_TRAINER_COMPRESSION', raising=False)
+    assert ModelTrainerConfig(model_trainer_dir=str(tmp_path)).compression is False
+
+def test_validation_split_is_disjoint_and_stratified(config):
+    train, _ = _arrays()
+    fit, validation = ModelTrainer(None, config).validation_split(train)
+    assert len(fit) + len(validation) == len(train)
+    assert len(validation) == pytest.approx(config.validation_split_ratio * len(train), abs=1)
+    assert validation[:, -1].mean() == pytest.approx(train[:, -1].mean(), abs=0.01)
+    rows = {row.tobytes() for row in train}
+    assert {row.tobytes() for row in fit} | {row.tobytes() for row in validation} == rows
+    assert not {row.tobytes() for row in fit} & {row.tobytes() for row in validation}
+
+def test_tree_count_does_not_depend_on_the_test_rows(config):
+    train, test = _arrays()
+    trainer = ModelTrainer(None, config)
+    fit, validation = trainer.validation_split(train)
+    model, _ = trainer.get_model_object_and_report(fit, test)
+
+    compressed, _, report = trainer.compress_model(model, fit, validation, test)
+    flipped = test.copy()
+    flipped[:, -1] = 1 - flipped[:, -1]
+    compressed_flipped, _, report_flipped = trainer.compress_model(model, fit, validation, flipped)
+
+    assert compressed.estimators_ == compressed_flipped.estimators_
+    assert 3 <= report.compressed_n_estimators <= report.original_n_estimators == 30
+    # the reported scores are the test f1 of both forests, measured after the choice
+    assert report.original_f1_score != report_flipped.original_f1_score
+
+def test_compressed_training_reports_test_metrics(config):
+    from sklearn.preprocessing import StandardScaler
+    from src.utils.main_utils import load_object
+    config.compression = True
+    train, test = _arrays()
+    trainer = ModelTrainer(None, config)
+    artifact = trainer.initiate_model_trainer(train_arr=train, test_arr=test, preprocessor_obj=StandardScaler())
+
+    model = load_object(artifact.trained_model_file_path).trained_model_object
+    assert len(model.estimators_) == artifact.compression_artifact.compressed_n_estimators
+    expected = ModelTrainer._classification_metrics(model, test[:, :-1], test[:, -1])
+    assert artifact.metric_artifact == expected
+    assert os.path.exists(artifact.trained_model_file_path)
+
+def _feature_arrays(n_rows: int = 20000):
+    """
+    Untransformed train features, a fitted preprocessor and the transformed train and test arrays of synthetic rows,
+    with the classes balanced (as SMOTEENN leaves them).
+    """
+    transformation = DataTransformation(None, None, None)
+    df = get_dtype_plan().apply(generate_frame(n_rows, seed=4))
+    positives = df[df[TARGET_COLUMN] == 1]
+    df = pd.concat([positives, df[df[TARGET_COLUMN] == 0].head(len(positives))]).sample(frac=1, random_state=0)
+    n_rows = len(df)
+    features = transformation.apply_custom_transformations(df.drop(columns=[TARGET_COLUMN, 'id']))
+    preprocessor = transformation.get_data_transformer_object().fit(features)
+    data = np.column_stack([preprocessor.transform(features), df[TARGET_COLUMN].to_numpy()]).astype(np.float64)
+    n_train = n_rows * 3 // 4
+    return features.iloc[:n_train], preprocessor, data[:n_train], data[n_train:]
+
+def test_feature_selection_does_not_depend_on_the_test_rows(config):
+    config.feature_selection = True
+    config.feature_selection_threshold = 0.05
+    config.feature_selection_n_repeats = 2
+    config.feature_selection_n_jobs = 1
+    train_features, preprocessor, train, test = _feature_arrays()
+    flipped = test.copy()
+    flipped[:, -1] = 1 - flipped[:, -1]
+    artifacts = [ModelTrainer(None, config).initiate_model_trainer(train_arr=train, test_arr=test_arr,
+                                                                   preprocessor_obj=preprocessor,
+                                                                   train_features_df=train_features)
+                 for test_arr in (test, flipped)]
+    selections = [artifact.feature_selection_artifact for artifact in artifacts]
+    assert selections[0] == selections[1]
+    assert selections[0].dropped_features # the threshold drops some of the synthetic features
+    # the reported metrics are still those of the test rows
+    assert artifacts[0].metric_artifact != artifacts[1].metric_artifact
+
+def test_sequential_training_passes_the_train_features(monkeypatch, tmp_path):
+    import src.pipeline.training_pipeline as training_pipeline
+    paths = {}
+    for split, seed in (('train', 0), ('test', 1)):
+        paths[split] = str(tmp_path / f'{split}.csv')
+        generate_frame(500, seed=seed).drop(columns=['id']).to_csv(paths[split], index=False)
+    calls = []
+    monkeypatch.setattr(training_pipeline.ModelTrainer, 'initiate_model_trainer', lambda self, **kwargs: calls.append(kwargs))
+    pipeline = training_pipeline.TrainPipeline()
+    pipeline.model_trainer_config.feature_selection = True
+    pipeline.model_trainer_config.incremental = False
+    pipeline.start_model_trainer(data_transformation_artifact=None, data_watermark=500,
+                                 data_ingestion_artifact=DataIngestionArtifact(paths['train'], paths['test']))
+    train_features = calls[0]['train_features_df']
+    # the rows the preprocessor is fitted on: the validation rows are held out
+    assert len(train_features) == 400 and TARGET_COLUMN not in train_features.columns
+    assert 'Vehicle_Damage_Yes' in train_features.columns
+
+def _base_model(model, train, tree_generations=None, data_watermark=None):
+    from src.entity.estimator import MyModel
+    model.fit(train[:, :-1], train[:, -1])
+    return MyModel(preprocessing_object=None, trained_model_object=model, tree_generations=tree_generations,
+                   data_watermark=data_watermark)
+
+@pytest.mark.parametrize('forest', ['RandomForestClassifier', 'ExtraTreesClassifier'])
+def test_incremental_forest_keeps_its_trees_and_adds_new_ones(config, forest):
+    import sklearn.ensemble
+    config._incremental_n_estimators, config._tree_window = 5, 0
+    train, test = _arrays()
+    base_model = _base_model(getattr(sklearn.ensemble, forest)(n_estimators=10, random_state=0), train[:1000])
+    old_trees = list(base_model.trained_model_object.estimators_)
+
+    model, metrics, tree_generations = ModelTrainer(None, config).get_incremental_model_and_report(
+        base_model, train[1000:], test)
+    assert len(model.estimators_) == 15 and model.estimators_[:10] == old_trees
+    assert tree_generations == [0] * 10 + [1] * 5 # a model saved before generations were tracked is generation 0
+    assert 0 < metrics.f1_score <= 1
+
+def test_incremental_forest_retires_generations_outside_the_window(config):
+    from sklearn.ensemble import RandomForestClassifier
+    config._incremental_n_estimators, config._tree_window = 3, 2
+    train, test = _arrays()
+    base_model = _base_model(RandomForestClassifier(n_estimators=12, random_state=0), train,
+                             tree_generations=[0] * 4 + [1] * 4 + [2] * 4)
+    newest = base_model.trained_model_object.estimators_[8:]
+
+    model, _, tree_generations = ModelTrainer(None, config).get_incremental_model_and_report(base_model, train, test)
+    # generation 3 is trained; a window of 2 keeps generations 2 and 3
+    assert tree_generations == [2] * 4 + [3] * 3
+    assert len(model.estimators_) == 7 and model.estimators_[:4] == newest
+
+@pytest.mark.parametrize('booster, rounds', [('GradientBoostingClassifier', 'n_estimators_'),
+                                             ('HistGradientBoostingClassifier', 'n_iter_')])
+def test_incremental_boosting_fits_extra_rounds(config, booster, rounds):
+    import sklearn.ensemble
+    config._incremental_n_estimators = 5
+    train, test = _arrays()
+    params = {'n_estimators': 10} if booster == 'GradientBoostingClassifier' else {'max_iter': 10, 'early_stopping': False}
+    base_model = _base_model(getattr(sklearn.ensemble, booster)(random_state=0, **params), train[:1000])
+    model, _, tree_generations = ModelTrainer(None, config).get_incremental_model_and_report(base_model, train[1000:], test)
+    assert getattr(model, rounds) == 15 and tree_generations is None
+
+def test_incremental_training_needs_a_supported_model(config):
+    from sklearn.linear_model import LogisticRegression
+    train, test = _arrays()
+    with pytest.raises(Exception, match='not supported for LogisticRegression'):
+        ModelTrainer(None, config).get_incremental_model_and_report(_base_model(LogisticRegression(), train), train, test)
+
+def test_incremental_mode_trains_from_scratch_without_a_production_model(config, tmp_path):
+    from sklearn.preprocessing import StandardScaler
+    from src.utils.main_utils import load_object
+    config.incremental = True
+    config.base_model_file_path = str(tmp_path / 'missing' / 'model.pkl')
+    train, test = _arrays()
+    artifact = ModelTrainer(None, config).initiate_model_trainer(train_arr=train, test_arr=test,
+                                                                 preprocessor_obj=StandardScaler(), data_watermark=42)
+    model = load_object(artifact.trained_model_file_path)
+    assert len(model.trained_model_object.estimators_) == config._n_estimators
+    assert model.tree_generations is None and model.data_watermark == 42
+
+def test_incremental_retrain_keeps_the_largest_watermark(config, tmp_path):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+    from src.utils.main_utils import load_object, save_object
+    config.incremental, config._incremental_n_estimators, config._tree_window = True, 4, 0
+    config.base_model_file_path = str(tmp_path / 'production.pkl')
+    train, test = _arrays()
+    base_model = _base_model(RandomForestClassifier(n_estimators=6, random_state=0), train, data_watermark=1000)
+    base_model.preprocessing_object = StandardScaler() # the new trees are served with the production preprocessor
+    save_object(config.base_model_file_path, base_model)
+    artifact = ModelTrainer(None, config).initiate_model_trainer(train_arr=train, test_arr=test, data_watermark=1500)
+    model = load_object(artifact.trained_model_file_path)
+    assert model.tree_generations == [0] * 6 + [1] * 4 and model.data_watermark == 1500
+    assert isinstance(model.preprocessing_object, StandardScaler)
+
+@pytest.mark.parametrize('configured, expected', [(None, 1234), (99, 99)])
+def test_incremental_ingestion_starts_after_the_production_watermark(monkeypatch, tmp_path, configured, expected):
+    from sklearn.ensemble import RandomForestClassifier
+    import src.pipeline.training_pipeline as training_pipeline
+    from src.utils.main_utils import save_object
+    train, _ = _arrays()
+    base_model_file_path = str(tmp_path / 'production.pkl')
+    save_object(base_model_file_path, _base_model(RandomForestClassifier(n_estimators=2), train, data_watermark=1234))
+    ingested = []
+    monkeypatch.setattr(training_pipeline.DataIngestion, 'initiate_data_ingestion',
+                        lambda self: ingested.append(self.export_query()))
+    pipeline = training_pipeline.TrainPipeline()
+    pipeline.model_trainer_config.incremental = True
+    pipeline.model_trainer_config.base_model_file_path = base_model_file_path
+    pipeline.data_ingestion_config.min_customer_id = configured # an explicit watermark wins
+    pipeline.start_data_ingestion()
+    assert pipeline.data_ingestion_config.min_customer_id == expected
+    assert ingested == [{'id': {'$gt': expected}}]
+
+@pytest.fixture
+def no_carved_validation(monkeypatch):
+    def fail(self, train):
+        raise AssertionError('validation rows carved out of the resampled train rows')
+    monkeypatch.setattr(ModelTrainer, 'validation_split', fail)
+
+def test_compression_is_tuned_on_the_held_out_validation_rows(config, no_carved_validation):
+    from sklearn.preprocessing import StandardScaler
+    config.compression = True
+    train, test = _arrays()
+    train, validation = train[:1800], train[1800:]
+    artifact = ModelTrainer(None, config).initiate_model_trainer(train_arr=train, test_arr=test, validation_arr=validation,
+                                                                 preprocessor_obj=StandardScaler())
+    assert artifact.compression_artifact is not None
+
+def test_validation_rows_are_loaded_from_the_transformation_artifact(config, no_carved_validation, tmp_path):
+    from sklearn.preprocessing import StandardScaler
+    from src.entity.artifact_entity import DataTransformationArtifact
+    from src.utils.main_utils import save_numpy_array_data, save_object
+    config.feature_selection = True
+    config.feature_selection_n_jobs = 1
+    train_features, preprocessor, train, test = _feature_arrays(8000)
+    n_fit = len(train) * 4 // 5
+    paths = {name: str(tmp_path / f'{name}.npy') for name in ('train', 'test', 'validation')}
+    for name, array in (('train', train[:n_fit]), ('test', test), ('validation', train[n_fit:])):
+        save_numpy_array_data(paths[name], array)
+    save_object(str(tmp_path / 'preprocessor.pkl'), preprocessor)
+    artifact = DataTransformationArtifact(str(tmp_path / 'preprocessor.pkl'), paths['train'], paths['test'],
+                                          transformed_validation_file_path=paths['validation'])
+    model_trainer_artifact = ModelTrainer(artifact, config).initiate_model_trainer(train_features_df=train_features.iloc[:n_fit])
+    assert model_trainer_artifact.feature_selection_artifact is not None
+
+@pytest.mark.parametrize('compression, feature_selection, expected', [(False, False, 0.0), (True, False, 0.2),
+                                                                      (False, True, 0.2)])
+def test_pipeline_holds_out_validation_rows_only_when_they_are_used(compression, feature_selection, expected):
+    from src.pipeline.training_pipeline import TrainPipeline
+    pipeline = TrainPipeline()
+    pipeline.model_trainer_config.compression = compression
+    pipeline.model_trainer_config.feature_selection = feature_selection
+    pipeline.model_trainer_config.validation_split_ratio = 0.2
+    assert pipeline.validation_split_ratio() == expected
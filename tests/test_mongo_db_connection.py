@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from src.constants import MONGODB_URL_KEY
+from src.configuration.mongo_db_connection import MongoDBClient
+from src.configuration.mongo_pool_metrics import PoolMetricsListener
+
+class FakeMongoClient:
+    def __init__(self, url, event_listeners=(), **kwargs):
+        self.url, self.event_listeners, self.kwargs = url, list(event_listeners), kwargs
+        self.closed = False
+
+    def __getitem__(self, database_name):
+        return database_name
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def clients(monkeypatch):
+    """
+    Empty per-process client caches and a pymongo.MongoClient that records its arguments instead of connecting.
+    """
+    import pymongo
+    monkeypatch.setattr(MongoDBClient, '_clients', {})
+    monkeypatch.setattr(MongoDBClient, '_metrics', {})
+    monkeypatch.setattr(pymongo, 'MongoClient', FakeMongoClient)
+    monkeypatch.setenv(MONGODB_URL_KEY, 'mongodb://localhost:27017')
+    return MongoDBClient
+
+def test_one_client_per_process(clients, monkeypatch):
+    parent_pid = os.getpid()
+    first = MongoDBClient('db').client
+    assert MongoDBClient('other').client is first
+    monkeypatch.setattr(os, 'getpid', lambda: -1) # as seen from a forked child
+    child = MongoDBClient.get_client()
+    assert child is not first and set(clients._clients) == {parent_pid, -1}
+    MongoDBClient.close()
+    assert child.closed and not first.closed and set(clients._clients) == {parent_pid}
+
+def test_fork_resets_the_caches_in_the_child(clients):
+    MongoDBClient.get_client()
+    lock = MongoDBClient._lock
+    MongoDBClient._after_fork_in_child()
+    assert MongoDBClient._clients == {} and MongoDBClient._metrics == {}
+    assert MongoDBClient._lock is not lock
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+def test_forked_child_builds_its_own_client(clients):
+    parent = MongoDBClient.get_client()
+    pid = os.fork()
+    if pid == 0: # child: report through the exit code, never return into pytest
+        os._exit(0 if MongoDBClient._clients == {} and MongoDBClient.get_client() is not parent else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+@pytest.mark.parametrize('url, verifies_tls', [('mongodb://localhost:27017', False),
+                                               ('mongodb+srv://cluster.example.net', True),
+                                               ('mongodb://host:27017/?tls=true', True),
+                                               ('mongodb://host:27017/?ssl=true', True)])
+def test_ca_file_is_only_given_to_tls_connections(clients, monkeypatch, url, verifies_tls):
+    monkeypatch.setenv(MONGODB_URL_KEY, url)
+    client = MongoDBClient.get_client()
+    assert ('tlsCAFile' in client.kwargs) == verifies_tls
+    assert isinstance(client.event_listeners[0], PoolMetricsListener)
+
+def test_missing_url_is_an_error(clients, monkeypatch):
+    monkeypatch.delenv(MONGODB_URL_KEY)
+    with pytest.raises(Exception, match=MONGODB_URL_KEY):
+        MongoDBClient('db')
+
+def test_pool_listener_counts_connections_and_checkouts(clients):
+    MongoDBClient.get_client()
+    listener = MongoDBClient._metrics[os.getpid()]
+    for _ in range(3):
+        listener.connection_created(None)
+    listener.connection_checked_out(None)
+    listener.connection_checked_out(None)
+    listener.connection_checked_in(None)
+    listener.connection_checked_out(None)
+    listener.connection_check_out_failed(None)
+    listener.connection_closed(None)
+    listener.pool_cleared(None)
+    metrics = MongoDBClient.pool_metrics()
+    assert metrics['open_connections'] == 2
+    assert (metrics['checked_out'], metrics['peak_checked_out'], metrics['total_checkouts']) == (2, 2, 3)
+    assert metrics['utilization'] == 2 / listener.max_pool_size
+    assert (metrics['checkout_failures'], metrics['pools_cleared']) == (1, 1)
+    listener.connection_checked_in(None)
+    listener.connection_checked_in(None)
+    listener.connection_checked_in(None) # more check-ins than check-outs never go negative
+    assert listener.snapshot()['checked_out'] == 0
@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.constants import DATABASE_NAME, TARGET_COLUMN
+from src.exception import MyException
+from src.data_access.project1_data import Poject1Data, documents_to_df, profile_from_aggregation
+from src.utils.profile_utils import (DataProfile, auto_bucket_edges_of_chunks, profile_chunks, profile_drift,
+                                     profile_frame)
+from synthetic_data import generate_frame
+
+NUMERIC = ['Age', 'Annual_Premium', 'Vintage', 'Region_Code']
+CATEGORICAL = ['Gender', 'Vehicle_Age']
+
+def _frame(rows: int = 3000, seed: int = 0):
+    df = generate_frame(rows, seed=seed)
+    df.loc[df.index[::97], 'Age'] = np.nan
+    df['Vintage'] = df['Vintage'].astype(object)
+    df.loc[df.index[5], 'Vintage'] = 'unknown' # an invalid value
+    return df
+
+def _assert_same_profile(actual: DataProfile, expected: DataProfile):
+    for profile in (actual, expected):
+        for column in profile.numeric.values():
+            column.sum, column.sum_squares = round(column.sum, 6), round(column.sum_squares, 3)
+    assert actual.to_dict() == expected.to_dict()
+
+def _chunks(df, size: int = 400):
+    return (df.iloc[start:start + size] for start in range(0, len(df), size))
+
+def test_chunked_profile_matches_the_whole_frame():
+    df = _frame()
+    edges = auto_bucket_edges_of_chunks(_chunks(df), NUMERIC, buckets=10)
+    profile = profile_chunks(_chunks(df), NUMERIC, CATEGORICAL, TARGET_COLUMN, bucket_edges=edges)
+    _assert_same_profile(profile, profile_frame(df, NUMERIC, CATEGORICAL, TARGET_COLUMN, buckets=10))
+
+def test_chunked_profile_with_reference_edges_matches_the_whole_frame():
+    reference = profile_frame(_frame(seed=1), NUMERIC, CATEGORICAL, TARGET_COLUMN)
+    df = _frame(seed=2)
+    profile = profile_chunks(_chunks(df), NUMERIC, CATEGORICAL, TARGET_COLUMN, bucket_edges=reference.bucket_edges())
+    expected = profile_frame(df, NUMERIC, CATEGORICAL, TARGET_COLUMN, reference=reference)
+    _assert_same_profile(profile, expected)
+    assert profile_drift(reference, profile) == pytest.approx(profile_drift(reference, expected))
+
+def test_empty_stream_gives_an_empty_profile():
+    profile = profile_chunks(iter([]), NUMERIC, CATEGORICAL, TARGET_COLUMN)
+    assert profile.n_rows == 0 and profile.numeric['Age'].count == 0
+
+def test_server_profile_matches_the_pandas_profile():
+    documents = [
+        {'Age': 21, 'Annual_Premium': 1000.5, 'Gender': 'Male', TARGET_COLUMN: 0},
+        {'Age': 35, 'Annual_Premium': 2000.0, 'Gender': 'Female', TARGET_COLUMN: 1},
+        {'Age': 35, 'Annual_Premium': 'bad', 'Gender': 'Male', TARGET_COLUMN: 0},
+        {'Age': 48, 'Annual_Premium': 3000.0, 'Gender': 'Male', TARGET_COLUMN: 0},
+        {'Age': 60, 'Annual_Premium': 4000.0, 'Gender': 'na', TARGET_COLUMN: 1},
+        {'Age': 'na', 'Annual_Premium': 5000.0, 'Gender': 'Female', TARGET_COLUMN: 0},
+    ]
+    # what the $facet of profile_pipeline(['Age', 'Annual_Premium'], ['Gender'], TARGET_COLUMN, buckets=2) returns
+    # for these documents: $bucketAuto buckets of round(5 / 2) numbers extended over ties, and the $group statistics
+    result = {
+        'buckets_0': [{'_id': {'min': 48, 'max': 60}, 'count': 2}, {'_id': {'min': 21, 'max': 48}, 'count': 3}],
+        'buckets_1': [{'_id': {'min': 1000.5, 'max': 4000.0}, 'count': 3}, {'_id': {'min': 4000.0, 'max': 5000.0}, 'count': 2}],
+        'frequencies_0': [{'_id': 'Male', 'count': 3}, {'_id': 'Female', 'count': 2}],
+        'frequencies_1': [{'_id': 0, 'count': 4}, {'_id': 1, 'count': 2}],
+        'statistics': [{'_id': None, 'n_rows': 6,
+                        'count_0': 5, 'null_0': 1, 'sum_0': 199, 'sum_squares_0': 8795, 'min_0': 21, 'max_0': 60,
+                        'count_1': 5, 'null_1': 0, 'sum_1': 15000.5, 'sum_squares_1': 55001000.25,
+                        'min_1': 1000.5, 'max_1': 5000.0, 'category_null_0': 1, 'category_null_1': 0}],
+    }
+    profile = profile_from_aggregation(result, ['Age', 'Annual_Premium'], ['Gender'], TARGET_COLUMN)
+    expected = profile_frame(documents_to_df(documents), ['Age', 'Annual_Premium'], ['Gender'], TARGET_COLUMN, buckets=2)
+    assert profile.source == 'server'
+    assert profile.numeric['Annual_Premium'].invalid_count == 1 and profile.numeric['Age'].bucket_counts == [3, 2]
+    profile.source = expected.source
+    _assert_same_profile(profile, expected)
+
+def _collection_data(mongo_client, df) -> Poject1Data:
+    collection = mongo_client[DATABASE_NAME]['customers']
+    collection.insert_many(df.astype(object).where(df.notna(), 'na').to_dict(orient='records'))
+    data = Poject1Data.__new__(Poject1Data)
+    data.mongo_client = SimpleNamespace(database=mongo_client[DATABASE_NAME], client=mongo_client)
+    return data
+
+def test_collection_fallback_profiles_chunk_by_chunk(mongo_client, monkeypatch):
+    data = _collection_data(mongo_client, _frame(1500))
+    collection = mongo_client[DATABASE_NAME]['customers']
+
+    exported_chunks = []
+    export = data.export_collection_in_chunks
+    def counting_export(*args, **kwargs):
+        for chunk in export(*args, **kwargs):
+            exported_chunks.append(len(chunk))
+            yield chunk
+    monkeypatch.setattr(data, 'export_collection_in_chunks', counting_export)
+
+    # mongomock has no $bucketAuto: the documents are profiled in pandas
+    profile = data.profile_collection('customers', NUMERIC, CATEGORICAL, TARGET_COLUMN, buckets=10,
+                                      fallback_chunk_size=200)
+    assert profile.source == 'pandas'
+    assert max(exported_chunks) == 200
+    expected = profile_frame(documents_to_df(list(collection.find())), NUMERIC, CATEGORICAL, TARGET_COLUMN, buckets=10)
+    _assert_same_profile(profile, expected)
+
+def _failing_aggregate(code: int):
+    from pymongo.errors import OperationFailure
+    def aggregate(*args, **kwargs):
+        raise OperationFailure(f'error {code}', code=code)
+    return aggregate
+
+def test_unsupported_pipeline_falls_back_to_pandas(mongo_client, monkeypatch):
+    data = _collection_data(mongo_client, _frame(300))
+    monkeypatch.setattr(type(mongo_client[DATABASE_NAME]['customers']), 'aggregate', _failing_aggregate(40324))
+    assert data.profile_collection('customers', NUMERIC, CATEGORICAL, TARGET_COLUMN).source == 'pandas'
+
+def test_other_server_errors_are_raised_without_exporting(mongo_client, monkeypatch):
+    data = _collection_data(mongo_client, _frame(300))
+    monkeypatch.setattr(type(mongo_client[DATABASE_NAME]['customers']), 'aggregate', _failing_aggregate(13)) # Unauthorized
+    monkeypatch.setattr(data, 'export_collection_in_chunks', lambda *args, **kwargs: pytest.fail('exported the collection'))
+    with pytest.raises(MyException, match='error 13'):
+        data.profile_collection('customers', NUMERIC, CATEGORICAL, TARGET_COLUMN)
@@ -0,0 +1,60 @@
+import pytest
+
+from src.constants import CUSTOMER_ID_COLUMN, TARGET_COLUMN
+from src.data_access.project1_data import _SAMPLE_HASH_MULTIPLIER, _SAMPLE_HASH_RANGE, hashed_sample_query
+from src.entity.config_entity import SampleRunConfig
+from src.pipeline.sample_pipeline import SampleRunPipeline, fit_linear_cost
+
+def test_linear_cost_through_two_measurements():
+    fixed, per_row = fit_linear_cost((1000, 5000), (3.0, 7.0))
+    assert fixed == pytest.approx(2.0) and per_row == pytest.approx(0.001)
+
+def test_linear_cost_fixed_part_is_never_negative():
+    fixed, per_row = fit_linear_cost((1000, 5000), (1.0, 9.0))
+    assert fixed == 0.0 and per_row == pytest.approx(0.002)
+
+@pytest.mark.parametrize('rows, values', [((1000, 5000), (3.0, 2.5)), ((5000, 5000), (3.0, 2.5))])
+def test_noisy_measurements_are_taken_as_all_per_row(rows, values):
+    assert fit_linear_cost(rows, values) == (0.0, pytest.approx(2.5 / 5000))
+
+def test_linear_cost_of_an_empty_sample():
+    assert fit_linear_cost((0, 0), (0.0, 0.0)) == (0.0, 0.0)
+
+def _pipeline(tmp_path, **kwargs) -> SampleRunPipeline:
+    return SampleRunPipeline(SampleRunConfig(sample_run_dir=str(tmp_path), **kwargs))
+
+def test_sample_rates_raise_rare_classes_to_min_class_rows(tmp_path):
+    rates = _pipeline(tmp_path, sample_rows=1000, min_class_rows=100).sample_rates({0: 9450, 1: 500, 2: 50, 3: 0})
+    assert rates == {0: pytest.approx(0.1), 1: pytest.approx(0.2), 2: 1.0}
+    assert rates[1] * 500 == pytest.approx(100) # raised from 50 rows at the collection-wide rate
+
+def test_sample_rates_of_a_collection_smaller_than_the_sample(tmp_path):
+    assert _pipeline(tmp_path, sample_rows=1000, min_class_rows=10).sample_rates({0: 400, 1: 100}) == {0: 1.0, 1: 1.0}
+
+@pytest.fixture
+def sample_collection(mongo_client):
+    collection = mongo_client['test']['sample']
+    collection.insert_many([{CUSTOMER_ID_COLUMN: i, TARGET_COLUMN: int(i % 7 == 0)} for i in range(1, 5001)])
+    return collection
+
+def _sampled_ids(collection, rates) -> set:
+    query = hashed_sample_query(rates, TARGET_COLUMN)
+    return {document[CUSTOMER_ID_COLUMN] for document in collection.find(query)}
+
+def test_smaller_rates_select_a_subset_of_larger_ones(sample_collection):
+    small = _sampled_ids(sample_collection, {0: 0.05, 1: 0.3})
+    large = _sampled_ids(sample_collection, {0: 0.2, 1: 0.6})
+    assert small and small < large
+    assert _sampled_ids(sample_collection, {0: 0.2, 1: 0.6}) == large # the same documents on every run
+
+def test_sample_query_matches_the_hash_evaluated_in_python(sample_collection):
+    rates = {0: 0.1, 1: 0.5}
+    expected = {i for i in range(1, 5001)
+                if (i * _SAMPLE_HASH_MULTIPLIER) % _SAMPLE_HASH_RANGE < int(rates[int(i % 7 == 0)] * _SAMPLE_HASH_RANGE)}
+    sampled = _sampled_ids(sample_collection, rates)
+    assert sampled == expected
+    positives = sum(i % 7 == 0 for i in sampled)
+    assert positives == pytest.approx(0.5 * 714, rel=0.15) and len(sampled) - positives == pytest.approx(0.1 * 4286, rel=0.15)
+
+def test_sample_query_leaves_out_values_without_a_rate(sample_collection):
+    assert all(i % 7 == 0 for i in _sampled_ids(sample_collection, {1: 1.0}))
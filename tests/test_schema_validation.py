@@ -0,0 +1,27 @@
+from src.utils.dtype_utils import get_dtype_plan
+from src.utils.schema_utils import get_compiled_schema
+from serving_benchmark import train_model
+from synthetic_data import generate_frame
+
+def test_row_validator_checks_the_category_vocabularies():
+    schema = get_compiled_schema()
+    df = get_dtype_plan().apply(generate_frame(200, seed=1))
+    assert schema.row_validator.validate(df).is_valid
+
+    df = generate_frame(200, seed=1)
+    df.loc[[3, 7], 'Vehicle_Age'] = '> 10 Year'
+    df.loc[5, 'Gender'] = 'Unknown'
+    report = schema.row_validator.validate(get_dtype_plan().apply(df))
+    assert report.counts() == {'Gender': {'unknown_value': 1}, 'Vehicle_Age': {'unknown_value': 2}}
+    assert report.invalid_mask.nonzero()[0].tolist() == [3, 5, 7]
+
+def test_request_validator_allows_only_category_codes_and_dummy_flags(tmp_path):
+    schema = get_compiled_schema()
+    assert schema.model_input_allowed_values(['Gender', 'Age', 'Vehicle_Damage_Yes']) == {'Gender': [0, 1],
+                                                                                          'Vehicle_Damage_Yes': [0, 1]}
+    features = train_model(rows=300, n_estimators=2, model_file_path=str(tmp_path / 'model.pkl'))
+    assert schema.request_validator.validate(features).is_valid
+    features.loc[0, 'Gender'] = 2
+    features.loc[1, 'Vehicle_Age_gt_2_Year'] = 3
+    report = schema.request_validator.validate(features)
+    assert report.counts() == {'Gender': {'unknown_value': 1}, 'Vehicle_Age_gt_2_Year': {'unknown_value': 1}}